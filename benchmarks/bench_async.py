@@ -0,0 +1,106 @@
+"""
+bench_async.py
+--------------
+Throughput of N concurrent sessions calling sql_agent tools on one event
+loop, with the tools called the way ADK calls a synchronous tool (directly on
+the loop) and through async_tools (bounded executor).
+
+Every session is a task that makes ``--calls`` tool calls, cycling through
+the cases of bench_tools (catalog-wide and single-recipe tools). For each
+strategy and session count the suite reports:
+
+    calls/s          completed tool calls per second of wall time
+    p50_ms, p95_ms   latency of one call as seen by its session
+    max_lag_ms       worst delay of a 5 ms heartbeat task on the same loop,
+                     i.e. how long other sessions (and adk web) were frozen
+
+Run from the repository root:
+    python -m benchmarks.bench_async                                # 10k recipes, read-through SQL
+    python -m benchmarks.bench_async --recipes 1000 --sessions 1 8 32 --mode snapshot
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_tools import _cases, catalog_path
+from sql_agent import async_tools, core
+
+SESSIONS = (1, 4, 16, 64)
+HEARTBEAT = 0.005
+# Cases left out: pool_metrics is not a tool and optimize_menu spends a fixed time budget.
+EXCLUDED = {"pool_metrics", "optimize_menu"}
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - t0 - HEARTBEAT)
+
+
+async def _session(calls: list, latencies: list[float], use_executor: bool) -> None:
+    for fn in calls:
+        t0 = time.perf_counter()
+        if use_executor:
+            await async_tools.call(fn, timeout=None)
+        else:
+            fn()
+            await asyncio.sleep(0)       # an ADK turn yields between events
+        latencies.append(time.perf_counter() - t0)
+
+
+async def _run(cases: list, sessions: int, calls: int, use_executor: bool) -> dict:
+    stop, lags, latencies = asyncio.Event(), [], []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _session([cases[(s + i) % len(cases)] for i in range(calls)], latencies, use_executor)
+        for s in range(sessions)
+    ))
+    wall = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1e3
+    return {
+        "calls_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "max_lag_ms": round(max(lags, default=0.0) * 1e3, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-session throughput of blocking vs async tools.")
+    parser.add_argument("--recipes", type=int, default=10_000, help="size of the synthetic catalog")
+    parser.add_argument("--sessions", type=int, nargs="+", default=list(SESSIONS))
+    parser.add_argument("--calls", type=int, default=20, help="tool calls per session")
+    parser.add_argument("--mode", choices=("sql", "snapshot"), default="sql")
+    parser.add_argument("--workers", type=int, default=async_tools.WORKERS, help="async_tools executor threads")
+    args = parser.parse_args(argv)
+
+    core.close_pools()
+    core.DB_PATH = catalog_path(args.recipes)
+    core.USE_SNAPSHOT = args.mode == "snapshot"
+    async_tools.configure(workers=args.workers)
+    cases = [fn for name, fn in _cases(core.DB_PATH).items() if name not in EXCLUDED]
+    for fn in cases:                    # warm-up: pools, snapshot, matrix
+        fn()
+
+    print(f"{args.recipes} recipes, {args.mode} mode, {args.workers} workers, {args.calls} calls per session\n")
+    print(f"{'strategy':<12}{'sessions':>9}{'calls/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max lag ms':>12}")
+    for sessions in args.sessions:
+        for label, use_executor in (("blocking", False), ("executor", True)):
+            r = asyncio.run(_run(cases, sessions, args.calls, use_executor))
+            print(f"{label:<12}{sessions:>9}{r['calls_per_s']:>10.1f}{r['p50_ms']:>10.2f}"
+                  f"{r['p95_ms']:>10.2f}{r['max_lag_ms']:>12.1f}", flush=True)
+    async_tools.shutdown()
+    core.close_pools()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+bench_coldstart.py
+------------------
+Time to first answer of a new process: the snapshot built from table scans
+versus the compiled catalog file (compiled.py).
+
+Each measurement runs in a fresh interpreter (imports are not timed), which
+opens the catalog database and answers one name lookup and one feasibility
+question, as the first tool calls of a new agent process would. Strategies:
+
+    sql        InventorySnapshot.load: table scans, dicts, NameIndex, matrix
+    compile    compiled.load_snapshot with no file yet: compile, then map it
+    mapped     compiled.load_snapshot on an up-to-date file: map it only
+
+Reported: seconds to the snapshot, seconds to the first answer, peak RSS of
+the process and the size of the compiled file. Several processes mapping the
+same file share its pages, so the file size is paid once per machine rather
+than per process.
+
+Run from the repository root:
+    python -m benchmarks.bench_coldstart
+    python -m benchmarks.bench_coldstart --sizes 10000 100000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_tools import catalog_path
+from sql_agent import compiled
+
+SIZES = (1_000, 10_000, 100_000)
+STRATEGIES = ("sql", "compile", "mapped")
+
+_CHILD = """
+import json, resource, sqlite3, sys, time
+from sql_agent import compiled
+from sql_agent.snapshot import InventorySnapshot
+strategy, path = sys.argv[1], sys.argv[2]
+t0 = time.perf_counter()
+conn = sqlite3.connect(path)
+snapshot = (InventorySnapshot.load if strategy == "sql" else compiled.load_snapshot)(conn)
+t1 = time.perf_counter()
+snapshot.resolve_recipe(next(iter(snapshot.recipes.values())))
+snapshot.feasibility()
+t2 = time.perf_counter()
+print(json.dumps({"snapshot": t1 - t0, "answer": t2 - t0,
+                  "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def _measure(strategy: str, path: str) -> dict:
+    if strategy == "compile" and os.path.exists(compiled.compiled_path(path)):
+        os.remove(compiled.compiled_path(path))
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, strategy, path], check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold start: snapshot from SQL vs compiled catalog.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many processes")
+    args = parser.parse_args(argv)
+
+    print(f"{'recipes':>9}{'strategy':>10}{'snapshot_s':>12}{'answer_s':>10}{'rss_mib':>9}{'speedup':>9}{'file_mib':>10}")
+    for size in args.sizes:
+        path = catalog_path(size)
+        baseline = None
+        for strategy in STRATEGIES:
+            runs = [_measure(strategy, path) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["answer"])
+            baseline = baseline or best["answer"]
+            file_mib = os.path.getsize(compiled.compiled_path(path)) / 2**20 if strategy != "sql" else 0.0
+            print(f"{size:>9}{strategy:>10}{best['snapshot']:>12.3f}{best['answer']:>10.3f}"
+                  f"{best['rss_mib']:>9.0f}{baseline / best['answer']:>9.1f}{file_mib:>10.1f}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
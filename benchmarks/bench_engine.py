@@ -0,0 +1,96 @@
+"""
+bench_engine.py
+---------------
+Compare the per-recipe Python feasibility loop with the vectorized
+RequirementMatrix engine on synthetic catalogs.
+
+Run from the repository root:
+    python -m benchmarks.bench_engine                 # 1k, 10k and 100k recipes
+    python -m benchmarks.bench_engine 5000 50000
+"""
+
+import random
+import sys
+import time
+
+from sql_agent.snapshot import InventorySnapshot
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def synthetic_snapshot(n_recipes: int, n_ingredients: int = 500, seed: int = 0) -> InventorySnapshot:
+    """An in-memory catalog with 1-12 ingredients per recipe."""
+    rnd = random.Random(seed)
+    ingredients = {f"i{i}": (f"ingredient {i}", rnd.randint(0, 50)) for i in range(n_ingredients)}
+    ingredient_uids = list(ingredients)
+    recipes, requirements = {}, {}
+    for r in range(n_recipes):
+        uid = f"r{r}"
+        recipes[uid] = f"recipe {r}"
+        picked = sorted(rnd.sample(ingredient_uids, rnd.randint(1, 12)), key=lambda u: ingredients[u][0])
+        requirements[uid] = [(u, rnd.randint(1, 10)) for u in picked]
+    return InventorySnapshot(recipes, ingredients, requirements)
+
+
+def python_feasibility(snapshot: InventorySnapshot) -> list[dict]:
+    """The pre-engine check_recipe_feasibility loop, one recipe at a time."""
+    results = []
+    for recipe, rows in snapshot.iter_recipes():
+        missing = [
+            {
+                "name":     r["name"],
+                "required": r["quantity"],
+                "in_stock": r["supply"],
+                "shortage": r["quantity"] - r["supply"],
+            }
+            for r in rows
+            if r["supply"] < r["quantity"]
+        ]
+        results.append({
+            "recipe_uid":  recipe["uid"],
+            "can_make":    len(missing) == 0,
+            "max_servings": min(r["supply"] // r["quantity"] for r in rows),
+            "missing_ingredients": missing,
+        })
+    return results
+
+
+def engine_feasibility(snapshot: InventorySnapshot) -> list[dict]:
+    matrix = snapshot.requirement_matrix()
+    result = matrix.evaluate()
+    missing = matrix.missing_by_row(result)
+    can_make, max_servings = result.can_make.tolist(), result.max_servings.tolist()
+    return [
+        {
+            "recipe_uid":  uid,
+            "can_make":    can_make[row],
+            "max_servings": max_servings[row],
+            "missing_ingredients": missing.get(row, []),
+        }
+        for row, uid in enumerate(matrix.recipe_uids)
+    ]
+
+
+def _best_of(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(sizes=SIZES) -> None:
+    print(f"{'recipes':>9} {'python ms':>10} {'engine ms':>10} {'evaluate ms':>12} {'speedup':>8}")
+    for n in sizes:
+        snapshot = synthetic_snapshot(n)
+        snapshot.requirement_matrix()  # build once, as the snapshot cache does
+        assert python_feasibility(snapshot) == engine_feasibility(snapshot)
+        py = _best_of(python_feasibility, snapshot)
+        en = _best_of(engine_feasibility, snapshot)
+        ev = _best_of(snapshot.requirement_matrix().evaluate)
+        print(f"{n:>9} {py * 1e3:>10.1f} {en * 1e3:>10.1f} {ev * 1e3:>12.2f} {py / en:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
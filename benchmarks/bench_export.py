@@ -0,0 +1,99 @@
+"""
+bench_export.py
+---------------
+Peak memory and time of catalog-wide listings: the complete lists of
+get_all_recipes / check_recipe_feasibility (COMPACT_RESULTS = False) versus
+streaming the same rows with core.iter_recipes / core.iter_feasibility into
+an NDJSON export (export.py) written to os.devnull.
+
+Time is the wall time of one call (the streamed one includes JSON encoding
+and the write). Peak memory is Python allocations during another call
+(tracemalloc). Both follow a warm-up call, so the snapshot and its
+feasibility view are not counted: in snapshot mode they are shared by every
+tool call anyway, and streaming from them only adds the int64 row selection.
+In read-through mode (``--modes sql``) nothing is held between calls and the
+streamed export reads one recipe at a time from the SQL cursor.
+
+The check fails (exit status 1) when a streamed export peaks above
+``--max-stream-mib``: streaming must stay bounded whatever the catalog size.
+
+Run from the repository root:
+    python -m benchmarks.bench_export
+    python -m benchmarks.bench_export --sizes 100000 --modes sql --max-stream-mib 8
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_tools import catalog_path
+from sql_agent import core, export
+
+SIZES = (1_000, 10_000, 100_000)
+MODES = ("snapshot", "sql")
+MAX_STREAM_MIB = 16.0
+
+
+def _listing(kind: str):
+    return core.get_all_recipes() if kind == "recipes" else core.check_recipe_feasibility()
+
+
+def _stream(kind: str) -> int:
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        return export.export(kind, out, "ndjson")["rows"]
+
+
+def _measure(fn) -> tuple[float, float]:
+    """(seconds, peak MiB) of ``fn``: one warm-up call, one timed call, one traced call."""
+    fn()
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    try:
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return seconds, peak / 2**20
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Peak memory of full listings vs streamed exports.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--max-stream-mib", type=float, default=MAX_STREAM_MIB,
+                        help="fail when a streamed export peaks above this")
+    args = parser.parse_args(argv)
+
+    core.COMPACT_RESULTS = False
+    failures = []
+    print(f"{'recipes':>9}{'mode':>10}{'kind':>13}{'strategy':>10}{'seconds':>10}{'peak MiB':>10}")
+    try:
+        for size in args.sizes:
+            for mode in args.modes:
+                core.close_pools()
+                core.DB_PATH = catalog_path(size)
+                core.USE_SNAPSHOT = mode == "snapshot"
+                for kind in export.KINDS:
+                    for strategy, fn in (("list", lambda: _listing(kind)), ("stream", lambda: _stream(kind))):
+                        seconds, peak = _measure(fn)
+                        print(f"{size:>9}{mode:>10}{kind:>13}{strategy:>10}{seconds:>10.3f}{peak:>10.1f}", flush=True)
+                        if strategy == "stream" and peak > args.max_stream_mib:
+                            failures.append(f"{size}/{mode}/{kind}: streamed export peaked at {peak:.1f} MiB")
+    finally:
+        core.close_pools()
+
+    if failures:
+        print(f"\n{len(failures)} export(s) above {args.max_stream_mib:.0f} MiB:")
+        print("\n".join(f"  {line}" for line in failures))
+        return 1
+    print(f"\nevery streamed export stayed under {args.max_stream_mib:.0f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+bench_feasibility.py
+--------------------
+Cost of "what can I cook" right after a stock update, with the maintained
+feasibility view (incremental) versus a full snapshot reload.
+
+On a copy of each synthetic catalog, every round changes the supply of one
+random ingredient through core.bulk_adjust_supply and then calls
+core.check_recipe_feasibility. The suite reports, per catalog size:
+
+    write_ms        the mutation tool call (including the snapshot update)
+    feasibility_ms  the following check_recipe_feasibility call (in reload
+                    mode, including dropping the old snapshot)
+    affected        recipes using the changed ingredient (mean)
+    events          feasibility change events published (mean)
+
+In "reload" mode the snapshot is invalidated after every write, which is
+what every write cost before supply changes were applied incrementally.
+
+Run from the repository root:
+    python -m benchmarks.bench_feasibility
+    python -m benchmarks.bench_feasibility --sizes 1000 100000 --rounds 50
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_tools import catalog_path
+from sql_agent import core
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def _run(db_path: str, rounds: int, reload: bool, seed: int) -> dict:
+    core.close_pools()
+    core.DB_PATH = db_path
+    core.check_recipe_feasibility()                 # warm-up: snapshot and view
+    events = []
+    unsubscribe = core.subscribe_feasibility(events.extend)
+    cache = core._get_snapshot_cache()
+    conn = sqlite3.connect(db_path)
+    names = [name for (name,) in conn.execute("SELECT name FROM ingredients ORDER BY id")]
+    conn.close()
+
+    rnd = random.Random(seed)
+    write_ms, feasibility_ms, affected = [], [], []
+    for _ in range(rounds):
+        name = rnd.choice(names)
+        t0 = time.perf_counter()
+        result = core.bulk_adjust_supply([{"ingredient_name": name, "supply": rnd.randint(0, 40)}])
+        t1 = time.perf_counter()
+        if reload:
+            cache.invalidate()
+        core.check_recipe_feasibility()
+        t2 = time.perf_counter()
+        if "error" in result:
+            continue
+        write_ms.append((t1 - t0) * 1e3)
+        feasibility_ms.append((t2 - t1) * 1e3)
+        view = core._get_snapshot().feasibility()
+        col = view.matrix.column_of.get(core._get_snapshot().ingredient_index.exact(name)[0])
+        affected.append(0 if col is None else int(view.colptr[col + 1] - view.colptr[col]))
+    unsubscribe()
+    core.close_pools()
+    return {
+        "write_ms": float(np.median(write_ms)),
+        "feasibility_ms": float(np.median(feasibility_ms)),
+        "affected": float(np.mean(affected)),
+        "events": len(events) / max(1, len(write_ms)),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="What-can-I-cook latency after a stock update.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_feasibility_")
+    print(f"{'recipes':>9}{'mode':>13}{'write ms':>10}{'feasibility ms':>16}{'affected':>10}{'events':>8}")
+    try:
+        for size in args.sizes:
+            db_path = os.path.join(workdir, f"catalog_{size}.db")
+            shutil.copy(catalog_path(size), db_path)
+            for i, mode in enumerate(("incremental", "reload")):
+                r = _run(db_path, args.rounds, mode == "reload", args.seed + i)
+                print(f"{size:>9}{mode:>13}{r['write_ms']:>10.2f}{r['feasibility_ms']:>16.2f}"
+                      f"{r['affected']:>10.0f}{r['events']:>8.1f}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
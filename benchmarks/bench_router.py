@@ -0,0 +1,173 @@
+"""
+bench_router.py
+---------------
+Hit rate, accuracy and latency of the deterministic intent router
+(sql_agent/router.py), optionally against full agent turns through the LLM.
+
+A seeded question set is built from the catalog: for every intent a few
+phrasings about random recipes and ingredients, plus questions the router
+must leave to the LLM (follow-ups, what-ifs, menus, unknown names). For each
+question the suite records whether it was routed, whether the intent was the
+expected one, and the routing time.
+
+With ``--llm N`` the first N questions are also sent through root_agent
+(ADK InMemoryRunner, one session per question) with the router off and on,
+and the wall time per turn is compared. This needs the Ollama model of
+sql_agent/agent.py to be running.
+
+Run from the repository root:
+    python -m benchmarks.bench_router                       # 1k recipes, router only
+    python -m benchmarks.bench_router --recipes 10000
+    python -m benchmarks.bench_router --recipes 10 --llm 20
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_tools import catalog_path
+from sql_agent import core, router
+
+# (expected intent, template); None = the router must fall through.
+TEMPLATES = [
+    ("max_servings", "How many servings of {recipe} can I make?"),
+    ("max_servings", "how many {recipe} can we make right now"),
+    ("count",        "Can I make {n} servings of {recipe}?"),
+    ("missing",      "Can I make {recipe}?"),
+    ("missing",      "What's missing for the {recipe}?"),
+    ("recipe",       "What's in {recipe}?"),
+    ("recipe",       "What are the ingredients of {recipe}?"),
+    ("inventory",    "What's in stock?"),
+    ("inventory",    "What ingredients do I have?"),
+    ("feasible",     "What can I make right now?"),
+    ("feasible",     "Which recipes can I cook today?"),
+    ("search",       "What can I make with {ingredient}?"),
+    ("search",       "Recipes with {ingredient}"),
+    (None,           "After making {recipe}, what else can I cook?"),
+    (None,           "How many {recipe} can I make after making {other}?"),
+    (None,           "What menu makes the best use of my stock?"),
+    (None,           "Can I make {recipe} and then {other}?"),
+    (None,           "How many servings of {recipe}xyz can I make?"),
+    (None,           "and what about {other}?"),
+    (None,           "Which is better, {recipe} or {other}?"),
+]
+
+
+def questions(db_path: str, per_template: int, seed: int = 0) -> list[tuple[str | None, str]]:
+    """``(expected intent, question)`` pairs over random recipes and ingredients of the catalog."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    recipes = [name for (name,) in conn.execute("SELECT name FROM recipes")]
+    ingredients = [name for (name,) in conn.execute("SELECT name FROM ingredients")]
+    conn.close()
+    pairs = []
+    for intent, template in TEMPLATES:
+        for _ in range(per_template if "{" in template else 1):
+            pairs.append((intent, template.format(
+                recipe=rnd.choice(recipes), other=rnd.choice(recipes),
+                ingredient=rnd.choice(ingredients), n=rnd.randint(1, 4),
+            )))
+    rnd.shuffle(pairs)
+    return pairs
+
+
+# ── Router only ───────────────────────────────────────────────────────────────
+
+def bench_router(pairs: list[tuple[str | None, str]]) -> dict:
+    router.reset_metrics()
+    for _, question in pairs:                   # warm-up: snapshot, name index, matrix
+        router.route(question)
+    router.reset_metrics()
+
+    by_intent: dict[str, dict] = {}
+    routed_ms, fallthrough_ms = [], []
+    misrouted, wrongly_routed = [], []
+    for expected, question in pairs:
+        t0 = time.perf_counter()
+        result = router.route(question)
+        elapsed = (time.perf_counter() - t0) * 1e3
+        (routed_ms if result else fallthrough_ms).append(elapsed)
+        stats = by_intent.setdefault(expected or "(llm)", {"questions": 0, "routed": 0})
+        stats["questions"] += 1
+        stats["routed"] += result is not None
+        if result and expected is None:
+            wrongly_routed.append((question, result.intent))
+        elif result and result.intent != expected:
+            misrouted.append((question, expected, result.intent))
+
+    print(f"{'intent':<16}{'questions':>10}{'routed':>8}")
+    for intent, stats in sorted(by_intent.items()):
+        print(f"{intent:<16}{stats['questions']:>10}{stats['routed']:>8}")
+    for question, intent in wrongly_routed:
+        print(f"  routed but should fall through: {question!r} -> {intent}")
+    for question, expected, intent in misrouted:
+        print(f"  misrouted: {question!r} expected {expected}, got {intent}")
+
+    metrics = router.metrics()
+    print(f"\nhit rate {metrics['hit_rate']:.1%} of {metrics['questions']} questions "
+          f"(fall-through reasons: {metrics['fallthrough']})")
+    for label, samples in (("routed answer", routed_ms), ("fall-through check", fallthrough_ms)):
+        if samples:
+            p50, p95 = np.percentile(samples, [50, 95])
+            print(f"{label:<20} p50 {p50:8.3f} ms   p95 {p95:8.3f} ms")
+    return {"metrics": metrics, "misrouted": len(misrouted) + len(wrongly_routed)}
+
+
+# ── Full agent turns ──────────────────────────────────────────────────────────
+
+async def _turn_seconds(runner, question: str) -> float:
+    from google.genai import types
+
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="bench")
+    message = types.Content(role="user", parts=[types.Part(text=question)])
+    t0 = time.perf_counter()
+    async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+        pass
+    return time.perf_counter() - t0
+
+
+async def bench_agent(pairs: list[tuple[str | None, str]], n: int) -> None:
+    from google.adk.runners import InMemoryRunner
+    from sql_agent.agent import root_agent
+
+    runner = InMemoryRunner(agent=root_agent, app_name="bench_router")
+    sample = [question for _, question in pairs[:n]]
+    seconds = {}
+    for enabled in (False, True):
+        router.configure(enabled=enabled)
+        seconds[enabled] = [await _turn_seconds(runner, q) for q in sample]
+    router.configure(enabled=True)
+
+    print(f"\n{'question':<60}{'llm s':>9}{'router s':>10}")
+    for question, off, on in zip(sample, seconds[False], seconds[True]):
+        print(f"{question[:58]:<60}{off:>9.2f}{on:>10.2f}")
+    off, on = sum(seconds[False]), sum(seconds[True])
+    print(f"\n{len(sample)} turns: {off:.1f}s without the router, {on:.1f}s with it "
+          f"({off / on:.1f}x faster)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the intent router against LLM turns.")
+    parser.add_argument("--recipes", type=int, default=1_000, help="size of the synthetic catalog")
+    parser.add_argument("--per-template", type=int, default=20, help="questions per question template")
+    parser.add_argument("--llm", type=int, default=0, metavar="N",
+                        help="also time N full agent turns with the router off and on (needs Ollama)")
+    args = parser.parse_args(argv)
+
+    core.close_pools()
+    core.DB_PATH = catalog_path(args.recipes)
+    pairs = questions(core.DB_PATH, args.per_template)
+    result = bench_router(pairs)
+    if args.llm:
+        asyncio.run(bench_agent(pairs, args.llm))
+    core.close_pools()
+    return 1 if result["misrouted"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+bench_schema.py
+---------------
+Time the tool-layer queries on a synthetic schema version 1 database (TEXT
+UUID keys, no secondary index) and on the same data after
+migrations.upgrade() (integer keys, covering index, constraints).
+
+Run from the repository root:
+    python -m benchmarks.bench_schema                 # 20k recipes, 2k ingredients
+    python -m benchmarks.bench_schema 100000 5000
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+from sql_agent.migrations import upgrade
+
+REPEAT = 5
+
+# name -> (v1 SQL, v4 SQL); "?" is bound to a recipe uid, an ingredient uid or a LIKE pattern.
+QUERIES = {
+    "catalog join (get_all_recipes)": (
+        """SELECT r.uid, r.name, i.uid, i.name, ri.quantity, i.supply
+           FROM recipes r
+           LEFT JOIN (recipe_ingredient ri JOIN ingredients i ON i.uid = ri.ingredient_uid)
+                  ON ri.recipe_uid = r.uid
+           ORDER BY r.name, r.uid, i.name""",
+        """SELECT r.uid, r.name, i.uid, i.name, ri.quantity, i.supply
+           FROM recipes r
+           LEFT JOIN (recipe_ingredient ri JOIN ingredients i ON i.id = ri.ingredient_id)
+                  ON ri.recipe_id = r.id
+           ORDER BY r.name, r.uid, i.name""",
+    ),
+    "recipe ingredients x200 (get_recipe_by_id)": (
+        """SELECT i.uid, i.name, ri.quantity, i.supply
+           FROM recipe_ingredient ri JOIN ingredients i ON i.uid = ri.ingredient_uid
+           WHERE ri.recipe_uid = ? ORDER BY i.name""",
+        """SELECT i.uid, i.name, ri.quantity, i.supply
+           FROM recipes r
+           JOIN recipe_ingredient ri ON ri.recipe_id = r.id
+           JOIN ingredients i        ON i.id = ri.ingredient_id
+           WHERE r.uid = ? ORDER BY i.name""",
+    ),
+    "recipes using ingredient x200": (
+        "SELECT recipe_uid, quantity FROM recipe_ingredient WHERE ingredient_uid = ?",
+        """SELECT r.uid, ri.quantity
+           FROM ingredients i
+           JOIN recipe_ingredient ri ON ri.ingredient_id = i.id
+           JOIN recipes r            ON r.id = ri.recipe_id
+           WHERE i.uid = ?""",
+    ),
+    "ingredient search (search_recipes_by_ingredient)": (
+        """SELECT r.uid FROM recipes r WHERE EXISTS (
+               SELECT 1 FROM recipe_ingredient ri JOIN ingredients i ON i.uid = ri.ingredient_uid
+               WHERE ri.recipe_uid = r.uid AND LOWER(i.name) LIKE LOWER(?))
+           ORDER BY r.name, r.uid""",
+        """SELECT r.uid FROM recipes r WHERE EXISTS (
+               SELECT 1 FROM recipe_ingredient ri JOIN ingredients i ON i.id = ri.ingredient_id
+               WHERE ri.recipe_id = r.id AND LOWER(i.name) LIKE LOWER(?))
+           ORDER BY r.name, r.uid""",
+    ),
+}
+
+
+def build_v1(path: str, n_recipes: int, n_ingredients: int, seed: int = 0) -> None:
+    """A schema version 1 database with 1-12 ingredients per recipe."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    upgrade(conn, target=1)
+    conn.execute("BEGIN")
+    ingredients = [(str(uuid.UUID(int=rnd.getrandbits(128))), f"ingredient {i}", rnd.randint(0, 50))
+                   for i in range(n_ingredients)]
+    conn.executemany("INSERT INTO ingredients VALUES (?, ?, ?)", ingredients)
+    for r in range(n_recipes):
+        uid = str(uuid.UUID(int=rnd.getrandbits(128)))
+        conn.execute("INSERT INTO recipes VALUES (?, ?)", (uid, f"recipe {r}"))
+        conn.executemany(
+            "INSERT INTO recipe_ingredient VALUES (?, ?, ?)",
+            [(uid, ing[0], rnd.randint(1, 10)) for ing in rnd.sample(ingredients, rnd.randint(1, 12))],
+        )
+    conn.execute("COMMIT")
+    conn.close()
+
+
+def _params(conn: sqlite3.Connection, name: str, rnd: random.Random) -> list[tuple]:
+    if "x200" not in name:
+        return [("%ingredient 1%",)] if "search" in name else [()]
+    table = "ingredients" if "using" in name else "recipes"
+    uids = [row[0] for row in conn.execute(f"SELECT uid FROM {table}")]
+    return [(uid,) for uid in rnd.sample(uids, min(200, len(uids)))]
+
+
+def time_query(conn: sqlite3.Connection, sql: str, params: list[tuple]) -> float:
+    """Best-of-REPEAT seconds to run ``sql`` once per parameter tuple."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for args in params:
+            conn.execute(sql, args).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> None:
+    n_recipes = int(argv[0]) if argv else 20_000
+    n_ingredients = int(argv[1]) if len(argv) > 1 else 2_000
+    with tempfile.TemporaryDirectory() as tmp:
+        v1_path, v4_path = os.path.join(tmp, "v1.db"), os.path.join(tmp, "v4.db")
+        build_v1(v1_path, n_recipes, n_ingredients)
+        shutil.copy(v1_path, v4_path)
+
+        conn = sqlite3.connect(v4_path, isolation_level=None)
+        start = time.perf_counter()
+        upgrade(conn)
+        conn.execute("VACUUM")
+        print(f"{n_recipes} recipes, {n_ingredients} ingredients; "
+              f"upgrade + VACUUM {time.perf_counter() - start:.2f}s")
+        conn.close()
+        print(f"file size   v1 {os.path.getsize(v1_path) / 2**20:8.1f} MiB   "
+              f"v4 {os.path.getsize(v4_path) / 2**20:8.1f} MiB\n")
+
+        old, new = sqlite3.connect(v1_path), sqlite3.connect(v4_path)
+        print(f"{'query':<50}{'v1 ms':>10}{'v4 ms':>10}{'speed-up':>10}")
+        for name, (v1_sql, v4_sql) in QUERIES.items():
+            params = _params(old, name, random.Random(1))
+            before = time_query(old, v1_sql, params)
+            after = time_query(new, v4_sql, params)
+            print(f"{name:<50}{before * 1e3:>10.1f}{after * 1e3:>10.1f}{before / after:>9.1f}x")
+        old.close()
+        new.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,170 @@
+"""
+bench_startup.py
+----------------
+Import time of the agent packages, from ``python -X importtime``, against a
+startup budget.
+
+The tool layer (sql_agent.core, the sweep workers' sql_agent.sweep,
+dice_agent.dice) must import without the agent framework: google.adk,
+LiteLlm and litellm's provider tables cost seconds and are only needed by
+sql_agent.agent / dice_agent.agent, which the packages import lazily. For
+every target the suite imports it in fresh interpreters and reports:
+
+    import_ms    best wall time of the imports the target adds (sum of the
+                 top-level cumulative times, interpreter start-up excluded)
+    modules      modules it loads
+    heaviest     the modules with the largest self time (with --top)
+
+A target fails when it is over its budget (BUDGET_MS, milliseconds on a
+developer machine; scale with ``--scale`` on slower hosts) or loads a module
+of FORBIDDEN. As with bench_tools, results can be saved as a baseline and
+later runs compared against it with a relative ``--threshold``.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --top 10 --repeat 10
+    python -m benchmarks.bench_startup --save benchmarks/baselines/startup.json
+    python -m benchmarks.bench_startup --compare benchmarks/baselines/startup.json --threshold 0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target -> budget in ms (None: reported, not checked)
+BUDGET_MS: dict[str, float | None] = {
+    "sql_agent":       20,
+    "dice_agent":      20,
+    "sql_agent.core":  250,
+    "sql_agent.sweep": 200,
+    "dice_agent.dice": 150,
+    "sql_agent.agent": None,
+    "dice_agent.agent": None,
+}
+
+# target -> module prefixes it must not load
+_AGENT_STACK = ("google", "litellm", "openai", "httpx", "pydantic")
+FORBIDDEN: dict[str, tuple[str, ...]] = {
+    "sql_agent":       _AGENT_STACK + ("numpy",),
+    "dice_agent":      _AGENT_STACK + ("numpy",),
+    "sql_agent.core":  _AGENT_STACK,
+    "sql_agent.sweep": _AGENT_STACK,
+    "dice_agent.dice": _AGENT_STACK,
+}
+
+NOISE_FLOOR_MS = 5.0
+
+
+def _importtime(code: str) -> list[tuple[int, float, float, str]]:
+    """``(depth, self_ms, cumulative_ms, module)`` per line of ``-X importtime`` for ``code``."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, int(self_us) / 1e3, int(cumulative_us) / 1e3, name.strip()))
+    return entries
+
+
+def measure(target: str, repeat: int, startup: set[str]) -> dict:
+    """Best of ``repeat`` fresh imports of ``target``."""
+    best = None
+    for _ in range(repeat):
+        entries = [e for e in _importtime(f"import {target}") if e[3] not in startup]
+        total = sum(cumulative for depth, _, cumulative, _ in entries if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+    heaviest = sorted(entries, key=lambda e: -e[1])
+    return {
+        "import_ms": round(total, 3),
+        "modules":   sorted(e[3] for e in entries),
+        "heaviest":  [(name, round(self_ms, 3)) for _, self_ms, _, name in heaviest],
+    }
+
+
+def check(target: str, result: dict, scale: float) -> list[str]:
+    """Budget and forbidden-module violations of one target."""
+    problems = []
+    budget = BUDGET_MS.get(target)
+    if budget is not None and result["import_ms"] > budget * scale:
+        problems.append(f"{target}: {result['import_ms']:.1f} ms over the {budget * scale:.0f} ms budget")
+    loaded = [
+        m for m in result["modules"]
+        if any(m == p or m.startswith(p + ".") for p in FORBIDDEN.get(target, ()))
+    ]
+    if loaded:
+        roots = sorted({m.split(".")[0] for m in loaded})
+        problems.append(f"{target}: loads {', '.join(roots)} ({len(loaded)} modules)")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import time of the agent packages against a budget.")
+    parser.add_argument("--targets", nargs="+", default=list(BUDGET_MS))
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many interpreters")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow hosts)")
+    parser.add_argument("--top", type=int, default=0, help="list this many heaviest modules per target")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail if import times regress against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed relative growth of import_ms (default 0.5)")
+    args = parser.parse_args(argv)
+
+    startup = {e[3] for e in _importtime("pass")}
+    results, problems = {}, []
+    print(f"{'target':<20}{'import ms':>11}{'budget':>9}{'modules':>9}")
+    for target in args.targets:
+        result = results[target] = measure(target, args.repeat, startup)
+        budget = BUDGET_MS.get(target)
+        print(f"{target:<20}{result['import_ms']:>11.1f}"
+              f"{'-' if budget is None else f'{budget * args.scale:.0f}':>9}{len(result['modules']):>9}", flush=True)
+        for name, self_ms in result["heaviest"][:args.top]:
+            print(f"    {name:<44}{self_ms:>9.1f}")
+        problems += check(target, result, args.scale)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        document = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+            },
+            "results": {t: {"import_ms": r["import_ms"], "modules": len(r["modules"])} for t, r in results.items()},
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1, sort_keys=True)
+        print(f"\nbaseline written to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        for target, result in results.items():
+            old = baseline.get(target)
+            if old is None:
+                continue
+            new_ms, old_ms = result["import_ms"], old["import_ms"]
+            if new_ms > old_ms * (1 + args.threshold) and new_ms - old_ms > NOISE_FLOOR_MS:
+                problems.append(f"{target}: {old_ms:.1f} -> {new_ms:.1f} ms against {args.compare}")
+
+    if problems:
+        print(f"\n{len(problems)} startup problem(s):")
+        print("\n".join(f"  {line}" for line in problems))
+        return 1
+    print("\nall targets within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+bench_sweep.py
+--------------
+Servings sweeps (sweep.SweepPool): one engine evaluation per scenario versus
+the blocked kernel inline and on process pools of growing size.
+
+For each catalog size, ``--sweep`` recipes (evenly spread over the catalog)
+are swept over 1..``--servings`` servings, i.e. what answering the question
+with simulate_remaining_recipes would take ``sweep x servings`` calls for.
+Strategies:
+
+    per-scenario   RequirementMatrix.evaluate() of each scenario's supply, one
+                   after the other (the engine work of simulate_remaining_recipes)
+    workers=1      SweepPool inline: blocks of scenarios evaluated as 2-D arrays
+    workers=N      SweepPool with N processes sharing the matrix in shared memory
+                   (the pool is warmed up first: worker start-up is paid once
+                   per process, not per sweep)
+
+Reported: wall time of the sweep, scenarios/s and speedup against
+per-scenario. Scaling with workers is bounded by the machine's cores
+(os.cpu_count() is printed).
+
+Run from the repository root:
+    python -m benchmarks.bench_sweep
+    python -m benchmarks.bench_sweep --sizes 10000 100000 --sweep 200 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_tools import catalog_path
+from sql_agent import core, sweep
+from sql_agent.sweep import SweepPool
+
+SIZES = (1_000, 10_000, 100_000)
+WORKERS = (1, 2, 4, 8)
+
+
+def _per_scenario(matrix, rows: np.ndarray, servings: int) -> int:
+    done = 0
+    for row in rows.tolist():
+        for s in range(1, servings + 1):
+            supply = matrix.supply - matrix.requirement_vector(row, s)
+            if (supply >= 0).all():
+                matrix.evaluate(supply)
+                done += 1
+    return done
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Servings sweep: per-scenario loop vs SweepPool.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--sweep", type=int, default=100, help="recipes swept per catalog")
+    parser.add_argument("--servings", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKERS))
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args(argv)
+
+    sweep.INLINE_WORK = 0           # measure the pool even for small sweeps
+    pools = {n: SweepPool(n) for n in args.workers}
+    print(f"os.cpu_count() = {os.cpu_count()}\n")
+    print(f"{'recipes':>9}{'scenarios':>11}{'strategy':>15}{'seconds':>10}{'scenarios/s':>13}{'speedup':>9}")
+    try:
+        for size in args.sizes:
+            core.close_pools()
+            core.DB_PATH = catalog_path(size)
+            matrix = core._get_snapshot().requirement_matrix()
+            rows = np.linspace(0, matrix.n_recipes - 1, min(args.sweep, matrix.n_recipes)).astype(np.int64)
+            scenarios = len(rows) * args.servings
+
+            baseline = _timed(lambda: _per_scenario(matrix, rows, args.servings), 1)
+            print(f"{size:>9}{scenarios:>11}{'per-scenario':>15}{baseline:>10.3f}"
+                  f"{scenarios / baseline:>13.0f}{1.0:>9.1f}", flush=True)
+            for n, pool in pools.items():
+                pool.run(matrix, rows[:1], 1)               # warm-up: workers, shared structure
+                seconds = _timed(lambda: pool.run(matrix, rows, args.servings), args.repeat)
+                print(f"{size:>9}{scenarios:>11}{f'workers={n}':>15}{seconds:>10.3f}"
+                      f"{scenarios / seconds:>13.0f}{baseline / seconds:>9.1f}", flush=True)
+    finally:
+        for pool in pools.values():
+            pool.close()
+        core.close_pools()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
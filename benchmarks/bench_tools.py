@@ -0,0 +1,258 @@
+"""
+bench_tools.py
+--------------
+Latency, SQL statement count and peak memory of every public function in
+sql_agent/core.py, on seeded synthetic catalogs of several sizes, in both
+snapshot and read-through (USE_SNAPSHOT = False) mode.
+
+Catalogs are built once with init_db.synthetic_catalog + bulk_load and cached
+in benchmarks/.cache/. For every case the suite reports:
+
+    p50_ms, p95_ms   steady-state wall time over ``reps`` calls (after one warm-up call)
+    statements       SQL statements executed by one call (sqlite3 trace callback)
+    peak_kib         peak Python memory allocated by one call (tracemalloc)
+
+Results can be saved as a JSON baseline and later runs compared against it.
+A case regresses when its p50 or peak memory grows by more than
+``--threshold`` (and by more than a small absolute noise floor), or when it
+executes more statements than before. Baselines are machine specific: compare
+runs from the same host.
+
+Run from the repository root:
+    python -m benchmarks.bench_tools                              # 10, 1k, 10k, 100k recipes (~10 min)
+    python -m benchmarks.bench_tools --sizes 10 1000 --modes snapshot
+    python -m benchmarks.bench_tools --save benchmarks/baselines/tools.json
+    python -m benchmarks.bench_tools --compare benchmarks/baselines/tools.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable
+
+import numpy as np
+
+from sql_agent import core
+from sql_agent.init_db import bulk_load, synthetic_catalog
+
+SIZES = (10, 1_000, 10_000, 100_000)
+MODES = ("snapshot", "sql")
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+SEED = 0
+
+MIN_REPS = 5
+MAX_REPS = 200
+CASE_BUDGET = 2.0         # seconds of timed calls per case (at least MIN_REPS)
+NOISE_FLOOR_MS = 0.2      # p50 changes below this are never regressions
+NOISE_FLOOR_KIB = 64      # same for peak memory
+
+# Admin helpers that are not tools and are not benchmarked, and the mutation
+# tools, which would change the cached catalogs (see bench_writes.py).
+SKIPPED = {
+    "close_pools", "catalog_version", "subscribe_feasibility", "feasibility_changes",
+    "consume_recipe", "restock", "bulk_adjust_supply", "close_sweep_pool", "iter_servings_sweep",
+    "iter_recipes", "iter_feasibility",
+}
+
+
+# ── Statement counting ────────────────────────────────────────────────────────
+
+_statements = 0
+_connect = sqlite3.connect
+
+
+def _count_statement(_sql: str) -> None:
+    global _statements
+    _statements += 1
+
+
+def _counting_connect(*args, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect() that counts every statement the connection runs."""
+    conn = _connect(*args, **kwargs)
+    conn.set_trace_callback(_count_statement)
+    return conn
+
+
+# ── Catalogs ──────────────────────────────────────────────────────────────────
+
+def catalog_path(n_recipes: int) -> str:
+    """Path of the seeded ``n_recipes`` catalog, built on first use."""
+    path = os.path.join(CACHE_DIR, f"catalog_{n_recipes}_seed{SEED}.db")
+    if not os.path.exists(path):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        n_ingredients = max(10, min(2_000, n_recipes // 50))
+        records = synthetic_catalog(
+            n_recipes, n_ingredients, per_recipe=(1, min(12, n_ingredients)), seed=SEED
+        )
+        bulk_load(path + ".tmp", records)
+        # Switch to WAL now, as the pool would on first use: changing the
+        # journal mode bumps data_version and would force one extra snapshot
+        # rebuild in the middle of the measurements.
+        conn = sqlite3.connect(path + ".tmp")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def _cases(db_path: str) -> dict[str, Callable[[], object]]:
+    """One representative call per public core function, on recipes from the middle of the catalog."""
+    conn = sqlite3.connect(db_path)
+    recipes = conn.execute("SELECT uid, name FROM recipes ORDER BY id").fetchall()
+    uid, name = recipes[len(recipes) // 2]
+    other = recipes[len(recipes) // 3][1]
+    n_ingredients = conn.execute("SELECT COUNT(*) FROM ingredients").fetchone()[0]
+    (term,) = conn.execute("SELECT name FROM ingredients WHERE id = ?", (n_ingredients // 2 + 1,)).fetchone()
+    conn.close()
+    plan = [{"recipe_name": name, "servings": 1}, {"recipe_name": other, "servings": 1}]
+    return {
+        "get_all_recipes":            core.get_all_recipes,
+        "get_recipe_by_id":           lambda: core.get_recipe_by_id(uid),
+        "get_inventory":              core.get_inventory,
+        "check_recipe_feasibility":   core.check_recipe_feasibility,
+        "search_recipes_by_ingredient": lambda: core.search_recipes_by_ingredient(term),
+        "get_missing_ingredients":    lambda: core.get_missing_ingredients(name),
+        "get_max_servings":           lambda: core.get_max_servings(name),
+        "simulate_remaining_recipes": lambda: core.simulate_remaining_recipes(name, 1),
+        "simulate_plan":              lambda: core.simulate_plan(steps=plan),
+        "optimize_menu":              lambda: core.optimize_menu(mode="fast", time_budget_seconds=0.2),
+        "simulate_servings_sweep":    lambda: core.simulate_servings_sweep([name, other], 3),
+        "pool_metrics":               core.pool_metrics,
+    }
+
+
+def public_functions() -> set[str]:
+    return {
+        name for name, value in vars(core).items()
+        if callable(value) and not name.startswith("_")
+        and getattr(value, "__module__", None) == core.__name__
+        and name not in SKIPPED
+    }
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+def measure(fn: Callable[[], object], budget: float = CASE_BUDGET) -> dict:
+    global _statements
+    fn()                                    # warm-up: pools, snapshot, matrix
+    _statements = 0
+    fn()
+    statements = _statements
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < MAX_REPS and (len(samples) < MIN_REPS or time.perf_counter() - started < budget):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95 = np.percentile(samples, [50, 95]) * 1e3
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "reps": len(samples),
+        "statements": statements,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run(sizes, modes, budget: float = CASE_BUDGET) -> dict:
+    missing = public_functions() - set(_cases(catalog_path(min(sizes))))
+    if missing:
+        print(f"warning: no benchmark case for {sorted(missing)}", file=sys.stderr)
+
+    results = {}
+    sqlite3.connect = _counting_connect
+    try:
+        for n in sizes:
+            path = catalog_path(n)
+            for mode in modes:
+                core.close_pools()
+                core.DB_PATH = path
+                core.USE_SNAPSHOT = mode == "snapshot"
+                for name, fn in _cases(path).items():
+                    key = f"{n}/{mode}/{name}"
+                    results[key] = measure(fn, budget)
+                    r = results[key]
+                    print(f"{key:<52}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+                          f"{r['statements']:>7}{r['peak_kib']:>12.1f}", flush=True)
+    finally:
+        sqlite3.connect = _connect
+        core.close_pools()
+    return results
+
+
+# ── Baselines ─────────────────────────────────────────────────────────────────
+
+def save(path: str, results: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    document = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=1, sort_keys=True)
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """Human-readable regressions of ``results`` against ``baseline["results"]``."""
+    regressions = []
+    for key, new in results.items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        if new["p50_ms"] > old["p50_ms"] * (1 + threshold) and new["p50_ms"] - old["p50_ms"] > NOISE_FLOOR_MS:
+            regressions.append(f"{key}: p50 {old['p50_ms']:.3f} -> {new['p50_ms']:.3f} ms")
+        if new["peak_kib"] > old["peak_kib"] * (1 + threshold) and new["peak_kib"] - old["peak_kib"] > NOISE_FLOOR_KIB:
+            regressions.append(f"{key}: peak memory {old['peak_kib']:.0f} -> {new['peak_kib']:.0f} KiB")
+        if new["statements"] > old["statements"]:
+            regressions.append(f"{key}: statements {old['statements']} -> {new['statements']}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every sql_agent tool across catalog sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--budget", type=float, default=CASE_BUDGET, help="seconds of timed calls per case")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail if results regress against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative growth of p50 / peak memory (default 0.25)")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<52}{'p50 ms':>10}{'p95 ms':>10}{'stmts':>7}{'peak KiB':>12}")
+    results = run(args.sizes, args.modes, args.budget)
+    if args.save:
+        save(args.save, results)
+        print(f"\nbaseline written to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"\nno regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+bench_writes.py
+---------------
+Throughput of concurrent stock updates, committed one transaction per write
+versus group-committed by writes.WriteBatcher.
+
+``--terminals`` threads each make ``--writes`` small supply changes (+1 or
+-1 on a random ingredient, guarded like the mutation tools) on a copy of a
+synthetic catalog. Strategies:
+
+    per-write     every thread has its own connection and commits each change
+                  in its own BEGIN IMMEDIATE transaction (busy_timeout waits)
+    batched       one WriteBatcher, linger 0: commits whatever queued up
+                  while the previous commit ran
+    batched+2ms   one WriteBatcher that waits up to 2 ms for more writes
+                  (fewer commits, but every write pays the wait when the
+                  load is light: the reason LINGER_S defaults to 0)
+
+For each strategy and terminal count the suite reports writes/s, p50/p95
+latency of one write and the number of commits (each one a WAL sync with
+the default synchronous=FULL).
+
+Run from the repository root:
+    python -m benchmarks.bench_writes
+    python -m benchmarks.bench_writes --terminals 1 4 16 64 --writes 200 --synchronous NORMAL
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_tools import catalog_path
+from sql_agent import migrations
+from sql_agent.pool import DEFAULT_PRAGMAS
+from sql_agent.writes import Rejected, WriteBatcher, adjust
+
+TERMINALS = (1, 4, 16, 64)
+
+
+def _changes(uids: list[str], n: int, seed: int) -> list[dict]:
+    rnd = random.Random(seed)
+    return [{"uid": uid, "name": uid, "delta": rnd.choice((1, -1))} for uid in rnd.choices(uids, k=n)]
+
+
+def _per_write(db_path: str, pragmas: dict, work: list[list[dict]]) -> tuple[list[float], int]:
+    latencies, commits, lock = [], [0], threading.Lock()
+
+    def terminal(changes: list[dict]) -> None:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.execute("PRAGMA busy_timeout = 60000")
+        mine = []
+        for change in changes:
+            t0 = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                adjust(conn, [change])
+                conn.execute("COMMIT")
+            except Rejected:
+                conn.execute("ROLLBACK")
+            mine.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            commits[0] += len(mine)
+
+    threads = [threading.Thread(target=terminal, args=(changes,)) for changes in work]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, commits[0]
+
+
+def _batched(db_path: str, pragmas: dict, work: list[list[dict]], linger: float) -> tuple[list[float], int]:
+    batcher = WriteBatcher(db_path, pragmas=pragmas, linger=linger)
+    latencies, lock = [], threading.Lock()
+
+    def terminal(changes: list[dict]) -> None:
+        mine = []
+        for change in changes:
+            t0 = time.perf_counter()
+            batcher.submit(lambda conn, change=change: adjust(conn, [change]))
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=terminal, args=(changes,)) for changes in work]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    commits = batcher.stats()["batches"]
+    batcher.close()
+    return latencies, commits
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent stock updates: one commit per write vs group commit.")
+    parser.add_argument("--recipes", type=int, default=1_000, help="size of the synthetic catalog")
+    parser.add_argument("--terminals", type=int, nargs="+", default=list(TERMINALS))
+    parser.add_argument("--writes", type=int, default=100, help="writes per terminal")
+    parser.add_argument("--synchronous", default="FULL", choices=("OFF", "NORMAL", "FULL"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_writes_")
+    db_path = os.path.join(workdir, "catalog.db")
+    shutil.copy(catalog_path(args.recipes), db_path)
+    migrations.upgrade_path(db_path)
+    conn = sqlite3.connect(db_path)
+    uids = [uid for (uid,) in conn.execute("SELECT uid FROM ingredients")]
+    conn.execute("UPDATE ingredients SET supply = supply + 1000000")     # -1 never runs short
+    conn.commit()
+    conn.close()
+    pragmas = {**DEFAULT_PRAGMAS, "synchronous": args.synchronous}
+
+    print(f"{args.recipes} recipes, {len(uids)} ingredients, {args.writes} writes per terminal, "
+          f"synchronous={args.synchronous}\n")
+    print(f"{'strategy':<14}{'terminals':>10}{'writes/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'commits':>9}")
+    try:
+        for terminals in args.terminals:
+            work = [_changes(uids, args.writes, args.seed + t) for t in range(terminals)]
+            for label, run in (
+                ("per-write", lambda: _per_write(db_path, pragmas, work)),
+                ("batched", lambda: _batched(db_path, pragmas, work, 0.0)),
+                ("batched+2ms", lambda: _batched(db_path, pragmas, work, 0.002)),
+            ):
+                started = time.perf_counter()
+                latencies, commits = run()
+                wall = time.perf_counter() - started
+                p50, p95 = np.percentile(latencies, [50, 95]) * 1e3
+                print(f"{label:<14}{terminals:>10}{len(latencies) / wall:>11.0f}{p50:>9.2f}{p95:>9.2f}"
+                      f"{commits:>9}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+fake_llm.py
+-----------
+A local stand-in for ``LiteLlm(model="ollama_chat/...")`` that replays
+scripted tool-call sequences, for load tests without a live Ollama.
+
+FakeLlm is an ADK BaseLlm like LiteLlm, so it can replace the model of any
+agent (or the ``inner`` model of llm_cache.CachedLlm). Every user prompt is
+matched against a list of Scenarios: a prompt template such as
+"How many servings of {recipe} can I make?" whose placeholders capture the
+names used in the tool arguments. A scenario is a sequence of steps, each
+one model response calling one or more tools (several calls in a step run
+concurrently, as when a model emits parallel function calls), followed by a
+final text answer. The step to replay is the number of tool-result messages
+since the last user message.
+
+Latency follows a simple model of a local LLM server:
+
+    queue       wait for one of ``parallel`` generation slots (Ollama serves
+                OLLAMA_NUM_PARALLEL requests at a time)
+    prefill     prompt tokens / prefill_tps (the whole conversation,
+                including tool results, is re-read every call)
+    decode      first_token_s + output tokens / decode_tps
+
+Tokens are estimated at 4 characters per token. The responses carry
+usage_metadata, and the time split is added to the current tracing span as
+``fake.queue_s``, ``fake.prefill_s`` and ``fake.decode_s``.
+"""
+
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from sql_agent import tracing
+
+CHARS_PER_TOKEN = 4
+_PLACEHOLDER = re.compile(r"\\\{(\w+)\\\}")
+
+
+@dataclass
+class Scenario:
+    """
+    A scripted conversation turn.
+
+    ``steps`` holds one list of tool calls per model response, each call a
+    ``{"name": ..., "args": {...}}`` dict. String values in the arguments and
+    the answer are formatted with the names captured by the prompt
+    placeholders, in nested dicts and lists too.
+    """
+
+    prompt: str
+    steps: list[list[dict]] = field(default_factory=list)
+    answer: str = "Done."
+    pattern: re.Pattern = field(init=False, repr=False)
+
+    def __post_init__(self):
+        regex = _PLACEHOLDER.sub(lambda m: f"(?P<{m.group(1)}>.+?)", re.escape(self.prompt))
+        self.pattern = re.compile(regex, re.IGNORECASE)
+
+
+def _fill(value, names: dict[str, str]):
+    if isinstance(value, str):
+        return value.format(**names)
+    if isinstance(value, dict):
+        return {k: _fill(v, names) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, names) for v in value]
+    return value
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class FakeLlm(BaseLlm):
+    """Replays Scenarios with simulated queueing, prefill and decode latency."""
+
+    scenarios: list[Scenario]
+    prefill_tps: float = 200.0
+    decode_tps: float = 20.0
+    first_token_s: float = 0.05
+    answer_tokens: int = 60         # decoded tokens of a final answer
+    parallel: int = 1
+    calls: int = 0
+    _semaphores: dict = PrivateAttr(default_factory=dict)
+
+    def _slots(self) -> asyncio.Semaphore:
+        """Generation slots of the running loop (asyncio primitives are bound to a loop)."""
+        loop = asyncio.get_running_loop()
+        slots = self._semaphores.get(loop)
+        if slots is None:
+            slots = self._semaphores[loop] = asyncio.Semaphore(self.parallel)
+        return slots
+
+    def _respond(self, llm_request: LlmRequest) -> tuple[types.Content, int]:
+        """The scripted response for the conversation so far, and its output tokens."""
+        last_user = max(
+            (i for i, c in enumerate(llm_request.contents)
+             if c.role == "user" and any(p.text for p in c.parts or ())),
+            default=None,
+        )
+        if last_user is None:
+            return types.Content(role="model", parts=[types.Part(text="Hello!")]), 2
+        prompt = " ".join(p.text for p in llm_request.contents[last_user].parts if p.text).strip()
+        step = sum(
+            1 for c in llm_request.contents[last_user + 1:]
+            if any(p.function_response for p in c.parts or ())
+        )
+        for scenario in self.scenarios:
+            match = scenario.pattern.fullmatch(prompt)
+            if match is None:
+                continue
+            names = match.groupdict()
+            if step < len(scenario.steps):
+                calls = [
+                    types.FunctionCall(name=call["name"], args=_fill(call.get("args", {}), names))
+                    for call in scenario.steps[step]
+                ]
+                tokens = sum(_tokens(json.dumps({"name": c.name, "args": c.args})) for c in calls)
+                return types.Content(role="model", parts=[types.Part(function_call=c) for c in calls]), tokens
+            return types.Content(role="model", parts=[types.Part(text=_fill(scenario.answer, names))]), self.answer_tokens
+        return types.Content(role="model", parts=[types.Part(text="I can only answer scripted questions.")]), self.answer_tokens
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        system = str(llm_request.config.system_instruction or "") if llm_request.config else ""
+        conversation = json.dumps(
+            [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents], default=str
+        )
+        prompt_tokens = _tokens(system) + _tokens(conversation)
+        content, output_tokens = self._respond(llm_request)
+
+        prefill = prompt_tokens / self.prefill_tps if self.prefill_tps else 0.0
+        decode = self.first_token_s + (output_tokens / self.decode_tps if self.decode_tps else 0.0)
+        loop = asyncio.get_running_loop()
+        queued = started = loop.time()
+        if prefill + decode > 0:        # zero latency: no server to queue for
+            async with self._slots():
+                started = loop.time()
+                await asyncio.sleep(prefill + decode)
+
+        current = tracing.current_span()
+        if current is not None:
+            current.attributes["fake.queue_s"] = started - queued
+            current.attributes["fake.prefill_s"] = prefill
+            current.attributes["fake.decode_s"] = decode
+        yield LlmResponse(
+            content=content,
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+
+# ── Scripts ───────────────────────────────────────────────────────────────────
+
+SQL_SCENARIOS = [
+    Scenario("How many servings of {recipe} can I make?",
+             [[{"name": "get_max_servings", "args": {"recipe_name": "{recipe}"}}]],
+             "You can make a few servings of {recipe}."),
+    Scenario("What can I cook today?",
+             [[{"name": "check_recipe_feasibility"}]],
+             "Here is what you can cook today."),
+    Scenario("What's in stock?",
+             [[{"name": "get_inventory"}]],
+             "Here is your inventory."),
+    Scenario("Show me the {recipe} recipe",
+             [[{"name": "get_recipe_by_id", "args": {"recipe_uid": "{recipe}"}}]],
+             "Here is the {recipe} recipe."),
+    Scenario("Which recipes use {ingredient}?",
+             [[{"name": "search_recipes_by_ingredient", "args": {"ingredient_name": "{ingredient}"}}]],
+             "These recipes use {ingredient}."),
+    Scenario("What am I missing for {recipe}, and how many can I make?",
+             [[{"name": "get_missing_ingredients", "args": {"recipe_name": "{recipe}"}},
+               {"name": "get_max_servings", "args": {"recipe_name": "{recipe}"}}]],
+             "Here is what is missing for {recipe} and how many you can make."),
+    Scenario("After making {other}, how many servings of {recipe} can I make?",
+             [[{"name": "simulate_remaining_recipes", "args": {"recipe_name": "{other}", "servings": 1}}]],
+             "After {other}, this is what you can still make."),
+    Scenario("If I make {recipe} and then {other}, what is left?",
+             [[{"name": "simulate_plan", "args": {"steps": [
+                 {"recipe_name": "{recipe}", "servings": 1}, {"recipe_name": "{other}", "servings": 1}]}}]],
+             "Here is what is left after {recipe} and {other}."),
+    Scenario("Compare {recipe} with {other}",
+             [[{"name": "get_recipe_by_id", "args": {"recipe_uid": "{recipe}"}}],
+              [{"name": "get_recipe_by_id", "args": {"recipe_uid": "{other}"}}]],
+             "{recipe} and {other} compared."),
+    Scenario("What menu makes the best use of my stock?",
+             [[{"name": "optimize_menu", "args": {"mode": "fast", "time_budget_seconds": 0.2}}]],
+             "This menu makes the best use of your stock."),
+    Scenario("Hello!", [], "Hello! Ask me about your recipes."),
+]
+
+DICE_SCENARIOS = [
+    Scenario("Roll a die", [[{"name": "roll_die"}]], "You rolled the die."),
+    Scenario("Roll two dice", [[{"name": "roll_die"}, {"name": "roll_die"}]], "You rolled two dice."),
+    Scenario("Roll 4d6 and drop the lowest",
+             [[{"name": "roll_dice", "args": {"notation": "4d6, drop lowest"}}]], "Here is your 4d6 drop lowest."),
+    Scenario("Roll a thousand dice",
+             [[{"name": "roll_dice", "args": {"count": 1000, "sides": 6}}]], "Here is the sum of 1000 dice."),
+    Scenario("Hello!", [], "Hello! Ask me to roll a die."),
+]
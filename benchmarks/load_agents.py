@@ -0,0 +1,240 @@
+"""
+load_agents.py
+--------------
+Offline load test of sql_agent or dice_agent: many concurrent ADK sessions
+against root_agent, with benchmarks/fake_llm.FakeLlm in place of Ollama.
+
+Each session is an InMemoryRunner session that sends ``--turns`` prompts drawn
+from the fake model's scenarios (filled with recipe and ingredient names of a
+synthetic catalog for sql_agent). The real agent runs unchanged (callbacks,
+router, llm_cache wrapper, async tools, SQLite) except for the model, so the
+report separates the time the model would take from the time spent in the
+tools and in the framework:
+
+    model queue     waiting for a generation slot of the fake model
+    model prefill   simulated prompt processing
+    model decode    simulated token generation
+    tools           tool execution (union of overlapping calls)
+    framework       the rest of the agent turn: ADK flow, callbacks, cache
+                    lookups, declarations, event handling
+    runner          outside the agent turn: session service, event stream
+
+Stages come from tracing spans (tracing is switched on for the run; dice_agent
+is instrumented the same way). They are wall times: with many sessions on few
+cores, "tools" and "framework" include waiting for the CPU. Run with
+``--no-latency`` to measure tool and framework overhead alone.
+
+Run from the repository root:
+    python -m benchmarks.load_agents                                   # sql_agent, 8 sessions x 5 turns
+    python -m benchmarks.load_agents --sessions 64 --turns 10 --parallel 4
+    python -m benchmarks.load_agents --agent dice --sessions 100 --no-latency
+    python -m benchmarks.load_agents --recipes 10000 --router --json load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import llm_cache
+from benchmarks.bench_tools import catalog_path
+from benchmarks.fake_llm import DICE_SCENARIOS, SQL_SCENARIOS, FakeLlm, Scenario
+from sql_agent import core, router, tracing
+
+STAGES = ("model queue", "model prefill", "model decode", "tools", "framework", "runner")
+
+
+# ── Setup ─────────────────────────────────────────────────────────────────────
+
+def _prompts(scenarios: list[Scenario], db_path: str | None, n: int, seed: int) -> list[str]:
+    """``n`` prompts cycling through the scenarios, with random catalog names."""
+    rnd = random.Random(seed)
+    recipes, ingredients = ["lemon cake"], ["eggs"]
+    if db_path is not None:
+        conn = sqlite3.connect(db_path)
+        recipes = [name for (name,) in conn.execute("SELECT name FROM recipes")]
+        ingredients = [name for (name,) in conn.execute("SELECT name FROM ingredients")]
+        conn.close()
+    prompts = []
+    for i in range(n):
+        template = scenarios[i % len(scenarios)].prompt
+        prompts.append(template.format(
+            recipe=rnd.choice(recipes), other=rnd.choice(recipes), ingredient=rnd.choice(ingredients),
+        ))
+    rnd.shuffle(prompts)
+    return prompts
+
+
+def _instrument(agent) -> None:
+    """Give ``agent`` the tracing callbacks and traced tools sql_agent already has."""
+    if agent.before_agent_callback is None:
+        agent.before_agent_callback = tracing.before_agent
+        agent.after_agent_callback = tracing.after_agent
+        agent.before_model_callback = tracing.before_model
+        agent.after_model_callback = tracing.after_model
+        agent.tools = [tracing.traced_tool(tool) for tool in agent.tools]
+
+
+def _install(agent, fake: FakeLlm) -> None:
+    if isinstance(agent.model, llm_cache.CachedLlm):
+        agent.model.inner = fake
+    else:
+        agent.model = fake
+
+
+# ── Run ───────────────────────────────────────────────────────────────────────
+
+async def _session(runner, prompts: list[str], latencies: list[float], errors: list[str]) -> None:
+    from google.genai import types
+
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="load")
+    for prompt in prompts:
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        t0 = time.perf_counter()
+        async for event in runner.run_async(user_id="load", session_id=session.id, new_message=message):
+            if event.error_code:
+                errors.append(f"{prompt!r}: {event.error_code} {event.error_message}")
+        latencies.append(time.perf_counter() - t0)
+
+
+async def _run(agent, prompts: list[list[str]]) -> dict:
+    from google.adk.runners import InMemoryRunner
+
+    runner = InMemoryRunner(agent=agent, app_name="load_agents")
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(_session(runner, session, latencies, errors) for session in prompts))
+    return {"wall": time.perf_counter() - started, "latencies": latencies, "errors": errors}
+
+
+def _union(intervals: list[tuple[int, int]]) -> int:
+    total, end = 0, None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            total += stop - start
+            end = stop
+        elif stop > end:
+            total += stop - end
+            end = stop
+    return total
+
+
+def breakdown(spans: list[dict], wall_total: float) -> dict:
+    """Seconds per stage summed over all turns, from the spans of tracing.spans()."""
+    traces = defaultdict(list)
+    for s in spans:
+        traces[s["trace_id"]].append(s)
+    stages = dict.fromkeys(STAGES, 0.0)
+    model_calls = prompt_tokens = 0
+    for trace in traces.values():
+        root = next((s for s in trace if s["parent_id"] is None), None)
+        if root is None:
+            continue
+        simulated = 0.0
+        for s in trace:
+            if s["kind"] != "model":
+                continue
+            model_calls += 1
+            prompt_tokens += s["attributes"].get("llm.prompt_tokens", 0)
+            for stage, key in (("model queue", "fake.queue_s"), ("model prefill", "fake.prefill_s"),
+                               ("model decode", "fake.decode_s")):
+                stages[stage] += s["attributes"].get(key, 0.0)
+                simulated += s["attributes"].get(key, 0.0)
+        tools = _union([(s["start_ns"], s["end_ns"]) for s in trace if s["kind"] == "tool"]) / 1e9
+        stages["tools"] += tools
+        stages["framework"] += max(0.0, (root["end_ns"] - root["start_ns"]) / 1e9 - simulated - tools)
+    stages["runner"] = max(0.0, wall_total - sum(stages[s] for s in STAGES[:5]))
+    return {"model_calls": model_calls, "prompt_tokens": prompt_tokens, "seconds": stages}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test an agent with a scripted stand-in LLM.")
+    parser.add_argument("--agent", choices=("sql", "dice"), default="sql")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--turns", type=int, default=5, help="prompts per session")
+    parser.add_argument("--recipes", type=int, default=1_000, help="synthetic catalog size (sql_agent)")
+    parser.add_argument("--prefill-tps", type=float, default=200.0, help="simulated prompt tokens per second")
+    parser.add_argument("--decode-tps", type=float, default=20.0, help="simulated output tokens per second")
+    parser.add_argument("--first-token-ms", type=float, default=50.0)
+    parser.add_argument("--parallel", type=int, default=1, help="concurrent generations (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--no-latency", action="store_true", help="zero model latency: tools and framework only")
+    parser.add_argument("--router", action="store_true", help="keep the sql_agent intent router on")
+    parser.add_argument("--llm-cache", action="store_true", help="keep llm_cache on (in-memory store)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.agent == "sql":
+        core.close_pools()
+        core.DB_PATH = catalog_path(args.recipes)
+        from sql_agent.agent import root_agent
+        scenarios, db_path = SQL_SCENARIOS, core.DB_PATH
+    else:
+        from dice_agent.agent import root_agent
+        scenarios, db_path = DICE_SCENARIOS, None
+    if args.no_latency:
+        args.prefill_tps = args.decode_tps = args.first_token_ms = 0.0
+    fake = FakeLlm(
+        model="fake/" + args.agent, scenarios=scenarios, prefill_tps=args.prefill_tps,
+        decode_tps=args.decode_tps, first_token_s=args.first_token_ms / 1e3, parallel=args.parallel,
+    )
+    _install(root_agent, fake)
+    _instrument(root_agent)
+    router.configure(enabled=args.router)
+    llm_cache.ENABLED = args.llm_cache
+    if args.llm_cache:
+        root_agent.model.store_path = ":memory:"
+    tracing.configure(enabled=True, sample_rate=1.0, max_spans=1_000_000)
+
+    # Warm-up: every scenario once (pools, snapshot, requirement matrix, declarations).
+    asyncio.run(_run(root_agent, [_prompts(scenarios, db_path, len(scenarios), args.seed + 1)]))
+    tracing.clear()
+    fake.calls = 0
+
+    prompts = _prompts(scenarios, db_path, args.sessions * args.turns, args.seed)
+    sessions = [prompts[i::args.sessions] for i in range(args.sessions)]
+    result = asyncio.run(_run(root_agent, sessions))
+    latencies = np.array(result["latencies"])
+    stages = breakdown(tracing.spans(), float(latencies.sum()))
+    n = len(latencies)
+
+    print(f"{args.agent}_agent: {args.sessions} sessions x {args.turns} turns; fake model "
+          f"prefill {args.prefill_tps:g} tok/s, decode {args.decode_tps:g} tok/s, "
+          f"first token {args.first_token_ms:g} ms, {args.parallel} slot(s)")
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"\n{n} turns in {result['wall']:.2f}s: {n / result['wall']:.2f} turns/s; "
+          f"latency p50 {p50:.3f}s  p95 {p95:.3f}s  p99 {p99:.3f}s  max {latencies.max():.3f}s")
+    print(f"model calls {fake.calls} ({fake.calls / n:.1f} per turn), "
+          f"mean prompt {stages['prompt_tokens'] / max(1, stages['model_calls']):.0f} tokens, "
+          f"errors {len(result['errors'])}")
+    print(f"\n{'stage':<16}{'ms / turn':>12}{'share':>9}")
+    total = sum(stages["seconds"].values()) or 1.0
+    for stage, seconds in stages["seconds"].items():
+        print(f"{stage:<16}{seconds / n * 1e3:>12.2f}{seconds / total:>9.1%}")
+    for error in result["errors"][:10]:
+        print(f"  error {error}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "args": vars(args),
+                "turns": n,
+                "wall_s": result["wall"],
+                "turns_per_s": n / result["wall"],
+                "latency_s": {"p50": p50, "p95": p95, "p99": p99, "max": float(latencies.max())},
+                "model_calls": fake.calls,
+                "stage_ms_per_turn": {k: v / n * 1e3 for k, v in stages["seconds"].items()},
+                "errors": result["errors"],
+            }, f, indent=1)
+    core.close_pools()
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
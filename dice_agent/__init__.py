@@ -1 +1,17 @@
-from . import agent
+"""
+dice_agent
+----------
+Dice rolling agent. ``dice`` (notation, random streams) imports without the
+agent framework; ``agent`` and ``root_agent`` (google.adk, LiteLlm) are
+imported on first access, e.g. by the ADK agent loader.
+"""
+
+import importlib
+
+
+def __getattr__(name: str):
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    if name == "root_agent":
+        return importlib.import_module(".agent", __name__).root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,23 +1,56 @@
 from google.adk.agents.llm_agent import Agent
 from google.adk.models.lite_llm import LiteLlm
-import numpy as np
+from google.adk.tools.tool_context import ToolContext
+from llm_cache import CachedLlm
 
-def roll_die() -> int:
+from . import dice
+
+
+def _session_id(tool_context: ToolContext | None) -> str:
+    return tool_context.session.id if tool_context is not None else ""
+
+
+def roll_die(tool_context: ToolContext | None = None) -> dict:
     """Return the value of a rolled dice"""
-    value = np.random.randint(1, 7)
+    rng, _ = dice.stream(_session_id(tool_context))
+    value = int(rng.integers(1, 7))
     return {"status": "success", "value":value}
 
 
+def roll_dice(
+    notation: str = "",
+    count: int = 1,
+    sides: int = 6,
+    modifier: int = 0,
+    repeat: int = 1,
+    seed: int | None = None,
+    tool_context: ToolContext | None = None,
+) -> dict:
+    return dice.roll_dice(notation, count, sides, modifier, repeat, seed, _session_id(tool_context))
+
+
+# The model sees dice.roll_dice's docstring (every argument but session_id).
+roll_dice.__doc__ = dice.roll_dice.__doc__
+
+
 root_agent = Agent(
-    model=LiteLlm(model="ollama_chat/qwen2.5:latest"),
+    # Dice results must not be replayed from the cache.
+    model=CachedLlm.wrap(LiteLlm(model="ollama_chat/qwen2.5:latest"), exclude_tools={"roll_die", "roll_dice"}),
     name="dice_agent",
     description=(
-        "hello world agent that can roll a dice of 6 sides"
+        "hello world agent that can roll dice"
     ),
     instruction="""
       You roll dice and tell the outcome of the dice.
+      For anything but a single six-sided die, call roll_dice ONCE with dice
+      notation ("3d6", "4d6+2, drop lowest", "2d20 keep highest", "d%"),
+      and use repeat for the same roll several times ("6x 4d6 drop lowest").
+      Never call a tool once per die. Pass seed only when the user asks for a
+      seed or a reproducible roll. For large rolls, report the summary (sum,
+      mean, histogram) rather than individual values.
     """,
     tools=[
         roll_die,
+        roll_dice,
     ],
-)
\ No newline at end of file
+)
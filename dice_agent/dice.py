@@ -0,0 +1,309 @@
+"""
+dice.py
+-------
+Dice rolling for the dice agent: standard dice notation, vectorised with
+numpy.random.Generator, on one seedable random stream per session.
+
+Notation (case-insensitive, spaces ignored):
+
+    d20, 3d6, d%                 N dice of S sides (N defaults to 1, % = 100)
+    4d6+2, 2d8+1d6-1             dice groups and constant modifiers, summed
+    4d6kh3 / 4d6dl1              keep highest 3 / drop lowest 1 (also kl, dh;
+    2d20kl1                      k = kh, d = dl)
+    4d6, drop lowest             the same as words after a comma, applied to
+    2d20, keep highest           the dice group (there must be exactly one)
+    6x 4d6 drop lowest           repeat the whole roll 6 times
+
+Every dice group is drawn with one ``Generator.integers`` call of shape
+(repeat, count), so a million dice cost about as much as one tool call for a
+single die. Results list the individual values only up to LIST_LIMIT; larger
+rolls come back as a summary (count, sum, mean, min, max and a histogram)
+instead of a million numbers in the model's context.
+
+Random streams: every ADK session gets its own Generator (PCG64), created on
+its first roll. Passing ``seed`` restarts the session's stream from that seed,
+so the same rolls can be replayed. With DICE_SEED set in the environment,
+new streams are derived from it and the session id, which makes whole runs
+reproducible (tests, load benchmarks).
+
+This module does not import the agent framework; agent.py passes the ADK
+session id in and exposes roll_dice as a tool.
+"""
+
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+MAX_DICE = 1_000_000          # dice per call, over all groups and repeats
+MAX_SIDES = 1_000_000
+LIST_LIMIT = 50               # list values up to this many, summarise beyond
+HISTOGRAM_MAX_BINS = 100
+MAX_SESSIONS = 10_000         # streams kept (least recently used are dropped)
+DICE_SEED = int(os.environ["DICE_SEED"]) if os.environ.get("DICE_SEED") else None
+
+_DEFAULT_SESSION = ""         # stream of calls made outside an ADK session
+
+
+# ── Notation ──────────────────────────────────────────────────────────────────
+
+@dataclass
+class DiceGroup:
+    """``count`` dice of ``sides`` sides; keep ``keep`` of them ("kh"/"kl"), all when None."""
+
+    count: int
+    sides: int
+    sign: int = 1
+    keep: tuple[str, int] | None = None
+
+    def label(self) -> str:
+        text = f"{self.count}d{self.sides}"
+        if self.keep is not None:
+            text += f"{self.keep[0]}{self.keep[1]}"
+        return text
+
+
+_REPEAT = re.compile(r"^(\d+)\s*x\s*(?=\S)", re.IGNORECASE)
+_TERM = re.compile(r"([+-])?(?:(\d*)d(\d+|%)(?:(kh|kl|dh|dl|k|d)(\d+))?|(\d+))", re.IGNORECASE)
+_OPTION = re.compile(r"(drop|keep)\s*(lowest|highest)\s*(\d+)?", re.IGNORECASE)
+
+
+def _keep(count: int, op: str, n: int) -> tuple[str, int]:
+    """Normalise a keep/drop operator to ("kh" | "kl", how many are kept)."""
+    op = {"k": "kh", "d": "dl"}.get(op, op)
+    if n < 0 or n > count:
+        raise ValueError(f"cannot {'keep' if op[0] == 'k' else 'drop'} {n} of {count} dice.")
+    if op == "dl":
+        return "kh", count - n
+    if op == "dh":
+        return "kl", count - n
+    return op, n
+
+
+def parse(notation: str) -> tuple[list[DiceGroup], int, int]:
+    """
+    Parse dice notation into ``(groups, modifier, repeat)``.
+
+    Raises:
+        ValueError with a message meant for the user.
+    """
+    text = notation.strip()
+    repeat = 1
+    match = _REPEAT.match(text)
+    if match:
+        repeat = int(match.group(1))
+        text = text[match.end():]
+    expression, *options = [part.strip() for part in re.split(r",|\s+(?=(?:drop|keep)\b)", text, flags=re.IGNORECASE)]
+
+    groups, modifier, pos = [], 0, 0
+    compact = re.sub(r"\s+", "", expression)
+    while pos < len(compact):
+        match = _TERM.match(compact, pos)
+        if match is None or match.end() == pos or (pos > 0 and match.group(1) is None):
+            raise ValueError(f"cannot read '{compact[pos:]}' in '{notation}'.")
+        sign = -1 if match.group(1) == "-" else 1
+        if match.group(6) is not None:
+            modifier += sign * int(match.group(6))
+        else:
+            count = int(match.group(2) or 1)
+            sides = 100 if match.group(3) == "%" else int(match.group(3))
+            keep = _keep(count, match.group(4).lower(), int(match.group(5))) if match.group(4) else None
+            groups.append(DiceGroup(count, sides, sign, keep))
+        pos = match.end()
+    if not groups:
+        raise ValueError(f"'{notation}' has no dice (write e.g. 2d6).")
+
+    for option in filter(None, options):
+        match = _OPTION.fullmatch(option)
+        if match is None:
+            raise ValueError(f"unknown option '{option}' (use e.g. 'drop lowest' or 'keep highest 2').")
+        if len(groups) != 1 or groups[0].keep is not None:
+            raise ValueError(f"'{option}' needs exactly one dice group without kh/kl/dh/dl.")
+        op = ("d" if match.group(1).lower() == "drop" else "k") + match.group(2)[0].lower()
+        groups[0].keep = _keep(groups[0].count, op, int(match.group(3) or 1))
+    return groups, modifier, repeat
+
+
+# ── Streams ───────────────────────────────────────────────────────────────────
+
+_streams: "OrderedDict[str, tuple[np.random.Generator, int | None]]" = OrderedDict()
+_streams_lock = threading.Lock()
+
+
+def _new_stream(session_id: str, seed: int | None) -> np.random.Generator:
+    if seed is not None:
+        return np.random.Generator(np.random.PCG64(seed))
+    if DICE_SEED is not None:
+        sequence = np.random.SeedSequence(DICE_SEED, spawn_key=(zlib.crc32(session_id.encode()),))
+        return np.random.Generator(np.random.PCG64(sequence))
+    return np.random.default_rng()
+
+
+def stream(session_id: str = _DEFAULT_SESSION, seed: int | None = None) -> tuple[np.random.Generator, int | None]:
+    """
+    The random stream of a session and the seed it was started from (None
+    for fresh entropy). A ``seed`` restarts the stream.
+    """
+    with _streams_lock:
+        entry = _streams.get(session_id)
+        if entry is None or seed is not None:
+            entry = _streams[session_id] = (_new_stream(session_id, seed), seed)
+        _streams.move_to_end(session_id)
+        while len(_streams) > MAX_SESSIONS:
+            _streams.popitem(last=False)
+        return entry
+
+
+def reset_streams() -> None:
+    with _streams_lock:
+        _streams.clear()
+
+
+# ── Rolling ───────────────────────────────────────────────────────────────────
+
+def _whole(name: str, value, minimum: int | None = None) -> int:
+    """``value`` as an int (2.0 and "2" are accepted); ValueError if it is not a whole number >= ``minimum``."""
+    try:
+        number = value if isinstance(value, int) else float(value)
+        whole = int(number)
+    except (TypeError, ValueError, OverflowError):
+        whole = None
+    if isinstance(value, bool) or whole is None or whole != number or (minimum is not None and whole < minimum):
+        bound = "" if minimum is None else f" >= {minimum}"
+        raise ValueError(f"{name} must be a whole number{bound}, got {value!r}.")
+    return whole
+
+
+def _summary(values: np.ndarray, low: int, high: int) -> dict:
+    """Count, sum, mean, min, max and a histogram (or percentiles when the range is wide)."""
+    summary = {
+        "count": int(values.size),
+        "sum":   int(values.sum()),
+        "mean":  round(float(values.mean()), 3),
+        "min":   int(values.min()),
+        "max":   int(values.max()),
+    }
+    if high - low + 1 <= HISTOGRAM_MAX_BINS:
+        counts = np.bincount(values.ravel() - low, minlength=high - low + 1)
+        summary["histogram"] = {str(low + i): int(c) for i, c in enumerate(counts.tolist()) if c}
+    else:
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        summary["percentiles"] = {"p5": float(p5), "p50": float(p50), "p95": float(p95)}
+    return summary
+
+
+def roll(groups: list[DiceGroup], modifier: int, repeat: int, rng: np.random.Generator) -> dict:
+    """Roll parsed notation on ``rng`` (see roll_dice for the result format)."""
+    totals = np.full(repeat, modifier, dtype=np.int64)
+    details = []
+    for group in groups:
+        values = rng.integers(1, group.sides + 1, size=(repeat, group.count), dtype=np.int64)
+        kept = values
+        if group.keep is not None:
+            op, n = group.keep
+            ordered = np.sort(values, axis=1)
+            kept = ordered[:, group.count - n:] if op == "kh" else ordered[:, :n]
+        subtotals = kept.sum(axis=1)
+        totals += group.sign * subtotals
+
+        detail = {"dice": ("-" if group.sign < 0 else "") + group.label()}
+        if repeat == 1 and group.count <= LIST_LIMIT:
+            detail["values"] = values[0].tolist()
+            if group.keep is not None:
+                dropped = np.sort(values[0])
+                dropped = dropped[:group.count - n] if op == "kh" else dropped[n:]
+                detail["dropped"] = dropped.tolist()
+            detail["subtotal"] = int(subtotals[0])
+        elif values.size > LIST_LIMIT:
+            detail["summary"] = _summary(values, 1, group.sides)
+        details.append(detail)
+
+    result: dict = {}
+    if repeat == 1:
+        result["total"] = int(totals[0])
+    elif repeat <= LIST_LIMIT:
+        result["totals"] = totals.tolist()
+    else:
+        low = modifier + sum(
+            g.sign * (g.keep[1] if g.keep else g.count) * (1 if g.sign > 0 else g.sides) for g in groups
+        )
+        high = modifier + sum(
+            g.sign * (g.keep[1] if g.keep else g.count) * (g.sides if g.sign > 0 else 1) for g in groups
+        )
+        result["totals_summary"] = _summary(totals, low, high)
+    result["groups"] = details
+    if modifier:
+        result["modifier"] = modifier
+    return result
+
+
+def roll_dice(
+    notation: str = "",
+    count: int = 1,
+    sides: int = 6,
+    modifier: int = 0,
+    repeat: int = 1,
+    seed: int | None = None,
+    session_id: str = _DEFAULT_SESSION,
+) -> dict:
+    """
+    Roll any number of dice in one call, e.g. "3d6", "4d6+2, drop lowest",
+    "2d20 keep highest", "6x 4d6 drop lowest" or "1000d6", on this
+    session's random stream.
+
+    Args:
+        notation: Dice notation. When given, count, sides and modifier are ignored.
+        count:    Number of dice (without notation).
+        sides:    Sides per die (without notation).
+        modifier: Constant added to the total (without notation).
+        repeat:   Roll the whole thing this many times (e.g. 6 ability scores).
+        seed:     Restart this session's random stream from this seed, to
+                  reproduce a sequence of rolls.
+
+    Returns:
+        {
+          "status": "success",
+          "notation": "4d6kh3+2",
+          "total": 15,                       # "totals": [...] when repeat > 1,
+                                             # "totals_summary": {...} when repeat > 50
+          "groups": [{"dice": "4d6kh3", "values": [6, 1, 4, 3], "dropped": [1], "subtotal": 13}],
+          "modifier": 2,
+          "seed": 42                         # only when the stream was seeded
+        }
+        Groups with more than 50 values have a "summary" instead of "values":
+        {"count": 1000, "sum": 3512, "mean": 3.512, "min": 1, "max": 6,
+         "histogram": {"1": 160, "2": 171, ...}}
+        or {"status": "error", "error_message": "..."}.
+    """
+    try:
+        repeat = _whole("repeat", repeat, 1)
+        seed = None if seed is None else _whole("seed", seed, 0)
+        if notation:
+            groups, modifier, times = parse(notation)
+            repeat *= times
+        else:
+            groups = [DiceGroup(_whole("count", count), _whole("sides", sides))]
+            modifier = _whole("modifier", modifier)
+        if repeat < 1:
+            raise ValueError("repeat must be at least 1.")
+        for group in groups:
+            if group.count < 1 or not 1 <= group.sides <= MAX_SIDES:
+                raise ValueError(f"{group.label()} needs at least one die of 1 to {MAX_SIDES:,} sides.")
+        if sum(g.count for g in groups) * repeat > MAX_DICE:
+            raise ValueError(f"at most {MAX_DICE:,} dice per roll.")
+    except (TypeError, ValueError) as exc:
+        return {"status": "error", "error_message": str(exc)}
+
+    rng, stream_seed = stream(session_id, seed)
+    label = "".join(
+        ("-" if g.sign < 0 else ("+" if i else "")) + g.label() for i, g in enumerate(groups)
+    ) + (f"{modifier:+d}" if modifier else "")
+    result = {"status": "success", "notation": (f"{repeat}x " if repeat > 1 else "") + label}
+    result.update(roll(groups, modifier, repeat, rng))
+    if stream_seed is not None:
+        result["seed"] = stream_seed
+    return result
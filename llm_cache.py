@@ -0,0 +1,340 @@
+"""
+llm_cache.py
+------------
+Persistent cache of model responses, shared by dice_agent and sql_agent.
+
+CachedLlm wraps the agent's model (LiteLlm -> Ollama) and answers a request
+it has seen before from an SQLite store instead of regenerating it. The
+cache key is the SHA-256 of:
+
+- the model name,
+- the normalised conversation: every part of every message, with whitespace
+  collapsed and the per-call function call ids dropped,
+- the request config: system instruction, tool declarations, sampling
+  settings,
+- an optional data version, e.g. core.catalog_version() for the recipe
+  database: a write to the database changes the key, so cached answers
+  about the old stock are never served.
+
+Both generations of a tool-using turn are cached: the response that calls a
+tool and, keyed on the conversation that now holds the tool result, the
+final answer. Requests and responses that involve one of ``exclude_tools``
+(tools whose result must not be replayed, such as roll_die) are neither
+looked up nor stored, and neither are streamed or failed responses.
+
+Entries expire after TTL_SECONDS; beyond MAX_ENTRIES or MAX_BYTES the least
+recently used ones are evicted. Lookups and stores run in a worker thread
+(asyncio.to_thread): the store waits up to 5 s for another process's write
+lock, which must not stall the event loop.
+
+Configuration (environment):
+    LLM_CACHE=0                  turn the cache off (CachedLlm passes through)
+    LLM_CACHE_PATH=path.db       store location (default ~/.cache/local_ai_agent/llm_cache.db)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import AsyncGenerator, Callable
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+ENABLED = os.environ.get("LLM_CACHE", "1").lower() not in ("", "0", "false", "no")
+CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "local_ai_agent", "llm_cache.db"),
+)
+TTL_SECONDS = 7 * 24 * 3600
+MAX_ENTRIES = 10_000
+MAX_BYTES = 64 * 2**20
+
+_SPACES = re.compile(r"\s+")
+
+
+# ── Store ─────────────────────────────────────────────────────────────────────
+
+class ResponseStore:
+    """
+    SQLite key -> serialised LlmResponse map with TTL and LRU eviction.
+
+    One connection guarded by a lock; several processes can share the file
+    (WAL mode, writes are single statements). The entry count and size are
+    tracked per process from the rows this store writes and deletes; other
+    processes' writes show up when the tracked totals cross a cap, at which
+    point they are recounted before anything is evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl_seconds: float = TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+        max_bytes: int = MAX_BYTES,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key      TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                bytes    INTEGER NOT NULL,
+                created  REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_by_accessed ON responses (accessed);
+            CREATE INDEX IF NOT EXISTS responses_by_created ON responses (created);
+            """
+        )
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "bypassed": 0, "evicted": 0}
+        self._count, self._bytes = self._totals()
+
+    def _totals(self) -> tuple[int, int]:
+        return self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses").fetchone()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created, bytes FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                if self._conn.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount:
+                    self._count -= 1
+                    self._bytes -= row[2]
+                self.stats["evicted"] += 1
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        nbytes = len(response.encode())
+        with self._lock:
+            replaced = self._conn.execute("SELECT bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, nbytes, now, now),
+            )
+            if replaced is None:
+                self._count += 1
+            self._bytes += nbytes - (replaced[0] if replaced else 0)
+            self.stats["stores"] += 1
+            self._evict(now)
+
+    def bypass(self) -> None:
+        """Count a request that was neither looked up nor stored."""
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def _evict(self, now: float) -> None:
+        """
+        Drop expired entries, then the least recently used ones beyond the
+        caps. Expired rows are found through the ``created`` index; the
+        table is only scanned when the tracked totals exceed a cap.
+        """
+        cutoff = now - self.ttl_seconds
+        expired, expired_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses WHERE created < ?", (cutoff,)
+        ).fetchone()
+        if expired:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+            self._count -= expired
+            self._bytes -= expired_bytes
+        evicted = expired
+        if self._count > self.max_entries or self._bytes > self.max_bytes:
+            self._count, self._bytes = self._totals()      # include other processes' writes
+        if self._count > self.max_entries or self._bytes > self.max_bytes:
+            keep, kept_bytes = 0, 0
+            for key, nbytes in self._conn.execute(
+                "SELECT key, bytes FROM responses ORDER BY accessed DESC"
+            ).fetchall():
+                if keep < self.max_entries and kept_bytes + nbytes <= self.max_bytes:
+                    keep += 1
+                    kept_bytes += nbytes
+                    continue
+                evicted += self._conn.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount
+            self._count, self._bytes = keep, kept_bytes
+        self.stats["evicted"] += evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._count, self._bytes = 0, 0
+
+    def metrics(self) -> dict:
+        """
+        Returns:
+            {"entries": 120, "bytes": 480000, "hits": 40, "misses": 90, "hit_rate": 0.308,
+             "stores": 85, "bypassed": 6, "evicted": 0}
+        """
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses"
+            ).fetchone()
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": count,
+                "bytes": size,
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: dict[str, ResponseStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str = CACHE_PATH) -> ResponseStore:
+    """The process-wide store for ``path``, shared by every CachedLlm using it."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ResponseStore(path)
+        return store
+
+
+# ── Keys ──────────────────────────────────────────────────────────────────────
+
+def _normalize_part(part: types.Part) -> dict:
+    data = part.model_dump(mode="json", exclude_none=True)
+    if "text" in data:
+        data["text"] = _SPACES.sub(" ", data["text"]).strip()
+    for field in ("function_call", "function_response"):
+        if field in data:
+            data[field].pop("id", None)       # generated per call
+    data.pop("thought_signature", None)
+    return data
+
+
+def _tool_names(contents: list[types.Content]) -> set[str]:
+    names = set()
+    for content in contents:
+        for part in content.parts or ():
+            for call in (part.function_call, part.function_response):
+                if call is not None and call.name:
+                    names.add(call.name)
+    return names
+
+
+def request_key(llm_request: LlmRequest, model: str, version: str = "") -> str:
+    """SHA-256 of the normalised request (see the module docstring)."""
+    payload = {
+        "model": model,
+        "version": version,
+        "contents": [
+            {"role": c.role, "parts": [_normalize_part(p) for p in c.parts or ()]}
+            for c in llm_request.contents
+        ],
+        "config": llm_request.config.model_dump(mode="json", exclude_none=True) if llm_request.config else {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+# ── Model wrapper ─────────────────────────────────────────────────────────────
+
+class CachedLlm(BaseLlm):
+    """
+    A model that serves repeated requests from a ResponseStore and forwards
+    the others to ``inner``.
+
+        Agent(model=CachedLlm.wrap(LiteLlm(model="ollama_chat/qwen2.5:latest"),
+                                   version=core.catalog_version))
+    """
+
+    inner: BaseLlm
+    version: Callable[[], str] | None = None
+    exclude_tools: frozenset[str] = frozenset()
+    store_path: str = CACHE_PATH
+
+    @classmethod
+    def wrap(
+        cls,
+        inner: BaseLlm,
+        version: Callable[[], str] | None = None,
+        exclude_tools: set[str] | frozenset[str] = frozenset(),
+        store_path: str = CACHE_PATH,
+    ) -> "CachedLlm":
+        return cls(
+            model=inner.model, inner=inner, version=version,
+            exclude_tools=frozenset(exclude_tools), store_path=store_path,
+        )
+
+    @property
+    def store(self) -> ResponseStore:
+        return get_store(self.store_path)
+
+    def _cacheable(self, llm_request: LlmRequest) -> bool:
+        return not (_tool_names(llm_request.contents) & self.exclude_tools)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if not ENABLED or stream or not self._cacheable(llm_request):
+            if ENABLED:
+                self.store.bypass()
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                yield response
+            return
+
+        key = request_key(llm_request, self.model, self.version() if self.version else "")
+        cached = await asyncio.to_thread(self.store.get, key)
+        if cached is not None:
+            response = LlmResponse.model_validate_json(cached)
+            response.custom_metadata = {**(response.custom_metadata or {}), "llm_cache": "hit"}
+            yield response
+            return
+
+        responses = []
+        async for response in self.inner.generate_content_async(llm_request, stream):
+            responses.append(response)
+            yield response
+        if len(responses) == 1 and self._storable(responses[0]):
+            await asyncio.to_thread(self.store.put, key, _serialize(responses[0]))
+
+    def _storable(self, response: LlmResponse) -> bool:
+        return (
+            response.error_code is None
+            and not response.partial
+            and response.content is not None
+            and not (_tool_names([response.content]) & self.exclude_tools)
+        )
+
+
+def _serialize(response: LlmResponse) -> str:
+    """JSON of ``response`` without function call ids, so replays get fresh ones."""
+    data = response.model_dump(mode="json", exclude_none=True)
+    for part in data.get("content", {}).get("parts", ()):
+        for field in ("function_call", "function_response"):
+            if field in part:
+                part[field].pop("id", None)
+    return json.dumps(data, separators=(",", ":"))
+
+
+def metrics(path: str = CACHE_PATH) -> dict:
+    return get_store(path).metrics()
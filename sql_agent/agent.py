@@ -1,12 +1,19 @@
 from google.adk.agents.llm_agent import Agent
 from google.adk.models.lite_llm import LiteLlm
-import numpy as np
-from .core import get_all_recipes,get_inventory,get_recipe_by_id,get_missing_ingredients,check_recipe_feasibility,search_recipes_by_ingredient,get_max_servings,simulate_remaining_recipes
+from llm_cache import CachedLlm
+from .core import catalog_version,consume_recipe,restock,bulk_adjust_supply,get_all_recipes,get_inventory,get_recipe_by_id,get_missing_ingredients,check_recipe_feasibility,search_recipes_by_ingredient,get_max_servings,simulate_remaining_recipes,simulate_plan,optimize_menu,simulate_servings_sweep
+from . import async_tools, router, tracing
 
 
 
 root_agent = Agent(
-    model=LiteLlm(model="ollama_chat/qwen2.5:latest"),
+    # Repeated prompts are answered from llm_cache; a write to the database changes the key.
+    # Turns that call a mutation tool are never replayed from the cache.
+    model=CachedLlm.wrap(
+        LiteLlm(model="ollama_chat/qwen2.5:latest"),
+        version=catalog_version,
+        exclude_tools={"consume_recipe", "restock", "bulk_adjust_supply"},
+    ),
     name="sql_agent",
     description=(
         "Agent that can query a sqlite database and get info from it"
@@ -16,35 +23,44 @@ root_agent = Agent(
         a set of specialized tools. Use them to answer any question about recipes and ingredients.
         
         DATABASE SCHEMA (for context):
-            recipes            (uid TEXT, name TEXT)
-            ingredients        (uid TEXT, name TEXT, supply INTEGER)
-            recipe_ingredient  (recipe_uid TEXT, ingredient_uid TEXT, quantity INTEGER)
+            recipes            (id INTEGER, uid TEXT, name TEXT)
+            ingredients        (id INTEGER, uid TEXT, name TEXT, supply INTEGER, version INTEGER)
+            recipe_ingredient  (recipe_id INTEGER, ingredient_id INTEGER, quantity INTEGER)
         
         AVAILABLE TOOLS AND WHEN TO USE THEM:
         
         AVAILABLE TOOLS AND WHEN TO USE THEM:
 
-        - get_all_recipes
+        - get_all_recipes(cursor)
             Retrieves every recipe with its full ingredient list (name, required quantity, current supply).
             Use when the user wants to browse or list all available recipes.
         
         - get_recipe_by_id(recipe_uid)
-            Fetches complete details for one recipe by its UUID.
-            Use when the user asks about a specific recipe by name — first call get_all_recipes to
-            resolve the name to a UID, then call this tool.
+            Fetches complete details for one recipe. Pass the recipe name; a UUID also works.
+            Use when the user asks about the ingredients of a specific recipe.
         
-        - get_inventory
+        - get_inventory(cursor)
             Returns all ingredients and their current supply quantities.
             Use when the user asks what ingredients are available or in stock.
         
-        - check_recipe_feasibility
+        - check_recipe_feasibility(cursor)
             Cross-references every recipe against the current inventory and flags which ones can be
             made right now (supply >= required quantity for every ingredient). Also reports the exact
             shortage for infeasible recipes.
             Use when the user asks which recipes they can cook today, or wants a feasibility overview.
         
-        - search_recipes_by_ingredient(ingredient_name)
-            Finds all recipes that contain a given ingredient (partial, case-insensitive match).
+        These three list tools answer with a compact table: "columns" names the fields once and
+        every entry of "rows" is a list of values in that order; a column written as
+        {"ingredients": ["name", "quantity", "supply"]} holds a nested table with those fields.
+        Only part of a long list fits in one answer: "total" is the full count, "summary" (when
+        present) covers every row, and passing "next_cursor" back as cursor returns the next page.
+        Prefer the summary over paging through everything.
+        
+        - search_recipes_by_ingredient(ingredient_name, limit, cursor)
+            Finds recipes that contain a given ingredient (partial, case-insensitive match).
+            Combine ingredients with AND / OR / NOT, e.g. "eggs AND milk".
+            Results come in pages: if "next_cursor" is not null and the user wants more,
+            call again with cursor set to that value.
             Use when the user asks "what can I make with eggs?" or searches by a specific ingredient.
         
         - get_missing_ingredients(recipe_name)
@@ -70,6 +86,55 @@ root_agent = Agent(
             This is the ONLY correct tool for post-consumption feasibility questions.
             Do NOT substitute get_missing_ingredients or get_max_servings for these questions.
         
+        - simulate_plan(steps, plans)
+            Simulates a whole sequence of consumptions in ONE call, e.g.
+            steps=[{"recipe_name": "lemon cake", "servings": 1}, {"recipe_name": "apple cake", "servings": 2}].
+            Reports the remaining supply and whether each step can be made, stopping at the first
+            step that cannot. Pass several alternative sequences as plans=[[...], [...]] to compare them.
+            Read-only — does not modify the database.
+            Use for chained questions ("after X, can I still make Y, and then Z?") or to compare
+            options ("is it better to make A then B, or C?") instead of calling
+            simulate_remaining_recipes repeatedly.
+        
+        - optimize_menu(weights, min_servings, mode, time_budget_seconds)
+            Computes the mix of recipes that yields the most servings from the current stock.
+            Optional weights={"lemon cake": 2} favours recipes (weight 0 excludes one) and
+            min_servings={"apple cake": 1} forces recipes into the menu.
+            Read-only — does not modify the database.
+            Use whenever the user asks what combination or menu makes the best use of the stock.
+            Never guess an allocation yourself — always call this tool.
+        
+        - simulate_servings_sweep(recipe_names, max_servings, cursor)
+            For each listed recipe (all recipes when omitted), simulates making 1..max_servings
+            servings and reports how many OTHER recipes can still be made afterwards and which
+            ones are lost. Answers with a compact table like the list tools above.
+            Read-only — does not modify the database.
+            Use for questions over many recipes or serving counts at once ("which recipe can I
+            make 3 of without losing anything else?") instead of calling
+            simulate_remaining_recipes once per recipe and serving count.
+        
+        - consume_recipe(recipe_name, servings)
+            Records that the user actually cooked N servings of a recipe: subtracts the ingredients
+            from the stock in the database. All or nothing — if anything is short, nothing changes
+            and the shortages are reported.
+            Use ONLY when the user says they made / cooked / used something ("I just made 2 lemon
+            cakes"). For "what if" questions use simulate_remaining_recipes or simulate_plan.
+        
+        - restock(ingredient_name, quantity, expected_version)
+            Adds a delivery of one ingredient to the stock ("we received 12 eggs").
+        
+        - bulk_adjust_supply(adjustments)
+            Applies several stock changes at once, all or nothing, e.g.
+            adjustments=[{"ingredient_name": "eggs", "delta": 12}, {"ingredient_name": "milk", "supply": 3}].
+            "delta" adds (negative removes); "supply" sets the counted amount.
+            Use for deliveries of several items, stock counts and corrections.
+        
+        The three tools above WRITE to the database. Every ingredient has a "version" that
+        each change increments; the results report it. If a write fails with "conflicts",
+        someone else changed the stock: tell the user and re-read before trying again. When
+        retrying a write that may already have been applied, pass the last seen version as
+        expected_version so it is never applied twice.
+        
         GUIDELINES:
         - Always call the most specific tool available rather than a general one.
         - For any question about a specific recipe, pass its name directly — tools resolve names
@@ -79,7 +144,15 @@ root_agent = Agent(
         - When reporting shortages, phrase them in plain language
           (e.g. "You need 3 lemons but only have 1 — you are short by 2.").
     """,
-    tools=[
+    # router.before_agent answers routable questions without the LLM (off unless
+    # SQL_AGENT_ROUTER=1); it runs first so that a routed turn never opens an agent span.
+    # Spans for the turn, each model call and each tool call (off unless SQL_AGENT_TRACING=1).
+    before_agent_callback=[router.before_agent, tracing.before_agent],
+    after_agent_callback=tracing.after_agent,
+    before_model_callback=tracing.before_model,
+    after_model_callback=tracing.after_model,
+    # Async variants: the SQLite work runs on async_tools' bounded executor, not the event loop.
+    tools=[async_tools.to_async(tracing.traced_tool(tool)) for tool in (
         get_all_recipes,
         get_inventory,
         get_recipe_by_id,
@@ -87,6 +160,12 @@ root_agent = Agent(
         check_recipe_feasibility,
         search_recipes_by_ingredient,
         get_max_servings,
-        simulate_remaining_recipes
-    ],
+        simulate_remaining_recipes,
+        simulate_plan,
+        optimize_menu,
+        simulate_servings_sweep,
+        consume_recipe,
+        restock,
+        bulk_adjust_supply,
+    )],
 )
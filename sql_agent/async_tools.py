@@ -0,0 +1,165 @@
+"""
+async_tools.py
+--------------
+Async variants of the core.py tools, run on a bounded thread pool.
+
+ADK calls a synchronous tool directly on the event loop thread, so under
+``adk web`` one slow full-catalog call stalls every other session. The
+variants here have the same names, signatures and docstrings (ADK builds the
+same declarations from them) but hand the work to a ThreadPoolExecutor of
+WORKERS threads and await it. ADK already runs the function calls of one
+model turn concurrently (asyncio.gather), so independent calls of a turn now
+overlap too.
+
+- Bounded: at most WORKERS calls run at once; further calls wait on the
+  event loop, where waiting is free and cancellable. WORKERS defaults to
+  core.POOL_SIZE, so a running call never waits for a read connection, and
+  the pool's thread affinity gives every worker its own warm connection.
+- Timeouts: a call that has not finished after TOOL_TIMEOUT seconds
+  (including its wait for a worker) returns {"error": "..."} to the model.
+- Schema errors: a missing or outdated database (migrations.SchemaError,
+  see core.AUTO_MIGRATE) returns {"error": "..."} too, instead of raising
+  out of the ADK turn.
+- Cancellation: a cancelled or timed-out call that has not started is
+  dropped; one that is running has its SQLite statements interrupted (via a
+  progress handler on the connections from core._get_conn). Python-level
+  work already running, such as a snapshot rebuild, finishes in the
+  background and its result is discarded. A mutation tool whose write is
+  already queued in the write batcher (writes.py) still commits; retries
+  that pass expected_version cannot apply it twice.
+
+Tracing context (the current span) is carried over to the worker thread.
+
+Usage:
+    result = await async_tools.get_max_servings("lemon cake")
+    result = await async_tools.call(core.optimize_menu, mode="exact", timeout=60)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from . import core, migrations
+
+WORKERS = core.POOL_SIZE
+TOOL_TIMEOUT: float | None = 30.0     # seconds; None waits forever
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="sql_agent_tool")
+    return _executor
+
+
+def _get_slots(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    """One semaphore per event loop (asyncio primitives are bound to a loop)."""
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(WORKERS)
+    return slots
+
+
+def configure(workers: int | None = None, timeout: float | None = ...) -> None:
+    """Change the worker count (takes effect for new calls) or the default timeout."""
+    global WORKERS, TOOL_TIMEOUT
+    if timeout is not ...:
+        TOOL_TIMEOUT = timeout
+    if workers is not None and workers != WORKERS:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        shutdown(wait=False)
+        WORKERS = workers
+
+
+def shutdown(wait: bool = True) -> None:
+    """Stop the executor (running calls finish); the next call starts a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+        _slots.clear()
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _release(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore) -> None:
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:        # the loop is closed: nobody is waiting on it any more
+        pass
+
+
+async def call(fn: Callable[..., Any], *args, timeout: float | None = ..., **kwargs) -> Any:
+    """
+    Run ``fn(*args, **kwargs)`` on the tool executor and return its result.
+
+    ``timeout`` (default TOOL_TIMEOUT) bounds the wait for a worker plus the
+    run; on expiry the call is cancelled and an {"error": ...} dict returned.
+    Cancelling the awaiting task cancels the call the same way. A
+    migrations.SchemaError of ``fn`` is returned as {"error": ...} as well.
+    """
+    timeout = TOOL_TIMEOUT if timeout is ... else timeout
+    loop = asyncio.get_running_loop()
+    slots = _get_slots(loop)
+    cancelled = threading.Event()
+    context = contextvars.copy_context()
+    context.run(core._cancelled.set, cancelled)
+
+    future = None
+    try:
+        async with asyncio.timeout(timeout):
+            await slots.acquire()
+            try:
+                future = _get_executor().submit(context.run, fn, *args, **kwargs)
+            except BaseException:
+                slots.release()
+                raise
+            future.add_done_callback(lambda _: _release(loop, slots))
+            return await asyncio.wrap_future(future)
+    except TimeoutError:
+        name = getattr(fn, "__name__", "tool call")
+        return {"error": f"{name} did not finish within {timeout:g}s. Try a narrower request."}
+    except migrations.SchemaError as exc:
+        return {"error": str(exc)}
+    finally:
+        if future is not None and not future.done():
+            future.cancel()     # not started yet: never runs
+        cancelled.set()         # running: its SQLite statements abort
+
+
+def to_async(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Async variant of ``fn`` with the same name, signature and docstring."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await call(fn, *args, **kwargs)
+
+    return wrapper
+
+
+# ── Tools ─────────────────────────────────────────────────────────────────────
+
+get_all_recipes = to_async(core.get_all_recipes)
+get_recipe_by_id = to_async(core.get_recipe_by_id)
+get_inventory = to_async(core.get_inventory)
+check_recipe_feasibility = to_async(core.check_recipe_feasibility)
+search_recipes_by_ingredient = to_async(core.search_recipes_by_ingredient)
+get_missing_ingredients = to_async(core.get_missing_ingredients)
+get_max_servings = to_async(core.get_max_servings)
+simulate_remaining_recipes = to_async(core.simulate_remaining_recipes)
+simulate_plan = to_async(core.simulate_plan)
+optimize_menu = to_async(core.optimize_menu)
+simulate_servings_sweep = to_async(core.simulate_servings_sweep)
+consume_recipe = to_async(core.consume_recipe)
+restock = to_async(core.restock)
+bulk_adjust_supply = to_async(core.bulk_adjust_supply)
@@ -0,0 +1,375 @@
+"""
+compiled.py
+-----------
+Compiled catalog: the recipe catalog of a database exported once into a
+binary file that new processes memory-map instead of scanning the tables.
+
+Building an InventorySnapshot from SQL means three table scans, a join, a
+Python dict per table, the name indexes (normalising every name, trigram
+sets) and the RequirementMatrix. On a large catalog that is seconds of CPU
+per process before the first answer, repeated by every agent process. The
+compiled file holds all of it as fixed-width arrays:
+
+    requirement matrix   CSR indptr / indices / data (int64), rows in
+                         (name, uid) order as RequirementMatrix.from_recipes
+                         builds them, plus the recipe and ingredient of each
+                         row and column
+    supply               ingredient supply at compile time
+    strings              uids and names as an offsets (int64) + UTF-8 blob table
+    name indexes         the arrays of FrozenNameIndex (names.freeze())
+
+A CompiledCatalog maps the file read-only with np.memmap and hands out
+np.frombuffer views of it: the matrix arrays are used in place (zero-copy),
+and every process mapping the same file shares its pages in the OS page
+cache. Only the strings are decoded into Python objects.
+
+File layout (little-endian):
+
+    b"SQLACAT\\0"  magic
+    uint32         FORMAT_VERSION
+    uint32         header length
+    header         JSON: {"key": {...}, "sections": {name: [offset, dtype, count]}}
+    sections       from the first 64-byte boundary after the header, each
+                   64-byte aligned; offsets are relative to that boundary
+
+Staleness: ``PRAGMA data_version`` is local to a connection, so it cannot
+identify a database state across processes. The file is keyed instead on
+``structure_version`` (migration 6; bumped by every catalog change except
+supply changes), the row counts of the three tables (and largest ids) and a
+digest of the recipe and ingredient uids, which tells apart a database
+rebuilt with the same shape. A file whose key differs from the database's
+(or of another FORMAT_VERSION) is stale and rebuilt by load_snapshot(), as
+is one whose ingredients do not match the database's supplies.
+init_db.bulk_load() deletes the file of the database it loads into.
+Supplies change without touching the key and are always read from the
+database, so a stock update never recompiles the file.
+
+Usage:
+    python -m sql_agent.compiled build path/to/recipes.db   # -> recipes.db.catalog
+    python -m sql_agent.compiled info path/to/recipes.db
+
+    cache = SnapshotCache(db_path, load=load_snapshot)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+
+import numpy as np
+
+from . import tracing
+from .engine import RequirementMatrix
+from .names import FrozenNameIndex, freeze
+from .snapshot import InventorySnapshot, read_structure_version, read_tables
+
+MAGIC = b"SQLACAT\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SUFFIX = ".catalog"
+
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def compiled_path(db_path: str) -> str:
+    """Path of the compiled catalog of ``db_path``."""
+    return db_path + SUFFIX
+
+
+def database_path(conn: sqlite3.Connection) -> str:
+    """File of the main database of ``conn`` ("" for an in-memory database)."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def catalog_key(conn: sqlite3.Connection) -> dict:
+    """
+    What a compiled file must have been built from to be current for ``conn``.
+
+    Returns:
+        {"structure_version": 12, "recipes": [10000, 10000], "ingredients": [200, 200],
+         "recipe_ingredient": 65012,        # [count, max id], count
+         "uids": "9f3c..."}                 # digest of the recipe and ingredient uids
+    """
+    key: dict = {"structure_version": read_structure_version(conn)}
+    digest = hashlib.blake2b(digest_size=16)
+    for table in ("recipes", "ingredients"):
+        key[table] = list(conn.execute(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {table}").fetchone())
+        (uids,) = conn.execute(
+            f"SELECT COALESCE(group_concat(uid, char(10)), '') FROM (SELECT uid FROM {table} ORDER BY id)"
+        ).fetchone()
+        digest.update(uids.encode() + b"\0")
+    key["recipe_ingredient"] = conn.execute("SELECT COUNT(*) FROM recipe_ingredient").fetchone()[0]
+    key["uids"] = digest.hexdigest()
+    return key
+
+
+# ── Strings ───────────────────────────────────────────────────────────────────
+
+def _pack_strings(strings: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """``(offsets, blob)``: string i is ``blob[offsets[i]:offsets[i + 1]]`` in UTF-8."""
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _unpack_strings(offsets: np.ndarray, blob: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    text = data.decode()
+    if len(text) == len(data):          # ASCII: byte offsets are character offsets
+        return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+    return [data[a:b].decode() for a, b in zip(bounds, bounds[1:])]
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+
+def _sections(conn: sqlite3.Connection) -> dict[str, np.ndarray]:
+    """The arrays of the compiled file, from the tables of ``conn``."""
+    recipes, ingredients, requirements = read_tables(conn)
+    recipe_uids = list(recipes)
+    ingredient_uids = list(ingredients)
+    recipe_position = {uid: i for i, uid in enumerate(recipe_uids)}
+    ingredient_position = {uid: i for i, uid in enumerate(ingredient_uids)}
+
+    # Same row and column order as RequirementMatrix.from_recipes(snapshot.iter_recipes()).
+    rows = sorted(recipe_uids, key=lambda uid: (recipes[uid], uid))
+    columns: dict[str, int] = {}
+    indptr, indices, data = [0], [], []
+    for uid in rows:
+        for ingredient_uid, quantity in requirements.get(uid, ()):
+            indices.append(columns.setdefault(ingredient_uid, len(columns)))
+            data.append(quantity)
+        indptr.append(len(indices))
+
+    sections = {
+        "matrix_rows":       np.array([recipe_position[uid] for uid in rows], dtype=np.int64),
+        "matrix_columns":    np.array([ingredient_position[uid] for uid in columns], dtype=np.int64),
+        "matrix_indptr":     np.array(indptr, dtype=np.int64),
+        "matrix_indices":    np.array(indices, dtype=np.int64),
+        "matrix_data":       np.array(data, dtype=np.int64),
+        "ingredient_supply": np.array([supply for _, supply in ingredients.values()], dtype=np.int64),
+    }
+    strings = {
+        "recipe_uids":      recipe_uids,
+        "recipe_names":     list(recipes.values()),
+        "ingredient_uids":  ingredient_uids,
+        "ingredient_names": [name for name, _ in ingredients.values()],
+    }
+    for prefix, entries in (
+        ("recipe_index", recipes),
+        ("ingredient_index", {uid: name for uid, (name, _) in ingredients.items()}),
+    ):
+        frozen = freeze(entries)        # keys and names are the uid / name tables above
+        strings[f"{prefix}_normalized"] = frozen["normalized"]
+        strings[f"{prefix}_grams"] = frozen["grams"]
+        for name in ("by_name", "offsets", "postings"):
+            sections[f"{prefix}_{name}"] = frozen[name]
+    for name, values in strings.items():
+        sections[f"{name}_offsets"], sections[f"{name}_blob"] = _pack_strings(values)
+    return sections
+
+
+def compile_catalog(conn: sqlite3.Connection, path: str) -> dict:
+    """
+    Write the compiled catalog of ``conn``'s database to ``path`` (atomically:
+    a temporary file renamed over it). Everything is read in one transaction.
+
+    Returns:
+        the key the file was built for (see catalog_key()).
+    """
+    with tracing.span("compiled.compile"):
+        in_transaction = conn.in_transaction
+        if not in_transaction:
+            conn.execute("BEGIN")
+        try:
+            key = catalog_key(conn)
+            sections = _sections(conn)
+        finally:
+            if not in_transaction:
+                conn.execute("COMMIT")
+
+        layout, offset = {}, 0
+        for name, array in sections.items():
+            layout[name] = [offset, array.dtype.str, int(array.size)]
+            offset = _aligned(offset + array.nbytes)
+        header = json.dumps({"key": key, "sections": layout}).encode()
+        start = _aligned(_PREAMBLE.size + len(header))
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+                f.write(header)
+                for name, array in sections.items():
+                    f.seek(start + layout[name][0])
+                    f.write(array.tobytes())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return key
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+
+class CompiledCatalog:
+    """
+    A compiled catalog file mapped read-only.
+
+    Attributes:
+        path:   the file.
+        key:    what it was built from (see catalog_key()).
+        arrays: section name -> read-only view of the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        if self._map.size < _PREAMBLE.size:
+            raise ValueError(f"{path} is not a compiled catalog")
+        magic, version, length = _PREAMBLE.unpack(self._map[:_PREAMBLE.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled catalog")
+        self.format_version = version
+        if version != FORMAT_VERSION:
+            self.key, self.arrays = None, {}
+            return
+        header = json.loads(self._map[_PREAMBLE.size:_PREAMBLE.size + length].tobytes())
+        start = _aligned(_PREAMBLE.size + length)
+        self.key = header["key"]
+        self.arrays = {
+            name: np.frombuffer(self._map, dtype=np.dtype(dtype), count=count, offset=start + offset)
+            for name, (offset, dtype, count) in header["sections"].items()
+        }
+
+    def is_current(self, key: dict) -> bool:
+        return self.format_version == FORMAT_VERSION and self.key == key
+
+    def strings(self, name: str) -> list[str]:
+        return _unpack_strings(self.arrays[f"{name}_offsets"], self.arrays[f"{name}_blob"])
+
+    def _name_index(self, prefix: str, keys: list[str], names: list[str]) -> FrozenNameIndex:
+        a = self.arrays
+        return FrozenNameIndex(
+            keys, names, self.strings(f"{prefix}_normalized"),
+            a[f"{prefix}_by_name"], self.strings(f"{prefix}_grams"),
+            a[f"{prefix}_offsets"], a[f"{prefix}_postings"],
+        )
+
+    def snapshot(
+        self,
+        version: int = 0,
+        supply: dict[str, int] | None = None,
+    ) -> InventorySnapshot:
+        """
+        An InventorySnapshot backed by this file, with ``supply`` (ingredient
+        uid -> supply, e.g. read live from the database) instead of the
+        supplies the file was compiled with.
+        """
+        a = self.arrays
+        recipe_uids, recipe_names = self.strings("recipe_uids"), self.strings("recipe_names")
+        ingredient_uids, ingredient_names = self.strings("ingredient_uids"), self.strings("ingredient_names")
+        if supply is None:
+            supplies = a["ingredient_supply"].tolist()
+        else:
+            supplies = [supply[uid] for uid in ingredient_uids]
+
+        rows, columns = a["matrix_rows"].tolist(), a["matrix_columns"].tolist()
+        matrix = RequirementMatrix(
+            [recipe_uids[r] for r in rows], [recipe_names[r] for r in rows],
+            [ingredient_uids[c] for c in columns], [ingredient_names[c] for c in columns],
+            np.array([supplies[c] for c in columns], dtype=np.int64),
+            a["matrix_indptr"], a["matrix_indices"], a["matrix_data"],
+        )
+        return InventorySnapshot(
+            dict(zip(recipe_uids, recipe_names)),
+            dict(zip(ingredient_uids, zip(ingredient_names, supplies))),
+            None,
+            version,
+            recipe_index=self._name_index("recipe_index", recipe_uids, recipe_names),
+            ingredient_index=self._name_index("ingredient_index", ingredient_uids, ingredient_names),
+            structure_version=self.key["structure_version"],
+            matrix=matrix,
+        )
+
+
+def _open(path: str) -> CompiledCatalog | None:
+    try:
+        return CompiledCatalog(path)
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(
+    conn: sqlite3.Connection,
+    version: int = 0,
+    previous: InventorySnapshot | None = None,
+) -> InventorySnapshot:
+    """
+    SnapshotCache loader: the snapshot of ``conn``'s database from its
+    compiled catalog, compiled first when the file is missing or stale
+    (including a file whose ingredient uids are not the database's).
+    Supplies are read from ``conn``. Falls back to InventorySnapshot.load
+    for databases without structure_version (schema before version 6),
+    in-memory databases and when the file cannot be written.
+    """
+    db_path = database_path(conn)
+    key = catalog_key(conn)
+    if not db_path or key["structure_version"] is None:
+        return InventorySnapshot.load(conn, version, previous)
+    path = compiled_path(db_path)
+    with tracing.span("compiled.load"):
+        supply = dict(conn.execute("SELECT uid, supply FROM ingredients"))
+        catalog = _open(path)
+        if catalog is not None and catalog.is_current(key):
+            try:
+                return catalog.snapshot(version, supply)
+            except KeyError:        # an ingredient uid the database does not have: stale
+                pass
+        try:
+            compile_catalog(conn, path)
+        except OSError:
+            return InventorySnapshot.load(conn, version, previous)
+        catalog = _open(path)
+        if catalog is None or not catalog.is_current(key):    # replaced by an older build meanwhile
+            return InventorySnapshot.load(conn, version, previous)
+        try:
+            return catalog.snapshot(version, supply)
+        except KeyError:            # the catalog changed between the key and the supplies
+            return InventorySnapshot.load(conn, version, previous)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile a recipes database into a memory-mappable catalog file.")
+    parser.add_argument("command", choices=("build", "info"))
+    parser.add_argument("db_path")
+    args = parser.parse_args(argv)
+    path = compiled_path(args.db_path)
+    conn = sqlite3.connect(args.db_path)
+    try:
+        if args.command == "build":
+            key = compile_catalog(conn, path)
+            print(f"wrote {path} ({os.path.getsize(path):,} bytes) for {key}")
+            return
+        catalog = _open(path)
+        if catalog is None:
+            print(f"{path}: missing or unreadable")
+            return
+        state = "current" if catalog.is_current(catalog_key(conn)) else "stale"
+        print(f"{path}: format {catalog.format_version}, {state}, built for {catalog.key}")
+        for name, array in catalog.arrays.items():
+            print(f"  {name:<32}{array.dtype.str:>6}{array.size:>12,}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
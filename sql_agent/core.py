@@ -41,49 +41,593 @@ recipe_tools.py
 ---------------
 Tool implementations for the Recipe Agent, backed by the recipes.db SQLite database.
 
-Database schema:
-    recipes            (uid TEXT PK, name TEXT)
-    ingredients        (uid TEXT PK, name TEXT, supply INTEGER)
-    recipe_ingredient  (recipe_uid TEXT, ingredient_uid TEXT, quantity INTEGER)
+Database schema (version 6, see migrations.py):
+    recipes            (id INTEGER PK, uid TEXT UNIQUE, name TEXT)
+    ingredients        (id INTEGER PK, uid TEXT UNIQUE, name TEXT, supply INTEGER, version INTEGER)
+    recipe_ingredient  (recipe_id INTEGER, ingredient_id INTEGER, quantity INTEGER)
+                       PK (recipe_id, ingredient_id), index (ingredient_id, recipe_id, quantity)
+    structure_version  (version INTEGER), bumped by triggers on non-supply changes
 
 Each public function maps 1-to-1 to an Anthropic tool definition (see TOOL_DEFINITIONS).
-Pass DB_PATH at import time or override it before calling any function.
+The database file is SQL_AGENT_DB in the environment (default: recipes.db
+next to this module); DB_PATH can also be overridden before calling any function.
 """
 
 import sqlite3
 import json
+import math
+import os
+import threading
 from contextlib import contextmanager
-from typing import Any
+from contextvars import ContextVar
+from itertools import groupby
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+import numpy as np
+
+from . import compiled, fts, migrations, tracing, writes
+from .engine import RequirementMatrix
+from .feasibility import FeasibilityView
+from .fts import parse_query
+from .names import Match, is_ambiguous, rank
+from .planner import InfeasibleMenuError, solve_menu
+from .pool import DEFAULT_PRAGMAS, ConnectionPool
+from .replica import Replica
+from .shaping import decode_cursor, encode_cursor, shape_rows
+from .snapshot import InventorySnapshot, SnapshotCache
+
+if TYPE_CHECKING:
+    from .sweep import SweepPool
 
 # ── Configuration ─────────────────────────────────────────────────────────────
 
-# DB_PATH = "recipes.db"  # override as needed, e.g. recipe_tools.DB_PATH = "/path/to/recipes.db"
-DB_PATH = r"/Users/thomaszilliox/Documents/git_repos/local_ai_agent/sql_agent/recipes.db"
+# Database file: SQL_AGENT_DB, else recipes.db next to this module. Override as
+# needed, e.g. core.DB_PATH = "/path/to/recipes.db".
+DB_PATH = os.environ.get("SQL_AGENT_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.db")
+
+# Connection pool settings, read when a pool is first created for DB_PATH.
+POOL_SIZE = 8                 # max open connections per pool
+POOL_TIMEOUT = 5.0            # seconds to wait for a free connection
+POOL_HEALTH_CHECK_INTERVAL = 30.0
+SQLITE_PRAGMAS: dict[str, Any] = dict(DEFAULT_PRAGMAS)
+
+# Replica mode (SQL_AGENT_REPLICA=1): SQL reads (read-through catalog, FTS
+# search, name lookups of the mutation tools) go to an in-memory copy of
+# DB_PATH made with the backup API and recopied when the file changes (see
+# replica.py). Writes still go to the file.
+USE_REPLICA = os.environ.get("SQL_AGENT_REPLICA", "").lower() not in ("", "0", "false", "no")
+
+# Serve reads from an in-memory InventorySnapshot that is rebuilt only when
+# PRAGMA data_version changes. Set to False for strict read-through to SQLite.
+USE_SNAPSHOT = True
+
+# Build snapshots from the compiled catalog file next to DB_PATH (recipes.db.catalog,
+# see compiled.py), compiled on first use and whenever the catalog changed, instead
+# of from table scans. SQL_AGENT_COMPILED=0 turns it off.
+USE_COMPILED_CATALOG = os.environ.get("SQL_AGENT_COMPILED", "1").lower() not in ("", "0", "false", "no")
+
+# Run ingredient searches through the recipe_search FTS5 table when it is
+# installed (python -m sql_agent.fts install <db>); otherwise use the catalog.
+USE_FTS = True
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 200
+
+# Return catalog-wide lists (get_all_recipes, get_inventory,
+# check_recipe_feasibility) as compact tables of at most RESULT_BUDGET_BYTES,
+# paged with a cursor (see shaping.py). Set to False for the verbose lists.
+COMPACT_RESULTS = True
+RESULT_BUDGET_BYTES = 8_000   # ~2k tokens
+
+# Upgrade DB_PATH to the latest schema (migrations.py) the first time a pool or
+# snapshot is opened on it (SQL_AGENT_AUTO_MIGRATE=1). Off by default: the
+# schema is then only checked, and an older database makes the tools raise
+# migrations.OutdatedSchemaError until it is upgraded by hand (the async tools
+# ADK calls answer {"error": ...} instead). A missing database is never
+# created: the tools raise migrations.MissingDatabaseError.
+AUTO_MIGRATE = os.environ.get("SQL_AGENT_AUTO_MIGRATE", "").lower() not in ("", "0", "false", "no")
+
+# Inventory mutation tools (consume_recipe, restock, bulk_adjust_supply). Their
+# writes are group-committed by one WriteBatcher per database (see writes.py).
+# Set ALLOW_WRITES to False to keep the tools read-only.
+ALLOW_WRITES = True
+WRITE_MAX_BATCH = 64
+WRITE_LINGER = 0.0            # seconds a batch waits for more writes (0: none)
+
+# Servings sweeps (simulate_servings_sweep) run on SWEEP_WORKERS processes
+# (0: one per CPU) that share the requirement matrix through shared memory
+# (see sweep.py). The pool is started on the first large sweep.
+SWEEP_WORKERS = 0
+SWEEP_MAX_SERVINGS = 20
+SWEEP_MAX_CELLS = 20_000_000  # scenarios x recipes evaluated by one sweep
+SWEEP_LOST_LIMIT = 10         # recipes listed under "lost" per scenario
 
 # ── DB helper ─────────────────────────────────────────────────────────────────
 
+_pools: dict[tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_migrated: set[str] = set()
+_writers: dict[str, writes.WriteBatcher] = {}
+_replicas: dict[str, Replica] = {}
+_sweep_pool: "SweepPool | None" = None
+
+# Set by async_tools for a call running on its executor: once the event is set
+# (timeout or cancellation), statements on connections from _get_conn abort.
+_cancelled: ContextVar[threading.Event | None] = ContextVar("sql_agent_cancelled", default=None)
+INTERRUPT_CHECK_STEPS = 1_000     # SQLite VM instructions between cancellation checks
+
+
+def _ensure_schema(db_path: str) -> None:
+    """
+    Bring ``db_path`` to the latest schema with AUTO_MIGRATE, else check that it
+    is; once per process (caller holds _pools_lock). Raises
+    migrations.SchemaError for a missing or outdated database.
+    """
+    if db_path not in _migrated:
+        if AUTO_MIGRATE and os.path.exists(db_path):
+            migrations.upgrade_path(db_path)
+        else:
+            migrations.check_path(db_path)
+        _migrated.add(db_path)
+
+
+def _get_pool(read_only: bool = True) -> ConnectionPool:
+    """Return the (lazily created) pool for the current DB_PATH."""
+    key = (DB_PATH, read_only)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                _ensure_schema(DB_PATH)
+                pool = ConnectionPool(
+                    DB_PATH,
+                    max_size=POOL_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    pragmas=SQLITE_PRAGMAS,
+                    read_only=read_only,
+                    health_check_interval=POOL_HEALTH_CHECK_INTERVAL,
+                )
+                _pools[key] = pool
+    return pool
+
+
+def _get_replica() -> Replica:
+    """Return the (lazily created) in-memory replica of the current DB_PATH."""
+    replica = _replicas.get(DB_PATH)
+    if replica is None:
+        with _pools_lock:
+            replica = _replicas.get(DB_PATH)
+            if replica is None:
+                _ensure_schema(DB_PATH)
+                replica = _replicas[DB_PATH] = Replica(
+                    DB_PATH,
+                    max_size=POOL_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    health_check_interval=POOL_HEALTH_CHECK_INTERVAL,
+                )
+    return replica
+
+
 @contextmanager
-def _get_conn():
-    """Yield a sqlite3 connection with row_factory set to dict-like rows."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+def _get_conn(read_only: bool = True):
+    """
+    Yield a pooled sqlite3 connection with row_factory set to dict-like rows.
+
+    Read-only connections run with ``PRAGMA query_only`` and are reused by the
+    same thread across calls, keeping SQLite's page cache warm; with
+    USE_REPLICA they read the in-memory replica. Statements and rows are
+    counted into the current tool span when tracing is on, and are
+    interrupted when the calling async tool is cancelled or times out.
+    """
+    source = _get_replica().connection() if read_only and USE_REPLICA else _get_pool(read_only).connection()
+    with source as conn, tracing.watch(conn):
+        cancelled = _cancelled.get()
+        if cancelled is None:
+            yield conn
+            return
+        conn.set_progress_handler(cancelled.is_set, INTERRUPT_CHECK_STEPS)
+        try:
+            yield conn
+        finally:
+            conn.set_progress_handler(None, 0)
+
+
+def _get_writer() -> writes.WriteBatcher:
+    """Return the (lazily created) write batcher for the current DB_PATH."""
+    writer = _writers.get(DB_PATH)
+    if writer is None:
+        with _pools_lock:
+            writer = _writers.get(DB_PATH)
+            if writer is None:
+                _ensure_schema(DB_PATH)
+                writer = _writers[DB_PATH] = writes.WriteBatcher(
+                    DB_PATH, pragmas=SQLITE_PRAGMAS, max_batch=WRITE_MAX_BATCH, linger=WRITE_LINGER,
+                )
+    return writer
+
+
+def pool_metrics() -> dict:
+    """
+    Return size and wait-time metrics for every open connection pool, batch
+    metrics for every write batcher and refresh metrics for every replica.
+
+    Returns:
+        {
+          "read:/path/to/recipes.db": {"max_size": 8, "size": 2, "idle": 2, ...},
+          "writer:/path/to/recipes.db": {"batches": 40, "mutations": 512, "mean_batch": 12.8, ...},
+          "replica:/path/to/recipes.db": {"generation": 3, "refreshes": 3, "pool": {...}, ...},
+          ...
+        }
+    """
+    metrics = {
+        f"{'read' if read_only else 'write'}:{path}": pool.stats()
+        for (path, read_only), pool in list(_pools.items())
+    }
+    metrics.update({f"writer:{path}": writer.stats() for path, writer in list(_writers.items())})
+    metrics.update({f"replica:{path}": replica.stats() for path, replica in list(_replicas.items())})
+    return metrics
+
+
+def catalog_version() -> str:
+    """
+    A token that changes whenever DB_PATH is written, also by other processes
+    (llm_cache keys cached model answers on it).
+
+    Built from the size and modification time of the database file and its
+    WAL: every committed write changes one of them. A checkpoint changes it
+    too without changing the data, which only costs cache misses.
+    """
+    parts = [DB_PATH]
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            parts.append("-")
+        else:
+            parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def close_pools() -> None:
+    """
+    Close every connection pool, write batcher, replica, snapshot and the sweep pool
+    (e.g. at shutdown or after moving DB_PATH).
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
+        for replica in _replicas.values():
+            replica.close()
+        _replicas.clear()
+        for cache in _snapshot_caches.values():
+            cache.close()
+        _snapshot_caches.clear()
+    close_sweep_pool()
+
+
+def _get_sweep_pool() -> "SweepPool":
+    global _sweep_pool
+    if _sweep_pool is None:
+        # Imported on first use: multiprocessing and the process pool are not
+        # needed by anything else in the tool layer.
+        from .sweep import SweepPool
+
+        with _pools_lock:
+            if _sweep_pool is None:
+                _sweep_pool = SweepPool(SWEEP_WORKERS)
+    return _sweep_pool
+
+
+def close_sweep_pool() -> None:
+    """Stop the sweep worker processes and free their shared memory."""
+    global _sweep_pool
+    with _pools_lock:
+        pool, _sweep_pool = _sweep_pool, None
+    if pool is not None:
+        pool.close()
 
 
 def _rows_to_dicts(rows) -> list[dict]:
     return [dict(row) for row in rows]
 
 
+# ── Catalog sources ───────────────────────────────────────────────────────────
+
+# One ordered pass over every recipe and its ingredients. The parenthesised
+# inner join keeps the original semantics (an ingredient row only counts when
+# both the link and the ingredient exist) while the outer LEFT JOIN still
+# yields recipes that have no ingredients at all.
+_RECIPE_ROWS_SQL = """
+    SELECT r.uid       AS recipe_uid,
+           r.name      AS recipe_name,
+           i.uid       AS ingredient_uid,
+           i.name      AS name,
+           ri.quantity AS quantity,
+           i.supply    AS supply
+    FROM {recipes} r
+    LEFT JOIN (recipe_ingredient ri
+               JOIN ingredients i ON i.id = ri.ingredient_id)
+           ON ri.recipe_id = r.id
+    ORDER BY r.name, r.uid, i.name
+"""
+
+# The recipes after the first ``?`` in (name, uid) order, for a later page.
+_RECIPES_FROM = "(SELECT id, uid, name FROM recipes ORDER BY name, uid LIMIT -1 OFFSET ?)"
+
+
+def _recipe_key(row) -> tuple[str, str]:
+    return row["recipe_uid"], row["recipe_name"]
+
+
+class _SqlCatalog:
+    """
+    Read-through catalog: answers every read with a query on ``conn``.
+
+    Exposes the same read interface as snapshot.InventorySnapshot.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def resolve_recipe(self, name: str, limit: int = 5) -> list[Match]:
+        """
+        Ranked recipe matches for ``name``. Read-through mode only ranks the
+        names that contain ``name``; fuzzy matching needs the snapshot index.
+        """
+        rows = self.conn.execute(
+            "SELECT uid, name FROM recipes WHERE LOWER(name) LIKE LOWER(?) ORDER BY id",
+            (f"%{name}%",),
+        ).fetchall()
+        return rank(name, ((r["uid"], r["name"]) for r in rows), limit)
+
+    def resolve_ingredient(self, name: str, limit: int = 5) -> list[Match]:
+        """Ranked ingredient matches for ``name`` (names that contain it, as resolve_recipe)."""
+        rows = self.conn.execute(
+            "SELECT uid, name FROM ingredients WHERE LOWER(name) LIKE LOWER(?) ORDER BY id",
+            (f"%{name}%",),
+        ).fetchall()
+        return rank(name, ((r["uid"], r["name"]) for r in rows), limit)
+
+    def find_recipe(self, name: str) -> dict | None:
+        """Best non-fuzzy recipe match for ``name``, or None."""
+        matches = self.resolve_recipe(name, 1)
+        return {"uid": matches[0].key, "name": matches[0].name} if matches else None
+
+    def get_recipe(self, recipe_uid: str) -> dict | None:
+        row = self.conn.execute(
+            "SELECT uid, name FROM recipes WHERE uid = ?", (recipe_uid,)
+        ).fetchone()
+        return None if row is None else dict(row)
+
+    def recipe_ingredients(self, recipe_uid: str) -> list[dict]:
+        """Ingredient rows of one recipe, ordered by ingredient name."""
+        return _rows_to_dicts(
+            self.conn.execute(
+                """
+                SELECT i.uid, i.name, ri.quantity, i.supply
+                FROM recipes r
+                JOIN recipe_ingredient ri ON ri.recipe_id = r.id
+                JOIN ingredients i        ON i.id = ri.ingredient_id
+                WHERE r.uid = ?
+                ORDER BY i.name
+                """,
+                (recipe_uid,),
+            ).fetchall()
+        )
+
+    def inventory(self) -> list[dict]:
+        return _rows_to_dicts(
+            self.conn.execute(
+                "SELECT uid, name, supply FROM ingredients ORDER BY name"
+            ).fetchall()
+        )
+
+    def match_recipes(self, clauses: list[list[tuple[str, bool]]]) -> list[str]:
+        """
+        UIDs of recipes matching parsed ingredient clauses (see fts.parse_query),
+        ordered by recipe name.
+        """
+        uses = """EXISTS (SELECT 1 FROM recipe_ingredient ri
+                          JOIN ingredients i ON i.id = ri.ingredient_id
+                          WHERE ri.recipe_id = r.id AND LOWER(i.name) LIKE LOWER(?))"""
+        where, params = [], []
+        for clause in clauses:
+            where.append(" AND ".join(f"NOT {uses}" if neg else uses for _, neg in clause))
+            params.extend(f"%{term}%" for term, _ in clause)
+        rows = self.conn.execute(
+            f"SELECT r.uid FROM recipes r WHERE ({') OR ('.join(where)}) ORDER BY r.name, r.uid",
+            params,
+        ).fetchall()
+        return [row["uid"] for row in rows]
+
+    def recipe_rows(self, recipe_uids: list[str]) -> list[tuple[dict, list[dict]]]:
+        """``(recipe, ingredients)`` pairs for the given recipes, in the given order (one query)."""
+        rows = self.conn.execute(
+            """
+            SELECT r.uid AS recipe_uid, r.name AS recipe_name,
+                   i.uid AS ingredient_uid, i.name AS name, ri.quantity, i.supply
+            FROM recipes r
+            LEFT JOIN (recipe_ingredient ri
+                       JOIN ingredients i ON i.id = ri.ingredient_id)
+                   ON ri.recipe_id = r.id
+            WHERE r.uid IN (SELECT value FROM json_each(?))
+            ORDER BY r.uid, i.name
+            """,
+            (json.dumps(recipe_uids),),
+        )
+        grouped = {
+            uid: ({"uid": uid, "name": name}, [
+                {"uid": r["ingredient_uid"], "name": r["name"],
+                 "quantity": r["quantity"], "supply": r["supply"]}
+                for r in group
+                if r["ingredient_uid"] is not None
+            ])
+            for (uid, name), group in groupby(rows, key=_recipe_key)
+        }
+        return [grouped[uid] for uid in recipe_uids if uid in grouped]
+
+    def recipe_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def iter_recipes(self, start: int = 0) -> Iterator[tuple[dict, list[dict]]]:
+        """
+        Yield ``(recipe, ingredients)`` pairs for every recipe, ordered by name,
+        from the ``start``-th on.
+
+        All rows come from a single JOIN statement and are grouped while the
+        cursor streams, so the number of statements is constant regardless of
+        catalog size.
+
+        Yields:
+            (
+              {"uid": "...", "name": "lemon cake"},
+              [{"uid": "...", "name": "eggs", "quantity": 3, "supply": 10}, ...]
+            )
+        """
+        if start:
+            cursor = self.conn.execute(_RECIPE_ROWS_SQL.format(recipes=_RECIPES_FROM), (start,))
+        else:
+            cursor = self.conn.execute(_RECIPE_ROWS_SQL.format(recipes="recipes"))
+        for (uid, name), rows in groupby(cursor, key=_recipe_key):
+            ingredients = [
+                {
+                    "uid":      r["ingredient_uid"],
+                    "name":     r["name"],
+                    "quantity": r["quantity"],
+                    "supply":   r["supply"],
+                }
+                for r in rows
+                if r["ingredient_uid"] is not None
+            ]
+            yield {"uid": uid, "name": name}, ingredients
+
+    def requirement_matrix(self) -> RequirementMatrix:
+        return RequirementMatrix.from_recipes(self.iter_recipes())
+
+    def feasibility(self) -> FeasibilityView:
+        return FeasibilityView(self.requirement_matrix())
+
+
+_snapshot_caches: dict[str, SnapshotCache] = {}
+
+
+def _get_snapshot_cache() -> SnapshotCache:
+    cache = _snapshot_caches.get(DB_PATH)
+    if cache is None:
+        with _pools_lock:
+            _ensure_schema(DB_PATH)
+            load = compiled.load_snapshot if USE_COMPILED_CATALOG else None
+            cache = _snapshot_caches.setdefault(DB_PATH, SnapshotCache(DB_PATH, load))
+    return cache
+
+
+def _get_snapshot() -> InventorySnapshot:
+    """Return the up-to-date snapshot of DB_PATH (one data_version check per call)."""
+    return _get_snapshot_cache().get()
+
+
+def subscribe_feasibility(callback: Callable[[list[dict]], None]) -> Callable[[], None]:
+    """
+    Call ``callback(events)`` with the feasibility change events of DB_PATH
+    (see feasibility.py): one per recipe whose can_make, max_servings or
+    limiting ingredient changed. Returns the function that unsubscribes.
+
+    Writes made through this module are published right after they commit;
+    writes by other processes when the next tool call notices them.
+    """
+    return _get_snapshot_cache().subscribe(callback)
+
+
+def feasibility_changes(since: int = 0) -> dict:
+    """
+    Poll the feasibility change events of DB_PATH after sequence number ``since``.
+
+    Returns:
+        {"seq": 42, "events": [{"seq": 41, "type": "recipe", "recipe_name": "lemon cake", ...}, ...],
+         "truncated": False}
+    """
+    cache = _get_snapshot_cache()
+    cache.get()
+    return cache.feed.since(since)
+
+
+def _shaped(
+    tool: str,
+    rows: Callable[[int], Iterable[dict]],
+    cursor: str | None,
+    total: int,
+    summary: dict | None = None,
+) -> dict:
+    """
+    Page of the compact table format, or an error for a bad cursor.
+    ``rows(offset)`` yields the rows of the whole result from the
+    ``offset``-th on; only those that fit the page are consumed.
+    """
+    try:
+        offset = decode_cursor(tool, cursor)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return shape_rows(rows(offset), RESULT_BUDGET_BYTES, tool, offset, total, summary)
+
+
+def _lookup_recipe(catalog, recipe_name: str) -> tuple[dict | None, dict]:
+    """
+    Resolve a user-supplied recipe name.
+
+    Returns ``(recipe, extra)``: on success ``extra`` holds ranked
+    "alternatives" when the match is ambiguous; when nothing matches,
+    ``recipe`` is None and ``extra`` is the error result, with fuzzy
+    "did_you_mean" suggestions when there are any.
+    """
+    matches = catalog.resolve_recipe(recipe_name)
+    if not matches or matches[0].match == "fuzzy":
+        error = {"error": f"No recipe matching '{recipe_name}' found."}
+        if matches:
+            error["did_you_mean"] = [m.name for m in matches]
+        return None, error
+    best = matches[0]
+    extra = {}
+    if is_ambiguous(matches):
+        extra["alternatives"] = [m.name for m in matches[1:] if m.match != "fuzzy"]
+    return {"uid": best.key, "name": best.name}, extra
+
+
+@contextmanager
+def _catalog():
+    """
+    Yield the catalog tools read from: the in-memory snapshot when USE_SNAPSHOT
+    is set, otherwise a read-through _SqlCatalog over a pooled connection.
+    """
+    if USE_SNAPSHOT:
+        yield _get_snapshot()
+    else:
+        with _get_conn() as conn:
+            yield _SqlCatalog(conn)
+
+
 # ── Tool functions ─────────────────────────────────────────────────────────────
-def get_all_recipes() -> list[dict]:
+def get_all_recipes(cursor: str | None = None) -> list[dict] | dict:
     """
     Return every recipe in the database along with its full ingredient list
     (ingredient name, required quantity, and current supply).
 
-    Returns:
+    With COMPACT_RESULTS (the default) the recipes come back as one compact
+    page (see shaping.py):
+        {
+          "columns": ["name", {"ingredients": ["name", "quantity", "supply"]}],
+          "rows": [["lemon cake", [["eggs", 3, 10], ...]], ...],
+          "total": 1200, "returned": 150, "next_cursor": "..." or None,
+          "encoding": {...}
+        }
+
+    Args:
+        cursor: "next_cursor" of the previous page, to continue the listing.
+
+    Returns (COMPACT_RESULTS = False):
         [
           {
             "uid": "...",
@@ -96,32 +640,32 @@ def get_all_recipes() -> list[dict]:
           ...
         ]
     """
-    with _get_conn() as conn:
-        recipes = _rows_to_dicts(
-            conn.execute("SELECT uid, name FROM recipes ORDER BY name").fetchall()
-        )
-        for recipe in recipes:
-            recipe["ingredients"] = _rows_to_dicts(
-                conn.execute(
-                    """
-                    SELECT i.name, ri.quantity, i.supply
-                    FROM recipe_ingredient ri
-                    JOIN ingredients i ON i.uid = ri.ingredient_uid
-                    WHERE ri.recipe_uid = ?
-                    ORDER BY i.name
-                    """,
-                    (recipe["uid"],),
-                ).fetchall()
-            )
-        return recipes
+    def recipes(start: int = 0) -> Iterator[dict]:
+        for recipe, rows in catalog.iter_recipes(start):
+            yield {
+                "uid":         recipe["uid"],
+                "name":        recipe["name"],
+                "ingredients": [
+                    {"name": r["name"], "quantity": r["quantity"], "supply": r["supply"]}
+                    for r in rows
+                ],
+            }
+
+    with _catalog() as catalog:
+        if COMPACT_RESULTS:
+            return _shaped("get_all_recipes", recipes, cursor, catalog.recipe_count())
+        return list(recipes())
 
 
 def get_recipe_by_id(recipe_uid: str) -> dict:
     """
     Return a single recipe by its UID, including its full ingredient list.
 
+    Compact listings (COMPACT_RESULTS) leave UIDs out, so a recipe name is
+    accepted too and resolved like in the other tools.
+
     Args:
-        recipe_uid: The UUID of the recipe (TEXT primary key).
+        recipe_uid: The UUID of the recipe (TEXT primary key), or its name.
 
     Returns:
         {
@@ -133,57 +677,67 @@ def get_recipe_by_id(recipe_uid: str) -> dict:
         }
         or {"error": "Recipe not found"} if the UID does not exist.
     """
-    with _get_conn() as conn:
-        row = conn.execute(
-            "SELECT uid, name FROM recipes WHERE uid = ?", (recipe_uid,)
-        ).fetchone()
+    with _catalog() as catalog:
+        recipe = catalog.get_recipe(recipe_uid)
+        extra = {}
+        if recipe is None:
+            recipe, extra = _lookup_recipe(catalog, recipe_uid)
+            if recipe is None:
+                return {**extra, "error": f"Recipe '{recipe_uid}' not found."}
 
-        if row is None:
-            return {"error": f"Recipe '{recipe_uid}' not found."}
-
-        recipe = dict(row)
-        recipe["ingredients"] = _rows_to_dicts(
-            conn.execute(
-                """
-                SELECT i.name, ri.quantity, i.supply
-                FROM recipe_ingredient ri
-                JOIN ingredients i ON i.uid = ri.ingredient_uid
-                WHERE ri.recipe_uid = ?
-                ORDER BY i.name
-                """,
-                (recipe_uid,),
-            ).fetchall()
-        )
-        return recipe
+        recipe["ingredients"] = [
+            {"name": r["name"], "quantity": r["quantity"], "supply": r["supply"]}
+            for r in catalog.recipe_ingredients(recipe["uid"])
+        ]
+        return {**recipe, **extra}
 
 
-def get_inventory() -> list[dict]:
+def get_inventory(cursor: str | None = None) -> list[dict] | dict:
     """
     Return every ingredient in stock with its current supply.
 
-    Returns:
+    With COMPACT_RESULTS the ingredients come back as one compact page:
+        {"columns": ["name", "supply"], "rows": [["eggs", 10], ...], "total": 5, ...}
+
+    Args:
+        cursor: "next_cursor" of the previous page, to continue the listing.
+
+    Returns (COMPACT_RESULTS = False):
         [
           {"uid": "...", "name": "eggs",  "supply": 10},
           {"uid": "...", "name": "milk",  "supply": 2},
           ...
         ]
     """
-    with _get_conn() as conn:
-        return _rows_to_dicts(
-            conn.execute(
-                "SELECT uid, name, supply FROM ingredients ORDER BY name"
-            ).fetchall()
-        )
+    with _catalog() as catalog:
+        inventory = catalog.inventory()
+    if COMPACT_RESULTS:
+        summary = {"out_of_stock": sum(1 for i in inventory if i["supply"] <= 0)}
+        return _shaped("get_inventory", lambda start: inventory[start:], cursor, len(inventory), summary)
+    return inventory
 
 
-def check_recipe_feasibility() -> list[dict]:
+def check_recipe_feasibility(cursor: str | None = None) -> list[dict] | dict:
     """
     Cross-reference every recipe against the current inventory and report
     which recipes can be made right now.
 
     A recipe is feasible when every required ingredient has supply >= quantity.
 
-    Returns:
+    With COMPACT_RESULTS the recipes come back as one compact page, with a
+    {"can_make": n, "cannot_make": m} summary over all recipes when the page
+    does not hold them all:
+        {
+          "columns": ["recipe_name", "can_make",
+                      {"missing_ingredients": ["name", "required", "in_stock", "shortage"]}],
+          "rows": [["apple cake", True, []], ["lemon cake", False, [["lemon", 3, 1, 2]]], ...],
+          "total": 1200, "returned": 130, "next_cursor": "...", "summary": {...}
+        }
+
+    Args:
+        cursor: "next_cursor" of the previous page, to continue the listing.
+
+    Returns (COMPACT_RESULTS = False):
         [
           {
             "recipe_uid":  "...",
@@ -207,82 +761,98 @@ def check_recipe_feasibility() -> list[dict]:
           ...
         ]
     """
-    with _get_conn() as conn:
-        recipes = _rows_to_dicts(
-            conn.execute("SELECT uid, name FROM recipes ORDER BY name").fetchall()
-        )
-        results = []
-        for recipe in recipes:
-            rows = _rows_to_dicts(
-                conn.execute(
-                    """
-                    SELECT i.name, ri.quantity, i.supply
-                    FROM recipe_ingredient ri
-                    JOIN ingredients i ON i.uid = ri.ingredient_uid
-                    WHERE ri.recipe_uid = ?
-                    """,
-                    (recipe["uid"],),
-                ).fetchall()
-            )
-            missing = [
-                {
-                    "name":     r["name"],
-                    "required": r["quantity"],
-                    "in_stock": r["supply"],
-                    "shortage": r["quantity"] - r["supply"],
-                }
-                for r in rows
-                if r["supply"] < r["quantity"]
-            ]
-            results.append(
-                {
-                    "recipe_uid":           recipe["uid"],
-                    "recipe_name":          recipe["name"],
-                    "can_make":             len(missing) == 0,
-                    "missing_ingredients":  missing,
-                }
-            )
-        return results
+    with _catalog() as catalog:
+        view = catalog.feasibility()
+
+    # Shortages are listed only for the rows that end up on the page.
+    matrix = view.matrix
+    can_make = view.can_make.tolist()
+
+    def rows(start: int = 0) -> Iterator[dict]:
+        for row in range(start, matrix.n_recipes):
+            yield {
+                "recipe_uid":           matrix.recipe_uids[row],
+                "recipe_name":          matrix.recipe_names[row],
+                "can_make":             can_make[row],
+                "missing_ingredients":  [] if can_make[row] else matrix.missing(row),
+            }
+
+    if COMPACT_RESULTS:
+        summary = {"can_make": view.feasible, "cannot_make": matrix.n_recipes - view.feasible}
+        return _shaped("check_recipe_feasibility", rows, cursor, matrix.n_recipes, summary)
+    return list(rows())
 
 
-def search_recipes_by_ingredient(ingredient_name: str) -> list[dict]:
+def search_recipes_by_ingredient(
+    ingredient_name: str,
+    limit: int = SEARCH_PAGE_SIZE,
+    cursor: str | None = None,
+) -> dict:
     """
-    Find all recipes that contain a given ingredient (case-insensitive partial match).
+    Find recipes by ingredient (case-insensitive partial match), one page at a time.
+
+    Several ingredients can be combined with AND / OR / NOT, e.g. "eggs AND milk"
+    (recipes using both), "lemon OR apple", "eggs NOT milk". When the optional
+    recipe_search FTS5 index is installed (see fts.py) the search runs through it.
 
     Args:
-        ingredient_name: Full or partial ingredient name to search for.
+        ingredient_name: Ingredient name, partial name or AND/OR/NOT expression.
+        limit:           Maximum number of recipes per page (default 20).
+        cursor:          The "next_cursor" of the previous page, to continue a search.
 
     Returns:
-        [
-          {
-            "recipe_uid":           "...",
-            "recipe_name":          "lemon cake",
-            "matching_ingredient":  "lemon",
-            "required_quantity":    3,
-            "in_stock":             3
-          },
-          ...
-        ]
+        {
+          "results": [
+            {
+              "recipe_uid":           "...",
+              "recipe_name":          "lemon cake",
+              "matching_ingredient":  "lemon",
+              "required_quantity":    3,
+              "in_stock":             3
+            },
+            ...
+          ],
+          "next_cursor": "eyJxIjoi..."     # None on the last page
+        }
+        or {"error": "..."} for an empty query or an invalid cursor.
     """
-    with _get_conn() as conn:
-        rows = _rows_to_dicts(
-            conn.execute(
-                """
-                SELECT r.uid  AS recipe_uid,
-                       r.name AS recipe_name,
-                       i.name AS matching_ingredient,
-                       ri.quantity AS required_quantity,
-                       i.supply    AS in_stock
-                FROM recipe_ingredient ri
-                JOIN recipes     r ON r.uid = ri.recipe_uid
-                JOIN ingredients i ON i.uid = ri.ingredient_uid
-                WHERE LOWER(i.name) LIKE LOWER(?)
-                ORDER BY r.name
-                """,
-                (f"%{ingredient_name}%",),
-            ).fetchall()
-        )
-        return rows
+    clauses = parse_query(ingredient_name)
+    if not clauses:
+        return {"error": f"No ingredient to search for in '{ingredient_name}'."}
+    try:
+        offset = decode_cursor(ingredient_name, cursor)
+    except ValueError as e:
+        return {"error": str(e)}
+    limit = max(1, min(int(limit), SEARCH_MAX_PAGE_SIZE))
+
+    with _catalog() as catalog:
+        page_uids = None
+        if USE_FTS:
+            with _get_conn() as conn:
+                if fts.is_current(conn):
+                    page_uids = fts.search_recipe_uids(conn, ingredient_name, offset, limit)
+        if page_uids is None:
+            page_uids = catalog.match_recipes(clauses)[offset:offset + limit + 1]
+        recipes = catalog.recipe_rows(page_uids[:limit])
+
+    terms = fts.positive_terms(clauses)
+    results = [
+        {
+            "recipe_uid":          recipe["uid"],
+            "recipe_name":         recipe["name"],
+            "matching_ingredient": r["name"],
+            "required_quantity":   r["quantity"],
+            "in_stock":            r["supply"],
+        }
+        for recipe, rows in recipes
+        for r in rows
+        if any(term in r["name"].lower() for term in terms)
+    ]
+    has_more = len(page_uids) > limit
+    return {
+        "results":     results,
+        "next_cursor": encode_cursor(ingredient_name, offset + limit) if has_more else None,
+    }
 
 
 def get_missing_ingredients(recipe_name: str) -> dict:
@@ -290,8 +860,8 @@ def get_missing_ingredients(recipe_name: str) -> dict:
     For a specific recipe, list every ingredient whose current supply is
     below the required quantity.
 
-    Resolves the recipe by name internally (case-insensitive, partial match)
-    so the caller never needs to know the UID.
+    Resolves the recipe by name internally (exact, then prefix, then partial
+    match, case-insensitive) so the caller never needs to know the UID.
 
     Args:
         recipe_name: Full or partial recipe name (e.g. "lemon cake").
@@ -304,31 +874,18 @@ def get_missing_ingredients(recipe_name: str) -> dict:
           "missing_count": 1,
           "missing_ingredients": [
             {"name": "lemon", "required": 3, "in_stock": 1, "shortage": 2}
-          ]
+          ],
+          "alternatives": ["lemon cake deluxe"]   # only when the name is ambiguous
         }
-        or {"error": "..."} if no matching recipe is found.
+        or {"error": "...", "did_you_mean": [...]} if no matching recipe is found.
     """
-    with _get_conn() as conn:
-        row = conn.execute(
-            "SELECT uid, name FROM recipes WHERE LOWER(name) LIKE LOWER(?)",
-            (f"%{recipe_name}%",),
-        ).fetchone()
+    with _catalog() as catalog:
+        recipe, extra = _lookup_recipe(catalog, recipe_name)
 
-        if row is None:
-            return {"error": f"No recipe matching '{recipe_name}' found."}
+        if recipe is None:
+            return extra
 
-        recipe = dict(row)
-        rows = _rows_to_dicts(
-            conn.execute(
-                """
-                SELECT i.name, ri.quantity, i.supply
-                FROM recipe_ingredient ri
-                JOIN ingredients i ON i.uid = ri.ingredient_uid
-                WHERE ri.recipe_uid = ?
-                """,
-                (recipe["uid"],),
-            ).fetchall()
-        )
+        rows = catalog.recipe_ingredients(recipe["uid"])
         missing = [
             {
                 "name":     r["name"],
@@ -345,6 +902,7 @@ def get_missing_ingredients(recipe_name: str) -> dict:
             "can_make":            len(missing) == 0,
             "missing_count":       len(missing),
             "missing_ingredients": missing,
+            **extra,
         }
 
 
@@ -353,8 +911,8 @@ def get_max_servings(recipe_name: str) -> dict:
     Compute how many full servings of a recipe can be made with the current
     ingredient supply, and identify the limiting ingredient.
 
-    Resolves the recipe by name internally (case-insensitive, partial match)
-    so the caller never needs to know the UID.
+    Resolves the recipe by name internally (exact, then prefix, then partial
+    match, case-insensitive) so the caller never needs to know the UID.
 
     For each ingredient, the maximum servings it allows is floor(supply / quantity).
     The overall maximum is the minimum across all ingredients.
@@ -372,55 +930,42 @@ def get_max_servings(recipe_name: str) -> dict:
             {"name": "eggs",  "required": 3, "in_stock": 10, "max_servings": 3},
             {"name": "lemon", "required": 3, "in_stock": 3,  "max_servings": 1},
             {"name": "milk",  "required": 1, "in_stock": 2,  "max_servings": 2}
-          ]
+          ],
+          "alternatives": ["lemon tart"]          # only when the name is ambiguous
         }
-        or {"error": "..."} if no matching recipe is found.
+        or {"error": "...", "did_you_mean": [...]} if no matching recipe is found.
     """
-    with _get_conn() as conn:
-        row = conn.execute(
-            "SELECT uid, name FROM recipes WHERE LOWER(name) LIKE LOWER(?)",
-            (f"%{recipe_name}%",),
-        ).fetchone()
-
-        if row is None:
-            return {"error": f"No recipe matching '{recipe_name}' found."}
-
-        recipe = dict(row)
-        rows = _rows_to_dicts(
-            conn.execute(
-                """
-                SELECT i.name, ri.quantity, i.supply
-                FROM recipe_ingredient ri
-                JOIN ingredients i ON i.uid = ri.ingredient_uid
-                WHERE ri.recipe_uid = ?
-                ORDER BY i.name
-                """,
-                (recipe["uid"],),
-            ).fetchall()
-        )
+    with _catalog() as catalog:
+        recipe, extra = _lookup_recipe(catalog, recipe_name)
 
-        if not rows:
-            return {"error": f"Recipe '{recipe['name']}' has no ingredients defined."}
+        if recipe is None:
+            return extra
 
+        # One recipe's rows (the same rule as RequirementMatrix.breakdown): read-through
+        # mode must not build the catalog-wide matrix to answer for a single recipe.
         breakdown = [
             {
-                "name":         r["name"],
-                "required":     r["quantity"],
-                "in_stock":     r["supply"],
-                "max_servings": r["supply"] // r["quantity"] if r["quantity"] > 0 else 0,
+                "name":         i["name"],
+                "required":     i["quantity"],
+                "in_stock":     i["supply"],
+                "max_servings": i["supply"] // i["quantity"] if i["quantity"] > 0 else 0,
             }
-            for r in rows
+            for i in catalog.recipe_ingredients(recipe["uid"])
         ]
 
-        limiting = min(breakdown, key=lambda x: x["max_servings"])
+    if not breakdown:
+        return {"error": f"Recipe '{recipe['name']}' has no ingredients defined."}
 
-        return {
-            "recipe_uid":          recipe["uid"],
-            "recipe_name":         recipe["name"],
-            "max_servings":        limiting["max_servings"],
-            "limiting_ingredient": limiting["name"],
-            "breakdown":           breakdown,
-        }
+    limiting = min(breakdown, key=lambda x: x["max_servings"])
+
+    return {
+        "recipe_uid":          recipe["uid"],
+        "recipe_name":         recipe["name"],
+        "max_servings":        limiting["max_servings"],
+        "limiting_ingredient": limiting["name"],
+        "breakdown":           breakdown,
+        **extra,
+    }
 
 
 def simulate_remaining_recipes(recipe_name: str, servings: int = 1) -> dict:
@@ -450,105 +995,825 @@ def simulate_remaining_recipes(recipe_name: str, servings: int = 1) -> dict:
               "missing_ingredients": []
             },
             ...
-          ]
+          ],
+          "alternatives": [...]                   # only when the name is ambiguous
         }
         or {"error": "..."} if the recipe is not found or servings exceed max_servings.
     """
-    with _get_conn() as conn:
+    with _catalog() as catalog:
         # Resolve recipe by name
-        row = conn.execute(
-            "SELECT uid, name FROM recipes WHERE LOWER(name) LIKE LOWER(?)",
-            (f"%{recipe_name}%",),
-        ).fetchone()
+        consumed, extra = _lookup_recipe(catalog, recipe_name)
 
-        if row is None:
-            return {"error": f"No recipe matching '{recipe_name}' found."}
+        if consumed is None:
+            return extra
 
-        consumed = dict(row)
+        matrix = catalog.requirement_matrix()
 
-        # Get ingredients required for the consumed recipe
-        required_rows = _rows_to_dicts(
-            conn.execute(
-                """
-                SELECT i.uid, i.name, ri.quantity, i.supply
-                FROM recipe_ingredient ri
-                JOIN ingredients i ON i.uid = ri.ingredient_uid
-                WHERE ri.recipe_uid = ?
-                """,
-                (consumed["uid"],),
-            ).fetchall()
-        )
+    consumed_row = matrix.row_of[consumed["uid"]]
+    error = _consumption_error(matrix, consumed_row, servings)
+    if error is not None:
+        return error
+
+    # Check feasibility of every OTHER recipe against virtual supply
+    result = matrix.evaluate(matrix.supply - matrix.requirement_vector(consumed_row, servings))
+    missing = matrix.missing_by_row(result)
+    return {
+        **_remaining_result(matrix, consumed_row, servings, result.can_make, result.max_servings,
+                            lambda row: missing.get(row, [])),
+        **extra,
+    }
 
-        # Validate we have enough stock for the requested servings
-        for r in required_rows:
-            needed = r["quantity"] * servings
-            if r["supply"] < needed:
-                return {
-                    "error": (
-                        f"Not enough '{r['name']}' to make {servings} serving(s) of "
-                        f"'{consumed['name']}'. Need {needed}, have {r['supply']}."
-                    )
-                }
 
-        # Build a virtual supply map after consumption
-        virtual_supply: dict[str, int] = {
-            r["name"]: r["supply"] for r in
-            _rows_to_dicts(conn.execute("SELECT name, supply FROM ingredients").fetchall())
+def _consumption_error(matrix: RequirementMatrix, row: int, servings: int) -> dict | None:
+    """The error result when the supply does not cover ``servings`` of ``row``."""
+    for r in matrix.breakdown(row):
+        needed = r["required"] * servings
+        if r["in_stock"] < needed:
+            return {
+                "error": (
+                    f"Not enough '{r['name']}' to make {servings} serving(s) of "
+                    f"'{matrix.recipe_names[row]}'. Need {needed}, have {r['in_stock']}."
+                )
+            }
+    return None
+
+
+def _remaining_result(
+    matrix: RequirementMatrix,
+    consumed_row: int,
+    servings: int,
+    can_make: np.ndarray,
+    max_servings: np.ndarray,
+    missing: Callable[[int], list[dict]],
+) -> dict:
+    """
+    simulate_remaining_recipes' result for ``servings`` of ``consumed_row``,
+    from the evaluation of the supply left (``missing(row)`` lists the
+    shortages of a recipe that cannot be made).
+    """
+    remaining_supply = [
+        {
+            "name":   r["name"],
+            "before": r["in_stock"],
+            "used":   r["required"] * servings,
+            "after":  r["in_stock"] - r["required"] * servings,
+        }
+        for r in matrix.breakdown(consumed_row)
+    ]
+    can_make = can_make.tolist()
+    max_servings = max_servings.tolist()
+    feasible_recipes = [
+        {
+            "recipe_name":         name,
+            "can_make":            can_make[row],
+            "max_servings":        max_servings[row],
+            "missing_ingredients": [] if can_make[row] else missing(row),
+        }
+        for row, name in enumerate(matrix.recipe_names)
+        if row != consumed_row  # skip the consumed recipe itself
+    ]
+    return {
+        "consumed_recipe":   matrix.recipe_names[consumed_row],
+        "servings_consumed": servings,
+        "remaining_supply":  remaining_supply,
+        "feasible_recipes":  feasible_recipes,
+    }
+
+
+def _resolve_step(catalog, matrix: RequirementMatrix, step: dict, cache: dict) -> dict:
+    """
+    Resolve one plan step to its matrix row (name lookups are shared per call),
+    or to the step's "error" when it is malformed or names no recipe.
+    """
+    if not isinstance(step, dict) or not isinstance(step.get("recipe_name"), str):
+        return {
+            "recipe_name": None, "servings": None,
+            "error": f"A step must be {{\"recipe_name\": ..., \"servings\": ...}}, got {step!r}.",
         }
-        remaining_supply = []
-        for r in required_rows:
-            used = r["quantity"] * servings
-            virtual_supply[r["name"]] -= used
-            remaining_supply.append({
+    name = step["recipe_name"]
+    servings = step.get("servings", 1)
+    count = _as_int(servings)
+    if count is None or count < 1:
+        return {
+            "recipe_name": name, "servings": servings,
+            "error": f"servings must be a whole number >= 1, got {servings!r}.",
+        }
+    if name not in cache:
+        cache[name] = catalog.find_recipe(name)
+    recipe = cache[name]
+    resolved = {"recipe_name": name, "servings": count}
+    if recipe is None:
+        resolved["error"] = f"No recipe matching '{name}' found."
+    else:
+        resolved["recipe_name"] = recipe["name"]
+        resolved["row"] = matrix.row_of[recipe["uid"]]
+    return resolved
+
+
+def _run_plan(matrix: RequirementMatrix, steps: list[dict]) -> dict:
+    """Apply every step's consumption as a running delta on one supply vector."""
+    demands = np.zeros((len(steps), matrix.n_ingredients), dtype=np.int64)
+    for k, step in enumerate(steps):
+        if "row" in step:
+            demands[k] = matrix.requirement_vector(step["row"], step["servings"])
+    after = matrix.supply - np.cumsum(demands, axis=0)
+
+    supply = matrix.supply
+    step_results = []
+    failed_step = None
+    for k, step in enumerate(steps):
+        result = {"step": k + 1, "recipe_name": step["recipe_name"], "servings": step["servings"]}
+        step_results.append(result)
+        if "error" in step:
+            result.update(can_make=False, error=step["error"])
+            failed_step = k + 1
+            break
+
+        breakdown = matrix.breakdown(step["row"], supply)
+        result["max_servings"] = min((r["max_servings"] for r in breakdown), default=0)
+        missing = [
+            {
+                "name":     r["name"],
+                "required": r["required"] * step["servings"],
+                "in_stock": r["in_stock"],
+                "shortage": r["required"] * step["servings"] - r["in_stock"],
+            }
+            for r in breakdown
+            if r["in_stock"] < r["required"] * step["servings"]
+        ]
+        result["can_make"] = not missing
+        if missing:
+            result["missing_ingredients"] = missing
+            failed_step = k + 1
+            break
+
+        result["remaining_supply"] = [
+            {
                 "name":   r["name"],
-                "before": r["supply"],
-                "used":   used,
-                "after":  virtual_supply[r["name"]],
-            })
+                "before": r["in_stock"],
+                "used":   r["required"] * step["servings"],
+                "after":  r["in_stock"] - r["required"] * step["servings"],
+            }
+            for r in breakdown
+        ]
+        supply = after[k]
+
+    evaluation = matrix.evaluate(supply)
+    max_servings = evaluation.max_servings.tolist()
+    return {
+        "feasible":     failed_step is None,
+        "failed_step":  failed_step,
+        "steps":        step_results,
+        "feasible_after_plan": [
+            {"recipe_name": name, "max_servings": max_servings[row]}
+            for row, name in enumerate(matrix.recipe_names)
+            if max_servings[row] > 0
+        ],
+    }
+
+
+def simulate_plan(
+    steps: list[dict] | None = None,
+    plans: list[list[dict]] | None = None,
+) -> dict:
+    """
+    Simulate a sequence of recipe consumptions (a plan), or several alternative
+    plans, in one call and report the supply and feasibility after every step.
+
+    Each step consumes servings of one recipe from the supply left by the
+    previous steps. A plan stops at the first step that cannot be made.
+    Like simulate_remaining_recipes this is read-only — the database is never
+    modified.
+
+    Args:
+        steps: One plan, as an ordered list of
+               {"recipe_name": "lemon cake", "servings": 1} steps.
+        plans: Several alternative plans, each a list of steps as above. Every
+               plan starts again from the current supply.
+
+    Returns:
+        {
+          "plans": [
+            {
+              "feasible":    True,
+              "failed_step": None,
+              "steps": [
+                {
+                  "step": 1, "recipe_name": "lemon cake", "servings": 1,
+                  "max_servings": 1, "can_make": True,
+                  "remaining_supply": [
+                    {"name": "eggs", "before": 10, "used": 3, "after": 7},
+                    ...
+                  ]
+                },
+                {
+                  "step": 2, "recipe_name": "apple cake", "servings": 2,
+                  "max_servings": 1, "can_make": False,
+                  "missing_ingredients": [
+                    {"name": "apple", "required": 4, "in_stock": 2, "shortage": 2}
+                  ]
+                }
+              ],
+              "feasible_after_plan": [
+                {"recipe_name": "scramble eggs", "max_servings": 1}
+              ]
+            },
+            ...
+          ]
+        }
+        or {"error": "..."} if neither steps nor plans are given. A step that is
+        malformed (servings not a whole number >= 1) or names no recipe ends its
+        plan with can_make False and that step's "error".
+    """
+    all_plans = ([steps] if steps else []) + list(plans or [])
+    if not all_plans:
+        return {"error": "Provide 'steps' or 'plans' with at least one step."}
+    if not all(isinstance(plan, list) for plan in all_plans):
+        return {"error": "Every plan must be a list of {\"recipe_name\", \"servings\"} steps."}
+
+    with _catalog() as catalog:
+        matrix = catalog.requirement_matrix()
+        names: dict = {}
+        resolved = [
+            [_resolve_step(catalog, matrix, step, names) for step in plan]
+            for plan in all_plans
+        ]
+
+    return {"plans": [_run_plan(matrix, plan) for plan in resolved]}
+
+
+def optimize_menu(
+    weights: dict[str, float] | None = None,
+    min_servings: dict[str, int] | None = None,
+    mode: str = "auto",
+    time_budget_seconds: float = 2.0,
+) -> dict:
+    """
+    Find the mix of recipes that yields the most servings from the current
+    supply, optionally favouring some recipes and guaranteeing minimum servings.
+
+    Solves the integer allocation problem over every recipe. "exact" uses
+    branch and bound (small catalogs; larger ones are solved as "fast"),
+    "fast" uses an LP relaxation with greedy rounding that stops at the time
+    budget; "auto" picks one by catalog size.
+    Read-only — does not modify the database.
 
-        # Check feasibility of every OTHER recipe against virtual supply
-        all_recipes = _rows_to_dicts(
-            conn.execute("SELECT uid, name FROM recipes ORDER BY name").fetchall()
+    Args:
+        weights:             Optional {recipe name: weight} priorities. A serving of a
+                             recipe is worth its weight (default 1.0); weight 0 excludes it.
+        min_servings:        Optional {recipe name: servings} that must be in the menu.
+        mode:                "auto" (default), "exact" or "fast".
+        time_budget_seconds: Maximum solving time (default: 2 seconds).
+
+    Returns:
+        {
+          "mode":           "exact",
+          "optimal":        True,
+          "objective":      3.0,
+          "upper_bound":    3.0,
+          "total_servings": 3,
+          "menu": [
+            {"recipe_name": "scramble eggs", "servings": 2},
+            {"recipe_name": "lemon cake",    "servings": 1}
+          ],
+          "remaining_supply": [
+            {"name": "eggs", "before": 10, "used": 10, "after": 0},
+            ...
+          ]
+        }
+        or {"error": "..."} if a recipe name is unknown, a weight or minimum is not
+        a number >= 0, the mode is invalid or the minimum servings cannot be met.
+    """
+    budget = _as_number(time_budget_seconds)
+    if budget is None or budget < 0:
+        return {"error": f"time_budget_seconds must be a number >= 0, got {time_budget_seconds!r}."}
+    checks = (
+        ("weights", weights, _as_number, "a number >= 0"),
+        ("min_servings", min_servings, _as_int, "a whole number >= 0"),
+    )
+    for label, values, _, _ in checks:
+        if values is not None and not isinstance(values, dict):
+            return {"error": f"{label} must be an object of {{recipe name: value}}, got {values!r}."}
+
+    with _catalog() as catalog:
+        matrix = catalog.requirement_matrix()
+        vectors = {"weights": np.ones(matrix.n_recipes), "min_servings": np.zeros(matrix.n_recipes, dtype=np.int64)}
+        for label, values, parse, expected in checks:
+            for name, value in (values or {}).items():
+                number = parse(value)
+                if number is None or number < 0:
+                    return {"error": f"{label}['{name}'] must be {expected}, got {value!r}."}
+                recipe = catalog.find_recipe(name)
+                if recipe is None:
+                    return {"error": f"No recipe matching '{name}' found."}
+                vectors[label][matrix.row_of[recipe["uid"]]] = number
+
+    try:
+        solution = solve_menu(
+            matrix, vectors["weights"], vectors["min_servings"], mode=mode, time_budget=budget
         )
-        feasible_recipes = []
-        for recipe in all_recipes:
-            if recipe["uid"] == consumed["uid"]:
-                continue  # skip the consumed recipe itself
-
-            ing_rows = _rows_to_dicts(
-                conn.execute(
-                    """
-                    SELECT i.name, ri.quantity
-                    FROM recipe_ingredient ri
-                    JOIN ingredients i ON i.uid = ri.ingredient_uid
-                    WHERE ri.recipe_uid = ?
-                    """,
-                    (recipe["uid"],),
-                ).fetchall()
+    except InfeasibleMenuError as e:
+        short = ", ".join(f"{matrix.ingredient_names[col]} (short by {gap})" for col, gap in e.shortages)
+        return {"error": f"{e} Missing: {short}."}
+    except ValueError as e:
+        return {"error": str(e)}
+
+    servings = solution.servings.tolist()
+    used = matrix.consumption(solution.servings)
+    menu = sorted(
+        (
+            {"recipe_name": matrix.recipe_names[row], "servings": count}
+            for row, count in enumerate(servings)
+            if count > 0
+        ),
+        key=lambda r: (-r["servings"], r["recipe_name"]),
+    )
+    return {
+        "mode":           solution.mode,
+        "optimal":        solution.optimal,
+        "objective":      round(solution.objective, 6),
+        "upper_bound":    round(solution.upper_bound, 6),
+        "total_servings": sum(servings),
+        "menu":           menu,
+        "remaining_supply": [
+            {
+                "name":   matrix.ingredient_names[col],
+                "before": int(matrix.supply[col]),
+                "used":   int(used[col]),
+                "after":  int(matrix.supply[col] - used[col]),
+            }
+            for col in np.flatnonzero(used).tolist()
+        ],
+    }
+
+
+# ── Servings sweeps ───────────────────────────────────────────────────────────
+
+def _sweep(recipe_names: list[str] | None, max_servings: int) -> tuple[FeasibilityView, Any] | dict:
+    """Run the sweep of 1..max_servings of every named recipe (all when None), or return an error."""
+    if isinstance(recipe_names, str):
+        recipe_names = [recipe_names]
+    servings = _as_int(max_servings)
+    if servings is None or not 1 <= servings <= SWEEP_MAX_SERVINGS:
+        return {"error": f"max_servings must be a whole number from 1 to {SWEEP_MAX_SERVINGS}."}
+
+    with _catalog() as catalog:
+        view = catalog.feasibility()
+        matrix = view.matrix
+        if recipe_names is None:
+            rows = np.arange(matrix.n_recipes, dtype=np.int64)
+        else:
+            rows = []
+            for name in recipe_names:
+                recipe, extra = _lookup_recipe(catalog, name)
+                if recipe is None:
+                    return extra
+                rows.append(matrix.row_of[recipe["uid"]])
+            rows = np.array(list(dict.fromkeys(rows)), dtype=np.int64)
+
+    cells = len(rows) * servings * matrix.n_recipes
+    if cells > SWEEP_MAX_CELLS:
+        return {
+            "error": (
+                f"A sweep of {len(rows)} recipe(s) x {servings} serving(s) over {matrix.n_recipes} "
+                f"recipes is too large; name fewer recipes or lower max_servings."
+            )
+        }
+    with tracing.span("sweep") as current:
+        if current is not None:
+            current.attributes.update({"sweep.scenarios": len(rows) * servings, "sweep.cells": cells})
+        return view, _get_sweep_pool().run(matrix, rows, servings)
+
+
+def simulate_servings_sweep(
+    recipe_names: list[str] | None = None,
+    max_servings: int = 3,
+    cursor: str | None = None,
+) -> list[dict] | dict:
+    """
+    For each recipe, simulate consuming 1, 2, ... max_servings servings of it
+    and report how many OTHER recipes can still be made afterwards, and which
+    ones are lost. Answers "what does making more of X cost me?" for many
+    recipes in one call, instead of one simulate_remaining_recipes call per
+    recipe and serving count. Read-only — does not modify the database.
+
+    Args:
+        recipe_names: Recipes to sweep (full or partial names); all recipes when omitted.
+        max_servings: Sweep 1..max_servings servings of each recipe (default: 3).
+        cursor:       "next_cursor" of the previous page, to continue the listing.
+
+    Returns (COMPACT_RESULTS = False; otherwise the same rows as a compact
+    page, with a {"scenarios": n, "possible": m} summary):
+        [
+          {
+            "recipe_name":       "lemon cake",
+            "servings_consumed": 1,
+            "possible":          True,           # False: not enough stock for it
+            "can_make_others":   41,             # other recipes still feasible
+            "lost_count":        2,              # feasible now, not afterwards
+            "lost":              ["lemon tart", "lemonade"]   # first 10
+          },
+          ...
+        ]
+        or {"error": "..."} if a recipe is not found or the sweep is too large.
+    """
+    swept = _sweep(recipe_names, max_servings)
+    if isinstance(swept, dict):
+        return swept
+    view, sweep = swept
+    names = view.matrix.recipe_names
+    now = view.can_make
+
+    swept_rows = sweep.rows.tolist()
+
+    def rows(start: int = 0) -> Iterator[dict]:
+        for scenario in range(start, int(sweep.possible.size)):     # recipe-major, like sweep.possible
+            i, s = divmod(scenario, sweep.max_servings)
+            row, s = swept_rows[i], s + 1
+            result = {"recipe_name": names[row], "servings_consumed": s}
+            if not sweep.possible[i, s - 1]:
+                result.update(possible=False, can_make_others=None, lost_count=None, lost=[])
+                yield result
+                continue
+            after = sweep.can_make[i, s - 1]
+            lost = np.flatnonzero(now & ~after)
+            lost = lost[lost != row]
+            result.update(
+                possible=True,
+                can_make_others=int(after.sum()) - int(after[row]),
+                lost_count=len(lost),
+                lost=[names[r] for r in lost[:SWEEP_LOST_LIMIT].tolist()],
+            )
+            yield result
+
+    if COMPACT_RESULTS:
+        summary = {"scenarios": int(sweep.possible.size), "possible": int(sweep.possible.sum())}
+        return _shaped("simulate_servings_sweep", rows, cursor, int(sweep.possible.size), summary)
+    return list(rows())
+
+
+def iter_servings_sweep(recipe_names: list[str] | None = None, max_servings: int = 3) -> Iterator[dict]:
+    """
+    The full simulate_remaining_recipes result of every scenario of a sweep,
+    in recipe then servings order, computed by one parallel sweep (for
+    scripts and reports; the dicts list every recipe, so they are large).
+
+    Yields:
+        simulate_remaining_recipes(name, servings) results, e.g.
+        {"consumed_recipe": "lemon cake", "servings_consumed": 1,
+         "remaining_supply": [...], "feasible_recipes": [...]}
+        or its {"error": ...} for a scenario the stock does not cover. A bad
+        argument yields a single {"error": ...}.
+    """
+    swept = _sweep(recipe_names, max_servings)
+    if isinstance(swept, dict):
+        yield swept
+        return
+    view, sweep = swept
+    matrix = view.matrix
+    for i, row in enumerate(sweep.rows.tolist()):
+        for s in range(1, sweep.max_servings + 1):
+            if not sweep.possible[i, s - 1]:
+                yield _consumption_error(matrix, row, s)
+                continue
+            supply = sweep.remaining_supply(matrix, i, s)
+            yield _remaining_result(
+                matrix, row, s, sweep.can_make[i, s - 1], sweep.servings[i, s - 1],
+                lambda r, supply=supply: matrix.missing(r, supply),
+            )
+
+
+# ── Streaming listings ────────────────────────────────────────────────────────
+#
+# Generator variants of get_all_recipes / check_recipe_feasibility for scripts
+# and exports (export.py): rows are produced one at a time instead of as a
+# complete list, with optional filters. In read-through mode they stream from
+# one SQL statement on a pooled connection, which stays checked out until
+# the generator is exhausted or closed.
+
+STREAM_CHUNK = 4_096          # snapshot rows converted to Python at a time
+
+def _filter_error(min_servings) -> dict | None:
+    if _as_int(min_servings) is None or int(min_servings) < 0:
+        return {"error": f"min_servings must be a whole number >= 0, got {min_servings!r}."}
+    return None
+
+
+def _stream_recipes(feasible_only: bool, min_servings: int) -> Iterator[tuple[dict, list[dict], bool, int]]:
+    """
+    ``(recipe, ingredients, can_make, max_servings)`` of the recipes passing
+    the filters, ordered by name.
+
+    From the snapshot the filters are applied to its feasibility view and only
+    the kept recipes' rows are built. Read-through, the rows come from
+    _SqlCatalog.iter_recipes() and each recipe is evaluated as it arrives,
+    with the engine's rules (max_servings: min of supply // quantity, 0
+    without ingredients).
+    """
+    with _catalog() as catalog:
+        if isinstance(catalog, InventorySnapshot):
+            view = catalog.feasibility()
+            matrix = view.matrix
+            keep = np.ones(matrix.n_recipes, dtype=bool)
+            if feasible_only:
+                keep &= view.can_make
+            if min_servings > 0:
+                keep &= view.max_servings >= min_servings
+            selected = np.flatnonzero(keep)
+            for start in range(0, len(selected), STREAM_CHUNK):     # no list of every row
+                rows = selected[start:start + STREAM_CHUNK]
+                for row, can_make, servings in zip(
+                    rows.tolist(), view.can_make[rows].tolist(), view.max_servings[rows].tolist()
+                ):
+                    uid = matrix.recipe_uids[row]
+                    yield {"uid": uid, "name": matrix.recipe_names[row]}, catalog.recipe_ingredients(uid), can_make, servings
+            return
+        for recipe, ingredients in catalog.iter_recipes():
+            can_make = all(r["supply"] >= r["quantity"] for r in ingredients)
+            servings = min(
+                (r["supply"] // r["quantity"] if r["quantity"] > 0 else 0 for r in ingredients), default=0
             )
-            missing = [
+            if (can_make or not feasible_only) and servings >= min_servings:
+                yield recipe, ingredients, can_make, servings
+
+
+def iter_recipes(feasible_only: bool = False, min_servings: int = 0) -> Iterator[dict]:
+    """
+    Every recipe with its ingredient list, one at a time, ordered by name
+    (the rows of get_all_recipes with COMPACT_RESULTS = False).
+
+    Args:
+        feasible_only: Only recipes that can be made with the current stock.
+        min_servings:  Only recipes with max_servings >= this.
+
+    Yields:
+        {"uid": "...", "name": "lemon cake",
+         "ingredients": [{"name": "eggs", "quantity": 3, "supply": 10}, ...]}
+        or a single {"error": "..."} for a bad argument.
+    """
+    error = _filter_error(min_servings)
+    if error is not None:
+        yield error
+        return
+    for recipe, ingredients, _, _ in _stream_recipes(feasible_only, int(min_servings)):
+        yield {
+            "uid":         recipe["uid"],
+            "name":        recipe["name"],
+            "ingredients": [
+                {"name": r["name"], "quantity": r["quantity"], "supply": r["supply"]}
+                for r in ingredients
+            ],
+        }
+
+
+def iter_feasibility(feasible_only: bool = False, min_servings: int = 0) -> Iterator[dict]:
+    """
+    The feasibility of every recipe, one at a time, ordered by name (the rows
+    of check_recipe_feasibility with COMPACT_RESULTS = False, plus max_servings).
+
+    Args:
+        feasible_only: Only recipes that can be made with the current stock.
+        min_servings:  Only recipes with max_servings >= this.
+
+    Yields:
+        {"recipe_uid": "...", "recipe_name": "lemon cake", "can_make": False,
+         "max_servings": 0,
+         "missing_ingredients": [{"name": "lemon", "required": 3, "in_stock": 1, "shortage": 2}]}
+        or a single {"error": "..."} for a bad argument.
+    """
+    error = _filter_error(min_servings)
+    if error is not None:
+        yield error
+        return
+    for recipe, ingredients, can_make, servings in _stream_recipes(feasible_only, int(min_servings)):
+        yield {
+            "recipe_uid":          recipe["uid"],
+            "recipe_name":         recipe["name"],
+            "can_make":            can_make,
+            "max_servings":        servings,
+            "missing_ingredients": [] if can_make else [
                 {
                     "name":     r["name"],
                     "required": r["quantity"],
-                    "in_stock": virtual_supply.get(r["name"], 0),
-                    "shortage": r["quantity"] - virtual_supply.get(r["name"], 0),
+                    "in_stock": r["supply"],
+                    "shortage": r["quantity"] - r["supply"],
                 }
-                for r in ing_rows
-                if virtual_supply.get(r["name"], 0) < r["quantity"]
+                for r in ingredients
+                if r["supply"] < r["quantity"]
+            ],
+        }
+
+
+# ── Mutation tools ────────────────────────────────────────────────────────────
+#
+# Names are resolved read-through on a pooled connection (a burst of writes
+# never waits for snapshot rebuilds); the changes themselves are applied by
+# the write batcher, each call in its own savepoint of a group commit.
+
+def _as_int(value) -> int | None:
+    """``value`` as an int when it is a whole number (models sometimes send 2.0), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return None
+
+
+def _as_number(value) -> float | None:
+    """``value`` as a float when it is a finite int or float (not a bool), else None."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def _lookup_for_write(kind: str, matches: list[Match], name: str) -> tuple[dict | None, dict]:
+    """
+    Like _lookup_recipe, but stricter since the result is written to: fuzzy
+    matches are not used and an ambiguous name is refused, not guessed.
+    """
+    matches = [m for m in matches if m.match != "fuzzy"]
+    if not matches:
+        return None, {"error": f"No {kind} matching '{name}' found; nothing was changed."}
+    if is_ambiguous(matches):
+        return None, {
+            "error": f"'{name}' matches several {kind}s; nothing was changed. Use the full name.",
+            "did_you_mean": [m.name for m in matches],
+        }
+    return {"uid": matches[0].key, "name": matches[0].name}, {}
+
+
+def _write(mutation) -> dict | list:
+    """Submit ``mutation`` to the write batcher of DB_PATH; database errors become {"error": ...}."""
+    try:
+        result = _get_writer().submit(mutation)
+    except sqlite3.Error as exc:
+        return {"error": f"The database rejected the change ({exc}); nothing was changed."}
+    if not isinstance(result, dict):
+        replica = _replicas.get(DB_PATH)
+        if replica is not None:
+            replica.refresh(force=False)    # the next read must see this write
+        cache = _snapshot_caches.get(DB_PATH)
+        if cache is not None:
+            cache.get()         # apply the new supplies now: subscribers hear of them right away
+    return result
+
+
+_READ_ONLY_ERROR = {"error": "The inventory is read-only here; no change was made."}
+
+
+def consume_recipe(recipe_name: str, servings: int = 1) -> dict:
+    """
+    Record that servings of a recipe were actually cooked: subtract its
+    ingredients from the stock in the database.
+
+    All or nothing: when any ingredient is short, nothing is subtracted and
+    the shortages are reported. For "what if" questions use
+    simulate_remaining_recipes instead, which does not write.
+
+    Args:
+        recipe_name: Full or partial recipe name (e.g. "lemon cake").
+        servings:    Number of servings cooked (default: 1).
+
+    Returns:
+        {
+          "recipe_name":       "lemon cake",
+          "servings_consumed": 2,
+          "ingredients": [
+            {"name": "eggs",  "used": 6, "supply": 4, "version": 3},
+            {"name": "lemon", "used": 6, "supply": 0, "version": 5}
+          ]
+        }
+        or {"error": "Not enough stock; nothing was changed.",
+            "shortages": [{"name": "lemon", "required": 6, "in_stock": 3, "shortage": 3}]}
+        or {"error": "...", "did_you_mean": [...]} if the name matches no single recipe.
+    """
+    if not ALLOW_WRITES:
+        return dict(_READ_ONLY_ERROR)
+    count = _as_int(servings)
+    if count is None or count < 1:
+        return {"error": f"servings must be a whole number >= 1, got {servings!r}."}
+
+    with _get_conn() as conn:
+        recipe, error = _lookup_for_write("recipe", _SqlCatalog(conn).resolve_recipe(recipe_name), recipe_name)
+    if recipe is None:
+        return error
+
+    result = _write(lambda conn: writes.consume(conn, recipe["uid"], count))
+    if isinstance(result, dict):
+        return result
+    return {"recipe_name": recipe["name"], "servings_consumed": count, "ingredients": result}
+
+
+def restock(ingredient_name: str, quantity: int, expected_version: int | None = None) -> dict:
+    """
+    Add a delivery to the stock of one ingredient in the database.
+
+    Args:
+        ingredient_name:  Full or partial ingredient name (e.g. "eggs").
+        quantity:         Amount received, >= 1.
+        expected_version: Optional. The ingredient's "version" as last seen
+                          (every change increments it); the restock is only
+                          applied if nobody changed the ingredient since.
+                          Pass it when retrying, so a restock is never
+                          applied twice.
+
+    Returns:
+        {"name": "eggs", "added": 12, "supply": 22, "version": 4}
+        or {"error": "The stock changed since it was read; ...",
+            "conflicts": [{"name": "eggs", "expected_version": 3, "version": 4, "supply": 22}]}
+        or {"error": "...", "did_you_mean": [...]} if the name matches no single ingredient.
+    """
+    if not ALLOW_WRITES:
+        return dict(_READ_ONLY_ERROR)
+    amount = _as_int(quantity)
+    if amount is None or amount < 1:
+        return {"error": f"quantity must be a whole number >= 1, got {quantity!r}."}
+    if expected_version is not None and _as_int(expected_version) is None:
+        return {"error": f"expected_version must be a whole number, got {expected_version!r}."}
+
+    with _get_conn() as conn:
+        ingredient, error = _lookup_for_write(
+            "ingredient", _SqlCatalog(conn).resolve_ingredient(ingredient_name), ingredient_name
+        )
+    if ingredient is None:
+        return error
+
+    change = {
+        "uid": ingredient["uid"], "name": ingredient["name"], "delta": amount,
+        "expected_version": None if expected_version is None else _as_int(expected_version),
+    }
+    result = _write(lambda conn: writes.adjust(conn, [change]))
+    if isinstance(result, dict):
+        return result
+    return {"name": result[0]["name"], "added": amount, "supply": result[0]["supply"], "version": result[0]["version"]}
+
+
+def bulk_adjust_supply(adjustments: list[dict]) -> dict:
+    """
+    Apply several stock changes at once, all or nothing (e.g. a stock count
+    or a delivery note from a terminal).
+
+    Args:
+        adjustments: One entry per change, either relative or absolute:
+            [
+              {"ingredient_name": "eggs", "delta": 12},      # add 12
+              {"ingredient_name": "milk", "delta": -1},      # remove 1
+              {"ingredient_name": "flour", "supply": 500}    # counted: set to 500
             ]
-            feasible_recipes.append({
-                "recipe_name":         recipe["name"],
-                "can_make":            len(missing) == 0,
-                "max_servings":        min(
-                    (virtual_supply.get(r["name"], 0) // r["quantity"] if r["quantity"] > 0 else 0)
-                    for r in ing_rows
-                ) if ing_rows else 0,
-                "missing_ingredients": missing,
+            Each entry may carry "expected_version" (see restock).
+
+    Returns:
+        {
+          "applied": 3,
+          "ingredients": [
+            {"name": "eggs",  "supply": 22,  "version": 4},
+            {"name": "milk",  "supply": 1,   "version": 7},
+            {"name": "flour", "supply": 500, "version": 2}
+          ]
+        }
+        or {"error": "...", "shortages": [...], "conflicts": [...], "unknown": [...]}
+        with nothing changed when any entry cannot be applied.
+    """
+    if not ALLOW_WRITES:
+        return dict(_READ_ONLY_ERROR)
+    if not isinstance(adjustments, list) or not adjustments:
+        return {"error": "adjustments must be a non-empty list of {\"ingredient_name\", \"delta\" or \"supply\"}."}
+
+    changes, problems = [], []
+    with _get_conn() as conn:
+        catalog = _SqlCatalog(conn)
+        for i, item in enumerate(adjustments):
+            if not isinstance(item, dict) or not isinstance(item.get("ingredient_name"), str):
+                problems.append(f"entry {i}: needs an ingredient_name.")
+                continue
+            name = item["ingredient_name"]
+            if ("delta" in item) == ("supply" in item):
+                problems.append(f"entry {i} ({name}): give exactly one of delta or supply.")
+                continue
+            key = "delta" if "delta" in item else "supply"
+            value = _as_int(item[key])
+            if value is None or (key == "supply" and value < 0):
+                problems.append(f"entry {i} ({name}): {key} must be a whole number"
+                                f"{' >= 0' if key == 'supply' else ''}, got {item[key]!r}.")
+                continue
+            expected = item.get("expected_version")
+            if expected is not None and _as_int(expected) is None:
+                problems.append(f"entry {i} ({name}): expected_version must be a whole number.")
+                continue
+            ingredient, error = _lookup_for_write("ingredient", catalog.resolve_ingredient(name), name)
+            if ingredient is None:
+                problems.append(f"entry {i}: {error['error']}")
+                continue
+            changes.append({
+                "uid": ingredient["uid"], "name": ingredient["name"], key: value,
+                "expected_version": None if expected is None else _as_int(expected),
             })
+    if problems:
+        return {"error": "Some adjustments are invalid; nothing was changed.", "problems": problems}
 
-        return {
-            "consumed_recipe":   consumed["name"],
-            "servings_consumed": servings,
-            "remaining_supply":  remaining_supply,
-            "feasible_recipes":  feasible_recipes,
-        }
\ No newline at end of file
+    result = _write(lambda conn: writes.adjust(conn, changes))
+    if isinstance(result, dict):
+        return result
+    return {"applied": len(result), "ingredients": result}
@@ -0,0 +1,265 @@
+"""
+engine.py
+---------
+Vectorized feasibility engine over a recipe × ingredient requirement matrix.
+
+The requirements of every recipe are stored once in CSR form (``indptr``,
+``indices``, ``data``) against a dense supply vector. can_make, shortages,
+max_servings and the limiting ingredient of *every* recipe are then computed
+with a handful of numpy operations instead of one Python loop per ingredient.
+
+Row order follows the catalog's recipe order (by name) and, inside a row,
+entries follow ingredient name order, so ties for the limiting ingredient are
+broken exactly like the original ``min(breakdown, ...)`` did.
+
+Usage:
+    matrix = RequirementMatrix.from_recipes(catalog.iter_recipes())
+    result = matrix.evaluate()            # or matrix.evaluate(virtual_supply)
+    result.can_make[row], result.max_servings[row], result.limiting[row]
+"""
+
+import copy
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+
+class Evaluation(NamedTuple):
+    """
+    Per-recipe feasibility for one supply vector.
+
+    Attributes:
+        supply:       int64[n_ingredients] supply vector that was evaluated.
+        can_make:     bool[n_recipes]  — every requirement is covered.
+        max_servings: int64[n_recipes] — min over entries of supply // quantity
+                      (0 for recipes without ingredients).
+        limiting:     int64[n_recipes] — ingredient column of the first entry
+                      reaching max_servings, -1 for recipes without ingredients.
+        shortage:     int64[nnz] — quantity - supply per entry, 0 when covered.
+    """
+    supply: np.ndarray
+    can_make: np.ndarray
+    max_servings: np.ndarray
+    limiting: np.ndarray
+    shortage: np.ndarray
+
+
+class RequirementMatrix:
+    """
+    CSR requirement matrix plus the ingredient supply it was loaded with.
+
+    Attributes:
+        recipe_uids, recipe_names:         row labels.
+        ingredient_uids, ingredient_names: column labels.
+        supply:   int64[n_ingredients] current supply per column.
+        indptr:   int64[n_recipes + 1] row offsets into indices/data.
+        indices:  int64[nnz] ingredient column of each entry.
+        data:     int64[nnz] required quantity of each entry.
+        row_of:   recipe uid -> row.
+        column_of: ingredient uid -> column.
+    """
+
+    def __init__(
+        self,
+        recipe_uids: list[str],
+        recipe_names: list[str],
+        ingredient_uids: list[str],
+        ingredient_names: list[str],
+        supply: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+    ):
+        self.recipe_uids = recipe_uids
+        self.recipe_names = recipe_names
+        self.ingredient_uids = ingredient_uids
+        self.ingredient_names = ingredient_names
+        self.supply = np.asarray(supply, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.int64)
+
+        self.row_of = {uid: row for row, uid in enumerate(recipe_uids)}
+        self.column_of = {uid: col for col, uid in enumerate(ingredient_uids)}
+
+        counts = np.diff(self.indptr)
+        self._entry_row = np.repeat(np.arange(len(recipe_uids), dtype=np.int64), counts)
+        self._nonempty = counts > 0
+        self._row_starts = self.indptr[:-1][self._nonempty]
+
+    @classmethod
+    def from_recipes(cls, recipes: Iterable[tuple[dict, list[dict]]]) -> "RequirementMatrix":
+        """
+        Build the matrix from ``(recipe, ingredients)`` pairs as yielded by a
+        catalog's iter_recipes(); ingredient dicts need uid, name, quantity, supply.
+        """
+        recipe_uids, recipe_names = [], []
+        ingredient_uids, ingredient_names, supply = [], [], []
+        column_of: dict[str, int] = {}
+        indptr, indices, data = [0], [], []
+        for recipe, ingredients in recipes:
+            recipe_uids.append(recipe["uid"])
+            recipe_names.append(recipe["name"])
+            for r in ingredients:
+                col = column_of.get(r["uid"])
+                if col is None:
+                    col = column_of[r["uid"]] = len(ingredient_uids)
+                    ingredient_uids.append(r["uid"])
+                    ingredient_names.append(r["name"])
+                    supply.append(r["supply"])
+                indices.append(col)
+                data.append(r["quantity"])
+            indptr.append(len(indices))
+        return cls(
+            recipe_uids, recipe_names, ingredient_uids, ingredient_names,
+            np.array(supply, dtype=np.int64), np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int64), np.array(data, dtype=np.int64),
+        )
+
+    @property
+    def n_recipes(self) -> int:
+        return len(self.recipe_uids)
+
+    @property
+    def n_ingredients(self) -> int:
+        return len(self.ingredient_uids)
+
+    def with_supply(self, supply: np.ndarray) -> "RequirementMatrix":
+        """A matrix sharing this one's structure, with another supply vector."""
+        other = copy.copy(self)
+        other.supply = np.asarray(supply, dtype=np.int64)
+        return other
+
+    def recipes_using(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Inverted index (CSC form): the rows using column ``col`` are
+        ``rows[colptr[col]:colptr[col + 1]]``.
+        """
+        order = np.argsort(self.indices, kind="stable")
+        colptr = np.zeros(self.n_ingredients + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.n_ingredients), out=colptr[1:])
+        return colptr, self._entry_row[order]
+
+    def row_slice(self, row: int) -> slice:
+        return slice(int(self.indptr[row]), int(self.indptr[row + 1]))
+
+    def requirement_vector(self, row: int, servings: int = 1) -> np.ndarray:
+        """Dense int64[n_ingredients] amount consumed by ``servings`` of one recipe."""
+        used = np.zeros(self.n_ingredients, dtype=np.int64)
+        span = self.row_slice(row)
+        np.add.at(used, self.indices[span], self.data[span] * servings)
+        return used
+
+    def consumption(self, servings: np.ndarray) -> np.ndarray:
+        """Dense int64[n_ingredients] amount consumed by ``servings[row]`` of every recipe."""
+        servings = np.asarray(servings, dtype=np.int64)
+        return np.bincount(
+            self.indices, weights=self.data * servings[self._entry_row], minlength=self.n_ingredients
+        ).astype(np.int64)
+
+    # ── Evaluation ────────────────────────────────────────────────────────────
+
+    def breakdown(self, row: int, supply: np.ndarray | None = None) -> list[dict]:
+        """Per-ingredient servings of one recipe, in ingredient name order."""
+        supply = self.supply if supply is None else supply
+        span = self.row_slice(row)
+        cols, qty = self.indices[span], self.data[span]
+        stock = supply[cols]
+        servings = np.where(qty > 0, stock // np.maximum(qty, 1), 0)
+        return [
+            {
+                "name":         self.ingredient_names[col],
+                "required":     q,
+                "in_stock":     s,
+                "max_servings": m,
+            }
+            for col, q, s, m in zip(cols.tolist(), qty.tolist(), stock.tolist(), servings.tolist())
+        ]
+
+    def evaluate(self, supply: np.ndarray | None = None) -> Evaluation:
+        """Compute can_make, max_servings, limiting ingredient and shortages for all recipes."""
+        supply = self.supply if supply is None else np.asarray(supply, dtype=np.int64)
+        n = self.n_recipes
+        max_servings = np.zeros(n, dtype=np.int64)
+        limiting = np.full(n, -1, dtype=np.int64)
+        if not len(self.data):
+            return Evaluation(supply, np.ones(n, dtype=bool), max_servings, limiting,
+                              np.zeros(0, dtype=np.int64))
+
+        available = supply[self.indices]
+        short = available < self.data
+        shortage = np.where(short, self.data - available, 0)
+        can_make = np.bincount(self._entry_row[short], minlength=n) == 0
+
+        per_entry = np.where(self.data > 0, available // np.maximum(self.data, 1), 0)
+        max_servings[self._nonempty] = np.minimum.reduceat(per_entry, self._row_starts)
+
+        hits = np.flatnonzero(per_entry == max_servings[self._entry_row])
+        rows, first = np.unique(self._entry_row[hits], return_index=True)
+        limiting[rows] = self.indices[hits[first]]
+
+        return Evaluation(supply, can_make, max_servings, limiting, shortage)
+
+    def evaluate_rows(
+        self, rows: np.ndarray, supply: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        ``(can_make, max_servings, limiting)`` of the given rows only, as
+        evaluate() computes them, in O(entries of those rows).
+        """
+        supply = self.supply if supply is None else np.asarray(supply, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(rows)
+        max_servings = np.zeros(n, dtype=np.int64)
+        limiting = np.full(n, -1, dtype=np.int64)
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.ones(n, dtype=bool), max_servings, limiting
+
+        local_starts = np.cumsum(counts) - counts
+        local_row = np.repeat(np.arange(n, dtype=np.int64), counts)
+        entries = np.arange(total, dtype=np.int64) + np.repeat(starts - local_starts, counts)
+        qty = self.data[entries]
+        available = supply[self.indices[entries]]
+        can_make = np.bincount(local_row[available < qty], minlength=n) == 0
+
+        per_entry = np.where(qty > 0, available // np.maximum(qty, 1), 0)
+        nonempty = counts > 0
+        max_servings[nonempty] = np.minimum.reduceat(per_entry, local_starts[nonempty])
+
+        hits = np.flatnonzero(per_entry == max_servings[local_row])
+        hit_rows, first = np.unique(local_row[hits], return_index=True)
+        limiting[hit_rows] = self.indices[entries[hits[first]]]
+        return can_make, max_servings, limiting
+
+    def missing(self, row: int, supply: np.ndarray | None = None) -> list[dict]:
+        """Shortage rows of one recipe, in ingredient name order."""
+        supply = self.supply if supply is None else supply
+        span = self.row_slice(row)
+        cols, qty = self.indices[span], self.data[span]
+        stock = supply[cols]
+        short = np.flatnonzero(stock < qty)
+        names = self.ingredient_names
+        return [
+            {"name": names[col], "required": q, "in_stock": s, "shortage": q - s}
+            for col, q, s in zip(cols[short].tolist(), qty[short].tolist(), stock[short].tolist())
+        ]
+
+    def missing_by_row(self, result: Evaluation) -> dict[int, list[dict]]:
+        """Shortage rows of every infeasible recipe, keyed by row (O(shortages))."""
+        missing: dict[int, list[dict]] = {}
+        entries = np.flatnonzero(result.shortage > 0)
+        names = self.ingredient_names
+        for row, col, qty, stock, gap in zip(
+            self._entry_row[entries].tolist(),
+            self.indices[entries].tolist(),
+            self.data[entries].tolist(),
+            result.supply[self.indices[entries]].tolist(),
+            result.shortage[entries].tolist(),
+        ):
+            missing.setdefault(row, []).append(
+                {"name": names[col], "required": qty, "in_stock": stock, "shortage": gap}
+            )
+        return missing
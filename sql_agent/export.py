@@ -0,0 +1,139 @@
+"""
+export.py
+---------
+Catalog-wide exports as NDJSON or CSV, streamed from core.iter_recipes /
+core.iter_feasibility: rows are written as they are produced, so memory
+stays bounded by one recipe regardless of catalog size (the snapshot itself
+aside; use --read-through to stream straight from SQLite).
+
+Formats:
+
+    ndjson   one JSON object per line, as the generators yield them
+    csv      recipes:     recipe_uid, recipe_name, ingredient, quantity, supply
+                          (one line per recipe ingredient; a recipe without
+                          ingredients has one line with empty ingredient columns)
+             feasibility: recipe_uid, recipe_name, can_make, max_servings,
+                          missing_ingredients ("lemon:2;eggs:1", name:shortage)
+
+Usage:
+    python -m sql_agent.export recipes --format ndjson -o recipes.ndjson
+    python -m sql_agent.export feasibility --format csv --feasible-only --min-servings 2
+    python -m sql_agent.export feasibility --db path/to/recipes.db --read-through
+
+    export("feasibility", sys.stdout, "csv", feasible_only=True)
+"""
+
+import argparse
+import csv
+import json
+import sys
+from contextlib import closing
+from itertools import chain
+from typing import Iterator, TextIO
+
+from . import core
+
+KINDS = ("recipes", "feasibility")
+FORMATS = ("ndjson", "csv")
+
+CSV_COLUMNS = {
+    "recipes":     ["recipe_uid", "recipe_name", "ingredient", "quantity", "supply"],
+    "feasibility": ["recipe_uid", "recipe_name", "can_make", "max_servings", "missing_ingredients"],
+}
+
+
+def rows(kind: str, feasible_only: bool = False, min_servings: int = 0) -> Iterator[dict]:
+    """The generator behind an export of ``kind``."""
+    if kind == "recipes":
+        return core.iter_recipes(feasible_only, min_servings)
+    if kind == "feasibility":
+        return core.iter_feasibility(feasible_only, min_servings)
+    raise ValueError(f"unknown export {kind!r} (expected one of {', '.join(KINDS)})")
+
+
+def _csv_lines(kind: str, record: dict) -> list[list]:
+    """The CSV lines of one yielded row."""
+    if kind == "recipes":
+        if not record["ingredients"]:
+            return [[record["uid"], record["name"], "", "", ""]]
+        return [
+            [record["uid"], record["name"], r["name"], r["quantity"], r["supply"]]
+            for r in record["ingredients"]
+        ]
+    missing = ";".join(f"{m['name']}:{m['shortage']}" for m in record["missing_ingredients"])
+    return [[record["recipe_uid"], record["recipe_name"], int(record["can_make"]), record["max_servings"], missing]]
+
+
+def export(
+    kind: str,
+    out: TextIO,
+    format: str = "ndjson",
+    feasible_only: bool = False,
+    min_servings: int = 0,
+) -> dict:
+    """
+    Write every ``kind`` row ("recipes" or "feasibility") passing the filters
+    to ``out`` as ``format`` ("ndjson" or "csv").
+
+    Returns:
+        {"kind": "feasibility", "format": "csv", "rows": 1200}
+        or {"error": "..."} for a bad argument (nothing is written).
+    """
+    if format not in FORMATS:
+        return {"error": f"unknown format {format!r} (expected one of {', '.join(FORMATS)})"}
+    try:
+        records = rows(kind, feasible_only, min_servings)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    with closing(records):                      # hands a read-through connection back
+        first = next(records, None)
+        if first is not None and "error" in first:
+            return first
+        stream = records if first is None else chain((first,), records)
+        count = 0
+        if format == "ndjson":
+            for record in stream:
+                out.write(json.dumps(record, ensure_ascii=False))
+                out.write("\n")
+                count += 1
+        else:
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(CSV_COLUMNS[kind])
+            for record in stream:
+                writer.writerows(_csv_lines(kind, record))
+                count += 1
+    return {"kind": kind, "format": format, "rows": count}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export the recipe catalog as NDJSON or CSV.")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--feasible-only", action="store_true", help="only recipes that can be made now")
+    parser.add_argument("--min-servings", type=int, default=0, help="only recipes with max_servings >= N")
+    parser.add_argument("--db", help="database file (default: core.DB_PATH)")
+    parser.add_argument("--read-through", action="store_true",
+                        help="stream from SQLite instead of building the in-memory snapshot")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        core.DB_PATH = args.db
+    if args.read_through:
+        core.USE_SNAPSHOT = False
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        result = export(args.kind, out, args.format, args.feasible_only, args.min_servings)
+    finally:
+        if args.output:
+            out.close()
+        core.close_pools()
+    if "error" in result:
+        print(result["error"], file=sys.stderr)
+        return 2
+    print(f"{result['rows']} {args.kind} row(s) written", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
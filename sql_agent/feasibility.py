@@ -0,0 +1,184 @@
+"""
+feasibility.py
+--------------
+Maintained per-recipe feasibility, updated incrementally on supply changes.
+
+A FeasibilityView holds can_make, max_servings and the limiting ingredient
+of every recipe of a RequirementMatrix, plus an inverted index from
+ingredient to the recipes that use it. When the supply moves, apply()
+recomputes only the recipes that use a changed ingredient, so answering
+"what can I cook" after a stock update costs O(affected recipes) instead of
+a full evaluation of the catalog. The view is immutable: apply() returns a
+new view (sharing the index) and the change events, one per recipe whose
+feasibility, max_servings or limiting ingredient changed:
+
+    {"seq": 17, "type": "recipe", "recipe_uid": "...", "recipe_name": "lemon cake",
+     "can_make": False, "max_servings": 0, "limiting_ingredient": "lemon",
+     "before": {"can_make": True, "max_servings": 1, "limiting_ingredient": "lemon"}}
+
+A change to the catalog itself (recipes, quantities, names) is not
+incremental: the snapshot is reloaded and a single event says so:
+
+    {"seq": 18, "type": "reload", "recipes": 100000, "can_make": 4210}
+
+A ChangeFeed numbers the events, keeps the last HISTORY of them for polling
+(since(seq)) and pushes them to subscribers. snapshot.SnapshotCache owns one
+feed per database and publishes to it whenever it brings its snapshot up to
+date, whether the change came from this process or another one.
+
+Usage:
+    view = FeasibilityView(matrix)
+    view, events = view.apply(matrix.with_supply(new_supply))
+    unsubscribe = feed.subscribe(lambda events: print(events))
+"""
+
+import threading
+from collections import deque
+from typing import Callable
+
+import numpy as np
+
+from .engine import RequirementMatrix
+
+HISTORY = 10_000        # events kept for since()
+
+
+class FeasibilityView:
+    """
+    Feasibility of every recipe for the supply of ``matrix``.
+
+    Attributes:
+        matrix:        the RequirementMatrix (rows, columns, supply) it describes.
+        can_make:      bool[n_recipes].
+        max_servings:  int64[n_recipes].
+        limiting:      int64[n_recipes] ingredient column, -1 without ingredients.
+        feasible:      number of recipes that can be made.
+        colptr, rows:  inverted index, see RequirementMatrix.recipes_using().
+    """
+
+    def __init__(self, matrix: RequirementMatrix, _state: tuple | None = None):
+        self.matrix = matrix
+        if _state is None:
+            result = matrix.evaluate()
+            self.can_make, self.max_servings, self.limiting = result.can_make, result.max_servings, result.limiting
+            self.colptr, self.rows = matrix.recipes_using()
+        else:
+            self.can_make, self.max_servings, self.limiting, self.colptr, self.rows = _state
+        self.feasible = int(self.can_make.sum())
+
+    def affected(self, columns: np.ndarray) -> np.ndarray:
+        """Sorted rows of the recipes that use any of ``columns``."""
+        if not len(columns):
+            return np.zeros(0, dtype=np.int64)
+        parts = [self.rows[self.colptr[col]:self.colptr[col + 1]] for col in columns.tolist()]
+        return np.unique(np.concatenate(parts))
+
+    def apply(self, matrix: RequirementMatrix) -> tuple["FeasibilityView", list[dict]]:
+        """
+        The view for ``matrix`` (same structure, new supply), recomputing only
+        the recipes that use an ingredient whose supply changed.
+
+        Returns:
+            (view, events) with events in row (recipe name) order, without "seq".
+        """
+        changed = np.flatnonzero(matrix.supply != self.matrix.supply)
+        rows = self.affected(changed)
+        can_make, max_servings, limiting = matrix.evaluate_rows(rows, matrix.supply)
+
+        moved = np.flatnonzero(
+            (can_make != self.can_make[rows])
+            | (max_servings != self.max_servings[rows])
+            | (limiting != self.limiting[rows])
+        )
+        names = matrix.ingredient_names
+        events = [
+            {
+                "type":                "recipe",
+                "recipe_uid":          matrix.recipe_uids[row],
+                "recipe_name":         matrix.recipe_names[row],
+                "can_make":            bool(can_make[i]),
+                "max_servings":        int(max_servings[i]),
+                "limiting_ingredient": names[limiting[i]] if limiting[i] >= 0 else None,
+                "before": {
+                    "can_make":            bool(self.can_make[row]),
+                    "max_servings":        int(self.max_servings[row]),
+                    "limiting_ingredient": names[self.limiting[row]] if self.limiting[row] >= 0 else None,
+                },
+            }
+            for i, row in zip(moved.tolist(), rows[moved].tolist())
+        ]
+
+        state = [self.can_make, self.max_servings, self.limiting]
+        if len(moved):
+            state = [a.copy() for a in state]
+            for array, values in zip(state, (can_make, max_servings, limiting)):
+                array[rows] = values
+        return FeasibilityView(matrix, (*state, self.colptr, self.rows)), events
+
+
+class ChangeFeed:
+    """
+    Sequence-numbered change events: a bounded history to poll and push
+    subscribers.
+
+    Subscribers are called with each published list of events on the thread
+    that noticed the change, and should return quickly. An exception in a
+    subscriber is counted in ``subscriber_errors`` and does not stop the others.
+    """
+
+    def __init__(self, history: int = HISTORY):
+        self._lock = threading.Lock()
+        self._events: deque[dict] = deque(maxlen=history)
+        self._subscribers: list[Callable[[list[dict]], None]] = []
+        self.seq = 0
+        self.subscriber_errors = 0
+
+    def publish(self, events: list[dict]) -> None:
+        self.append(events)
+        self.notify(events)
+
+    def append(self, events: list[dict]) -> None:
+        """Number ``events`` and add them to the history (without notifying)."""
+        with self._lock:
+            for event in events:
+                self.seq += 1
+                event["seq"] = self.seq
+                self._events.append(event)
+
+    def notify(self, events: list[dict]) -> None:
+        """Push ``events`` to the subscribers."""
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception:
+                self.subscriber_errors += 1
+
+    def subscribe(self, callback: Callable[[list[dict]], None]) -> Callable[[], None]:
+        """Call ``callback(events)`` on every publish; returns the function that unsubscribes."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def since(self, seq: int = 0) -> dict:
+        """
+        Events after ``seq``.
+
+        Returns:
+            {"seq": 42, "events": [...], "truncated": False}
+            "truncated" is True when events after ``seq`` were already dropped
+            from the history; re-read the full state then.
+        """
+        with self._lock:
+            events = [e for e in self._events if e["seq"] > seq]
+            oldest = self._events[0]["seq"] if self._events else self.seq + 1
+            return {"seq": self.seq, "events": events, "truncated": seq + 1 < oldest}
@@ -0,0 +1,249 @@
+"""
+fts.py
+------
+Optional SQLite FTS5 index over recipe and ingredient names.
+
+``recipe_search`` holds one document per recipe: the recipe name and the names
+of all its ingredients. Triggers on recipes, ingredients and recipe_ingredient
+keep it in sync, so once installed it never has to be refreshed by hand.
+Document rowids are ``recipes.id`` (schema version 2+, see migrations.py).
+
+Queries accept plain terms combined with AND / OR / NOT, e.g. "eggs AND milk",
+"lemon OR apple", "eggs NOT milk". AND binds tighter than OR. The table uses
+the trigram tokenizer, so a term matches anywhere inside an ingredient name,
+exactly like the partial matching of the LIKE-based search ("ilk" finds
+"milk"). A trigram index cannot serve terms shorter than MIN_TERM_LENGTH
+characters; search_recipe_uids() returns None for those and the caller falls
+back to the catalog search.
+
+Tables created by older versions (unicode61 tokenizer, which matches whole
+words only) are not used for searching; ``install`` replaces them.
+
+Usage:
+    python -m sql_agent.fts install  path/to/recipes.db
+    python -m sql_agent.fts rebuild  path/to/recipes.db
+    python -m sql_agent.fts uninstall path/to/recipes.db
+"""
+
+import argparse
+import re
+import sqlite3
+
+TABLE = "recipe_search"
+TOKENIZER = "trigram"
+MIN_TERM_LENGTH = 3
+_SEPARATOR = " | "              # between the ingredient names of a document
+
+# Indexes the document of every recipe selected by {where}.
+_INDEX = f"""
+    INSERT INTO {TABLE} (rowid, recipe_uid, recipe_name, ingredient_names)
+    SELECT r.id, r.uid, r.name,
+           (SELECT group_concat(i.name, '{_SEPARATOR}')
+            FROM recipe_ingredient ri JOIN ingredients i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = r.id)
+    FROM recipes r WHERE {{where}}
+"""
+
+# Re-indexes the document of every recipe selected by {where} (trigger bodies).
+_REINDEX = f"""
+    DELETE FROM {TABLE} WHERE rowid IN (SELECT id FROM recipes r WHERE {{where}});
+    {_INDEX};
+"""
+
+_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+    recipe_name, ingredient_names, recipe_uid UNINDEXED, tokenize = '{TOKENIZER}'
+);
+
+CREATE TRIGGER IF NOT EXISTS {TABLE}_recipe_ai AFTER INSERT ON recipes BEGIN
+    {_REINDEX.format(where="r.id = NEW.id")}
+END;
+CREATE TRIGGER IF NOT EXISTS {TABLE}_recipe_au AFTER UPDATE OF id, uid, name ON recipes BEGIN
+    DELETE FROM {TABLE} WHERE rowid = OLD.id;
+    {_REINDEX.format(where="r.id = NEW.id")}
+END;
+CREATE TRIGGER IF NOT EXISTS {TABLE}_recipe_ad AFTER DELETE ON recipes BEGIN
+    DELETE FROM {TABLE} WHERE rowid = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS {TABLE}_link_ai AFTER INSERT ON recipe_ingredient BEGIN
+    {_REINDEX.format(where="r.id = NEW.recipe_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS {TABLE}_link_au AFTER UPDATE OF recipe_id, ingredient_id ON recipe_ingredient BEGIN
+    {_REINDEX.format(where="r.id IN (OLD.recipe_id, NEW.recipe_id)")}
+END;
+CREATE TRIGGER IF NOT EXISTS {TABLE}_link_ad AFTER DELETE ON recipe_ingredient BEGIN
+    {_REINDEX.format(where="r.id = OLD.recipe_id")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS {TABLE}_ingredient_au AFTER UPDATE OF name ON ingredients BEGIN
+    {_REINDEX.format(where="r.id IN (SELECT recipe_id FROM recipe_ingredient WHERE ingredient_id = NEW.id)")}
+END;
+"""
+
+_TRIGGERS = (
+    "recipe_ai", "recipe_au", "recipe_ad", "link_ai", "link_au", "link_ad", "ingredient_au",
+)
+
+
+# ── Installation ──────────────────────────────────────────────────────────────
+
+def _table_sql(conn: sqlite3.Connection) -> str | None:
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE,)
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def is_installed(conn: sqlite3.Connection) -> bool:
+    """Whether a recipe_search table exists (of any version)."""
+    return _table_sql(conn) is not None
+
+
+def is_current(conn: sqlite3.Connection) -> bool:
+    """Whether the installed recipe_search table can serve searches (trigram tokenizer)."""
+    sql = _table_sql(conn)
+    return sql is not None and f"'{TOKENIZER}'" in sql
+
+
+def install(conn: sqlite3.Connection) -> None:
+    """Create the FTS table and its triggers (replacing an outdated one), then index every recipe."""
+    if is_installed(conn) and not is_current(conn):
+        uninstall(conn)
+    with conn:
+        conn.executescript(_SCHEMA)
+    rebuild(conn)
+
+
+def rebuild(conn: sqlite3.Connection) -> None:
+    """
+    Re-index every recipe from scratch, in one transaction (the caller's, if
+    one is open): searches never see a partly rebuilt table.
+    """
+    in_transaction = conn.in_transaction
+    if not in_transaction:
+        conn.execute("BEGIN")
+    try:
+        conn.execute(f"DELETE FROM {TABLE}")
+        conn.execute(_INDEX.format(where="1"))
+    except BaseException:
+        if not in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    if not in_transaction:
+        conn.execute("COMMIT")
+
+
+def uninstall(conn: sqlite3.Connection) -> None:
+    with conn:
+        for name in _TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {TABLE}_{name}")
+        conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+# ── Query language ────────────────────────────────────────────────────────────
+
+_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def parse_query(text: str) -> list[list[tuple[str, bool]]]:
+    """
+    Parse "a AND b OR c NOT d" into OR-ed clauses of AND-ed ``(term, negated)``.
+
+    Adjacent terms without an operator are AND-ed; quoted phrases stay whole.
+
+    >>> parse_query("eggs AND milk OR lemon NOT sugar")
+    [[('eggs', False), ('milk', False)], [('lemon', False), ('sugar', True)]]
+    """
+    clauses: list[list[tuple[str, bool]]] = [[]]
+    negate = False
+    for quoted, word in _TOKEN.findall(text):
+        if word in ("AND", "&&"):
+            continue
+        if word in ("OR", "||"):
+            if clauses[-1]:
+                clauses.append([])
+            continue
+        if word == "NOT":
+            negate = True
+            continue
+        term = (quoted if quoted else word).strip().lower()
+        if term:
+            clauses[-1].append((term, negate))
+        negate = False
+    return [clause for clause in clauses if any(not neg for _, neg in clause)]
+
+
+def to_match_expression(clauses: list[list[tuple[str, bool]]], column: str) -> str:
+    """Render parsed clauses as an FTS5 MATCH expression restricted to ``column``."""
+
+    def phrase(term: str) -> str:
+        return '"' + term.replace('"', '""') + '"'
+
+    rendered = []
+    for clause in clauses:
+        expression = " AND ".join(phrase(t) for t, neg in clause if not neg)
+        for term, neg in clause:
+            if neg:
+                expression = f"({expression}) NOT {phrase(term)}"
+        rendered.append(f"({expression})")
+    return f"{column} : ({' OR '.join(rendered)})"
+
+
+def positive_terms(clauses: list[list[tuple[str, bool]]]) -> list[str]:
+    return [term for clause in clauses for term, neg in clause if not neg]
+
+
+# ── Search ────────────────────────────────────────────────────────────────────
+
+def can_serve(clauses: list[list[tuple[str, bool]]]) -> bool:
+    """
+    Whether the index answers ``clauses`` exactly: every term is long enough
+    for a trigram lookup and cannot span two ingredient names of a document.
+    """
+    return all(
+        len(term) >= MIN_TERM_LENGTH and _SEPARATOR.strip() not in term
+        for clause in clauses for term, _ in clause
+    )
+
+
+def search_recipe_uids(conn: sqlite3.Connection, query: str, offset: int, limit: int) -> list[str] | None:
+    """
+    UIDs of the recipes whose ingredients match ``query``, ordered by recipe
+    name, for one page (``limit + 1`` rows are read to detect a next page).
+    None when the index cannot serve the query (see can_serve()).
+    """
+    clauses = parse_query(query)
+    if not clauses:
+        return []
+    if not can_serve(clauses):
+        return None
+    return [
+        row[0]
+        for row in conn.execute(
+            f"""
+            SELECT recipe_uid FROM {TABLE}
+            WHERE {TABLE} MATCH ?
+            ORDER BY recipe_name, recipe_uid
+            LIMIT ? OFFSET ?
+            """,
+            (to_match_expression(clauses, "ingredient_names"), limit + 1, offset),
+        )
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the recipe_search FTS5 index.")
+    parser.add_argument("action", choices=("install", "rebuild", "uninstall"))
+    parser.add_argument("db_path")
+    args = parser.parse_args(argv)
+    conn = sqlite3.connect(args.db_path)
+    try:
+        {"install": install, "rebuild": rebuild, "uninstall": uninstall}[args.action](conn)
+    finally:
+        conn.close()
+    print(f"{args.action}: {TABLE} on {args.db_path} done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,403 @@
+"""
+init_db.py
+----------
+Create and fill recipes.db: the small demo catalog, seeded synthetic catalogs
+of any size, or catalogs loaded from JSONL / CSV files.
+
+Every source is a stream of catalog records:
+
+    {"type": "ingredient", "uid": "...", "name": "eggs", "supply": 10}
+    {"type": "recipe", "uid": "...", "name": "lemon cake",
+     "ingredients": [{"name": "eggs", "quantity": 3}, {"uid": "...", "quantity": 1}]}
+
+``uid`` is optional (a UUID is generated). Recipe ingredients refer to an
+ingredient by ``uid`` or, failing that, by ``name``, and must come after it.
+
+bulk_load() writes the records with executemany() in one transaction, with
+``synchronous = OFF`` and an in-memory journal while it runs and with the
+secondary indexes (and the FTS index, if installed) built after the data;
+the structure_version triggers are off during the load too and bump the
+version once at the end.
+A crash or power loss during a load can therefore corrupt the file: load
+into a fresh database, or keep a copy.
+
+Usage (from the repository root):
+    python -m sql_agent.init_db                                  # demo catalog
+    python -m sql_agent.init_db synth --recipes 100000 --ingredients 2000 \\
+        --per-recipe 1-12 --distribution poisson --popularity zipf --seed 7
+    python -m sql_agent.init_db synth --recipes 100000 --jsonl catalog.jsonl
+    python -m sql_agent.init_db load catalog.jsonl
+    python -m sql_agent.init_db load --ingredients-csv ingredients.csv --recipes-csv recipes.csv
+
+Every command takes ``--db PATH`` (default: recipes.db in the working directory).
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
 import sqlite3
+import time
 import uuid
+from itertools import groupby
+from typing import Iterable, Iterator
 
-# Connect to SQLite database (creates file if it doesn't exist)
-conn = sqlite3.connect('recipes.db')
-cursor = conn.cursor()
-
-# Create tables
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS recipes (
-    uid TEXT PRIMARY KEY,
-    name TEXT NOT NULL
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS ingredients (
-    uid TEXT PRIMARY KEY,
-    name TEXT NOT NULL,
-    supply INTEGER NOT NULL
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS recipe_ingredient (
-    recipe_uid TEXT,
-    ingredient_uid TEXT,
-    quantity INTEGER NOT NULL,
-    FOREIGN KEY (recipe_uid) REFERENCES recipes(uid),
-    FOREIGN KEY (ingredient_uid) REFERENCES ingredients(uid),
-    PRIMARY KEY (recipe_uid, ingredient_uid)
-)
-''')
-
-# Add ingredients
-ingredients_data = [
-    ('eggs', 10),
-    ('milk', 2),
-    ('tomato', 1),
-    ('apple', 2),
-    ('lemon', 3)
+import numpy as np
+
+from . import fts
+from .compiled import compiled_path
+from .migrations import create_indexes, create_triggers, drop_indexes, drop_triggers, upgrade
+
+BATCH_SIZE = 50_000     # rows per executemany() call
+
+DEMO_CATALOG = [
+    {"type": "ingredient", "name": "eggs", "supply": 10},
+    {"type": "ingredient", "name": "milk", "supply": 2},
+    {"type": "ingredient", "name": "tomato", "supply": 1},
+    {"type": "ingredient", "name": "apple", "supply": 2},
+    {"type": "ingredient", "name": "lemon", "supply": 3},
+    {"type": "recipe", "name": "lemon cake", "ingredients": [
+        {"name": "eggs", "quantity": 3}, {"name": "milk", "quantity": 1}, {"name": "lemon", "quantity": 3},
+    ]},
+    {"type": "recipe", "name": "apple cake", "ingredients": [
+        {"name": "eggs", "quantity": 3}, {"name": "milk", "quantity": 1}, {"name": "apple", "quantity": 2},
+    ]},
+    {"type": "recipe", "name": "scramble eggs", "ingredients": [
+        {"name": "eggs", "quantity": 5},
+    ]},
 ]
 
-ingredient_uids = {}
-for name, supply in ingredients_data:
-    uid = str(uuid.uuid4())
-    ingredient_uids[name] = uid
-    cursor.execute('INSERT INTO ingredients (uid, name, supply) VALUES (?, ?, ?)',
-                   (uid, name, supply))
-
-# Add recipes
-recipes_data = [
-    ('lemon cake', [('eggs', 3), ('milk', 1), ('lemon', 3)]),
-    ('apple cake', [('eggs', 3), ('milk', 1), ('apple', 2)]),
-    ('scramble eggs', [('eggs', 5)])
+
+# ── Synthetic catalogs ────────────────────────────────────────────────────────
+
+_INGREDIENT_WORDS = [
+    "eggs", "milk", "flour", "sugar", "butter", "salt", "lemon", "apple", "tomato", "onion",
+    "garlic", "rice", "pasta", "chicken", "beef", "carrot", "potato", "cream", "cheese", "yeast",
+    "honey", "basil", "pepper", "olive oil", "spinach", "mushroom", "ginger", "vanilla", "cocoa", "almond",
 ]
+_STYLES = ["classic", "spicy", "grandma's", "quick", "roasted", "creamy", "rustic", "summer", "baked", "smoky"]
+_DISHES = ["cake", "soup", "stew", "salad", "pie", "tart", "risotto", "curry", "bread", "gratin"]
+
+DISTRIBUTIONS = ("uniform", "poisson", "geometric")
+POPULARITIES = ("uniform", "zipf")
+
+
+def _seeded_uid(rnd: random.Random) -> str:
+    return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+
+def _ingredient_counts(rng: np.random.Generator, n: int, low: int, high: int, distribution: str) -> list[int]:
+    """Ingredients per recipe, clipped to [low, high]."""
+    if distribution == "uniform":
+        counts = rng.integers(low, high + 1, n)
+    elif distribution == "poisson":           # bell-shaped around the middle of the range
+        counts = rng.poisson((low + high) / 2, n)
+    elif distribution == "geometric":         # most recipes short, a long tail of big ones
+        counts = low - 1 + rng.geometric(1 / max((high - low) / 3 + 1, 1), n)
+    else:
+        raise ValueError(f"Unknown distribution '{distribution}', expected one of {DISTRIBUTIONS}.")
+    return np.clip(counts, low, high).tolist()
+
+
+def synthetic_catalog(
+    n_recipes: int,
+    n_ingredients: int = 500,
+    per_recipe: tuple[int, int] = (1, 12),
+    distribution: str = "uniform",
+    popularity: str = "uniform",
+    zipf_exponent: float = 1.1,
+    max_supply: int = 50,
+    max_quantity: int = 10,
+    seed: int = 0,
+) -> Iterator[dict]:
+    """
+    Yield the records of a reproducible synthetic catalog.
+
+    Args:
+        n_recipes:     Number of recipes.
+        n_ingredients: Number of distinct ingredients.
+        per_recipe:    (min, max) ingredients per recipe.
+        distribution:  Shape of the ingredients-per-recipe count: "uniform",
+                       "poisson" (centred on the middle of per_recipe) or
+                       "geometric" (long tail).
+        popularity:    How ingredients are picked: "uniform", or "zipf" where
+                       ingredient k is used in proportion to 1 / k**zipf_exponent
+                       (a few staples appear in most recipes).
+        max_supply:    Supplies are drawn from 0..max_supply.
+        max_quantity:  Quantities are drawn from 1..max_quantity.
+        seed:          Same seed and arguments, same catalog (uids included).
+    """
+    if popularity not in POPULARITIES:
+        raise ValueError(f"Unknown popularity '{popularity}', expected one of {POPULARITIES}.")
+    low, high = per_recipe
+    if not 1 <= low <= high <= n_ingredients:
+        raise ValueError(f"per_recipe must satisfy 1 <= min <= max <= n_ingredients, got {per_recipe}.")
+    rnd = random.Random(seed)
+    rng = np.random.default_rng(seed)
+
+    ingredients = []
+    for k in range(n_ingredients):
+        word = _INGREDIENT_WORDS[k % len(_INGREDIENT_WORDS)]
+        name = word if k < len(_INGREDIENT_WORDS) else f"{word} {k // len(_INGREDIENT_WORDS) + 1}"
+        record = {"type": "ingredient", "uid": _seeded_uid(rnd), "name": name,
+                  "supply": rnd.randint(0, max_supply)}
+        ingredients.append(record)
+        yield record
+
+    cum_weights = np.cumsum(1.0 / np.arange(1, n_ingredients + 1) ** zipf_exponent).tolist()
+    counts = _ingredient_counts(rng, n_recipes, low, high, distribution)
+    for r, count in enumerate(counts):
+        if popularity == "uniform":
+            picked = rnd.sample(range(n_ingredients), count)
+        else:
+            chosen: dict[int, None] = {}
+            while len(chosen) < count:
+                chosen.update(dict.fromkeys(rnd.choices(range(n_ingredients), cum_weights=cum_weights, k=count)))
+            picked = list(chosen)[:count]
+        main = ingredients[picked[0]]["name"]
+        yield {
+            "type": "recipe",
+            "uid": _seeded_uid(rnd),
+            "name": f"{rnd.choice(_STYLES)} {main} {rnd.choice(_DISHES)} {r}",
+            "ingredients": [
+                {"uid": ingredients[k]["uid"], "quantity": rnd.randint(1, max_quantity)} for k in picked
+            ],
+        }
+
+
+# ── File formats ──────────────────────────────────────────────────────────────
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    """Stream records from a JSON-lines file (blank lines are skipped)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_jsonl(path: str, records: Iterable[dict]) -> int:
+    """Write records as JSON lines. Returns the number of records written."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            n += 1
+    return n
+
+
+def read_csv(ingredients_path: str, recipes_path: str) -> Iterator[dict]:
+    """
+    Stream records from two CSV files with header rows:
+
+        ingredients.csv   name, supply [, uid]
+        recipes.csv       recipe, ingredient, quantity [, recipe_uid] [, ingredient_uid]
+
+    recipes.csv has one row per (recipe, ingredient); the rows of a recipe
+    must be consecutive.
+    """
+    with open(ingredients_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {"type": "ingredient", "uid": row.get("uid") or None,
+                   "name": row["name"], "supply": int(row["supply"])}
+    with open(recipes_path, newline="", encoding="utf-8") as f:
+        rows = csv.DictReader(f)
+        for (recipe_uid, name), group in groupby(rows, key=lambda r: (r.get("recipe_uid") or None, r["recipe"])):
+            yield {
+                "type": "recipe",
+                "uid": recipe_uid,
+                "name": name,
+                "ingredients": [
+                    {"uid": r.get("ingredient_uid") or None, "name": r["ingredient"], "quantity": int(r["quantity"])}
+                    for r in group
+                ],
+            }
+
+
+# ── Bulk loader ───────────────────────────────────────────────────────────────
+
+def _next_id(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def _insert(conn: sqlite3.Connection, records: Iterable[dict], batch_size: int) -> dict:
+    """Insert ``records`` inside the caller's transaction, batching executemany() calls."""
+    by_uid: dict[str, int] = {}
+    by_name: dict[str, int] = {}
+    for id_, uid, name in conn.execute("SELECT id, uid, name FROM ingredients ORDER BY id"):
+        by_uid[uid] = id_
+        by_name.setdefault(name, id_)
+    next_ingredient = _next_id(conn, "ingredients")
+    next_recipe = _next_id(conn, "recipes")
+
+    ingredient_rows, recipe_rows, link_rows = [], [], []
+    counts = {"ingredients": 0, "recipes": 0, "links": 0}
+
+    def flush() -> None:
+        # Parents before children, so the foreign keys always resolve.
+        for table, columns, rows in (
+            ("ingredients", "id, uid, name, supply", ingredient_rows),
+            ("recipes", "id, uid, name", recipe_rows),
+            ("recipe_ingredient", "recipe_id, ingredient_id, quantity", link_rows),
+        ):
+            if rows:
+                marks = ", ".join("?" * len(rows[0]))
+                conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({marks})", rows)
+                rows.clear()
+
+    for record in records:
+        kind = record.get("type")
+        if kind == "ingredient":
+            uid = record.get("uid") or str(uuid.uuid4())
+            ingredient_rows.append((next_ingredient, uid, record["name"], int(record["supply"])))
+            by_uid[uid] = next_ingredient
+            by_name.setdefault(record["name"], next_ingredient)
+            next_ingredient += 1
+            counts["ingredients"] += 1
+        elif kind == "recipe":
+            recipe_rows.append((next_recipe, record.get("uid") or str(uuid.uuid4()), record["name"]))
+            for item in record.get("ingredients", ()):
+                ingredient_id = by_uid.get(item.get("uid")) or by_name.get(item.get("name"))
+                if ingredient_id is None:
+                    ref = item.get("uid") or item.get("name")
+                    raise ValueError(f"Recipe '{record['name']}' uses unknown ingredient '{ref}'.")
+                link_rows.append((next_recipe, ingredient_id, int(item["quantity"])))
+                counts["links"] += 1
+            next_recipe += 1
+            counts["recipes"] += 1
+        else:
+            raise ValueError(f"Unknown record type {kind!r}, expected 'ingredient' or 'recipe'.")
+        if len(link_rows) >= batch_size or len(ingredient_rows) >= batch_size:
+            flush()
+    flush()
+    return counts
+
+
+def bulk_load(db_path: str, records: Iterable[dict], batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Append catalog records to ``db_path`` (created and migrated to the latest
+    schema as needed) in a single transaction, and delete its compiled
+    catalog (compiled.py), which no longer matches.
+
+    Returns:
+        {"ingredients": 2000, "recipes": 100000, "links": 650000, "seconds": 3.2}
+
+    Raises:
+        ValueError:     a record is malformed or refers to an unknown ingredient.
+        IntegrityError: a uid already exists or a value breaks a CHECK constraint.
+        Nothing is written when the load fails.
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        upgrade(conn)
+        had_fts = fts.is_installed(conn)
+        if had_fts:
+            fts.uninstall(conn)    # its triggers would re-index on every inserted row
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        try:
+            conn.execute("BEGIN")
+            try:
+                drop_indexes(conn)
+                drop_triggers(conn)
+                counts = _insert(conn, records, batch_size)
+                create_indexes(conn)
+                create_triggers(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+            if had_fts:
+                fts.install(conn)
+    finally:
+        conn.close()
+    try:
+        os.remove(compiled_path(db_path))    # built from the catalog before this load
+    except FileNotFoundError:
+        pass
+    counts["seconds"] = round(time.perf_counter() - start, 3)
+    return counts
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def _print_catalog(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    print("=== INGREDIENTS ===")
+    for name, supply in conn.execute("SELECT name, supply FROM ingredients ORDER BY id"):
+        print(f"{name}: {supply}")
+    print("\n=== RECIPES ===")
+    for (name,) in conn.execute("SELECT name FROM recipes ORDER BY id"):
+        print(name)
+    print("\n=== RECIPE DETAILS ===")
+    for recipe, ingredient, quantity in conn.execute("""
+        SELECT r.name, i.name, ri.quantity
+        FROM recipes r
+        JOIN recipe_ingredient ri ON r.id = ri.recipe_id
+        JOIN ingredients i ON ri.ingredient_id = i.id
+        ORDER BY r.name, i.name
+    """):
+        print(f"{recipe} -> {quantity} {ingredient}")
+    conn.close()
+
+
+def _range(text: str) -> tuple[int, int]:
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Create and fill a recipes database.")
+    parser.add_argument("--db", default="recipes.db", help="database file (default: ./recipes.db)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("demo", help="the 5-ingredient, 3-recipe demo catalog (default)")
+
+    synth = commands.add_parser("synth", help="a seeded synthetic catalog")
+    synth.add_argument("--recipes", type=int, default=100_000)
+    synth.add_argument("--ingredients", type=int, default=500)
+    synth.add_argument("--per-recipe", type=_range, default=(1, 12), metavar="MIN-MAX")
+    synth.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+    synth.add_argument("--popularity", choices=POPULARITIES, default="uniform")
+    synth.add_argument("--zipf-exponent", type=float, default=1.1)
+    synth.add_argument("--seed", type=int, default=0)
+    synth.add_argument("--jsonl", metavar="PATH", help="write the catalog to PATH instead of the database")
+
+    load = commands.add_parser("load", help="load a JSONL file or a pair of CSV files")
+    load.add_argument("jsonl", nargs="?")
+    load.add_argument("--ingredients-csv")
+    load.add_argument("--recipes-csv")
+
+    args = parser.parse_args(argv)
+    if args.command == "synth":
+        records = synthetic_catalog(
+            args.recipes, args.ingredients, args.per_recipe, args.distribution,
+            args.popularity, args.zipf_exponent, seed=args.seed,
+        )
+        if args.jsonl:
+            print(f"wrote {write_jsonl(args.jsonl, records)} records to {args.jsonl}")
+            return
+    elif args.command == "load":
+        if args.jsonl:
+            records = read_jsonl(args.jsonl)
+        elif args.ingredients_csv and args.recipes_csv:
+            records = read_csv(args.ingredients_csv, args.recipes_csv)
+        else:
+            parser.error("load needs a JSONL file or both --ingredients-csv and --recipes-csv")
+    else:
+        records = DEMO_CATALOG
+
+    counts = bulk_load(args.db, records, args.batch_size)
+    if args.command in (None, "demo"):
+        _print_catalog(args.db)
+    print(f"\nLoaded {counts['ingredients']} ingredients, {counts['recipes']} recipes and "
+          f"{counts['links']} recipe ingredients into '{args.db}' in {counts['seconds']}s.")
+
 
-for recipe_name, ingredients in recipes_data:
-    recipe_uid = str(uuid.uuid4())
-    cursor.execute('INSERT INTO recipes (uid, name) VALUES (?, ?)',
-                   (recipe_uid, recipe_name))
-
-    for ingredient_name, quantity in ingredients:
-        cursor.execute('INSERT INTO recipe_ingredient (recipe_uid, ingredient_uid, quantity) VALUES (?, ?, ?)',
-                       (recipe_uid, ingredient_uids[ingredient_name], quantity))
-
-# Commit changes
-conn.commit()
-
-# Display the data to verify
-print("=== INGREDIENTS ===")
-cursor.execute('SELECT name, supply FROM ingredients')
-for row in cursor.fetchall():
-    print(f"{row[0]}: {row[1]}")
-
-print("\n=== RECIPES ===")
-cursor.execute('SELECT name FROM recipes')
-for row in cursor.fetchall():
-    print(row[0])
-
-print("\n=== RECIPE DETAILS ===")
-cursor.execute('''
-SELECT r.name, i.name, ri.quantity
-FROM recipes r
-JOIN recipe_ingredient ri ON r.uid = ri.recipe_uid
-JOIN ingredients i ON ri.ingredient_uid = i.uid
-ORDER BY r.name, i.name
-''')
-for row in cursor.fetchall():
-    print(f"{row[0]} -> {row[2]} {row[1]}")
-
-# Close connection
-conn.close()
-
-print("\nDatabase 'recipes.db' created successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+migrations.py
+-------------
+Versioned schema migrations for recipes.db.
+
+The current version is stored in a one-row ``schema_version`` table. upgrade()
+applies every missing step in order, each one in its own transaction, so a
+failed step leaves the database at the previous version. The version is read
+again once the write lock is held, so processes upgrading the same database
+at the same time apply each step once.
+
+    1  baseline            the original recipes / ingredients / recipe_ingredient tables
+    2  integer keys        INTEGER PRIMARY KEY ``id`` on recipes and ingredients;
+                           recipe_ingredient links by integer id (WITHOUT ROWID)
+    3  covering index      recipe_ingredient (ingredient_id, recipe_id, quantity)
+    4  constraints         NOT NULL / CHECK constraints on every column
+    5  row versions        ingredients.version, bumped by every stock change
+                           (optimistic concurrency for the mutation tools)
+    6  structure version   one-row ``structure_version`` table, bumped by
+                           triggers on every change except supply changes, so
+                           readers can tell a stock update from a catalog edit
+
+A database without a schema_version table but with the original tables is
+adopted at version 1. An empty database is created straight through every step.
+
+Usage:
+    python -m sql_agent.migrations path/to/recipes.db          # upgrade
+    python -m sql_agent.migrations path/to/recipes.db --status
+"""
+
+import argparse
+import os
+import sqlite3
+from typing import Callable
+
+from . import fts
+
+# ── Steps ─────────────────────────────────────────────────────────────────────
+
+def _execute_script(conn: sqlite3.Connection, script: str) -> None:
+    """
+    Run ``script`` statement by statement. Unlike executescript(), which
+    COMMITs first, this keeps every statement inside the migration's transaction.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def _baseline(conn: sqlite3.Connection) -> None:
+    _execute_script(conn, """
+        CREATE TABLE IF NOT EXISTS recipes (
+            uid TEXT PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ingredients (
+            uid TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            supply INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS recipe_ingredient (
+            recipe_uid TEXT,
+            ingredient_uid TEXT,
+            quantity INTEGER NOT NULL,
+            FOREIGN KEY (recipe_uid) REFERENCES recipes(uid),
+            FOREIGN KEY (ingredient_uid) REFERENCES ingredients(uid),
+            PRIMARY KEY (recipe_uid, ingredient_uid)
+        );
+    """)
+
+
+def _integer_keys(conn: sqlite3.Connection) -> None:
+    _execute_script(conn, """
+        CREATE TABLE recipes_new (
+            id   INTEGER PRIMARY KEY,
+            uid  TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL
+        );
+        INSERT INTO recipes_new (id, uid, name)
+            SELECT rowid, uid, name FROM recipes;
+
+        CREATE TABLE ingredients_new (
+            id     INTEGER PRIMARY KEY,
+            uid    TEXT NOT NULL UNIQUE,
+            name   TEXT NOT NULL,
+            supply INTEGER NOT NULL
+        );
+        INSERT INTO ingredients_new (id, uid, name, supply)
+            SELECT rowid, uid, name, supply FROM ingredients;
+
+        CREATE TABLE recipe_ingredient_new (
+            recipe_id     INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+            ingredient_id INTEGER NOT NULL REFERENCES ingredients(id),
+            quantity      INTEGER NOT NULL,
+            PRIMARY KEY (recipe_id, ingredient_id)
+        ) WITHOUT ROWID;
+        INSERT INTO recipe_ingredient_new (recipe_id, ingredient_id, quantity)
+            SELECT r.id, i.id, ri.quantity
+            FROM recipe_ingredient ri
+            JOIN recipes_new     r ON r.uid = ri.recipe_uid
+            JOIN ingredients_new i ON i.uid = ri.ingredient_uid;
+
+        DROP TABLE recipe_ingredient;
+        DROP TABLE recipes;
+        DROP TABLE ingredients;
+        ALTER TABLE recipes_new RENAME TO recipes;
+        ALTER TABLE ingredients_new RENAME TO ingredients;
+        ALTER TABLE recipe_ingredient_new RENAME TO recipe_ingredient;
+    """)
+
+
+def _covering_index(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS recipe_ingredient_by_ingredient
+        ON recipe_ingredient (ingredient_id, recipe_id, quantity)
+    """)
+
+
+def _constraints(conn: sqlite3.Connection) -> None:
+    bad = conn.execute("""
+        SELECT (SELECT COUNT(*) FROM recipes WHERE length(trim(name)) = 0)
+             + (SELECT COUNT(*) FROM ingredients WHERE length(trim(name)) = 0 OR supply < 0)
+             + (SELECT COUNT(*) FROM recipe_ingredient WHERE quantity < 0)
+    """).fetchone()[0]
+    if bad:
+        raise sqlite3.IntegrityError(
+            f"{bad} row(s) have empty names, negative supply or negative quantities; "
+            "fix them before upgrading to schema version 4."
+        )
+    _execute_script(conn, """
+        CREATE TABLE recipes_new (
+            id   INTEGER PRIMARY KEY,
+            uid  TEXT NOT NULL UNIQUE CHECK (length(uid) > 0),
+            name TEXT NOT NULL CHECK (length(trim(name)) > 0)
+        );
+        INSERT INTO recipes_new SELECT id, uid, name FROM recipes;
+
+        CREATE TABLE ingredients_new (
+            id     INTEGER PRIMARY KEY,
+            uid    TEXT NOT NULL UNIQUE CHECK (length(uid) > 0),
+            name   TEXT NOT NULL CHECK (length(trim(name)) > 0),
+            supply INTEGER NOT NULL CHECK (supply >= 0)
+        );
+        INSERT INTO ingredients_new SELECT id, uid, name, supply FROM ingredients;
+
+        CREATE TABLE recipe_ingredient_new (
+            recipe_id     INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+            ingredient_id INTEGER NOT NULL REFERENCES ingredients(id),
+            quantity      INTEGER NOT NULL CHECK (quantity >= 0),
+            PRIMARY KEY (recipe_id, ingredient_id)
+        ) WITHOUT ROWID;
+        INSERT INTO recipe_ingredient_new SELECT recipe_id, ingredient_id, quantity FROM recipe_ingredient;
+
+        DROP TABLE recipe_ingredient;
+        DROP TABLE recipes;
+        DROP TABLE ingredients;
+        ALTER TABLE recipes_new RENAME TO recipes;
+        ALTER TABLE ingredients_new RENAME TO ingredients;
+        ALTER TABLE recipe_ingredient_new RENAME TO recipe_ingredient;
+
+        CREATE INDEX IF NOT EXISTS recipe_ingredient_by_ingredient
+        ON recipe_ingredient (ingredient_id, recipe_id, quantity);
+    """)
+
+
+def _row_versions(conn: sqlite3.Connection) -> None:
+    conn.execute("ALTER TABLE ingredients ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _structure_version(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE structure_version (version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO structure_version (version) VALUES (0)")
+    create_triggers(conn)
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "baseline schema", _baseline),
+    (2, "integer surrogate keys", _integer_keys),
+    (3, "covering index on recipe_ingredient (ingredient_id, recipe_id, quantity)", _covering_index),
+    (4, "NOT NULL / CHECK constraints", _constraints),
+    (5, "ingredients.version row versions", _row_versions),
+    (6, "structure_version table and triggers", _structure_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Secondary indexes of the latest schema. Bulk loaders drop them and build
+# them again once the data is in, which is much faster than maintaining them
+# row by row.
+INDEXES = {
+    "recipe_ingredient_by_ingredient":
+        "CREATE INDEX IF NOT EXISTS recipe_ingredient_by_ingredient "
+        "ON recipe_ingredient (ingredient_id, recipe_id, quantity)",
+}
+
+
+# Triggers of the latest schema that bump structure_version on any change to
+# the catalog other than ingredients.supply / ingredients.version. Bulk loaders
+# drop them too and bump the version once at the end.
+_BUMP = "UPDATE structure_version SET version = version + 1"
+TRIGGERS = {
+    f"structure_{table}_{event.split()[0].lower()}":
+        f"CREATE TRIGGER IF NOT EXISTS structure_{table}_{event.split()[0].lower()} "
+        f"AFTER {event} ON {table} BEGIN {_BUMP}; END"
+    for table, events in (
+        ("recipes", ("INSERT", "DELETE", "UPDATE OF id, uid, name")),
+        ("recipe_ingredient", ("INSERT", "DELETE", "UPDATE")),
+        ("ingredients", ("INSERT", "DELETE", "UPDATE OF id, uid, name")),
+    )
+    for event in events
+}
+
+
+def drop_indexes(conn: sqlite3.Connection) -> None:
+    for name in INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    for sql in INDEXES.values():
+        conn.execute(sql)
+
+
+def drop_triggers(conn: sqlite3.Connection) -> None:
+    for name in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_triggers(conn: sqlite3.Connection) -> None:
+    """(Re)create the structure_version triggers and bump it for the changes made without them."""
+    for sql in TRIGGERS.values():
+        conn.execute(sql)
+    conn.execute(_BUMP)
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+class SchemaError(RuntimeError):
+    """Base of the errors raised by check_path for a database the tools cannot use."""
+
+
+class MissingDatabaseError(SchemaError):
+    """Raised when a database to check does not exist (it is not created)."""
+
+    def __init__(self, db_path: str):
+        super().__init__(
+            f"{db_path} does not exist; create it with 'python -m sql_agent.init_db' "
+            f"or point SQL_AGENT_DB at an existing database."
+        )
+
+
+class OutdatedSchemaError(SchemaError):
+    """Raised when a database is older than LATEST_VERSION and may not be upgraded."""
+
+    def __init__(self, db_path: str, version: int):
+        super().__init__(
+            f"{db_path} is at schema version {version}, not {LATEST_VERSION}; upgrade it with "
+            f"'python -m sql_agent.migrations {db_path}' (or set SQL_AGENT_AUTO_MIGRATE=1)."
+        )
+        self.version = version
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Schema version of ``conn`` (0 for an empty database, 1 for an unversioned original)."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "schema_version" in tables:
+        row = conn.execute("SELECT version FROM schema_version").fetchone()
+        return row[0] if row else 0
+    return 1 if "recipes" in tables else 0
+
+
+def _set_version(conn: sqlite3.Connection, version: int) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    conn.execute("DELETE FROM schema_version")
+    conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+
+
+def upgrade(conn: sqlite3.Connection, target: int = LATEST_VERSION) -> list[int]:
+    """
+    Apply every missing migration up to ``target``.
+
+    Table rebuilds drop the FTS triggers (see fts.py), so they are re-installed
+    afterwards when the search index was present.
+
+    Returns:
+        The versions that were applied (empty when already up to date).
+    """
+    applied = []
+    version = current_version(conn)
+    had_fts = fts.is_installed(conn)
+    conn.execute("PRAGMA foreign_keys = OFF")  # table rebuilds, see https://sqlite.org/lang_altertable.html
+    try:
+        for step, _, migrate in MIGRATIONS:
+            if step <= version or step > target:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = current_version(conn)    # another process may have upgraded meanwhile
+                if step <= version:
+                    conn.execute("COMMIT")
+                    continue
+                migrate(conn)
+                _set_version(conn, step)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(step)
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    if applied and had_fts and target == LATEST_VERSION:
+        fts.install(conn)
+    return applied
+
+
+def upgrade_path(db_path: str) -> list[int]:
+    """Open ``db_path``, upgrade it and close it again."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        return upgrade(conn)
+    finally:
+        conn.close()
+
+
+def check_path(db_path: str) -> None:
+    """
+    Raise OutdatedSchemaError unless ``db_path`` is at LATEST_VERSION, or
+    MissingDatabaseError if it does not exist (nothing is written or created).
+    """
+    if not os.path.exists(db_path):
+        raise MissingDatabaseError(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        version = current_version(conn)
+    finally:
+        conn.close()
+    if version < LATEST_VERSION:
+        raise OutdatedSchemaError(db_path, version)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Upgrade a recipes database to the latest schema.")
+    parser.add_argument("db_path")
+    parser.add_argument("--status", action="store_true", help="only print the current version")
+    args = parser.parse_args(argv)
+    if args.status:
+        if not os.path.exists(args.db_path):
+            raise SystemExit(str(MissingDatabaseError(args.db_path)))
+        conn = sqlite3.connect(args.db_path)
+        print(f"schema version {current_version(conn)} (latest {LATEST_VERSION})")
+        conn.close()
+        return
+    applied = upgrade_path(args.db_path)
+    print(f"applied {applied}" if applied else f"already at version {LATEST_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
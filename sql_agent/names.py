@@ -0,0 +1,522 @@
+"""
+names.py
+--------
+In-memory name resolution for recipes and ingredients.
+
+Replaces ``WHERE LOWER(name) LIKE '%x%'`` scans (and their arbitrary first
+match) with a NameIndex made of:
+
+- a normalised exact-name map,
+- a prefix trie,
+- a trigram inverted index for substring and fuzzy matches.
+
+Matches are ranked:
+
+    exact      1.0
+    prefix     0.9  (+ up to 0.05 for how much of the name the query covers)
+    word       0.8  the query starts a later word, e.g. "cake" in "lemon cake"
+    substring  0.7
+    fuzzy      up to 0.6, scaled by trigram similarity
+
+Ties go to the shorter name, then to insertion order. A search only looks at
+as many candidates as its ``limit`` needs: prefix matches come from a walk
+of the trie that visits the shortest names first, and word and substring
+matches (which rank lower) are only looked for when there are fewer prefix
+matches than ``limit``, shortest names first. Queries under 3 characters
+have no trigram to narrow the substring search with: they match by prefix
+and, with 2 characters, by word start only.
+
+When names change, updated() returns a copy of the index with only those
+names re-indexed, so a catalog refresh does not need a full rebuild and an
+index already handed to readers is never modified.
+
+FrozenNameIndex answers the same queries from flat arrays (names sorted for
+exact and prefix lookups, trigram postings lists) that freeze() builds once
+and compiled.py stores in the compiled catalog file, so a new process does
+not rebuild the dict-based index. It cannot be updated.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+AMBIGUITY_MARGIN = 0.05
+FUZZY_MIN_SIMILARITY = 0.3
+FUZZY_SHORTLIST = 50      # candidates scored after trigram-hit counting
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(name: str) -> str:
+    """Lower-case, strip accents and collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SPACES.sub(" ", stripped).strip().lower()
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def score(query: str, name: str) -> tuple[float, str]:
+    """Score a normalised ``name`` against a normalised ``query``."""
+    if name == query:
+        return 1.0, "exact"
+    if name.startswith(query):
+        return 0.9 + 0.05 * len(query) / len(name), "prefix"
+    position = name.find(query)
+    if position > 0:
+        return (0.8, "word") if name[position - 1] == " " else (0.7, "substring")
+    q, n = trigrams(query), trigrams(name)
+    similarity = 2 * len(q & n) / (len(q) + len(n))
+    return 0.6 * similarity, "fuzzy"
+
+
+class Match(NamedTuple):
+    key: str
+    name: str
+    score: float
+    match: str      # "exact" | "prefix" | "word" | "substring" | "fuzzy"
+
+
+def is_ambiguous(matches: list[Match]) -> bool:
+    """True when the best non-exact match has a close runner-up."""
+    return (
+        len(matches) > 1
+        and matches[0].match != "exact"
+        and matches[1].match != "fuzzy"
+        and matches[1].score >= matches[0].score - AMBIGUITY_MARGIN
+    )
+
+
+class NameIndex:
+    """
+    Searchable map of key (uid) -> name.
+
+    Thread-safe: searches and updates take an internal lock. An index that
+    snapshots share must not be modified (their names would change under
+    them); use updated() to get a modified copy instead.
+
+    Trie nodes map a character to the child node, ``""`` to the keys whose
+    name ends there and ``None`` to the length of the shortest name below.
+    """
+
+    def __init__(self, entries: dict[str, str] | None = None):
+        self._lock = threading.RLock()
+        self._names: dict[str, str] = {}        # key -> original name
+        self._normalized: dict[str, str] = {}   # key -> normalised name
+        self._order: dict[str, int] = {}        # key -> insertion rank (tie-break)
+        self._next = 0
+        self._exact: dict[str, list[str]] = {}
+        self._trie: dict = {}
+        self._grams: dict[str, set[str]] = {}
+        self._by_length: dict[int, set[str]] = {}   # len(name) -> keys
+        self._shared = False                    # True once copy() shared the parts below
+        self._owned: set[int] = set()           # ids of the parts copied since
+        for key, name in (entries or {}).items():
+            self.add(key, name)
+
+    def _rank(self, key: str) -> tuple[int, int]:
+        """Tie-break between matches of equal score: shorter name, then insertion order."""
+        return len(self._names[key]), self._order[key]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+
+    def _writable(self, parent: dict, key, empty: type):
+        """
+        ``parent[key]`` for modification: created as ``empty()`` when missing,
+        copied first when it is still shared with the index this one was
+        copied from (see copy()).
+        """
+        item = parent.get(key)
+        if item is None:
+            item = parent[key] = empty()
+        elif self._shared and id(item) not in self._owned:
+            item = parent[key] = item.copy()
+        else:
+            return item
+        if self._shared:
+            self._owned.add(id(item))
+        return item
+
+    def add(self, key: str, name: str) -> None:
+        with self._lock:
+            if key in self._names:
+                self.remove(key)
+            norm = normalize(name)
+            self._names[key] = name
+            self._normalized[key] = norm
+            self._order[key] = self._next
+            self._next += 1
+            self._writable(self._exact, norm, list).append(key)
+            self._writable(self._by_length, len(name), set).add(key)
+            node = self._trie
+            for ch in norm:
+                node[None] = min(node.get(None, len(norm)), len(norm))
+                node = self._writable(node, ch, dict)
+            node[None] = len(norm)
+            self._writable(node, "", set).add(key)
+            for gram in trigrams(norm):
+                self._writable(self._grams, gram, set).add(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if key not in self._names:
+                return
+            norm = self._normalized.pop(key)
+            name = self._names.pop(key)
+            del self._order[key]
+            same_length = self._writable(self._by_length, len(name), set)
+            same_length.discard(key)
+            if not same_length:
+                del self._by_length[len(name)]
+            exact = self._writable(self._exact, norm, list)
+            exact.remove(key)
+            if not exact:
+                del self._exact[norm]
+            path = [self._trie]
+            for ch in norm:
+                path.append(self._writable(path[-1], ch, dict))
+            self._writable(path[-1], "", set).discard(key)
+            if not path[-1][""]:
+                del path[-1][""]
+            for depth in range(len(norm), -1, -1):  # prune now-empty branches, fix the minimums
+                node = path[depth]
+                lengths = [child[None] for ch, child in node.items() if ch]
+                if "" in node:
+                    lengths.append(depth)
+                if lengths:
+                    node[None] = min(lengths)
+                elif depth:
+                    del path[depth - 1][norm[depth - 1]]
+                else:
+                    node.clear()
+            for gram in trigrams(norm):
+                keys = self._writable(self._grams, gram, set)
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def copy(self) -> "NameIndex":
+        """
+        A copy that shares the trie nodes and key sets with this index and
+        copies each one only when it first changes it (path copying), so a
+        copy costs a few dict copies, not a rebuild. From then on this index
+        copies shared parts before changing them too.
+        """
+        with self._lock:
+            other = NameIndex()
+            other._names = dict(self._names)
+            other._normalized = dict(self._normalized)
+            other._order = dict(self._order)
+            other._next = self._next
+            other._exact = dict(self._exact)
+            other._trie = dict(self._trie)
+            other._grams = dict(self._grams)
+            other._by_length = dict(self._by_length)
+            other._shared, other._owned = True, {id(other._trie)}
+            self._shared, self._owned = True, {id(self._trie)}
+            return other
+
+    def updated(self, entries: dict[str, str]) -> "NameIndex":
+        """
+        An index holding exactly ``entries``: this one when nothing changed,
+        otherwise a copy with only the changed names re-indexed. This index
+        is left as it is.
+        """
+        with self._lock:
+            if entries == self._names:
+                return self
+            other = self.copy()
+        other.update(entries)
+        return other
+
+    def update(self, entries: dict[str, str]) -> tuple[int, int]:
+        """
+        Make the index hold exactly ``entries`` in place, touching only what
+        changed. Only for an index nobody else reads yet (see updated()).
+
+        Returns:
+            (number of keys added or renamed, number of keys removed)
+        """
+        with self._lock:
+            removed = [key for key in self._names if key not in entries]
+            for key in removed:
+                self.remove(key)
+            changed = 0
+            for key, name in entries.items():
+                if self._names.get(key) != name:
+                    self.add(key, name)
+                    changed += 1
+            return changed, len(removed)
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    def _exact_keys(self, norm: str) -> Iterable[str]:
+        return self._exact.get(norm, ())
+
+    def exact(self, query: str) -> list[str]:
+        with self._lock:
+            return list(self._exact_keys(normalize(query)))
+
+    def _with_prefix(self, norm: str, limit: int) -> list[str]:
+        """
+        Keys whose names start with ``norm``, shortest first: every key whose
+        name is no longer than the ``limit``-th shortest (so equal lengths
+        are never cut), or all of them when there are fewer.
+        """
+        node = self._trie
+        for ch in norm:
+            node = node.get(ch)
+            if node is None:
+                return []
+        keys: list[str] = []
+        last = 0
+        tie = 0
+        heap: list = [(node[None], tie, len(norm), node)] if node else []
+        while heap and (len(keys) < limit or heap[0][0] <= last):
+            length, _, depth, item = heapq.heappop(heap)
+            if isinstance(item, set):
+                keys.extend(sorted(item, key=self._order.__getitem__))
+                last = length
+                continue
+            for ch, child in item.items():
+                if ch is None:
+                    continue
+                tie += 1
+                if ch == "":
+                    heapq.heappush(heap, (depth, tie, depth, child))
+                else:
+                    heapq.heappush(heap, (child[None], tie, depth + 1, child))
+        return keys
+
+    def _substring_candidates(self, norm: str) -> set[str]:
+        """Keys whose names hold every (unpadded) trigram of ``norm``."""
+        inner = [self._grams.get(norm[i:i + 3], set()) for i in range(len(norm) - 2)]
+        if not inner:
+            return set(self._names)  # queries under 3 characters: scan
+        return set.intersection(*sorted(inner, key=len))
+
+    def _infix_candidates(self, norm: str) -> Iterable[str]:
+        """
+        Keys that may hold ``norm`` after their first character, shortest
+        names first: those with all its trigrams, or for a 2-character query
+        those with a word starting with it (no scan below 3 characters).
+        """
+        if len(norm) >= 3:
+            keys = self._substring_candidates(norm)
+        elif len(norm) == 2:
+            keys = self._grams.get(" " + norm, set())
+        else:
+            return
+        for length in sorted(self._by_length):
+            yield from sorted(keys & self._by_length[length], key=self._order.__getitem__)
+
+    def _fuzzy_candidates(self, norm: str, limit: int) -> list[str]:
+        """The keys sharing the most padded trigrams with ``norm``."""
+        hits = Counter()
+        for gram in trigrams(norm):
+            hits.update(self._grams.get(gram, ()))
+        return [key for key, _ in hits.most_common(limit)]
+
+    def containing(self, query: str) -> list[str]:
+        """Every key whose normalised name contains ``query``, in insertion order."""
+        norm = normalize(query)
+        with self._lock:
+            keys = [k for k in self._substring_candidates(norm) if norm in self._normalized[k]]
+            return sorted(keys, key=self._order.__getitem__)
+
+    def _match(self, norm: str, key: str) -> Match:
+        return Match(key, self._names[key], *score(norm, self._normalized[key]))
+
+    def _infix_matches(self, norm: str, needed: int) -> list[Match]:
+        """
+        The ``needed`` best word matches and, when there are fewer, substring
+        matches of ``norm`` (prefix matches excluded).
+        """
+        words, others = [], []
+        for key in self._infix_candidates(norm):
+            name = self._normalized[key]
+            position = name.find(norm)
+            if position <= 0:
+                continue
+            if name[position - 1] == " ":
+                words.append(key)
+                if len(words) == needed:
+                    break
+            elif len(others) < needed:
+                others.append(key)
+        return [self._match(norm, key) for key in words + others]
+
+    def search(self, query: str, limit: int = 5, fuzzy: bool = True) -> list[Match]:
+        """
+        Ranked matches for ``query`` (best first). Fuzzy matches are only
+        looked for when nothing matches exactly, by prefix or as a substring,
+        and only for queries of 3 characters or more.
+        """
+        norm = normalize(query)
+        if not norm or limit < 1:
+            return []
+        with self._lock:
+            matches = [self._match(norm, key) for key in self._with_prefix(norm, limit)]
+            if len(matches) < limit:
+                matches.extend(self._infix_matches(norm, limit - len(matches)))
+            if fuzzy and not matches and len(norm) >= 3:
+                for key in self._fuzzy_candidates(norm, FUZZY_SHORTLIST):
+                    match = self._match(norm, key)
+                    if match.score >= 0.6 * FUZZY_MIN_SIMILARITY:
+                        matches.append(match)
+            matches.sort(key=lambda m: (-m.score, self._rank(m.key)))
+            return matches[:limit]
+
+
+class FrozenNameIndex(NameIndex):
+    """
+    Read-only NameIndex over arrays (see freeze()); same queries and ranking.
+
+    Args:
+        keys, names, normalized: per entry, in insertion order.
+        by_name:      positions sorted by normalised name.
+        grams:        trigrams, sorted; ``postings[offsets[g]:offsets[g + 1]]``
+                      are the positions (ascending) of the entries holding ``grams[g]``.
+    """
+
+    def __init__(
+        self,
+        keys: list[str],
+        names: list[str],
+        normalized: list[str],
+        by_name: np.ndarray,
+        grams: list[str],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+    ):
+        self._lock = threading.RLock()
+        self._keys = keys
+        self._norm_list = normalized
+        self._names = dict(zip(keys, names))
+        self._normalized = dict(zip(keys, normalized))
+        self._order = dict(zip(keys, range(len(keys))))
+        self._next = len(keys)
+        self._by_name = by_name.tolist()
+        self._by_name_array = np.asarray(by_name, dtype=np.int64)
+        self._norm_lengths = np.fromiter(map(len, normalized), np.int64, len(normalized))
+        self._name_lengths = np.fromiter(map(len, names), np.int64, len(names))
+        self._gram_ids = {gram: g for g, gram in enumerate(grams)}
+        self._offsets = offsets
+        self._postings = postings
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("FrozenNameIndex is read-only")
+
+    add = remove = update = updated = copy = _read_only
+
+    def _bounds(self, low: str, high: str) -> tuple[int, int]:
+        by_name, norms = self._by_name, self._norm_list
+        start = bisect.bisect_left(by_name, low, key=norms.__getitem__)
+        return start, bisect.bisect_left(by_name, high, lo=start, key=norms.__getitem__)
+
+    def _exact_keys(self, norm: str) -> Iterable[str]:
+        start, stop = self._bounds(norm, norm + "\0")
+        return [self._keys[i] for i in self._by_name[start:stop]]
+
+    def _with_prefix(self, norm: str, limit: int) -> list[str]:
+        start, stop = self._bounds(norm, norm + "\U0010ffff")
+        positions = self._by_name_array[start:stop]
+        if len(positions) > limit:
+            lengths = self._norm_lengths[positions]
+            longest = np.partition(lengths, limit - 1)[limit - 1]
+            positions = positions[lengths <= longest]
+        keys = self._keys
+        return [keys[i] for i in np.sort(positions).tolist()]
+
+    def _posting(self, gram: str) -> np.ndarray | None:
+        g = self._gram_ids.get(gram)
+        return None if g is None else self._postings[self._offsets[g]:self._offsets[g + 1]]
+
+    def _substring_positions(self, norm: str) -> np.ndarray:
+        """Positions of the entries holding every trigram of ``norm`` (3 characters or more)."""
+        inner = [self._posting(norm[i:i + 3]) for i in range(len(norm) - 2)]
+        if any(p is None for p in inner):
+            return np.zeros(0, dtype=np.int64)
+        inner.sort(key=len)
+        positions = inner[0]
+        for other in inner[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def _substring_candidates(self, norm: str) -> set[str]:
+        if len(norm) < 3:
+            return set(self._names)
+        keys = self._keys
+        return {keys[i] for i in self._substring_positions(norm).tolist()}
+
+    def _infix_candidates(self, norm: str) -> Iterable[str]:
+        if len(norm) >= 3:
+            positions = self._substring_positions(norm)
+        elif len(norm) == 2:
+            posting = self._posting(" " + norm)
+            positions = np.zeros(0, dtype=np.int64) if posting is None else posting
+        else:
+            return ()
+        positions = positions[np.lexsort((positions, self._name_lengths[positions]))]
+        keys = self._keys
+        return (keys[i] for i in positions.tolist())
+
+    def _fuzzy_candidates(self, norm: str, limit: int) -> list[str]:
+        lists = [p for p in map(self._posting, trigrams(norm)) if p is not None]
+        if not lists:
+            return []
+        hits = np.bincount(np.concatenate(lists))
+        best = np.argsort(-hits, kind="stable")[:limit]
+        keys = self._keys
+        return [keys[i] for i in best[hits[best] > 0].tolist()]
+
+
+def freeze(entries: dict[str, str]) -> dict:
+    """
+    The arguments of FrozenNameIndex for ``entries`` (key -> name), i.e. the
+    NameIndex(entries) content as lists and arrays.
+    """
+    keys, names = list(entries), list(entries.values())
+    normalized = [normalize(name) for name in names]
+    postings: dict[str, list[int]] = {}
+    for position, norm in enumerate(normalized):
+        for gram in trigrams(norm):
+            postings.setdefault(gram, []).append(position)
+    grams = sorted(postings)
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([len(postings[g]) for g in grams], out=offsets[1:])
+    flat = [p for g in grams for p in postings[g]]
+    return {
+        "keys":       keys,
+        "names":      names,
+        "normalized": normalized,
+        "by_name":    np.array(sorted(range(len(keys)), key=normalized.__getitem__), dtype=np.int64),
+        "grams":      grams,
+        "offsets":    offsets,
+        "postings":   np.array(flat, dtype=np.int64),
+    }
+
+
+def rank(query: str, entries: Iterable[tuple[str, str]], limit: int = 5) -> list[Match]:
+    """Rank ``(key, name)`` pairs against ``query`` without building an index."""
+    norm = normalize(query)
+    matches = []
+    for order, (key, name) in enumerate(entries):
+        value, kind = score(norm, normalize(name))
+        if kind == "fuzzy" and value < 0.6 * FUZZY_MIN_SIMILARITY:
+            continue
+        matches.append((Match(key, name, value, kind), order))
+    matches.sort(key=lambda m: (-m[0].score, len(m[0].name), m[1]))
+    return [m for m, _ in matches[:limit]]
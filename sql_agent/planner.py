@@ -0,0 +1,276 @@
+"""
+planner.py
+----------
+Production planner: choose integer servings per recipe that maximise the
+(weighted) number of servings without exceeding the ingredient supply.
+
+    maximise    sum_r  w_r * x_r
+    subject to  sum_r  a_rj * x_r <= supply_j     for every ingredient j
+                x_r >= min_r,  x_r integer
+
+Two solvers run on the RequirementMatrix from engine.py, with no external
+solver service:
+
+- "fast":  Lagrangian relaxation of the LP. Subgradient steps on ingredient
+           prices give a valid upper bound, and each price vector is rounded
+           to an integer plan by greedy filling in order of weight per priced
+           resource use. It runs until the time budget is used up.
+- "exact": depth-first branch and bound over the candidate recipes, pruned
+           with the Lagrangian bound. Only for small catalogs: with more than
+           EXACT_MAX_RECIPES candidate recipes it runs as "fast". If the time
+           budget runs out, the best plan found so far is returned with
+           ``optimal = False``.
+
+"auto" picks "exact" when there are at most EXACT_MAX_RECIPES candidate recipes.
+"""
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from .engine import RequirementMatrix
+
+EXACT_MAX_RECIPES = 25
+MAX_SUBGRADIENT_STEPS = 200
+
+
+class MenuSolution(NamedTuple):
+    """
+    Attributes:
+        servings:    int64[n_recipes] chosen servings per matrix row (minimums included).
+        objective:   weighted servings of the plan.
+        upper_bound: proven upper bound on the optimal objective.
+        optimal:     True when the plan is proven optimal.
+        mode:        solver that produced the plan ("exact" or "fast").
+        iterations:  subgradient steps (fast) or search nodes (exact).
+    """
+    servings: np.ndarray
+    objective: float
+    upper_bound: float
+    optimal: bool
+    mode: str
+    iterations: int
+
+
+class InfeasibleMenuError(ValueError):
+    """Raised when the minimum servings alone exceed the supply."""
+
+    def __init__(self, shortages: list[tuple[int, int]]):
+        super().__init__("Minimum servings exceed the available supply.")
+        self.shortages = shortages  # [(ingredient column, shortage), ...]
+
+
+class _Candidates:
+    """Recipes that can still add value: positive weight, at least one positive requirement."""
+
+    def __init__(self, matrix: RequirementMatrix, weights: np.ndarray):
+        rows, cols, qtys = [], [], []
+        for row in np.flatnonzero(weights > 0).tolist():
+            span = matrix.row_slice(row)
+            keep = matrix.data[span] > 0
+            if keep.any():
+                rows.append(row)
+                cols.append(matrix.indices[span][keep])
+                qtys.append(matrix.data[span][keep])
+        self.rows = np.array(rows, dtype=np.int64)
+        self.weights = weights[self.rows].astype(float)
+        self.cols = cols
+        self.qtys = qtys
+        # Python copies for the greedy inner loop, which is faster than numpy on tiny rows.
+        self.pairs = [list(zip(c.tolist(), q.tolist())) for c, q in zip(cols, qtys)]
+        self.indptr = np.concatenate([[0], np.cumsum([len(c) for c in cols])]).astype(np.int64)
+        self.indices = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+        self.data = np.concatenate(qtys) if qtys else np.zeros(0, dtype=np.int64)
+        self.entry_owner = np.repeat(np.arange(len(rows)), np.diff(self.indptr))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def upper_bounds(self, residual: np.ndarray) -> np.ndarray:
+        """Largest servings of each candidate on its own, given ``residual`` supply."""
+        if not len(self):
+            return np.zeros(0, dtype=np.int64)
+        per_entry = np.maximum(residual[self.indices], 0) // self.data
+        return np.minimum.reduceat(per_entry, self.indptr[:-1])
+
+    def priced_cost(self, prices: np.ndarray) -> np.ndarray:
+        """prices · a_r for every candidate."""
+        if not len(self):
+            return np.zeros(0)
+        return np.add.reduceat(prices[self.indices] * self.data, self.indptr[:-1])
+
+    def usage(self, x: np.ndarray, n_ingredients: int) -> np.ndarray:
+        """Total amount of each ingredient used by candidate servings ``x``."""
+        return np.bincount(self.indices, weights=self.data * x[self.entry_owner], minlength=n_ingredients)
+
+
+def _lagrangian_bound(cands: _Candidates, prices, residual, ub) -> tuple[float, np.ndarray]:
+    """Dual bound  prices·residual + Σ max(0, w_r - prices·a_r) · ub_r  and its maximiser."""
+    reduced = cands.weights - cands.priced_cost(prices)
+    x = np.where(reduced > 0, ub, 0)
+    return float(prices @ residual + (np.maximum(reduced, 0) * ub).sum()), x
+
+
+def _greedy(cands: _Candidates, order, residual: np.ndarray) -> np.ndarray:
+    """Round to an integer plan: give each candidate, in order, as many servings as still fit."""
+    left = residual.tolist()
+    x = np.zeros(len(cands), dtype=np.int64)
+    pairs = cands.pairs
+    for i in order.tolist():
+        take = min(left[c] // q for c, q in pairs[i])
+        if take > 0:
+            x[i] = take
+            for c, q in pairs[i]:
+                left[c] -= take * q
+    return x
+
+
+def _solve_fast(cands, residual, deadline):
+    """Subgradient search on ingredient prices with greedy rounding at each step."""
+    ub = cands.upper_bounds(residual)
+    scale = np.maximum(residual, 1).astype(float)
+    prices = np.zeros(len(residual))
+    best_bound, _ = _lagrangian_bound(cands, prices, residual, ub)
+
+    # Start from the plain "most weight per share of scarce supply" ordering.
+    share = np.add.reduceat(cands.data / scale[cands.indices], cands.indptr[:-1]) if len(cands) else np.zeros(0)
+    best_x = _greedy(cands, np.argsort(-cands.weights / np.maximum(share, 1e-12), kind="stable"), residual)
+    best_value = float(cands.weights @ best_x)
+
+    step = 0
+    theta = 2.0
+    while step < MAX_SUBGRADIENT_STEPS and time.perf_counter() < deadline:
+        step += 1
+        bound, x_relaxed = _lagrangian_bound(cands, prices, residual, ub)
+        best_bound = min(best_bound, bound)
+        if best_bound - best_value < 1e-9:
+            break
+
+        cost = cands.priced_cost(prices)
+        order = np.argsort(-(cands.weights / np.maximum(cost, 1e-12 * cands.weights)), kind="stable")
+        x = _greedy(cands, order, residual)
+        value = float(cands.weights @ x)
+        if value > best_value:
+            best_x, best_value = x, value
+
+        gradient = residual - cands.usage(x_relaxed, len(residual))
+        norm = float(gradient @ gradient)
+        if norm == 0:
+            break
+        prices = np.maximum(0.0, prices - theta * (bound - best_value) / norm * gradient)
+        if step % 20 == 0:
+            theta /= 2
+    return best_x, best_value, best_bound, prices, step
+
+
+def _solve_exact(cands, residual, deadline, prices, start_x, start_value):
+    """
+    Depth-first branch and bound; candidates are tried in priced-ratio order.
+    Works on a dense candidates x used-ingredients matrix, so it is only run
+    on small candidate sets (EXACT_MAX_RECIPES).
+    """
+    n = len(cands)
+    order = np.argsort(-(cands.weights / np.maximum(cands.priced_cost(prices), 1e-12)), kind="stable")
+    weights = cands.weights[order]
+    used = np.unique(cands.indices)             # ingredients no candidate uses never bind
+    residual, prices = residual[used], prices[used]
+    dense = np.zeros((n, len(used)), dtype=np.int64)
+    for k, i in enumerate(order.tolist()):
+        dense[k, np.searchsorted(used, cands.cols[i])] = cands.qtys[i]
+    positive = dense > 0
+    reduced = np.maximum(weights - dense @ prices, 0)
+
+    best = {"value": start_value, "x": start_x[order].copy(), "nodes": 0}
+    x = np.zeros(n, dtype=np.int64)
+    timed_out = False
+
+    def bound(k, res):
+        ub = np.where(positive[k:], np.maximum(res, 0) // np.maximum(dense[k:], 1), np.iinfo(np.int64).max).min(axis=1)
+        return min(float(weights[k:] @ ub), float(prices @ res + reduced[k:] @ ub))
+
+    def search(k, res, value):
+        nonlocal timed_out
+        best["nodes"] += 1
+        if value > best["value"] + 1e-9:
+            best["value"], best["x"] = value, x.copy()
+        if k == n or timed_out:
+            return
+        if time.perf_counter() > deadline:
+            timed_out = True
+            return
+        if value + bound(k, res) <= best["value"] + 1e-9:
+            return
+        row = positive[k]
+        most = int((res[row] // dense[k, row]).min())
+        for take in range(most, -1, -1):
+            x[k] = take
+            search(k + 1, res - take * dense[k], value + weights[k] * take)
+            if timed_out:
+                break
+        x[k] = 0
+
+    search(0, residual.copy(), 0.0)
+    solution = np.zeros(n, dtype=np.int64)
+    solution[order] = best["x"]
+    return solution, best["value"], not timed_out, best["nodes"]
+
+
+def solve_menu(
+    matrix: RequirementMatrix,
+    weights: np.ndarray,
+    min_servings: np.ndarray,
+    mode: str = "auto",
+    time_budget: float = 2.0,
+    supply: np.ndarray | None = None,
+) -> MenuSolution:
+    """
+    Maximise weighted servings over every matrix row.
+
+    Args:
+        matrix:       The catalog's RequirementMatrix.
+        weights:      float[n_recipes] value of one serving (<= 0 never chosen beyond its minimum).
+        min_servings: int64[n_recipes] servings that must be part of the plan.
+        mode:         "auto", "exact" or "fast" ("exact" runs as "fast" above
+                      EXACT_MAX_RECIPES candidate recipes; see MenuSolution.mode).
+        time_budget:  Wall-clock seconds for the search.
+        supply:       Supply to plan against (defaults to the matrix supply).
+
+    Raises:
+        InfeasibleMenuError: the minimum servings alone exceed the supply.
+        ValueError:          unknown mode.
+    """
+    if mode not in ("auto", "exact", "fast"):
+        raise ValueError(f"Unknown mode '{mode}', expected 'auto', 'exact' or 'fast'.")
+    deadline = time.perf_counter() + max(time_budget, 0.0)
+    supply = matrix.supply if supply is None else supply
+    weights = np.asarray(weights, dtype=float)
+    min_servings = np.asarray(min_servings, dtype=np.int64)
+
+    residual = supply - matrix.consumption(min_servings)
+    if (short := np.flatnonzero(residual < 0)).size:
+        raise InfeasibleMenuError([(int(c), int(-residual[c])) for c in short])
+    base_value = float(weights @ min_servings)
+
+    cands = _Candidates(matrix, weights)
+    if mode == "auto" or (mode == "exact" and len(cands) > EXACT_MAX_RECIPES):
+        mode = "exact" if len(cands) <= EXACT_MAX_RECIPES else "fast"
+
+    x, value, bound, prices, steps = _solve_fast(cands, residual, deadline)
+    optimal = bound - value < 1e-9
+    iterations = steps
+    if mode == "exact" and not optimal:
+        x, value, optimal, iterations = _solve_exact(cands, residual, deadline, prices, x, value)
+        if optimal:
+            bound = value
+
+    servings = min_servings.copy()
+    servings[cands.rows] += x
+    return MenuSolution(
+        servings=servings,
+        objective=base_value + value,
+        upper_bound=base_value + bound,
+        optimal=optimal,
+        mode=mode,
+        iterations=iterations,
+    )
@@ -0,0 +1,253 @@
+"""
+pool.py
+-------
+Bounded SQLite connection pool used by the tool layer in core.py.
+
+Opening a fresh connection per tool call throws away SQLite's page cache and
+pays the connect/PRAGMA cost every time. The pool keeps up to ``max_size``
+connections open and hands them out again, preferring the connection the
+calling thread used last so its warm page cache is reused.
+
+Each connection is configured once with the PRAGMAs passed to the pool
+(journal mode, mmap size, cache size, ...). Read-only pools additionally set
+``query_only`` so a tool can never write through them.
+
+Usage:
+    pool = ConnectionPool("recipes.db", max_size=4, read_only=True)
+    with pool.connection() as conn:
+        conn.execute("SELECT 1")
+    pool.stats()   # {"size": 1, "idle": 1, "in_use": 0, ...}
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# ── Defaults ──────────────────────────────────────────────────────────────────
+
+DEFAULT_PRAGMAS: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "mmap_size":    256 * 1024 * 1024,
+    "cache_size":   -16000,            # negative = KiB, i.e. ~16 MB per connection
+}
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+# ── Pool ──────────────────────────────────────────────────────────────────────
+
+class ConnectionPool:
+    """
+    A thread-safe, bounded pool of sqlite3 connections to a single database.
+
+    Args:
+        db_path:               Path of the SQLite database file.
+        max_size:              Maximum number of open connections.
+        timeout:               Seconds to wait for a free connection before
+                               raising PoolTimeoutError.
+        pragmas:               PRAGMAs applied (in order) to every new connection.
+                               Defaults to DEFAULT_PRAGMAS.
+        read_only:             When True, ``PRAGMA query_only = ON`` is applied last.
+        health_check_interval: Connections idle for longer than this many
+                               seconds are pinged with ``SELECT 1`` before reuse
+                               and replaced if the ping fails.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 8,
+        timeout: float = 5.0,
+        pragmas: dict[str, Any] | None = None,
+        read_only: bool = False,
+        health_check_interval: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.read_only = read_only
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        # thread id -> (connection, released_at); most recently released last.
+        self._idle: OrderedDict[int, list[tuple[sqlite3.Connection, float]]] = OrderedDict()
+        self._idle_count = 0
+        self._size = 0
+        self._closed = False
+
+        self._acquired = 0
+        self._created = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._health_check_failures = 0
+
+    # ── Connection lifecycle ──────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        # "file:" URIs open e.g. shared-cache memory databases (replica.py).
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, uri=self.db_path.startswith("file:"))
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _take_idle(self, thread_id: int) -> tuple[sqlite3.Connection, float] | None:
+        """Pop an idle connection, preferring one last used by ``thread_id``."""
+        if not self._idle_count:
+            return None
+        owner = thread_id if thread_id in self._idle else next(reversed(self._idle))
+        bucket = self._idle[owner]
+        entry = bucket.pop()
+        if not bucket:
+            del self._idle[owner]
+        self._idle_count -= 1
+        return entry
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, waiting up to ``timeout`` seconds."""
+        thread_id = threading.get_ident()
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                entry = self._take_idle(thread_id)
+                if entry is not None or self._size < self.max_size:
+                    break
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No SQLite connection available within {self.timeout}s "
+                        f"(pool size {self.max_size})."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            if entry is None:
+                self._size += 1  # reserve the slot before connecting outside the lock
+            self._acquired += 1
+            if waited:
+                elapsed = time.perf_counter() - started
+                self._waits += 1
+                self._wait_time_total += elapsed
+                self._wait_time_max = max(self._wait_time_max, elapsed)
+
+        if entry is not None:
+            conn, released_at = entry
+            if time.monotonic() - released_at < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            with self._cond:
+                self._health_check_failures += 1
+            conn.close()
+
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            if self._closed:    # closed while connecting: e.g. a replaced replica generation (replica.py)
+                self._size -= 1
+                conn.close()
+                raise RuntimeError("Connection pool is closed.")
+            self._created += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, rolling back any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            thread_id = threading.get_ident()
+            self._idle.setdefault(thread_id, []).append((conn, time.monotonic()))
+            self._idle.move_to_end(thread_id)
+            self._idle_count += 1
+            self._cond.notify()
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        finally:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager around acquire()/release()."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close every idle connection; checked-out ones are closed on release."""
+        with self._cond:
+            self._closed = True
+            for bucket in self._idle.values():
+                for conn, _ in bucket:
+                    conn.close()
+                    self._size -= 1
+            self._idle.clear()
+            self._idle_count = 0
+            self._cond.notify_all()
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the pool's size and wait-time metrics.
+
+        Returns:
+            {
+              "max_size": 8, "size": 3, "idle": 2, "in_use": 1,
+              "acquired": 120, "created": 3, "waits": 4, "timeouts": 0,
+              "wait_time_total_s": 0.012, "wait_time_max_s": 0.006,
+              "health_check_failures": 0
+            }
+        """
+        with self._cond:
+            return {
+                "max_size":              self.max_size,
+                "size":                  self._size,
+                "idle":                  self._idle_count,
+                "in_use":                self._size - self._idle_count,
+                "acquired":              self._acquired,
+                "created":               self._created,
+                "waits":                 self._waits,
+                "timeouts":              self._timeouts,
+                "wait_time_total_s":     round(self._wait_time_total, 6),
+                "wait_time_max_s":       round(self._wait_time_max, 6),
+                "health_check_failures": self._health_check_failures,
+            }
@@ -0,0 +1,214 @@
+"""
+replica.py
+----------
+In-memory replica of a database file for the read path of core.py.
+
+A Replica copies the file with the SQLite online backup API
+(``sqlite3.Connection.backup``) into a shared-cache in-memory database and
+hands out read-only connections to that copy from a ConnectionPool, so read
+queries never touch the disk. Writes keep going to the file (writes.py).
+
+Every refresh builds a new *generation*: a fresh in-memory database with its
+own name (``file:sql_agent_replica_<n>_<generation>?mode=memory&cache=shared``)
+is filled completely, and only then does it become the one connections are
+taken from. Readers never see a half-copied replica: a connection handed out
+before the swap keeps reading the old generation, which SQLite frees when
+its last connection closes. During a refresh the process briefly holds two
+copies of the database.
+
+Change detection is the one SnapshotCache uses: ``PRAGMA data_version`` on a
+watcher connection to the file changes whenever another connection commits.
+connection() checks it first; when it moved, the calling thread refreshes
+(the others keep reading the current generation meanwhile, or wait when
+there is none yet). refresh() copies right away, e.g. after a write of this
+process that the next read must see.
+
+Usage:
+    replica = Replica("recipes.db")
+    with replica.connection() as conn:
+        conn.execute("SELECT COUNT(*) FROM recipes")
+    replica.stats()   # {"generation": 1, "refreshes": 1, "last_refresh_ms": 12.5, ...}
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from . import tracing
+from .pool import ConnectionPool
+
+# Memory databases have no journal file and no mmap; only the page cache matters.
+REPLICA_PRAGMAS: dict[str, Any] = {"cache_size": -16000}
+
+_replica_ids = itertools.count(1)
+
+
+class _Generation:
+    __slots__ = ("number", "version", "anchor", "pool")
+
+    def __init__(self, number: int, version: int, anchor: sqlite3.Connection, pool: ConnectionPool):
+        self.number = number
+        self.version = version
+        self.anchor = anchor            # keeps the memory database alive while it is current
+        self.pool = pool
+
+    def close(self) -> None:
+        self.pool.close()               # connections still checked out close on release
+        self.anchor.close()
+
+
+class Replica:
+    """
+    Keeps an in-memory copy of ``db_path`` and pools read-only connections to it.
+
+    Args:
+        db_path:   Path of the SQLite database file.
+        max_size, timeout, health_check_interval: see ConnectionPool.
+        pragmas:   PRAGMAs of the replica connections (REPLICA_PRAGMAS).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 8,
+        timeout: float = 5.0,
+        pragmas: dict[str, Any] | None = None,
+        health_check_interval: float = 30.0,
+    ):
+        self.db_path = db_path
+        self._pool_args = {
+            "max_size": max_size,
+            "timeout": timeout,
+            "pragmas": dict(REPLICA_PRAGMAS if pragmas is None else pragmas),
+            "read_only": True,
+            "health_check_interval": health_check_interval,
+        }
+        self._name = f"sql_agent_replica_{next(_replica_ids)}"
+        self._watch_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()   # one copy at a time
+        self._watcher: sqlite3.Connection | None = None
+        self._current: _Generation | None = None
+        self._closed = False
+        self._refreshes = 0
+        self._refresh_s_total = 0.0
+        self._last_refresh_s = 0.0
+
+    def _data_version(self) -> int:
+        with self._watch_lock:
+            if self._watcher is None:
+                self._watcher = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._watcher.execute("PRAGMA query_only = ON")
+            return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def _copy(self, number: int) -> _Generation:
+        """Back the file up into a new memory database (the caller holds _refresh_lock)."""
+        version = self._data_version()       # a commit during the copy moves it again: recopied later
+        uri = f"file:{self._name}_{number}?mode=memory&cache=shared"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        try:
+            source = sqlite3.connect(self.db_path)
+            try:
+                source.backup(anchor)
+            finally:
+                source.close()
+        except BaseException:
+            anchor.close()
+            raise
+        return _Generation(number, version, anchor, ConnectionPool(uri, **self._pool_args))
+
+    def refresh(self, force: bool = True) -> bool:
+        """
+        Copy the file into a new generation and switch readers to it. With
+        ``force`` False, only when the file changed since the current copy.
+        Returns True when a new generation was installed.
+        """
+        with self._refresh_lock:
+            replaced = self._install(force)
+        if replaced is not None:
+            replaced.close()
+        return replaced is not None
+
+    def _install(self, force: bool) -> _Generation | None:
+        """Copy and swap in a new generation (caller holds _refresh_lock); returns the replaced one."""
+        if self._closed:
+            raise RuntimeError("Replica is closed.")
+        current = self._current
+        if not force and current is not None and current.version == self._data_version():
+            return None
+        started = time.perf_counter()
+        with tracing.span("replica.refresh"):
+            generation = self._copy(current.number + 1 if current is not None else 1)
+        elapsed = time.perf_counter() - started
+        self._current = generation
+        self._refreshes += 1
+        self._refresh_s_total += elapsed
+        self._last_refresh_s = elapsed
+        return current
+
+    def _generation(self) -> _Generation:
+        """The generation to read from, refreshed first if the file changed."""
+        current = self._current
+        if current is None:
+            self.refresh(force=False)
+        elif current.version != self._data_version() and self._refresh_lock.acquire(blocking=False):
+            # Only the thread that noticed the change copies; the others read the
+            # current generation meanwhile.
+            try:
+                replaced = self._install(force=False)
+            finally:
+                self._refresh_lock.release()
+            if replaced is not None:
+                replaced.close()
+        generation = self._current
+        if generation is None:
+            raise RuntimeError("Replica is closed.")
+        return generation
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """A read-only connection to the current replica (query_only, dict-like rows)."""
+        while True:
+            pool = self._generation().pool
+            try:
+                conn = pool.acquire()
+            except RuntimeError:
+                if self._closed:
+                    raise
+                continue                 # swapped out between lookup and acquire: take the new one
+            break
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            {"generation": 3, "version": 7, "refreshes": 3, "last_refresh_ms": 12.5,
+             "mean_refresh_ms": 11.9, "pool": {"max_size": 8, "size": 2, ...}}
+        """
+        current = self._current
+        refreshes = self._refreshes or 1
+        return {
+            "generation":      current.number if current else 0,
+            "version":         current.version if current else None,
+            "refreshes":       self._refreshes,
+            "last_refresh_ms": round(self._last_refresh_s * 1e3, 3),
+            "mean_refresh_ms": round(self._refresh_s_total / refreshes * 1e3, 3),
+            "pool":            current.pool.stats() if current else None,
+        }
+
+    def close(self) -> None:
+        """Close the current generation and the watcher; checked-out connections close on release."""
+        with self._refresh_lock:
+            self._closed = True
+            current, self._current = self._current, None
+        if current is not None:
+            current.close()
+        with self._watch_lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
@@ -0,0 +1,373 @@
+"""
+router.py
+---------
+Deterministic fast path in front of root_agent for the questions that map
+one-to-one to a tool:
+
+    how many lemon cakes can I make?          get_max_servings
+    can I make 3 lemon cakes?                 get_max_servings
+    can I make a lemon cake?                  get_missing_ingredients
+    what's missing for the apple cake?        get_missing_ingredients
+    what's in the lemon cake?                 get_recipe_by_id
+    what's in stock?                          get_inventory
+    what can I make right now?                check_recipe_feasibility
+    what can I make with eggs?                search_recipes_by_ingredient
+
+The whole question has to match one of the patterns below, and a recipe
+named in it has to resolve to exactly that recipe (ignoring case, accents,
+articles and a plural "s"). The router then calls the sql_agent.core
+function directly and renders a templated answer, skipping both LLM
+generations of a tool-using turn. Anything else (no pattern, an ambiguous or
+fuzzy name, a tool error) falls through to the LLM unchanged.
+
+It is off by default. Turn it on with ``SQL_AGENT_ROUTER=1`` or
+configure(enabled=True); it then runs as the first before_agent_callback of
+root_agent, and returning content from that callback ends the turn with the
+content as the agent's reply. The callback is async: routing, tool calls
+included, runs on async_tools' bounded executor with its timeout, so a slow
+query never blocks the event loop (a routed question that times out falls
+through to the LLM).
+
+metrics() reports the hit rate, per-intent counts, fall-through reasons and
+the time spent routing; benchmarks/bench_router.py compares routed and LLM
+latency.
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from . import async_tools, core, tracing
+from .names import normalize
+
+ENABLED = os.environ.get("SQL_AGENT_ROUTER", "").lower() not in ("", "0", "false", "no")
+MAX_LISTED = 15           # names spelled out in a list answer before "and N more"
+
+_ARTICLES = re.compile(r"^(?:a|an|the|some|my|our)\s+")
+_FILLER = re.compile(r"^(?:please\s+|hey\s+|ok\s+|so\s+)+|\s+please$")
+_TRAILING = re.compile(r"[\s?!.]+$")
+
+_MAKE = r"(?:make|cook|bake|prepare)"
+_WE = r"(?:i|we)"
+_NOW = r"(?:\s+(?:right\s+)?(?:now|today|tonight))?"
+_CAN = rf"(?:can|could)\s+{_WE}"
+
+
+class Route(NamedTuple):
+    intent: str
+    tool: str
+    args: dict
+    answer: str
+
+
+# ── Patterns ──────────────────────────────────────────────────────────────────
+# Tried in order against the normalised question; the first full match wins.
+# Named groups: "recipe" (resolved against the recipe names), "count",
+# "ingredient" (passed to the ingredient search).
+
+_PATTERNS: list[tuple[str, re.Pattern]] = [(intent, re.compile(pattern)) for intent, pattern in [
+    ("inventory",   r"what(?:'s| is)\s+in\s+stock"),
+    ("inventory",   rf"what(?:\s+ingredients)?\s+do\s+{_WE}\s+have(?:\s+in\s+stock)?"),
+    ("inventory",   r"what\s+ingredients\s+(?:are|are\s+there)(?:\s+(?:available|in\s+stock))?"),
+    ("inventory",   r"(?:show|list|give)(?:\s+me)?(?:\s+(?:the|my|our))?\s+(?:inventory|stock|ingredients|supplies)"),
+    ("feasible",    rf"what\s+(?:recipes\s+)?{_CAN}\s+{_MAKE}{_NOW}"),
+    ("feasible",    rf"which\s+recipes\s+{_CAN}\s+{_MAKE}{_NOW}"),
+    ("feasible",    rf"what\s+{_CAN}\s+{_MAKE}\s+with\s+(?:what\s+{_WE}\s+have|the\s+current\s+stock){_NOW}"),
+    ("search",      rf"what\s+(?:recipes\s+)?{_CAN}\s+{_MAKE}\s+with\s+(?P<ingredient>[\w' -]+?)"),
+    ("search",      r"(?:which\s+|what\s+|show(?:\s+me)?\s+|list\s+)?recipes\s+"
+                    r"(?:use|with|contain|containing|using|have|having)\s+(?P<ingredient>[\w' -]+?)"),
+    ("max_servings", rf"how\s+many(?:\s+(?:servings|portions)\s+of)?\s+(?P<recipe>.+?)\s+{_CAN}\s+{_MAKE}{_NOW}"),
+    ("count",       rf"{_CAN}\s+{_MAKE}\s+(?P<count>\d+)\s+(?:(?:servings|portions)\s+of\s+)?(?P<recipe>.+?){_NOW}"),
+    ("missing",     rf"{_CAN}\s+{_MAKE}\s+(?P<recipe>.+?){_NOW}"),
+    ("missing",     r"what(?:'s| is)\s+missing\s+(?:for|from)\s+(?P<recipe>.+)"),
+    ("missing",     rf"what\s+(?:am\s+i|are\s+we)\s+missing\s+(?:for|to\s+{_MAKE})\s+(?P<recipe>.+?){_NOW}"),
+    ("recipe",      r"what(?:'s| is)\s+in\s+(?P<recipe>.+)"),
+    ("recipe",      r"what\s+(?:are\s+the\s+ingredients|goes)\s+(?:of|for|in|into)\s+(?P<recipe>.+)"),
+    ("recipe",      r"(?:show|list|give)(?:\s+me)?\s+the\s+ingredients\s+(?:of|for|in)\s+(?P<recipe>.+)"),
+    ("recipe",      r"(?:show|give)(?:\s+me)?\s+the\s+(?P<recipe>.+?)\s+recipe"),
+]]
+
+
+def _clean(question: str) -> str:
+    text = normalize(question.replace("’", "'"))
+    text = _TRAILING.sub("", text)
+    return _FILLER.sub("", text).strip()
+
+
+def _name_forms(slot: str) -> list[str]:
+    """``slot`` without a leading article, then singular guesses of its last word."""
+    name = _ARTICLES.sub("", slot).strip()
+    forms = [name]
+    if name.endswith("ies"):
+        forms.append(name[:-3] + "y")
+    if name.endswith("es"):
+        forms.append(name[:-2])
+    if name.endswith("s"):
+        forms.append(name[:-1])
+    return forms
+
+
+def _resolved(tool: Callable[..., dict], slot: str, *args) -> dict | None:
+    """
+    Call ``tool(name, *args)`` for the forms of ``slot`` until one resolves to
+    a recipe of exactly that name. Ambiguous names and errors give None.
+    """
+    for name in _name_forms(slot):
+        result = tool(name, *args)
+        if "error" in result or result.get("alternatives"):
+            continue
+        if normalize(result.get("recipe_name") or result["name"]) == name:
+            return result
+    return None
+
+
+# ── Rendering ─────────────────────────────────────────────────────────────────
+
+def _listing(names: list[str], total: int | None = None) -> str:
+    total = len(names) if total is None else total
+    shown = ", ".join(names[:MAX_LISTED])
+    rest = total - min(len(names), MAX_LISTED)
+    return f"{shown} and {rest} more" if rest > 0 else shown
+
+
+def _plural(n: int, word: str) -> str:
+    return f"{n} {word}" if n == 1 else f"{n} {word}s"
+
+
+def _records(result: list[dict] | dict) -> list[dict]:
+    """Rows of a verbose list or a compact table (flat columns only) as dicts."""
+    if isinstance(result, list):
+        return result
+    columns = [c if isinstance(c, str) else next(iter(c)) for c in result["columns"]]
+    return [dict(zip(columns, row)) for row in result["rows"]]
+
+
+def _shortages(items: list[dict]) -> str:
+    return "; ".join(
+        f"you need {i['required']} {i['name']} but only have {i['in_stock']}"
+        for i in items
+    )
+
+
+def _render_servings(result: dict) -> str:
+    name, n = result["recipe_name"], result["max_servings"]
+    if n == 0:
+        short = [b for b in result["breakdown"] if b["max_servings"] == 0]
+        return f"You can't make {name} right now: {_shortages(short)}."
+    limiting = next(b for b in result["breakdown"] if b["name"] == result["limiting_ingredient"])
+    return (
+        f"You can make {_plural(n, 'serving')} of {name}. {limiting['name'].capitalize()} is the "
+        f"limiting ingredient ({limiting['in_stock']} in stock, {limiting['required']} per serving)."
+    )
+
+
+def _render_count(result: dict, count: int) -> str:
+    name, n = result["recipe_name"], result["max_servings"]
+    if n >= count:
+        return f"Yes, you can make {_plural(count, 'serving')} of {name} (up to {n} with the current stock)."
+    if n == 0:
+        return f"No. {_render_servings(result)}"
+    return (
+        f"No, you can only make {_plural(n, 'serving')} of {name}: "
+        f"{result['limiting_ingredient']} runs out first."
+    )
+
+
+def _render_missing(result: dict) -> str:
+    name = result["recipe_name"]
+    if result["can_make"]:
+        return f"You have everything you need for {name}."
+    lines = [
+        f"You need {m['required']} {m['name']} but only have {m['in_stock']} "
+        f"— you are short by {m['shortage']}."
+        for m in result["missing_ingredients"]
+    ]
+    return f"For {name}:\n" + "\n".join(f"- {line}" for line in lines)
+
+
+def _render_recipe(result: dict) -> str:
+    parts = [f"{i['quantity']} {i['name']} ({i['supply']} in stock)" for i in result["ingredients"]]
+    if not parts:
+        return f"{result['name']} has no ingredients defined."
+    return f"{result['name']} needs: " + ", ".join(parts) + "."
+
+
+def _render_inventory(result: list[dict] | dict) -> str:
+    rows = _records(result)
+    total = result["total"] if isinstance(result, dict) else len(rows)
+    if not total:
+        return "The inventory is empty."
+    stocked = [f"{r['name']} ({r['supply']})" for r in rows if r["supply"] > 0]
+    empty = [r["name"] for r in rows if r["supply"] <= 0]
+    answer = f"You have {_plural(total, 'ingredient')} on record: {_listing(stocked, total - len(empty))}."
+    if empty:
+        answer += f" Out of stock: {_listing(empty)}."
+    if isinstance(result, dict) and result.get("next_cursor"):
+        answer += " Ask for the full inventory to see the rest."
+    return answer
+
+
+def _render_feasible(result: list[dict] | dict) -> str:
+    rows = _records(result)
+    names = [r["recipe_name"] for r in rows if r["can_make"]]
+    if isinstance(result, dict) and "summary" in result:
+        feasible, total = result["summary"]["can_make"], result["total"]
+    else:
+        feasible, total = len(names), len(rows)
+    if not total:
+        return "There are no recipes in the database."
+    if not feasible:
+        return f"You can't make any of the {_plural(total, 'recipe')} with the current stock."
+    return f"You can make {feasible} of {_plural(total, 'recipe')} right now: {_listing(names, feasible)}."
+
+
+def _render_search(result: dict, ingredient: str) -> str:
+    names = list(dict.fromkeys(r["recipe_name"] for r in result["results"]))
+    more = " (and more; ask to see the next page)" if result["next_cursor"] else ""
+    return f"Recipes with {ingredient}: {_listing(names)}{more}."
+
+
+# ── Routing ───────────────────────────────────────────────────────────────────
+
+def _answer(intent: str, match: re.Match) -> tuple[str, dict, str] | None:
+    """``(tool, args, answer)`` for a matched question, or None to fall through."""
+    groups = match.groupdict()
+    if intent == "inventory":
+        return "get_inventory", {}, _render_inventory(core.get_inventory())
+    if intent == "feasible":
+        return "check_recipe_feasibility", {}, _render_feasible(core.check_recipe_feasibility())
+    if intent == "search":
+        ingredient = _ARTICLES.sub("", groups["ingredient"]).strip()
+        result = core.search_recipes_by_ingredient(ingredient)
+        if "error" in result or not result["results"]:
+            return None
+        return "search_recipes_by_ingredient", {"ingredient_name": ingredient}, _render_search(result, ingredient)
+
+    recipe = groups["recipe"]
+    if intent in ("max_servings", "count"):
+        result = _resolved(core.get_max_servings, recipe)
+        if result is None:
+            return None
+        args = {"recipe_name": result["recipe_name"]}
+        if intent == "count":
+            return "get_max_servings", args, _render_count(result, int(groups["count"]))
+        return "get_max_servings", args, _render_servings(result)
+    if intent == "missing":
+        result = _resolved(core.get_missing_ingredients, recipe)
+        if result is None:
+            return None
+        return "get_missing_ingredients", {"recipe_name": result["recipe_name"]}, _render_missing(result)
+    if intent == "recipe":
+        result = _resolved(core.get_recipe_by_id, recipe)
+        if result is None:
+            return None
+        return "get_recipe_by_id", {"recipe_uid": result["name"]}, _render_recipe(result)
+    return None
+
+
+def route(question: str) -> Route | None:
+    """
+    Answer ``question`` without the LLM when it matches a pattern with high
+    confidence; None means "let the agent handle it".
+    """
+    started = time.perf_counter()
+    routed, reason = None, "no_match"
+    with tracing.span("router", "router") as current:
+        text = _clean(question)
+        for intent, pattern in _PATTERNS:
+            match = pattern.fullmatch(text)
+            if match is None:
+                continue
+            try:
+                answered = _answer(intent, match)
+            except Exception:
+                answered, reason = None, "error"
+            else:
+                reason = "uncertain" if answered is None else "routed"
+            if answered is not None:
+                routed = Route(intent, *answered)
+            break
+        if current is not None:
+            current.attributes["router.outcome"] = reason
+            if routed is not None:
+                current.attributes["router.intent"] = routed.intent
+    _record(routed, reason, time.perf_counter() - started)
+    return routed
+
+
+async def before_agent(callback_context):
+    """
+    before_agent_callback: answer routable questions directly. The returned
+    content ends the turn as the agent's reply; None lets the agent run.
+    route() runs on the async_tools executor, never on the event loop.
+    """
+    if not ENABLED or callback_context.user_content is None:
+        return None
+    question = " ".join(part.text for part in callback_context.user_content.parts or () if part.text)
+    routed = await async_tools.call(route, question) if question else None
+    if not isinstance(routed, Route):      # no route, or an {"error": ...} timeout
+        return None
+    from google.genai import types
+    return types.Content(role="model", parts=[types.Part(text=routed.answer)])
+
+
+def configure(enabled: bool | None = None) -> None:
+    global ENABLED
+    if enabled is not None:
+        ENABLED = enabled
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_stats: dict = {}
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _stats.clear()
+        _stats.update(questions=0, routed_seconds=0.0, fallthrough_seconds=0.0,
+                      intents={}, fallthrough={})
+
+
+def _record(routed: Route | None, reason: str, seconds: float) -> None:
+    with _lock:
+        _stats["questions"] += 1
+        if routed is not None:
+            _stats["routed_seconds"] += seconds
+            _stats["intents"][routed.intent] = _stats["intents"].get(routed.intent, 0) + 1
+        else:
+            _stats["fallthrough_seconds"] += seconds
+            _stats["fallthrough"][reason] = _stats["fallthrough"].get(reason, 0) + 1
+
+
+def metrics() -> dict:
+    """
+    Router counters since the last reset_metrics().
+
+    Returns:
+        {
+          "questions": 120, "routed": 85, "hit_rate": 0.708,
+          "intents": {"max_servings": 40, "inventory": 12, ...},
+          "fallthrough": {"no_match": 30, "uncertain": 5},
+          "mean_routed_ms": 0.41,      # time to answer a routed question
+          "mean_fallthrough_ms": 0.05  # time added to a question the LLM answers
+        }
+    """
+    with _lock:
+        routed = sum(_stats["intents"].values())
+        missed = _stats["questions"] - routed
+        return {
+            "questions":           _stats["questions"],
+            "routed":              routed,
+            "hit_rate":            round(routed / _stats["questions"], 3) if _stats["questions"] else 0.0,
+            "intents":             dict(_stats["intents"]),
+            "fallthrough":         dict(_stats["fallthrough"]),
+            "mean_routed_ms":      round(_stats["routed_seconds"] / routed * 1e3, 3) if routed else 0.0,
+            "mean_fallthrough_ms": round(_stats["fallthrough_seconds"] / missed * 1e3, 3) if missed else 0.0,
+        }
+
+
+reset_metrics()
@@ -0,0 +1,188 @@
+"""
+shaping.py
+----------
+Compact, size-budgeted encoding of list-shaped tool results.
+
+ADK serialises every tool result into the model's context, and on a local
+model prompt processing time grows with its size. shape_rows() turns a list of
+row dicts into:
+
+- a columnar table: the keys are listed once in "columns" and each row becomes
+  a plain list. Nested lists of dicts (ingredients, missing ingredients) are
+  tabulated the same way, with their sub-columns declared in the header:
+
+      {"columns": ["name", {"ingredients": ["name", "quantity", "supply"]}],
+       "rows":    [["lemon cake", [["eggs", 3, 10], ["lemon", 3, 1]]], ...]}
+
+- without the keys the model never needs (UIDs; tools take names),
+- cut to a byte budget. When rows are left out, the result has "total",
+  "returned", an optional summary over *all* rows and a "next_cursor" that
+  continues after the last returned row.
+
+"encoding" reports the compact size of the page against the verbose JSON of
+the same rows. encode_cursor() / decode_cursor() make and check the cursors of
+these pages and of the paged ingredient search.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Iterable
+
+DROP_KEYS = frozenset({"uid", "recipe_uid", "ingredient_uid"})
+BYTES_PER_TOKEN = 4         # rough average for JSON on Llama/Qwen-style tokenizers
+
+
+def _fingerprint(query: str) -> str:
+    return hashlib.sha1(query.encode()).hexdigest()[:8]
+
+
+def encode_cursor(query: str, offset: int) -> str:
+    payload = json.dumps({"q": _fingerprint(query), "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(query: str, cursor: str | None) -> int:
+    """Offset stored in ``cursor``; raises ValueError if it is malformed or from another query."""
+    if not cursor:
+        return 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(payload["o"])
+        fingerprint = payload["q"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid pagination cursor.") from None
+    if fingerprint != _fingerprint(query) or offset < 0:
+        raise ValueError("Pagination cursor does not belong to this search.")
+    return offset
+
+
+def encoded_size(value) -> int:
+    """Size in bytes of ``value`` as compact JSON."""
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+def strip(value, drop: frozenset[str] = DROP_KEYS):
+    """Recursively remove the ``drop`` keys from dicts."""
+    if isinstance(value, dict):
+        return {k: strip(v, drop) for k, v in value.items() if k not in drop}
+    if isinstance(value, list):
+        return [strip(v, drop) for v in value]
+    return value
+
+
+class _Table:
+    """Column schema grown while rows are encoded (one level of nested tables)."""
+
+    def __init__(self):
+        self.columns: list[str] = []
+        self.nested: dict[str, list[str]] = {}
+
+    def _index(self, columns: list[str], keys) -> None:
+        for key in keys:
+            if key not in columns:
+                columns.append(key)
+
+    def encode(self, row: dict) -> list:
+        self._index(self.columns, row)
+        encoded = []
+        for column in self.columns:
+            value = row.get(column)
+            if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+                sub = self.nested.setdefault(column, [])
+                for item in value:
+                    self._index(sub, item)
+                value = [[item.get(c) for c in sub] for item in value]
+            encoded.append(value)
+        return encoded
+
+    def header(self) -> list:
+        return [{c: self.nested[c]} if c in self.nested else c for c in self.columns]
+
+    def pad(self, rows: list[list]) -> None:
+        """Rows encoded before a column (or sub-column) appeared are padded with None."""
+        width = len(self.columns)
+        for row in rows:
+            row.extend([None] * (width - len(row)))
+            for i, column in enumerate(self.columns):
+                if column in self.nested and isinstance(row[i], list):
+                    sub_width = len(self.nested[column])
+                    for item in row[i]:
+                        if isinstance(item, list):
+                            item.extend([None] * (sub_width - len(item)))
+
+
+def shape_rows(
+    rows: Iterable[dict],
+    budget_bytes: int,
+    cursor_key: str,
+    offset: int = 0,
+    total: int | None = None,
+    summary: dict | None = None,
+) -> dict:
+    """
+    Encode ``rows`` as a compact table of at most ``budget_bytes`` bytes. At
+    least one row is always returned. Rows are only consumed up to the end of
+    the page when ``total`` is given.
+
+    Args:
+        rows:         Row dicts in a stable order, from the ``offset``-th row of
+                      the whole result on (the caller skips the earlier ones, so
+                      it can do so without building them).
+        budget_bytes: Size budget of the encoded rows.
+        cursor_key:   Identifies the query the continuation cursor belongs to.
+        offset:       Index of the first row of ``rows`` in the whole result.
+        total:        Number of rows of the whole result, when known without
+                      consuming ``rows`` (otherwise the rest is counted).
+        summary:      Aggregates over all rows, included when rows are cut.
+
+    Returns:
+        {
+          "columns": ["recipe_name", "can_make", {"missing_ingredients": [...]}],
+          "rows": [[...], ...],
+          "total": 1200, "returned": 45,
+          "next_cursor": "eyJxIjoi...",             # None on the last page
+          "summary": {...},                         # only when rows were cut
+          "encoding": {"bytes": 7900, "verbose_bytes": 31000, "saved": "75%",
+                       "approx_tokens": 1975}
+        }
+    """
+    table = _Table()
+    page: list[list] = []
+    used = 2
+    verbose = 2
+    remaining = iter(rows)
+    seen = offset
+    for row in remaining:
+        seen += 1
+        encoded = table.encode(strip(row))
+        size = encoded_size(encoded) + 1
+        if page and used + size > budget_bytes:
+            seen -= 1
+            total = total if total is not None else seen + 1 + sum(1 for _ in remaining)
+            break
+        page.append(encoded)
+        used += size
+        verbose += encoded_size(row) + 1
+    if total is None:
+        total = seen
+    table.pad(page)
+
+    end = offset + len(page)
+    result = {
+        "columns": table.header(),
+        "rows": page,
+        "total": total,
+        "returned": len(page),
+        "next_cursor": encode_cursor(cursor_key, end) if end < total else None,
+    }
+    if end < total and summary:
+        result["summary"] = summary
+    compact = encoded_size(result)
+    result["encoding"] = {
+        "bytes": compact,
+        "verbose_bytes": verbose,
+        "saved": f"{max(0.0, 1 - compact / verbose):.0%}",
+        "approx_tokens": compact // BYTES_PER_TOKEN,
+    }
+    return result
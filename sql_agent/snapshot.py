@@ -0,0 +1,395 @@
+"""
+snapshot.py
+-----------
+In-process snapshot of the recipe catalog and inventory.
+
+The recipe catalog and supplies change far less often than the agent queries
+them, so instead of reading SQLite on every tool call the tool layer can serve
+reads from an InventorySnapshot held in memory. A SnapshotCache keeps one
+snapshot per database and cheaply checks ``PRAGMA data_version`` before every
+call; the snapshot is rebuilt only when another connection has committed a
+change to the database.
+
+When the change was only to ingredient supplies (``structure_version``,
+migration 6, did not move), the snapshot is not rebuilt: the supplies are
+re-read from the ingredients table and the new snapshot shares everything
+else with the old one, its feasibility view updated for the affected
+recipes only (see feasibility.py). The resulting change events are published
+to the cache's ChangeFeed.
+
+A snapshot can also be made from a compiled catalog file (compiled.py):
+then its recipe rows are read from the memory-mapped RequirementMatrix and
+its name indexes are FrozenNameIndexes, instead of dicts built from table
+scans. SnapshotCache takes the function that builds a full snapshot.
+
+InventorySnapshot exposes the same read interface as the SQL read-through
+catalog in core.py (resolve_recipe, find_recipe, get_recipe, recipe_ingredients,
+inventory, match_recipes, recipe_rows, iter_recipes, requirement_matrix,
+feasibility), so tools do not care which one they use.
+"""
+
+import copy
+import sqlite3
+import threading
+from typing import Callable, Iterator
+
+import numpy as np
+
+from . import tracing
+from .engine import RequirementMatrix
+from .feasibility import ChangeFeed, FeasibilityView
+from .names import FrozenNameIndex, Match, NameIndex
+
+Loader = Callable[[sqlite3.Connection, int, "InventorySnapshot | None"], "InventorySnapshot"]
+
+
+class InventorySnapshot:
+    """
+    Immutable in-memory copy of the recipes, ingredients and recipe_ingredient tables.
+
+    Attributes:
+        version:                 ``PRAGMA data_version`` the snapshot was built at.
+        structure_version:       ``structure_version`` it was built at (None
+                                 before schema version 6).
+        recipes:                 recipe uid -> name, in table (id) order.
+        ingredients:             ingredient uid -> (name, supply).
+        requirements:            recipe uid -> [(ingredient uid, quantity), ...]
+                                 sorted by ingredient name; None when the
+                                 snapshot reads recipe rows from ``matrix``.
+        recipe_index:            NameIndex over recipe names.
+        ingredient_index:        NameIndex over ingredient names.
+        recipes_by_ingredient:   ingredient uid -> [(recipe uid, quantity), ...]
+                                 (None without requirements).
+    """
+
+    def __init__(
+        self,
+        recipes: dict[str, str],
+        ingredients: dict[str, tuple[str, int]],
+        requirements: dict[str, list[tuple[str, int]]] | None,
+        version: int = 0,
+        recipe_index: NameIndex | None = None,
+        ingredient_index: NameIndex | None = None,
+        structure_version: int | None = None,
+        matrix: RequirementMatrix | None = None,
+    ):
+        if requirements is None and matrix is None:
+            raise ValueError("a snapshot without requirements needs the matrix")
+        self.version = version
+        self.structure_version = structure_version
+        self.recipes = recipes
+        self.ingredients = ingredients
+        self.requirements = requirements
+
+        ingredient_names = {uid: name for uid, (name, _) in ingredients.items()}
+        # Indexes handed in may still serve older snapshots: never modify them.
+        if recipe_index is None:
+            recipe_index = NameIndex(recipes)
+        elif not isinstance(recipe_index, FrozenNameIndex):
+            recipe_index = recipe_index.updated(recipes)
+        if ingredient_index is None:
+            ingredient_index = NameIndex(ingredient_names)
+        elif not isinstance(ingredient_index, FrozenNameIndex):
+            ingredient_index = ingredient_index.updated(ingredient_names)
+        self.recipe_index = recipe_index
+        self.ingredient_index = ingredient_index
+
+        self.recipes_by_ingredient: dict[str, list[tuple[str, int]]] | None = None
+        if requirements is not None:
+            self.recipes_by_ingredient = {}
+            for recipe_uid, rows in requirements.items():
+                for ingredient_uid, quantity in rows:
+                    self.recipes_by_ingredient.setdefault(ingredient_uid, []).append(
+                        (recipe_uid, quantity)
+                    )
+
+        if matrix is not None and requirements is None:
+            self._recipe_order = matrix.recipe_uids     # rows are in (name, uid) order
+        else:
+            self._recipe_order = sorted(recipes, key=lambda uid: (recipes[uid], uid))
+        self._ingredient_order = sorted(ingredients, key=lambda uid: (ingredients[uid][0], uid))
+        self._matrix: RequirementMatrix | None = matrix
+        self._using: tuple[np.ndarray, np.ndarray] | None = None   # matrix.recipes_using()
+        self._feasibility: FeasibilityView | None = None
+
+    @classmethod
+    def load(
+        cls,
+        conn: sqlite3.Connection,
+        version: int = 0,
+        previous: "InventorySnapshot | None" = None,
+    ) -> "InventorySnapshot":
+        """
+        Build a snapshot from three table scans on ``conn``.
+
+        When ``previous`` is given its name indexes are reused: copies with
+        only the names that changed re-indexed (``previous`` keeps serving
+        its own catalog unchanged).
+        """
+        structure_version = read_structure_version(conn)
+        recipes, ingredients, requirements = read_tables(conn)
+        if previous is None or isinstance(previous.recipe_index, FrozenNameIndex):
+            return cls(recipes, ingredients, requirements, version, structure_version=structure_version)
+        return cls(
+            recipes, ingredients, requirements, version,
+            recipe_index=previous.recipe_index,
+            ingredient_index=previous.ingredient_index,
+            structure_version=structure_version,
+        )
+
+    def with_supply(self, supply: dict[str, int], version: int) -> tuple["InventorySnapshot", list[dict]] | None:
+        """
+        A snapshot that shares everything with this one except the supplies
+        (ingredient uid -> supply, for every ingredient), plus the feasibility
+        change events when this snapshot's view was built. None when the
+        ingredients are not the same set, i.e. a reload is needed.
+        """
+        if supply.keys() != self.ingredients.keys():
+            return None
+        other = copy.copy(self)
+        other.version = version
+        other.ingredients = {uid: (name, supply[uid]) for uid, (name, _) in self.ingredients.items()}
+        other._matrix = other._feasibility = None
+        events: list[dict] = []
+        if self._matrix is not None:
+            matrix = self._matrix
+            other._matrix = matrix.with_supply(
+                np.fromiter((supply[uid] for uid in matrix.ingredient_uids), np.int64, matrix.n_ingredients)
+            )
+            if self._feasibility is not None:
+                other._feasibility, events = self._feasibility.apply(other._matrix)
+        return other, events
+
+    # ── Read interface ────────────────────────────────────────────────────────
+
+    def resolve_recipe(self, name: str, limit: int = 5) -> list[Match]:
+        """Ranked recipe matches for ``name`` (exact, prefix, substring, then fuzzy)."""
+        return self.recipe_index.search(name, limit)
+
+    def find_recipe(self, name: str) -> dict | None:
+        """Best non-fuzzy recipe match for ``name``, or None."""
+        matches = self.recipe_index.search(name, 1, fuzzy=False)
+        return {"uid": matches[0].key, "name": matches[0].name} if matches else None
+
+    def get_recipe(self, recipe_uid: str) -> dict | None:
+        name = self.recipes.get(recipe_uid)
+        return None if name is None else {"uid": recipe_uid, "name": name}
+
+    def recipe_ingredients(self, recipe_uid: str) -> list[dict]:
+        """Ingredient rows of one recipe, ordered by ingredient name."""
+        if self.requirements is None:
+            matrix = self._matrix
+            row = matrix.row_of.get(recipe_uid)
+            if row is None:
+                return []
+            cols = matrix.indices[matrix.row_slice(row)]
+            return [
+                {
+                    "uid":      matrix.ingredient_uids[col],
+                    "name":     matrix.ingredient_names[col],
+                    "quantity": quantity,
+                    "supply":   supply,
+                }
+                for col, quantity, supply in zip(
+                    cols.tolist(), matrix.data[matrix.row_slice(row)].tolist(), matrix.supply[cols].tolist()
+                )
+            ]
+        ingredients = self.ingredients
+        return [
+            {
+                "uid":      ingredient_uid,
+                "name":     ingredients[ingredient_uid][0],
+                "quantity": quantity,
+                "supply":   ingredients[ingredient_uid][1],
+            }
+            for ingredient_uid, quantity in self.requirements.get(recipe_uid, ())
+        ]
+
+    def inventory(self) -> list[dict]:
+        return [
+            {"uid": uid, "name": self.ingredients[uid][0], "supply": self.ingredients[uid][1]}
+            for uid in self._ingredient_order
+        ]
+
+    def _recipes_using(self, term: str) -> set[str]:
+        """Recipes with an ingredient whose name contains ``term``."""
+        uids: set[str] = set()
+        if self.recipes_by_ingredient is None:
+            matrix = self._matrix
+            if self._using is None:
+                self._using = matrix.recipes_using()
+            colptr, rows = self._using
+            for ingredient_uid in self.ingredient_index.containing(term):
+                col = matrix.column_of.get(ingredient_uid)
+                if col is not None:
+                    uids.update(matrix.recipe_uids[r] for r in rows[colptr[col]:colptr[col + 1]].tolist())
+            return uids
+        for ingredient_uid in self.ingredient_index.containing(term):
+            uids.update(r for r, _ in self.recipes_by_ingredient.get(ingredient_uid, ()))
+        return uids
+
+    def match_recipes(self, clauses: list[list[tuple[str, bool]]]) -> list[str]:
+        """
+        UIDs of recipes matching parsed ingredient clauses (see fts.parse_query),
+        ordered by recipe name.
+        """
+        matched: set[str] = set()
+        for clause in clauses:
+            positive = [self._recipes_using(t) for t, neg in clause if not neg]
+            uids = set.intersection(*sorted(positive, key=len))
+            for term, neg in clause:
+                if neg:
+                    uids -= self._recipes_using(term)
+            matched |= uids
+        return sorted(matched, key=lambda uid: (self.recipes[uid], uid))
+
+    def recipe_rows(self, recipe_uids: list[str]) -> list[tuple[dict, list[dict]]]:
+        """``(recipe, ingredients)`` pairs for the given recipes, in the given order."""
+        return [
+            ({"uid": uid, "name": self.recipes[uid]}, self.recipe_ingredients(uid))
+            for uid in recipe_uids
+            if uid in self.recipes
+        ]
+
+    def recipe_count(self) -> int:
+        return len(self.recipes)
+
+    def iter_recipes(self, start: int = 0) -> Iterator[tuple[dict, list[dict]]]:
+        """Yield ``(recipe, ingredients)`` pairs for every recipe, ordered by name, from the ``start``-th on."""
+        for uid in self._recipe_order[start:]:
+            yield {"uid": uid, "name": self.recipes[uid]}, self.recipe_ingredients(uid)
+
+    def requirement_matrix(self) -> RequirementMatrix:
+        """The snapshot's requirement matrix, built on first use and then reused."""
+        if self._matrix is None:
+            self._matrix = RequirementMatrix.from_recipes(self.iter_recipes())
+        return self._matrix
+
+    def feasibility(self) -> FeasibilityView:
+        """The maintained feasibility view, built on first use and then updated incrementally."""
+        if self._feasibility is None:
+            self._feasibility = FeasibilityView(self.requirement_matrix())
+        return self._feasibility
+
+
+def read_tables(
+    conn: sqlite3.Connection,
+) -> tuple[dict[str, str], dict[str, tuple[str, int]], dict[str, list[tuple[str, int]]]]:
+    """
+    ``(recipes, ingredients, requirements)`` as InventorySnapshot takes them,
+    from three table scans.
+    """
+    recipes = {
+        uid: name
+        for uid, name in conn.execute("SELECT uid, name FROM recipes ORDER BY id")
+    }
+    ingredients = {
+        uid: (name, supply)
+        for uid, name, supply in conn.execute("SELECT uid, name, supply FROM ingredients")
+    }
+    requirements: dict[str, list[tuple[str, int]]] = {}
+    for recipe_uid, ingredient_uid, quantity in conn.execute(
+        """
+        SELECT r.uid, i.uid, ri.quantity
+        FROM recipe_ingredient ri
+        JOIN recipes r     ON r.id = ri.recipe_id
+        JOIN ingredients i ON i.id = ri.ingredient_id
+        """
+    ):
+        requirements.setdefault(recipe_uid, []).append((ingredient_uid, quantity))
+    for rows in requirements.values():
+        rows.sort(key=lambda r: ingredients[r[0]][0])
+    return recipes, ingredients, requirements
+
+
+def read_structure_version(conn: sqlite3.Connection) -> int | None:
+    """``structure_version`` of the database, None before schema version 6."""
+    try:
+        row = conn.execute("SELECT version FROM structure_version").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return None if row is None else row[0]
+
+
+class SnapshotCache:
+    """
+    Keeps an InventorySnapshot of one database up to date.
+
+    A dedicated read-only connection is used to poll ``PRAGMA data_version``:
+    its value changes whenever another connection commits to the database, so
+    the check costs a single cheap statement when nothing has changed.
+    Supply-only changes are applied incrementally (see the module docstring)
+    and their feasibility events published to ``feed``. Full snapshots are
+    built by ``load`` (InventorySnapshot.load, or e.g. compiled.loader()).
+    """
+
+    def __init__(self, db_path: str, load: Loader | None = None):
+        self.db_path = db_path
+        self._load = InventorySnapshot.load if load is None else load
+        self.rebuilds = 0
+        self.updates = 0
+        self.feed = ChangeFeed()
+        self._tracking = False          # a subscriber needs events for every change
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._snapshot: InventorySnapshot | None = None
+
+    def _watcher(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA query_only = ON")
+        return self._conn
+
+    def get(self) -> InventorySnapshot:
+        """Return the current snapshot, updating or rebuilding it if the database has changed."""
+        events: list[dict] = []
+        with self._lock, tracing.watch(self._watcher()) as conn:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._snapshot is None or self._snapshot.version != version:
+                previous = self._snapshot
+                conn.execute("BEGIN")
+                try:
+                    updated = None
+                    structure = read_structure_version(conn)
+                    if previous is not None and structure is not None and structure == previous.structure_version:
+                        if self._tracking:
+                            previous.feasibility()
+                        supply = dict(conn.execute("SELECT uid, supply FROM ingredients"))
+                        updated = previous.with_supply(supply, version)
+                    if updated is not None:
+                        self._snapshot, events = updated
+                        self.updates += 1
+                    else:
+                        self._snapshot = self._load(conn, version, previous)
+                        self.rebuilds += 1
+                        if previous is not None and (self._tracking or previous._feasibility is not None):
+                            view = self._snapshot.feasibility()
+                            events = [{"type": "reload", "recipes": view.matrix.n_recipes, "can_make": view.feasible}]
+                finally:
+                    conn.execute("COMMIT")
+                self.feed.append(events)        # numbered in the order the changes were seen
+            snapshot = self._snapshot
+        self.feed.notify(events)                # outside the lock: subscribers may call tools
+        return snapshot
+
+    def subscribe(self, callback: Callable[[list[dict]], None]) -> Callable[[], None]:
+        """
+        Subscribe to the feasibility events of this database (see ChangeFeed).
+        From now on every snapshot keeps a feasibility view to diff against.
+        """
+        self._tracking = True
+        unsubscribe = self.feed.subscribe(callback)
+        self.get().feasibility()
+        return unsubscribe
+
+    def invalidate(self) -> None:
+        """Drop the current snapshot so the next get() rebuilds it."""
+        with self._lock:
+            self._snapshot = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._snapshot = None
@@ -0,0 +1,325 @@
+"""
+sweep.py
+--------
+Servings sweeps: "for each recipe, how much of everything else can I still
+make after 1..N servings of it?", on a process pool.
+
+A sweep is a grid of scenarios (consumed recipe x servings), each one a full
+evaluation of the catalog against the supply left by the scenario, which is
+what simulate_remaining_recipes computes for a single scenario. Here the grid
+is cut into tasks along both axes (blocks of scenarios x shards of recipes)
+and run on a ProcessPoolExecutor:
+
+- the read-only structure of the RequirementMatrix (indptr, indices, data) is
+  copied once into shared memory and workers map it by name, instead of the
+  matrix being pickled with every task; a task only carries its scenarios,
+  its recipe shard and the supply vector;
+- workers write can_make / max_servings straight into a shared output block
+  of shape (scenarios, recipes), so nothing large travels back either;
+- inside a task, a block of scenarios is evaluated at once as a 2-D array
+  (scenarios x requirement entries), not one evaluation per scenario.
+
+Small grids (below INLINE_WORK entry evaluations) run the same kernel in the
+calling process, where starting tasks would cost more than it saves.
+
+Usage:
+    pool = SweepPool(workers=8)
+    sweep = pool.run(matrix, rows=np.arange(matrix.n_recipes), max_servings=3)
+    sweep.can_make[i, s - 1, row], sweep.max_servings[i, s - 1, row]
+    pool.close()
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple
+
+import numpy as np
+
+from .engine import RequirementMatrix
+
+INLINE_WORK = 2_000_000       # scenarios x entries run without the pool below this
+TASKS_PER_WORKER = 4          # tasks per worker and sweep, for load balancing
+BLOCK_BYTES = 16 << 20        # scenarios evaluated together in a task, by memory
+START_METHOD = "spawn"        # the agent process runs threads; do not fork it
+
+_UNLIMITED = np.iinfo(np.int64).max
+
+
+class Sweep(NamedTuple):
+    """
+    Result of a servings sweep.
+
+    Attributes:
+        rows:         int64[k] consumed recipes (matrix rows).
+        max_servings: servings swept, 1..max_servings.
+        possible:     bool[k, max_servings] — the stock covers the scenario
+                      (otherwise simulate_remaining_recipes returns an error).
+        can_make:     bool[k, max_servings, n_recipes] per scenario, as
+                      RequirementMatrix.evaluate() computes it (all False for
+                      impossible scenarios).
+        servings:     int32[k, max_servings, n_recipes] max_servings likewise.
+        supply:       int64[n_ingredients] supply before consumption.
+    """
+    rows: np.ndarray
+    max_servings: int
+    possible: np.ndarray
+    can_make: np.ndarray
+    servings: np.ndarray
+    supply: np.ndarray
+
+    def remaining_supply(self, matrix: RequirementMatrix, i: int, servings: int) -> np.ndarray:
+        """The supply after ``servings`` of ``rows[i]``."""
+        return self.supply - matrix.requirement_vector(int(self.rows[i]), servings)
+
+
+# ── Kernel ────────────────────────────────────────────────────────────────────
+
+def capacity(indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, supply: np.ndarray) -> np.ndarray:
+    """
+    int64[n_recipes] most servings of each recipe the supply covers, counting
+    only ingredients with a quantity > 0 (unlimited for recipes without any).
+    """
+    n = len(indptr) - 1
+    result = np.full(n, _UNLIMITED, dtype=np.int64)
+    if not len(data):
+        return result
+    per_entry = np.where(data > 0, supply[indices] // np.maximum(data, 1), _UNLIMITED)
+    nonempty = np.diff(indptr) > 0
+    result[nonempty] = np.minimum.reduceat(per_entry, indptr[:-1][nonempty])
+    return result
+
+
+def _supplies(indptr, indices, data, supply, rows, servings) -> np.ndarray:
+    """int64[k, n_ingredients] supply left by each (row, servings) scenario."""
+    k = len(rows)
+    supplies = np.repeat(supply[None, :], k, axis=0)
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if total:
+        local_starts = np.cumsum(counts) - counts
+        entries = np.arange(total, dtype=np.int64) + np.repeat(starts - local_starts, counts)
+        scenario = np.repeat(np.arange(k, dtype=np.int64), counts)
+        supplies[scenario, indices[entries]] -= data[entries] * np.repeat(servings, counts)
+    return supplies
+
+
+def _evaluate_block(indptr, indices, data, lo: int, hi: int, supplies: np.ndarray):
+    """
+    ``(can_make, max_servings)`` of rows lo..hi for each supply vector, both
+    [k, hi - lo], with the formulas of RequirementMatrix.evaluate().
+    """
+    k = len(supplies)
+    start, stop = int(indptr[lo]), int(indptr[hi])
+    counts = np.diff(indptr[lo:hi + 1])
+    nonempty = counts > 0
+    can_make = np.ones((k, hi - lo), dtype=bool)
+    max_servings = np.zeros((k, hi - lo), dtype=np.int64)
+    if start == stop:
+        return can_make, max_servings
+
+    starts = indptr[lo:hi][nonempty] - start
+    cols, qty = indices[start:stop], data[start:stop]
+    available = supplies[:, cols]
+    can_make[:, nonempty] = ~np.logical_or.reduceat(available < qty, starts, axis=1)
+    per_entry = np.where(qty > 0, available // np.maximum(qty, 1), 0)
+    max_servings[:, nonempty] = np.minimum.reduceat(per_entry, starts, axis=1)
+    return can_make, max_servings
+
+
+def _run_task(indptr, indices, data, supply, rows, servings, targets, lo, hi, out_can, out_servings) -> None:
+    """Evaluate rows lo..hi for the given scenarios into out_*[targets, lo:hi]."""
+    entries = max(1, int(indptr[hi] - indptr[lo]))
+    block = max(1, BLOCK_BYTES // (entries * 8 * 3))
+    for b in range(0, len(rows), block):
+        part = slice(b, b + block)
+        supplies = _supplies(indptr, indices, data, supply, rows[part], servings[part])
+        can_make, max_servings = _evaluate_block(indptr, indices, data, lo, hi, supplies)
+        out_can[targets[part], lo:hi] = can_make
+        out_servings[targets[part], lo:hi] = np.minimum(max_servings, np.iinfo(out_servings.dtype).max)
+
+
+# ── Shared memory ─────────────────────────────────────────────────────────────
+
+def _share(arrays: dict[str, np.ndarray]) -> tuple[list[SharedMemory], dict]:
+    """Copy ``arrays`` into new shared memory blocks; returns (blocks, picklable spec)."""
+    blocks, spec = [], {}
+    for key, array in arrays.items():
+        block = SharedMemory(create=True, size=max(1, array.nbytes))
+        blocks.append(block)
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        spec[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def _empty_shared(shapes: dict[str, tuple[tuple, str]]) -> tuple[list[SharedMemory], dict]:
+    blocks, spec = [], {}
+    for key, (shape, dtype) in shapes.items():
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        block = SharedMemory(create=True, size=max(1, size))
+        blocks.append(block)
+        spec[key] = (block.name, shape, np.dtype(dtype).str)
+    return blocks, spec
+
+
+def _release(blocks: list[SharedMemory]) -> None:
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# Worker side: structure blocks stay mapped between tasks (a few structures at
+# most), output blocks are mapped for one task.
+_ATTACHED_STRUCTURES = 4
+_attached: "OrderedDict[str, SharedMemory]" = OrderedDict()
+
+
+def _attach(spec: dict, keep: bool) -> tuple[dict[str, np.ndarray], list[SharedMemory]]:
+    arrays, opened = {}, []
+    for key, (name, shape, dtype) in spec.items():
+        block = _attached.get(name) if keep else None
+        if block is None:
+            block = SharedMemory(name=name)
+            if keep:
+                _attached[name] = block
+                while len(_attached) > _ATTACHED_STRUCTURES * 3:
+                    _attached.popitem(last=False)[1].close()
+            else:
+                opened.append(block)
+        elif keep:
+            _attached.move_to_end(name)
+        arrays[key] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    return arrays, opened
+
+
+def _worker_task(structure: dict, output: dict, supply, rows, servings, targets, lo, hi) -> None:
+    s, _ = _attach(structure, keep=True)
+    out, opened = _attach(output, keep=False)
+    try:
+        _run_task(s["indptr"], s["indices"], s["data"], supply, rows, servings, targets, lo, hi,
+                  out["can_make"], out["servings"])
+    finally:
+        del s, out
+        for block in opened:
+            block.close()
+
+
+# ── Pool ──────────────────────────────────────────────────────────────────────
+
+def _shards(indptr: np.ndarray, n: int) -> list[tuple[int, int]]:
+    """Split the rows into ``n`` contiguous shards of about equal entry counts."""
+    rows = len(indptr) - 1
+    if n <= 1 or rows <= 1:
+        return [(0, rows)]
+    cuts = np.searchsorted(indptr, np.linspace(0, indptr[-1], n + 1)[1:-1])
+    bounds = np.unique(np.concatenate(([0], np.clip(cuts, 0, rows), [rows])))
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+class SweepPool:
+    """
+    Process pool for servings sweeps, with the matrix structure it last ran
+    on kept in shared memory (catalog structure changes are rare; supply
+    changes travel with each task).
+
+    Args:
+        workers:      Worker processes (0: os.cpu_count()). 1 runs everything inline.
+        start_method: multiprocessing start method of the workers.
+    """
+
+    def __init__(self, workers: int = 0, start_method: str = START_METHOD):
+        self.workers = workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._structure: tuple[tuple[np.ndarray, ...], list[SharedMemory], dict] | None = None
+
+    def _shared_structure(self, matrix: RequirementMatrix) -> dict:
+        arrays = (matrix.indptr, matrix.indices, matrix.data)
+        if self._structure is None or any(a is not b for a, b in zip(self._structure[0], arrays)):
+            if self._structure is not None:
+                _release(self._structure[1])
+            blocks, spec = _share(dict(zip(("indptr", "indices", "data"), arrays)))
+            self._structure = (arrays, blocks, spec)
+        return self._structure[2]
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context(self.start_method)
+            )
+        return self._executor
+
+    def run(
+        self,
+        matrix: RequirementMatrix,
+        rows: np.ndarray,
+        max_servings: int,
+        supply: np.ndarray | None = None,
+    ) -> Sweep:
+        """Sweep 1..max_servings servings of each of ``rows`` against ``supply`` (the matrix's)."""
+        supply = matrix.supply if supply is None else np.asarray(supply, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        k, n = len(rows), matrix.n_recipes
+        possible = np.arange(1, max_servings + 1)[None, :] <= capacity(
+            matrix.indptr, matrix.indices, matrix.data, supply
+        )[rows][:, None]
+        grid_rows, grid_servings = np.nonzero(possible)
+        scenario_rows = rows[grid_rows]
+        scenario_servings = (grid_servings + 1).astype(np.int64)
+        targets = grid_rows * max_servings + grid_servings
+        shape = (k * max_servings, n)
+
+        work = len(targets) * len(matrix.data)
+        if self.workers <= 1 or work < INLINE_WORK:
+            can_make, servings = np.zeros(shape, dtype=bool), np.zeros(shape, dtype=np.int32)
+            _run_task(matrix.indptr, matrix.indices, matrix.data, supply, scenario_rows,
+                      scenario_servings, targets, 0, n, can_make, servings)
+        else:
+            can_make, servings = self._run_pool(matrix, supply, scenario_rows, scenario_servings, targets, shape)
+        return Sweep(
+            rows, max_servings, possible,
+            can_make.reshape(k, max_servings, n), servings.reshape(k, max_servings, n), supply,
+        )
+
+    def _run_pool(self, matrix, supply, rows, servings, targets, shape) -> tuple[np.ndarray, np.ndarray]:
+        tasks = self.workers * TASKS_PER_WORKER
+        blocks = max(1, min(len(targets), tasks))
+        shards = _shards(matrix.indptr, -(-tasks // blocks))
+        with self._lock:
+            structure = self._shared_structure(matrix)
+            executor = self._get_executor()
+            out_blocks, output = _empty_shared({"can_make": (shape, "?"), "servings": (shape, "<i4")})
+            try:
+                futures = [
+                    executor.submit(_worker_task, structure, output, supply,
+                                    rows[part], servings[part], targets[part], lo, hi)
+                    for part in np.array_split(np.arange(len(targets)), blocks)
+                    for lo, hi in shards
+                    if len(part)
+                ]
+                for future in futures:
+                    future.result()
+                views = {
+                    key: np.ndarray(shp, np.dtype(dtype), buffer=block.buf)
+                    for block, (key, (_, shp, dtype)) in zip(out_blocks, output.items())
+                }
+                result = views["can_make"].copy(), views["servings"].copy()
+                del views
+            finally:
+                _release(out_blocks)
+        return result
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._structure is not None:
+                _release(self._structure[1])
+                self._structure = None
@@ -0,0 +1,399 @@
+"""
+tracing.py
+----------
+Lightweight spans and metrics for agent turns, model calls, tool calls and
+SQLite, to tell where the time of a slow turn went.
+
+    agent turn        before/after_agent_callback
+      model call      before/after_model_callback (LiteLlm -> Ollama), with token counts
+      tool call       traced_tool() around every tool in root_agent.tools:
+                      tool name, args hash, SQL statements, SQL rows, payload bytes
+        SQLite        watch() on the connections handed out by core._get_conn and
+                      used by the snapshot cache counts statements and rows
+
+Tracing is off by default. Turn it on with ``SQL_AGENT_TRACING=1`` (and
+optionally ``SQL_AGENT_TRACE_SAMPLE=0.1``) or configure(enabled=True). When
+off, a tool call costs one extra global lookup. When on, every call updates
+the metrics (count, errors, duration histogram) but only sampled turns record
+spans, count statements and rows, and measure payload size.
+
+Finished spans are kept in a bounded in-memory buffer and exported as
+OpenTelemetry OTLP/JSON (otlp_json, write_otlp_json); metrics are exported in
+the Prometheus text format (prometheus_text). serve() exposes both over HTTP:
+
+    GET /metrics    Prometheus text
+    GET /spans      OTLP/JSON of the buffered spans
+"""
+
+import functools
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+ENABLED = os.environ.get("SQL_AGENT_TRACING", "").lower() not in ("", "0", "false", "no")
+SAMPLE_RATE = float(os.environ.get("SQL_AGENT_TRACE_SAMPLE", "1.0"))
+MAX_SPANS = 10_000
+SERVICE_NAME = "sql_agent"
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    """One timed operation. ``sampled`` spans are exported; others only feed the metrics."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "statements", "rows", "error")
+
+    def __init__(self, name: str, kind: str, parent: "Span | None", sampled: bool):
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind            # "agent" | "model" | "tool"
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: dict[str, Any] = {}
+        self.statements = 0
+        self.rows = 0
+        self.error: str | None = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "kind": self.kind,
+            "start_ns": self.start_ns, "end_ns": self.end_ns,
+            "attributes": dict(self.attributes), "error": self.error,
+        }
+
+
+_current: ContextVar[Span | None] = ContextVar("sql_agent_span", default=None)
+_open: dict[tuple[str, str], tuple[Span, Any]] = {}   # (invocation id, kind) -> (span, context token)
+_spans: deque[Span] = deque(maxlen=MAX_SPANS)
+_metrics: dict[tuple[str, str], dict] = {}
+_lock = threading.Lock()
+
+
+def configure(enabled: bool | None = None, sample_rate: float | None = None, max_spans: int | None = None) -> None:
+    global ENABLED, SAMPLE_RATE, _spans
+    if enabled is not None:
+        ENABLED = enabled
+    if sample_rate is not None:
+        SAMPLE_RATE = sample_rate
+    if max_spans is not None:
+        with _lock:
+            _spans = deque(_spans, maxlen=max_spans)
+
+
+def clear() -> None:
+    """Drop buffered spans and reset every metric."""
+    with _lock:
+        _spans.clear()
+        _metrics.clear()
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+# ── Spans ─────────────────────────────────────────────────────────────────────
+
+def _begin(name: str, kind: str) -> Span:
+    parent = _current.get()
+    sampled = parent.sampled if parent else random.random() < SAMPLE_RATE
+    return Span(name, kind, parent, sampled)
+
+
+def _finish(span: Span) -> None:
+    span.end_ns = time.time_ns()
+    seconds = span.seconds
+    with _lock:
+        m = _metrics.get((span.kind, span.name))
+        if m is None:
+            m = _metrics[(span.kind, span.name)] = {
+                "count": 0, "errors": 0, "seconds": 0.0, "buckets": [0] * len(DURATION_BUCKETS),
+                "sampled": 0, "statements": 0, "rows": 0, "bytes": 0,
+            }
+        m["count"] += 1
+        m["errors"] += span.error is not None
+        m["seconds"] += seconds
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                m["buckets"][i] += 1
+        if span.sampled:
+            m["sampled"] += 1
+            m["statements"] += span.statements
+            m["rows"] += span.rows
+            m["bytes"] += span.attributes.get("payload.bytes", 0)
+            _spans.append(span)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal") -> Iterator[Span | None]:
+    """Time the enclosed block as a child of the current span (no-op when tracing is off)."""
+    if not ENABLED:
+        yield None
+        return
+    current = _begin(name, kind)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = type(exc).__name__
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current)
+
+
+def _args_hash(args: tuple, kwargs: dict) -> str:
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def traced_tool(fn: Callable) -> Callable:
+    """
+    Wrap a tool so each call is recorded as a "tool" span. functools.wraps
+    keeps the name, docstring and signature ADK builds the declaration from.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return fn(*args, **kwargs)
+        with span(fn.__name__, "tool") as current:
+            result = fn(*args, **kwargs)
+            if isinstance(result, dict) and "error" in result:
+                current.error = "tool_error"
+            if current.sampled:
+                current.attributes["tool.args_hash"] = _args_hash(args, kwargs)
+                current.attributes["payload.bytes"] = len(json.dumps(result, default=str))
+                current.attributes["sql.statements"] = current.statements
+                current.attributes["sql.rows"] = current.rows
+            return result
+
+    return wrapper
+
+
+# ── SQLite ────────────────────────────────────────────────────────────────────
+
+@contextmanager
+def watch(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Count the statements run and rows fetched on ``conn`` into the current sampled span."""
+    current = _current.get() if ENABLED else None
+    if current is None or not current.sampled:
+        yield conn
+        return
+    row_factory = conn.row_factory
+
+    def count_statement(_sql: str) -> None:
+        current.statements += 1
+
+    def count_row(cursor, row):
+        current.rows += 1
+        return row if row_factory is None else row_factory(cursor, row)
+
+    conn.set_trace_callback(count_statement)
+    conn.row_factory = count_row
+    try:
+        yield conn
+    finally:
+        conn.set_trace_callback(None)
+        conn.row_factory = row_factory
+
+
+# ── ADK callbacks ─────────────────────────────────────────────────────────────
+
+def _open_span(callback_context, kind: str, name: str) -> Span:
+    current = _begin(name, kind)
+    _open[(callback_context.invocation_id, kind)] = (current, _current.set(current))
+    return current
+
+
+def _close_span(callback_context, kind: str) -> Span | None:
+    entry = _open.pop((callback_context.invocation_id, kind), None)
+    if entry is None:
+        return None
+    current, token = entry
+    try:
+        _current.reset(token)
+    except ValueError:          # closed from another context: just drop the reference
+        _current.set(None)
+    _finish(current)
+    return current
+
+
+def before_agent(callback_context):
+    if ENABLED:
+        _open_span(callback_context, "agent", callback_context.agent_name)
+    return None
+
+
+def after_agent(callback_context):
+    if ENABLED:
+        _close_span(callback_context, "agent")
+    return None
+
+
+def before_model(callback_context, llm_request):
+    if ENABLED:
+        current = _open_span(callback_context, "model", llm_request.model or "model")
+        current.attributes["llm.messages"] = len(llm_request.contents or ())
+    return None
+
+
+def after_model(callback_context, llm_response):
+    if ENABLED:
+        entry = _open.get((callback_context.invocation_id, "model"))
+        usage = getattr(llm_response, "usage_metadata", None)
+        if entry is not None and usage is not None:
+            entry[0].attributes["llm.prompt_tokens"] = usage.prompt_token_count or 0
+            entry[0].attributes["llm.completion_tokens"] = usage.candidates_token_count or 0
+        if entry is not None and llm_response.error_code:
+            entry[0].error = str(llm_response.error_code)
+        _close_span(callback_context, "model")
+    return None
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+
+def spans() -> list[dict]:
+    """Finished sampled spans, oldest first."""
+    with _lock:
+        return [s.to_dict() for s in _spans]
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_json() -> dict:
+    """Buffered spans as an OTLP/JSON ExportTraceServiceRequest."""
+    with _lock:
+        finished = list(_spans)
+    kinds = {"agent": 1, "model": 3, "tool": 1}  # INTERNAL, CLIENT
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "sql_agent.tracing"},
+            "spans": [
+                {
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                    "name": f"{s.kind} {s.name}",
+                    "kind": kinds.get(s.kind, 1),
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)}
+                        for key, value in {f"{s.kind}.name": s.name, **s.attributes}.items()
+                    ],
+                    "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                }
+                for s in finished
+            ],
+        }],
+    }]}
+
+
+def write_otlp_json(path: str) -> int:
+    """Write otlp_json() to ``path``. Returns the number of spans written."""
+    document = otlp_json()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+    return len(document["resourceSpans"][0]["scopeSpans"][0]["spans"])
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    """Metrics in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = {
+            (kind, _label(name)): {**m, "buckets": list(m["buckets"])}
+            for (kind, name), m in _metrics.items()
+        }
+    lines = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP sql_agent_{name} {help_text}")
+        lines.append(f"# TYPE sql_agent_{name} {kind}")
+
+    family("calls_total", "counter", "Calls per span kind and name.")
+    for (kind, name), m in snapshot.items():
+        lines.append(f'sql_agent_calls_total{{kind="{kind}",name="{name}"}} {m["count"]}')
+    family("errors_total", "counter", "Calls that raised or returned an error.")
+    for (kind, name), m in snapshot.items():
+        lines.append(f'sql_agent_errors_total{{kind="{kind}",name="{name}"}} {m["errors"]}')
+    family("duration_seconds", "histogram", "Wall time per call.")
+    for (kind, name), m in snapshot.items():
+        labels = f'kind="{kind}",name="{name}"'
+        for bound, count in zip(DURATION_BUCKETS, m["buckets"]):
+            lines.append(f'sql_agent_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'sql_agent_duration_seconds_bucket{{{labels},le="+Inf"}} {m["count"]}')
+        lines.append(f"sql_agent_duration_seconds_sum{{{labels}}} {m['seconds']:.6f}")
+        lines.append(f"sql_agent_duration_seconds_count{{{labels}}} {m['count']}")
+    for metric, key, help_text in (
+        ("sampled_calls_total", "sampled", "Calls recorded as spans."),
+        ("sql_statements_total", "statements", "SQL statements run by sampled tool calls."),
+        ("sql_rows_total", "rows", "SQL rows fetched by sampled tool calls."),
+        ("payload_bytes_total", "bytes", "JSON size of sampled tool results."),
+    ):
+        family(metric, "counter", help_text)
+        for (kind, name), m in snapshot.items():
+            if kind == "tool":
+                lines.append(f'sql_agent_{metric}{{name="{name}"}} {m[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def serve(port: int = 9464, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """Serve /metrics and /spans from a daemon thread. Call .shutdown() to stop."""
+    # Imported here: http.server (email, html, mimetypes, ...) is a large part
+    # of the tool layer's import time and only the metrics endpoint needs it.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/spans":
+                body, content_type = json.dumps(otlp_json()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # keep the agent's console quiet
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="sql-agent-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,332 @@
+"""
+writes.py
+---------
+Group commit for the inventory mutation tools in core.py.
+
+Stock updates arrive in bursts from several terminals and agent sessions.
+Committing each one in its own transaction costs a WAL sync and a round of
+write-lock contention per update. A WriteBatcher owns the one writer
+connection of a database and a writer thread: mutations submitted from any
+thread are queued, and the thread applies everything that queued up while
+the previous commit ran (at most ``max_batch``, optionally waiting up to
+``linger`` seconds for more) in ONE transaction:
+
+    BEGIN IMMEDIATE
+      SAVEPOINT mutation; <mutation 1>; RELEASE mutation
+      SAVEPOINT mutation; <mutation 2> raises Rejected; ROLLBACK TO mutation; RELEASE mutation
+      ...
+    COMMIT
+
+Every mutation still succeeds or fails on its own: one that raises Rejected
+(failed validation, stale version) is rolled back to its savepoint and its
+caller gets the rejection result, the others commit. submit() returns once
+the commit holding the mutation is done.
+
+A mutation is a function of the writer connection. It runs while the batch
+holds the database write lock, so it should be a few short statements.
+
+The mutations used by core.py are at the bottom: adjust() applies supply
+changes guarded by row versions (ingredients.version, migration 5) and
+returns the new values straight from ``UPDATE ... RETURNING``.
+
+Usage:
+    batcher = WriteBatcher("recipes.db")
+    batcher.submit(lambda conn: adjust(conn, [{"uid": "...", "name": "eggs", "delta": 12}]))
+    batcher.stats()   # {"batches": 1, "mutations": 1, "mean_batch": 1.0, ...}
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from . import tracing
+from .pool import DEFAULT_PRAGMAS
+
+MAX_BATCH = 64
+LINGER_S = 0.0                # extra wait for stragglers once a batch has started
+BUSY_TIMEOUT_MS = 5_000       # wait for writers in other processes
+
+Mutation = Callable[[sqlite3.Connection], Any]
+
+
+class Rejected(Exception):
+    """Raised by a mutation to undo its own changes and hand ``result`` to its caller."""
+
+    def __init__(self, result: dict):
+        super().__init__(result.get("error", "rejected"))
+        self.result = result
+
+
+class _Pending:
+    __slots__ = ("mutation", "future", "queued", "batch_size")
+
+    def __init__(self, mutation: Mutation):
+        self.mutation = mutation
+        self.future: Future = Future()
+        self.queued = time.perf_counter()
+        self.batch_size = 0
+
+
+# ── Batcher ───────────────────────────────────────────────────────────────────
+
+class WriteBatcher:
+    """
+    Serialises the writes to one database through a writer thread that
+    commits them in batches.
+
+    Args:
+        db_path:    Path of the SQLite database file.
+        pragmas:    PRAGMAs applied to the writer connection (DEFAULT_PRAGMAS).
+        max_batch:  Most mutations committed together.
+        linger:     Seconds to wait for more mutations after the first one of
+                    a batch arrives (0 commits whatever is already queued).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        pragmas: dict[str, Any] | None = None,
+        max_batch: int = MAX_BATCH,
+        linger: float = LINGER_S,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.linger = linger
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        for name, value in (DEFAULT_PRAGMAS if pragmas is None else pragmas).items():
+            self._conn.execute(f"PRAGMA {name} = {value}")
+        self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        self._queue: "queue.SimpleQueue[_Pending | None]" = queue.SimpleQueue()
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "mutations": 0, "rejected": 0, "failed": 0, "max_batch": 0, "commit_s": 0.0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="sql_agent_writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, mutation: Mutation) -> Any:
+        """
+        Run ``mutation(conn)`` in the next batch and return its result once
+        committed; a Rejected mutation returns its ``result`` instead. Other
+        exceptions of the mutation, or of the batch's BEGIN/COMMIT, are raised.
+        """
+        if self._closed:
+            raise RuntimeError("WriteBatcher is closed")
+        pending = _Pending(mutation)
+        self._queue.put(pending)
+        result = pending.future.result()
+        current = tracing.current_span()
+        if current is not None:
+            current.attributes["write.batch_size"] = pending.batch_size
+            current.attributes["write.wait_ms"] = (time.perf_counter() - pending.queued) * 1e3
+        return result
+
+    def _collect(self, first: _Pending) -> tuple[list[_Pending], bool]:
+        """``first`` plus whatever else is queued (up to max_batch); True when close() was seen."""
+        batch = [first]
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                wait = deadline - time.perf_counter()
+                item = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, closing = self._collect(item)
+            self._apply(batch)
+            if closing:
+                break
+        self._conn.close()
+
+    def _apply(self, batch: list[_Pending]) -> None:
+        conn = self._conn
+        outcomes: list[tuple[_Pending, Any, BaseException | None]] = []
+        rejected = 0
+        started = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for pending in batch:
+                conn.execute("SAVEPOINT mutation")
+                try:
+                    result = pending.mutation(conn)
+                except Rejected as exc:
+                    result, error = exc.result, None
+                    rejected += 1
+                except Exception as exc:        # this mutation fails, the batch goes on
+                    result, error = None, exc
+                else:
+                    conn.execute("RELEASE mutation")
+                    outcomes.append((pending, result, None))
+                    continue
+                conn.execute("ROLLBACK TO mutation")
+                conn.execute("RELEASE mutation")
+                outcomes.append((pending, result, error))
+            conn.execute("COMMIT")
+        except Exception as exc:                # BEGIN or COMMIT failed: nothing was applied
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(pending, None, exc) for pending in batch]
+            rejected = 0
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            s = self._stats
+            s["batches"] += 1
+            s["mutations"] += len(batch)
+            s["rejected"] += rejected
+            s["failed"] += sum(1 for _, _, error in outcomes if error is not None)
+            s["max_batch"] = max(s["max_batch"], len(batch))
+            s["commit_s"] += elapsed
+        for pending, result, error in outcomes:
+            pending.batch_size = len(batch)
+            if error is not None:
+                pending.future.set_exception(error)
+            else:
+                pending.future.set_result(result)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            {"batches": 40, "mutations": 512, "mean_batch": 12.8, "max_batch": 31,
+             "rejected": 3, "failed": 0, "mean_commit_ms": 1.9, "queued": 0}
+        """
+        with self._stats_lock:
+            s = dict(self._stats)
+        batches = s["batches"] or 1
+        return {
+            "batches":        s["batches"],
+            "mutations":      s["mutations"],
+            "mean_batch":     round(s["mutations"] / batches, 2),
+            "max_batch":      s["max_batch"],
+            "rejected":       s["rejected"],
+            "failed":         s["failed"],
+            "mean_commit_ms": round(s["commit_s"] / batches * 1e3, 3),
+            "queued":         self._queue.qsize(),
+        }
+
+    def close(self) -> None:
+        """Apply what is queued, then stop the writer thread and close its connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+# ── Mutations ─────────────────────────────────────────────────────────────────
+
+_ADD_SQL = """
+    UPDATE ingredients SET supply = supply + :delta, version = version + 1
+    WHERE uid = :uid AND supply + :delta >= 0 AND (:expected IS NULL OR version = :expected)
+    RETURNING name, supply, version
+"""
+_SET_SQL = """
+    UPDATE ingredients SET supply = :supply, version = version + 1
+    WHERE uid = :uid AND (:expected IS NULL OR version = :expected)
+    RETURNING name, supply, version
+"""
+
+
+def adjust(conn: sqlite3.Connection, changes: list[dict]) -> list[dict]:
+    """
+    Apply supply changes, all or nothing.
+
+    Each change is {"uid", "name", "delta"} or {"uid", "name", "supply"} (an
+    absolute value), with an optional "expected_version": the change only
+    applies while the ingredient's version is still that value. Every applied
+    change bumps the version by one. Changes to the same ingredient apply in
+    order.
+
+    Returns:
+        [{"name": "eggs", "supply": 22, "version": 4}, ...]   # one per change
+
+    Raises:
+        Rejected with {"error": ..., "shortages": [...], "conflicts": [...],
+        "unknown": [...]} (only the non-empty lists) when a change would take
+        a supply below zero, a version check fails or an ingredient is gone.
+    """
+    applied, shortages, conflicts, unknown = [], [], [], []
+    for change in changes:
+        params = {"uid": change["uid"], "expected": change.get("expected_version")}
+        if "supply" in change:
+            row = conn.execute(_SET_SQL, {**params, "supply": change["supply"]}).fetchone()
+        else:
+            row = conn.execute(_ADD_SQL, {**params, "delta": change["delta"]}).fetchone()
+        if row is not None:
+            applied.append({"name": row[0], "supply": row[1], "version": row[2]})
+            continue
+
+        current = conn.execute(
+            "SELECT name, supply, version FROM ingredients WHERE uid = ?", (change["uid"],)
+        ).fetchone()
+        if current is None:
+            unknown.append(change["name"])
+        elif params["expected"] is not None and current[2] != params["expected"]:
+            conflicts.append({
+                "name":             current[0],
+                "expected_version": params["expected"],
+                "version":          current[2],
+                "supply":           current[1],
+            })
+        else:
+            shortages.append({
+                "name":     current[0],
+                "required": -change["delta"],
+                "in_stock": current[1],
+                "shortage": -change["delta"] - current[1],
+            })
+
+    if shortages or conflicts or unknown:
+        if conflicts:
+            error = "The stock changed since it was read; read it again and retry."
+        elif shortages:
+            error = "Not enough stock; nothing was changed."
+        else:
+            error = "Unknown ingredient; nothing was changed."
+        result: dict = {"error": error}
+        for key, items in (("shortages", shortages), ("conflicts", conflicts), ("unknown", unknown)):
+            if items:
+                result[key] = items
+        raise Rejected(result)
+    return applied
+
+
+def consume(conn: sqlite3.Connection, recipe_uid: str, servings: int) -> list[dict]:
+    """
+    Subtract ``servings`` x the ingredients of a recipe, all or nothing
+    (see adjust()).
+
+    Returns:
+        [{"name": "eggs", "used": 6, "supply": 4, "version": 3}, ...]   # by ingredient name
+    """
+    rows = conn.execute(
+        """
+        SELECT i.uid, i.name, ri.quantity
+        FROM recipes r
+        JOIN recipe_ingredient ri ON ri.recipe_id = r.id
+        JOIN ingredients i        ON i.id = ri.ingredient_id
+        WHERE r.uid = ?
+        ORDER BY i.name
+        """,
+        (recipe_uid,),
+    ).fetchall()
+    if not rows:
+        raise Rejected({"error": "The recipe has no ingredients defined; nothing was changed."})
+    changes = [{"uid": uid, "name": name, "delta": -quantity * servings} for uid, name, quantity in rows]
+    return [
+        {"name": item["name"], "used": -change["delta"], "supply": item["supply"], "version": item["version"]}
+        for change, item in zip(changes, adjust(conn, changes))
+    ]
@@ -0,0 +1,64 @@
+"""
+conftest.py
+-----------
+Shared fixtures: seeded catalog databases in a temporary directory, core
+pointed at one of them, and a log of the SQL statements run.
+
+Run from the repository root:
+    python -m pytest
+"""
+
+import sqlite3
+
+import pytest
+
+from sql_agent import core, init_db
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """``make_db(records=DEMO_CATALOG, name="recipes.db")``: a new database file filled with ``records``."""
+    def make(records=init_db.DEMO_CATALOG, name: str = "recipes.db") -> str:
+        path = str(tmp_path / name)
+        init_db.bulk_load(path, records)
+        return path
+    return make
+
+
+@pytest.fixture
+def use_db(monkeypatch):
+    """
+    ``use_db(path, **settings)``: point core at ``path`` with the given module
+    settings (e.g. USE_SNAPSHOT=False). Settings are restored and every pool,
+    snapshot and writer is closed afterwards.
+    """
+    def use(path: str, **settings) -> None:
+        core.close_pools()
+        monkeypatch.setattr(core, "DB_PATH", path)
+        for name, value in settings.items():
+            monkeypatch.setattr(core, name, value)
+    yield use
+    core.close_pools()
+
+
+@pytest.fixture
+def demo(make_db, use_db) -> str:
+    """core on a fresh copy of the demo catalog (verbose results); the database path."""
+    path = make_db()
+    use_db(path, COMPACT_RESULTS=False)
+    return path
+
+
+@pytest.fixture
+def statements(monkeypatch) -> list[str]:
+    """The SQL statements run on every connection opened after the fixture (trace callback)."""
+    log: list[str] = []
+    connect = sqlite3.connect
+
+    def traced(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(log.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", traced)
+    return log
@@ -0,0 +1,137 @@
+"""
+test_async_tools.py
+-------------------
+sql_agent.async_tools: timeouts and cancellation interrupt the SQLite
+statement of a running call and release its connection; the executor and the
+per-loop semaphore bound how many calls run at once.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from sql_agent import async_tools, core
+
+# Counts for minutes unless interrupted.
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1e10) SELECT count(*) FROM c"
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """``workers(n)``: run async_tools on a fresh executor of ``n`` threads."""
+    def use(n: int) -> None:
+        async_tools.shutdown()
+        monkeypatch.setattr(async_tools, "WORKERS", n)
+    yield use
+    async_tools.shutdown()
+
+
+class _SlowQuery:
+    """A tool that runs ENDLESS on a pooled connection and records how it ended."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self.error: BaseException | None = None
+
+    def __call__(self) -> dict:
+        try:
+            with core._get_conn() as conn:
+                self.started.set()
+                conn.execute(ENDLESS).fetchone()
+        except BaseException as exc:
+            self.error = exc
+            raise
+        finally:
+            self.finished.set()
+        return {}
+
+    def assert_interrupted(self) -> None:
+        assert self.finished.wait(10), "the statement was not interrupted"
+        assert isinstance(self.error, sqlite3.OperationalError) and "interrupted" in str(self.error)
+        assert core._get_pool().stats()["in_use"] == 0
+
+
+# ── Timeouts and cancellation ─────────────────────────────────────────────────
+
+def test_a_timed_out_call_is_interrupted_and_releases_its_connection(demo):
+    slow = _SlowQuery()
+    started = time.perf_counter()
+    result = asyncio.run(async_tools.call(slow, timeout=0.2))
+    assert "did not finish within 0.2s" in result["error"]
+    assert time.perf_counter() - started < 5
+    slow.assert_interrupted()
+    assert core.get_inventory()[0]["name"] == "apple"     # the released connection still works
+
+
+def test_a_cancelled_call_is_interrupted_and_releases_its_connection(demo):
+    slow = _SlowQuery()
+
+    async def cancel_while_running():
+        task = asyncio.create_task(async_tools.call(slow, timeout=None))
+        while not slow.started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_running())
+    slow.assert_interrupted()
+
+
+def test_a_call_that_times_out_waiting_for_a_worker_never_runs(demo, workers):
+    workers(1)
+    release, ran = threading.Event(), []
+
+    async def main():
+        busy = asyncio.create_task(async_tools.call(release.wait, timeout=None))
+        await asyncio.sleep(0.05)
+        waiting = await async_tools.call(ran.append, "ran", timeout=0.1)
+        release.set()
+        await busy
+        return waiting
+
+    assert "error" in asyncio.run(main())
+    assert ran == []
+
+
+def test_calls_without_a_cancellation_event_run_unchanged(demo):
+    assert core._cancelled.get() is None
+    assert asyncio.run(async_tools.get_max_servings("lemon cake"))["max_servings"] == 1
+
+
+# ── Bounds ────────────────────────────────────────────────────────────────────
+
+def test_at_most_workers_calls_run_at_once(demo, workers):
+    workers(2)
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def tool(i: int) -> int:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return i
+
+    async def main():
+        return await asyncio.gather(*(async_tools.call(tool, i) for i in range(8)))
+
+    assert asyncio.run(main()) == list(range(8))
+    assert peak[0] == 2
+
+
+def test_every_event_loop_gets_its_own_semaphore(demo, workers):
+    workers(2)
+
+    async def slots():
+        await async_tools.call(core.get_inventory)
+        return async_tools._get_slots(asyncio.get_running_loop())
+
+    first, second = asyncio.run(slots()), asyncio.run(slots())
+    assert first is not second
+    assert first._value == second._value == 2         # every slot was given back
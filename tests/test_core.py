@@ -0,0 +1,526 @@
+"""
+test_core.py
+------------
+Behaviour of the tool functions in sql_agent.core on seeded catalogs.
+"""
+
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from sql_agent import async_tools, compiled, core, fts, init_db, migrations, router
+
+
+def _synthetic(n_recipes: int) -> list[dict]:
+    return list(init_db.synthetic_catalog(n_recipes, 40, (1, 6), seed=1))
+
+
+def _without_uids(recipes: list[dict]) -> list[dict]:
+    return [{k: v for k, v in r.items() if k != "uid"} for r in recipes]
+
+
+# ── Catalog-wide reads (one ordered JOIN) ─────────────────────────────────────
+
+def test_get_all_recipes_lists_every_recipe_with_its_ingredients(demo):
+    assert _without_uids(core.get_all_recipes()) == [
+        {"name": "apple cake", "ingredients": [
+            {"name": "apple", "quantity": 2, "supply": 2},
+            {"name": "eggs", "quantity": 3, "supply": 10},
+            {"name": "milk", "quantity": 1, "supply": 2},
+        ]},
+        {"name": "lemon cake", "ingredients": [
+            {"name": "eggs", "quantity": 3, "supply": 10},
+            {"name": "lemon", "quantity": 3, "supply": 3},
+            {"name": "milk", "quantity": 1, "supply": 2},
+        ]},
+        {"name": "scramble eggs", "ingredients": [
+            {"name": "eggs", "quantity": 5, "supply": 10},
+        ]},
+    ]
+
+
+def test_check_recipe_feasibility_reports_shortages(make_db, use_db):
+    records = [dict(r) for r in init_db.DEMO_CATALOG]
+    records[4] = {"type": "ingredient", "name": "lemon", "supply": 1}
+    use_db(make_db(records), COMPACT_RESULTS=False)
+    feasibility = {r["recipe_name"]: r for r in core.check_recipe_feasibility()}
+    assert feasibility["apple cake"]["can_make"] is True
+    assert feasibility["lemon cake"]["missing_ingredients"] == [
+        {"name": "lemon", "required": 3, "in_stock": 1, "shortage": 2}
+    ]
+
+
+# Statements per call, whatever the catalog size: read-through tools run one
+# JOIN (plus one name lookup), snapshot reads one PRAGMA data_version.
+STATEMENTS_PER_CALL = {
+    (False, "get_all_recipes"):            1,
+    (False, "check_recipe_feasibility"):   1,
+    (False, "simulate_remaining_recipes"): 2,
+    (True, "get_all_recipes"):             1,
+    (True, "check_recipe_feasibility"):    1,
+    (True, "simulate_remaining_recipes"):  1,
+}
+
+
+@pytest.mark.parametrize("use_snapshot", [False, True], ids=["read-through", "snapshot"])
+@pytest.mark.parametrize("n_recipes", [20, 400])
+def test_statements_per_call_do_not_grow_with_the_catalog(make_db, use_db, statements, use_snapshot, n_recipes):
+    records = _synthetic(n_recipes)
+    recipe = next(r["name"] for r in records if r["type"] == "recipe")
+    use_db(make_db(records), USE_SNAPSHOT=use_snapshot, COMPACT_RESULTS=False)
+    calls = {
+        "get_all_recipes":            lambda: core.get_all_recipes(),
+        "check_recipe_feasibility":   lambda: core.check_recipe_feasibility(),
+        "simulate_remaining_recipes": lambda: core.simulate_remaining_recipes(recipe, servings=0),
+    }
+    for name, call in calls.items():
+        call()                      # opens the connections and builds the snapshot
+        statements.clear()
+        call()
+        assert len(statements) == STATEMENTS_PER_CALL[use_snapshot, name], (name, statements)
+
+
+def test_read_through_get_max_servings_reads_one_recipe(make_db, use_db, monkeypatch):
+    records = _synthetic(400)
+    recipe = next(r["name"] for r in records if r["type"] == "recipe")
+    path = make_db(records)
+    use_db(path, USE_SNAPSHOT=True)
+    expected = core.get_max_servings(recipe)
+    use_db(path, USE_SNAPSHOT=False)
+    monkeypatch.setattr(core._SqlCatalog, "requirement_matrix", lambda self: pytest.fail("built the matrix"))
+    assert core.get_max_servings(recipe) == expected
+
+
+# ── Snapshot vs read-through ──────────────────────────────────────────────────
+
+def _read_tools(recipe: str) -> dict:
+    return {
+        "get_all_recipes":            core.get_all_recipes(),
+        "get_inventory":              core.get_inventory(),
+        "check_recipe_feasibility":   core.check_recipe_feasibility(),
+        "get_recipe_by_id":           core.get_recipe_by_id(recipe),
+        "get_missing_ingredients":    core.get_missing_ingredients(recipe),
+        "get_max_servings":           core.get_max_servings(recipe),
+        "simulate_remaining_recipes": core.simulate_remaining_recipes(recipe, servings=0),
+    }
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["verbose", "compact"])
+def test_snapshot_answers_like_read_through(make_db, use_db, compact):
+    records = _synthetic(300)
+    recipe = next(r["name"] for r in records if r["type"] == "recipe")
+    path = make_db(records)
+    use_db(path, USE_SNAPSHOT=False, COMPACT_RESULTS=compact)
+    expected = _read_tools(recipe)
+    for compiled in (False, True):
+        use_db(path, USE_SNAPSHOT=True, USE_COMPILED_CATALOG=compiled, COMPACT_RESULTS=compact)
+        assert _read_tools(recipe) == expected
+
+
+def _rebuilt_in_place(make_db, path: str) -> None:
+    """Replace the database at ``path`` by a new load of the demo catalog (new uids), keeping its .catalog."""
+    with open(make_db(name="rebuilt.db"), "rb") as src, open(path, "wb") as dst:
+        dst.write(src.read())
+
+
+def test_compiled_catalog_is_rebuilt_for_a_database_with_new_uids(make_db, use_db):
+    path = make_db()
+    use_db(path, USE_SNAPSHOT=True, USE_COMPILED_CATALOG=True, COMPACT_RESULTS=False)
+    before = core.get_all_recipes()
+    assert os.path.exists(compiled.compiled_path(path))
+
+    _rebuilt_in_place(make_db, path)
+    use_db(path, USE_SNAPSHOT=True, USE_COMPILED_CATALOG=True, COMPACT_RESULTS=False)
+    after = core.get_all_recipes()
+    assert _without_uids(after) == _without_uids(before)
+    assert {r["uid"] for r in after}.isdisjoint(r["uid"] for r in before)
+    assert core.get_max_servings("scramble eggs")["max_servings"] == 2
+
+
+def test_compiled_catalog_with_unknown_ingredients_is_treated_as_stale(make_db, use_db, monkeypatch):
+    path = make_db()
+    use_db(path, USE_SNAPSHOT=True, USE_COMPILED_CATALOG=True, COMPACT_RESULTS=False)
+    catalog_key = compiled.catalog_key
+    monkeypatch.setattr(compiled, "catalog_key", lambda conn: {**catalog_key(conn), "uids": None})
+    core.get_inventory()
+
+    _rebuilt_in_place(make_db, path)        # same key once the digest is ignored
+    use_db(path, USE_SNAPSHOT=True, USE_COMPILED_CATALOG=True, COMPACT_RESULTS=False)
+    assert core.get_max_servings("lemon cake")["max_servings"] == 1
+
+
+def test_bulk_load_deletes_the_compiled_catalog(make_db):
+    path = make_db()
+    with sqlite3.connect(path) as conn:
+        compiled.compile_catalog(conn, compiled.compiled_path(path))
+    conn.close()
+    init_db.bulk_load(path, [{"type": "ingredient", "name": "flour", "supply": 5}])
+    assert not os.path.exists(compiled.compiled_path(path))
+
+
+def test_snapshot_sees_writes_by_other_connections(demo):
+    assert core.get_max_servings("scramble eggs")["max_servings"] == 2
+    with sqlite3.connect(demo) as conn:
+        conn.execute("UPDATE ingredients SET supply = 25 WHERE name = 'eggs'")
+    conn.close()
+    assert core.get_max_servings("scramble eggs")["max_servings"] == 5
+
+
+def test_an_old_snapshot_keeps_its_names_across_a_rebuild(demo, use_db):
+    use_db(demo, USE_COMPILED_CATALOG=False, COMPACT_RESULTS=False)
+    old = core._get_snapshot()
+    with sqlite3.connect(demo) as conn:
+        init_db.bulk_load(demo, [
+            {"type": "ingredient", "name": "banana", "supply": 4},
+            {"type": "recipe", "name": "banana bread", "ingredients": [{"name": "banana", "quantity": 2}]},
+        ])
+        conn.execute("DELETE FROM recipe_ingredient WHERE recipe_id = (SELECT id FROM recipes WHERE name = 'apple cake')")
+        conn.execute("DELETE FROM recipes WHERE name = 'apple cake'")
+    conn.close()
+    new = core._get_snapshot()
+    assert new is not old
+    assert new.find_recipe("banana bread")["name"] == "banana bread"
+    assert new.find_recipe("apple cake") is None
+
+    assert old.find_recipe("banana bread") is None
+    assert old.find_recipe("apple cake")["name"] == "apple cake"
+    assert all(m.key in old.recipes for m in old.resolve_recipe("banana bread"))
+    assert core.get_max_servings("banana bread")["max_servings"] == 2
+
+
+# ── simulate_plan ─────────────────────────────────────────────────────────────
+
+def test_simulate_plan_runs_steps_on_the_supply_left(demo):
+    plan = core.simulate_plan([
+        {"recipe_name": "lemon cake", "servings": 1},
+        {"recipe_name": "scramble eggs", "servings": 1},
+        {"recipe_name": "apple cake", "servings": 1},
+    ])["plans"][0]
+    assert plan["feasible"] is False and plan["failed_step"] == 3
+    eggs = [r for r in plan["steps"][1]["remaining_supply"] if r["name"] == "eggs"]
+    assert eggs == [{"name": "eggs", "before": 7, "used": 5, "after": 2}]
+    assert plan["steps"][2]["missing_ingredients"] == [
+        {"name": "eggs", "required": 3, "in_stock": 2, "shortage": 1}
+    ]
+
+
+@pytest.mark.parametrize("step", [
+    {"recipe_name": "scramble eggs", "servings": "two"},
+    {"recipe_name": "scramble eggs", "servings": None},
+    {"recipe_name": "scramble eggs", "servings": -5},
+    {"recipe_name": "scramble eggs", "servings": 1.5},
+    {"servings": 1},
+    "scramble eggs",
+])
+def test_simulate_plan_reports_a_malformed_step(demo, step):
+    plan = core.simulate_plan([{"recipe_name": "lemon cake", "servings": 1}, step])["plans"][0]
+    assert plan["failed_step"] == 2
+    assert plan["steps"][1]["can_make"] is False and "error" in plan["steps"][1]
+    assert "remaining_supply" not in plan["steps"][1]
+
+
+def test_simulate_plan_accepts_whole_float_servings(demo):
+    plan = core.simulate_plan([{"recipe_name": "scramble eggs", "servings": 2.0}])["plans"][0]
+    assert plan["feasible"] is True and plan["steps"][0]["servings"] == 2
+
+
+# ── optimize_menu ─────────────────────────────────────────────────────────────
+
+def test_optimize_menu_finds_the_most_servings(demo):
+    menu = core.optimize_menu(mode="exact")
+    assert menu["optimal"] is True and menu["total_servings"] == 2
+    assert all(r["after"] >= 0 for r in menu["remaining_supply"])
+
+
+def test_optimize_menu_honours_weights_and_minimums(demo):
+    menu = core.optimize_menu(weights={"scramble eggs": 0}, min_servings={"lemon cake": 1}, mode="exact")
+    assert {r["recipe_name"]: r["servings"] for r in menu["menu"]} == {"lemon cake": 1, "apple cake": 1}
+
+
+@pytest.mark.parametrize("arguments", [
+    {"weights": {"lemon cake": "high"}},
+    {"weights": {"lemon cake": -1}},
+    {"weights": ["lemon cake"]},
+    {"min_servings": {"lemon cake": -2}},
+    {"min_servings": {"lemon cake": 1.5}},
+    {"time_budget_seconds": "soon"},
+    {"mode": "best"},
+    {"weights": {"pancakes": 2}},
+])
+def test_optimize_menu_refuses_bad_arguments(demo, arguments):
+    assert "error" in core.optimize_menu(**arguments)
+
+
+def test_optimize_menu_exact_runs_as_fast_on_a_large_catalog(make_db, use_db):
+    use_db(make_db(_synthetic(400)))
+    menu = core.optimize_menu(mode="exact", time_budget_seconds=0.2)
+    assert menu["mode"] == "fast" and menu["total_servings"] > 0
+
+
+# ── search_recipes_by_ingredient ──────────────────────────────────────────────
+
+def _search_all(query: str) -> list[dict]:
+    """Every result of a search, following the cursors."""
+    results, cursor = [], None
+    while True:
+        page = core.search_recipes_by_ingredient(query, limit=7, cursor=cursor)
+        results += page["results"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return results
+
+
+QUERIES = ["alt", "ggs", "ilk", "utt", "a", "Eggs", "olive oil", "pepper 2",
+           "eggs AND milk", "lemon OR apple", "eggs NOT milk", "ic NOT sugar", "zzz"]
+
+
+@pytest.mark.parametrize("use_snapshot", [False, True], ids=["read-through", "snapshot"])
+def test_fts_search_matches_the_catalog_search(make_db, use_db, use_snapshot):
+    path = make_db(_synthetic(150))
+    use_db(path, USE_SNAPSHOT=use_snapshot)
+    expected = {query: _search_all(query) for query in QUERIES}
+    assert expected["ilk"] and expected["a"]
+
+    with sqlite3.connect(path) as conn:
+        fts.install(conn)
+    conn.close()
+    use_db(path, USE_SNAPSHOT=use_snapshot)
+    assert {query: _search_all(query) for query in QUERIES} == expected
+
+
+def test_fts_install_replaces_a_word_tokenized_table(make_db):
+    conn = sqlite3.connect(make_db())
+    conn.execute("CREATE VIRTUAL TABLE recipe_search USING fts5("
+                 "recipe_name, ingredient_names, recipe_uid UNINDEXED, tokenize = 'unicode61')")
+    assert fts.is_installed(conn) and not fts.is_current(conn)
+    fts.install(conn)
+    assert fts.is_current(conn)
+    assert fts.search_recipe_uids(conn, "ilk", 0, 10) is not None
+    assert fts.search_recipe_uids(conn, "ilk", 0, 10) == fts.search_recipe_uids(conn, "milk", 0, 10) != []
+    conn.close()
+
+
+def test_fts_rebuild_is_one_transaction(make_db):
+    conn = sqlite3.connect(make_db())
+    fts.install(conn)
+    before = fts.search_recipe_uids(conn, "milk", 0, 10)
+
+    def no_new_documents(action, table, *_):
+        insert = action == sqlite3.SQLITE_INSERT and table == fts.TABLE
+        return sqlite3.SQLITE_DENY if insert else sqlite3.SQLITE_OK
+
+    conn.set_authorizer(no_new_documents)
+    with pytest.raises(sqlite3.DatabaseError):
+        fts.rebuild(conn)
+    conn.set_authorizer(None)
+    assert not conn.in_transaction
+    assert fts.search_recipe_uids(conn, "milk", 0, 10) == before != []
+    conn.close()
+
+
+# ── Stock writes ──────────────────────────────────────────────────────────────
+
+DEMO_STOCK = {"apple": 2, "eggs": 10, "lemon": 3, "milk": 2, "tomato": 1}
+
+
+def _supplies() -> dict[str, int]:
+    return {row["name"]: row["supply"] for row in core.get_inventory()}
+
+
+@pytest.mark.parametrize("use_snapshot", [True, False])
+def test_consume_recipe_subtracts_its_ingredients(make_db, use_db, use_snapshot):
+    use_db(make_db(), COMPACT_RESULTS=False, USE_SNAPSHOT=use_snapshot)
+    result = core.consume_recipe("lemon cake")
+    assert result["servings_consumed"] == 1
+    assert {i["name"]: (i["used"], i["supply"]) for i in result["ingredients"]} == {
+        "eggs": (3, 7), "lemon": (3, 0), "milk": (1, 1),
+    }
+    assert _supplies() == {**DEMO_STOCK, "eggs": 7, "lemon": 0, "milk": 1}
+    assert core.get_max_servings("lemon cake")["max_servings"] == 0
+
+
+def test_consume_recipe_is_all_or_nothing(demo):
+    result = core.consume_recipe("lemon cake", servings=2)
+    assert result["error"].startswith("Not enough stock")
+    assert result["shortages"] == [{"name": "lemon", "required": 6, "in_stock": 3, "shortage": 3}]
+    assert _supplies() == DEMO_STOCK
+
+
+def test_restock_checks_the_expected_version(demo):
+    version = core.restock("eggs", 2)["version"]
+    assert core.restock("eggs", 5, expected_version=version)["supply"] == 17
+    stale = core.restock("eggs", 5, expected_version=version)
+    assert [c["name"] for c in stale["conflicts"]] == ["eggs"]
+    assert _supplies()["eggs"] == 17
+
+
+def test_bulk_adjust_supply_applies_every_entry_or_none(demo):
+    rejected = core.bulk_adjust_supply([
+        {"ingredient_name": "eggs", "delta": 5},
+        {"ingredient_name": "milk", "delta": -3},
+    ])
+    assert [s["name"] for s in rejected["shortages"]] == ["milk"]
+    invalid = core.bulk_adjust_supply([
+        {"ingredient_name": "eggs", "delta": 5},
+        {"ingredient_name": "eggs", "delta": 1, "supply": 3},
+    ])
+    assert "problems" in invalid
+    assert _supplies() == DEMO_STOCK
+
+    applied = core.bulk_adjust_supply([
+        {"ingredient_name": "eggs", "delta": 5},
+        {"ingredient_name": "milk", "supply": 0},
+    ])
+    assert applied["applied"] == 2
+    assert _supplies() == {**DEMO_STOCK, "eggs": 15, "milk": 0}
+
+
+def test_writes_are_refused_when_read_only(demo, monkeypatch):
+    monkeypatch.setattr(core, "ALLOW_WRITES", False)
+    assert "error" in core.restock("eggs", 1)
+    assert "error" in core.consume_recipe("lemon cake")
+    assert _supplies()["eggs"] == 10
+
+
+# ── Schema migrations ─────────────────────────────────────────────────────────
+
+def _version_1_db(path: str) -> str:
+    conn = sqlite3.connect(path, isolation_level=None)
+    migrations.upgrade(conn, target=1)
+    conn.execute("INSERT INTO ingredients VALUES ('i1', 'eggs', 10)")
+    conn.execute("INSERT INTO recipes VALUES ('r1', 'scramble eggs')")
+    conn.execute("INSERT INTO recipe_ingredient VALUES ('r1', 'i1', 5)")
+    conn.close()
+    return path
+
+
+def test_concurrent_upgrades_apply_every_step_once(tmp_path):
+    path = _version_1_db(str(tmp_path / "old.db"))
+    start = threading.Barrier(4)
+    applied, failures = [], []
+
+    def upgrade():
+        start.wait()
+        try:
+            applied.extend(migrations.upgrade_path(path))
+        except sqlite3.Error as exc:
+            failures.append(exc)
+
+    threads = [threading.Thread(target=upgrade) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+    assert sorted(applied) == list(range(2, migrations.LATEST_VERSION + 1))
+
+
+def test_tools_do_not_migrate_unless_asked(tmp_path, use_db):
+    path = _version_1_db(str(tmp_path / "old.db"))
+    use_db(path, AUTO_MIGRATE=False)
+    with pytest.raises(migrations.OutdatedSchemaError):
+        core.get_inventory()
+    conn = sqlite3.connect(path)
+    assert migrations.current_version(conn) == 1
+    conn.close()
+
+    use_db(path, AUTO_MIGRATE=True, COMPACT_RESULTS=False)
+    assert [(i["name"], i["supply"]) for i in core.get_inventory()] == [("eggs", 10)]
+
+
+def test_async_tools_report_an_outdated_schema(tmp_path, use_db):
+    path = _version_1_db(str(tmp_path / "old.db"))
+    use_db(path, AUTO_MIGRATE=False)
+    result = asyncio.run(async_tools.get_inventory())
+    assert "schema version 1" in result["error"]
+    assert "schema version 1" in asyncio.run(async_tools.get_max_servings("eggs"))["error"]
+
+
+@pytest.mark.parametrize("auto_migrate", [False, True])
+def test_a_missing_database_is_reported_not_created(tmp_path, use_db, auto_migrate):
+    path = str(tmp_path / "missing.db")
+    use_db(path, AUTO_MIGRATE=auto_migrate)
+    with pytest.raises(migrations.MissingDatabaseError):
+        core.get_inventory()
+    assert "does not exist" in asyncio.run(async_tools.get_inventory())["error"]
+    assert not os.path.exists(path)
+
+
+# ── Compact pages ─────────────────────────────────────────────────────────────
+
+def _all_pages(tool) -> list[dict]:
+    pages, cursor = [], None
+    while True:
+        pages.append(tool(cursor=cursor))
+        cursor = pages[-1]["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("use_snapshot", [False, True], ids=["read-through", "snapshot"])
+@pytest.mark.parametrize("tool, key", [
+    (core.get_all_recipes, "name"),
+    (core.check_recipe_feasibility, "recipe_name"),
+    (core.get_inventory, "name"),
+    (core.simulate_servings_sweep, "recipe_name"),
+])
+def test_compact_pages_cover_the_verbose_listing(make_db, use_db, use_snapshot, tool, key):
+    path = make_db(_synthetic(120))
+    use_db(path, USE_SNAPSHOT=use_snapshot, COMPACT_RESULTS=False)
+    verbose = [row[key] for row in tool()]
+
+    use_db(path, USE_SNAPSHOT=use_snapshot, COMPACT_RESULTS=True, RESULT_BUDGET_BYTES=200)
+    pages = _all_pages(tool)
+    assert len(pages) > 2
+    assert {page["total"] for page in pages} == {len(verbose)}
+    column = pages[0]["columns"].index(key)
+    assert [row[column] for page in pages for row in page["rows"]] == verbose
+
+
+def test_a_compact_page_builds_only_its_own_rows(demo, monkeypatch):
+    monkeypatch.setattr(core, "COMPACT_RESULTS", True)
+    monkeypatch.setattr(core, "RESULT_BUDGET_BYTES", 1)       # one row per page
+    built = []
+    recipe_ingredients = core.InventorySnapshot.recipe_ingredients
+    monkeypatch.setattr(core.InventorySnapshot, "recipe_ingredients",
+                        lambda self, uid: built.append(uid) or recipe_ingredients(self, uid))
+    first = core.get_all_recipes()
+    built.clear()
+    second = core.get_all_recipes(first["next_cursor"])
+    assert [row[0] for row in second["rows"]] == ["lemon cake"]
+    assert second["total"] == 3 and len(built) == 2      # the page's row and the one that did not fit
+
+
+# ── Router ────────────────────────────────────────────────────────────────────
+
+def _route_turn(question: str):
+    from google.genai import types
+    context = SimpleNamespace(user_content=types.Content(role="user", parts=[types.Part(text=question)]))
+    return asyncio.run(router.before_agent(context))
+
+
+def test_router_is_off_unless_enabled(demo, monkeypatch):
+    env = {k: v for k, v in os.environ.items() if k != "SQL_AGENT_ROUTER"}
+    default = subprocess.run([sys.executable, "-c", "from sql_agent import router; print(router.ENABLED)"],
+                             env=env, capture_output=True, text=True, check=True)
+    assert default.stdout.strip() == "False"
+    monkeypatch.setattr(router, "ENABLED", False)
+    assert _route_turn("how many lemon cakes can I make?") is None
+
+
+def test_router_runs_its_tools_off_the_event_loop(demo, monkeypatch):
+    monkeypatch.setattr(router, "ENABLED", True)
+    threads = []
+    get_max_servings = core.get_max_servings
+    monkeypatch.setattr(core, "get_max_servings",
+                        lambda *args: threads.append(threading.current_thread()) or get_max_servings(*args))
+    reply = _route_turn("how many lemon cakes can I make?")
+    assert reply.parts[0].text.startswith("You can make 1 serving of lemon cake.")
+    assert threads and threading.main_thread() not in threads
+    assert _route_turn("tell me a joke") is None
@@ -0,0 +1,43 @@
+"""
+test_dice.py
+------------
+Argument handling and reproducibility of dice_agent.dice.roll_dice.
+"""
+
+import pytest
+
+from dice_agent import dice
+
+
+@pytest.fixture(autouse=True)
+def fresh_streams():
+    dice.reset_streams()
+    yield
+    dice.reset_streams()
+
+
+def test_whole_float_arguments_are_accepted():
+    result = dice.roll_dice("3d6", repeat=2.0, seed=7.0)
+    assert result["status"] == "success"
+    assert result["notation"] == "2x 3d6" and len(result["totals"]) == 2
+    assert result["seed"] == 7
+
+
+@pytest.mark.parametrize("arguments", [
+    {"repeat": 2.5},
+    {"repeat": 0},
+    {"repeat": "many"},
+    {"seed": -1},
+    {"seed": "x"},
+    {"seed": 1.5},
+    {"notation": "", "count": 2.5},
+])
+def test_bad_arguments_return_an_error(arguments):
+    arguments = {"notation": "3d6", **arguments}
+    result = dice.roll_dice(**arguments)
+    assert result["status"] == "error" and result["error_message"]
+
+
+def test_a_seed_replays_the_same_rolls():
+    first = dice.roll_dice("4d6kh3", repeat=6, seed=42)
+    assert dice.roll_dice("4d6kh3", repeat=6, seed=42) == first
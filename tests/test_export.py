@@ -0,0 +1,112 @@
+"""
+test_export.py
+--------------
+sql_agent.export: NDJSON and CSV exports hold the same rows as the verbose
+listings, and streaming them keeps Python allocations bounded.
+"""
+
+import csv
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from sql_agent import core, export, init_db
+
+MAX_PEAK_MIB = 1.0      # see benchmarks/bench_export.py for larger catalogs
+
+
+def _without_servings(rows: list[dict]) -> list[dict]:
+    return [{k: v for k, v in r.items() if k != "max_servings"} for r in rows]
+
+
+def _export(kind: str, format: str, **filters) -> str:
+    out = io.StringIO()
+    result = export.export(kind, out, format, **filters)
+    assert "error" not in result, result
+    return out.getvalue()
+
+
+@pytest.fixture(params=[True, False], ids=["snapshot", "read-through"])
+def catalog(request, make_db, use_db) -> None:
+    records = [*init_db.synthetic_catalog(300, 40, (1, 6), seed=2),
+               {"type": "recipe", "name": "empty bowl", "ingredients": []}]
+    path = make_db(records)
+    use_db(path, USE_SNAPSHOT=request.param, COMPACT_RESULTS=False)
+
+
+# ── Round trips ───────────────────────────────────────────────────────────────
+
+def test_ndjson_round_trip(catalog):
+    assert [json.loads(line) for line in _export("recipes", "ndjson").splitlines()] == core.get_all_recipes()
+    feasibility = [json.loads(line) for line in _export("feasibility", "ndjson").splitlines()]
+    assert _without_servings(feasibility) == core.check_recipe_feasibility()
+    for row in feasibility[::30]:
+        assert row["max_servings"] == core.get_max_servings(row["recipe_name"])["max_servings"]
+
+
+def test_recipes_csv_round_trip(catalog):
+    reader = csv.DictReader(io.StringIO(_export("recipes", "csv")))
+    assert reader.fieldnames == export.CSV_COLUMNS["recipes"]
+    recipes: dict[str, dict] = {}
+    for line in reader:
+        recipe = recipes.setdefault(line["recipe_uid"], {
+            "uid": line["recipe_uid"], "name": line["recipe_name"], "ingredients": [],
+        })
+        if line["ingredient"]:
+            recipe["ingredients"].append({
+                "name": line["ingredient"], "quantity": int(line["quantity"]), "supply": int(line["supply"]),
+            })
+    assert list(recipes.values()) == core.get_all_recipes()
+    assert any(not r["ingredients"] for r in recipes.values())     # the empty-recipe line is covered
+
+
+def test_feasibility_csv_round_trip(catalog):
+    reader = csv.DictReader(io.StringIO(_export("feasibility", "csv")))
+    assert reader.fieldnames == export.CSV_COLUMNS["feasibility"]
+    expected = [
+        [r["recipe_uid"], r["recipe_name"], str(int(r["can_make"])), str(r["max_servings"]),
+         ";".join(f"{m['name']}:{m['shortage']}" for m in r["missing_ingredients"])]
+        for r in map(json.loads, _export("feasibility", "ndjson").splitlines())
+    ]
+    assert [list(line.values()) for line in reader] == expected
+
+
+def test_filters_match_the_feasibility_listing(catalog):
+    everything = [json.loads(line) for line in _export("feasibility", "ndjson").splitlines()]
+    exported = [json.loads(line) for line in _export("feasibility", "ndjson", min_servings=2).splitlines()]
+    assert exported == [r for r in everything if r["max_servings"] >= 2]
+    feasible = [json.loads(line) for line in _export("feasibility", "ndjson", feasible_only=True).splitlines()]
+    assert feasible == [r for r in everything if r["can_make"]]
+
+
+def test_bad_arguments_write_nothing(demo):
+    out = io.StringIO()
+    assert "error" in export.export("menus", out)
+    assert "error" in export.export("recipes", out, "xml")
+    assert out.getvalue() == ""
+
+
+# ── Memory ────────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("use_snapshot", [True, False], ids=["snapshot", "read-through"])
+@pytest.mark.parametrize("kind", export.KINDS)
+@pytest.mark.parametrize("format", export.FORMATS)
+def test_streamed_export_peak_is_bounded(make_db, use_db, use_snapshot, kind, format):
+    path = make_db(init_db.synthetic_catalog(3_000, 200, (1, 8), seed=3))
+    use_db(path, USE_SNAPSHOT=use_snapshot)
+
+    def stream() -> int:
+        with open(os.devnull, "w", encoding="utf-8") as out:
+            return export.export(kind, out, format)["rows"]
+
+    stream()        # warm-up: the snapshot and its feasibility view are shared by every call
+    tracemalloc.start()
+    try:
+        assert stream() == 3_000
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < MAX_PEAK_MIB * 2**20, f"peaked at {peak / 2**20:.2f} MiB"
@@ -0,0 +1,133 @@
+"""
+test_feasibility.py
+-------------------
+Incremental feasibility (FeasibilityView.apply, reached through the snapshot
+cache's supply-only updates) and its change feed: subscribe_feasibility,
+feasibility_changes and ChangeFeed.since.
+"""
+
+import random
+import sqlite3
+
+import numpy as np
+
+from sql_agent import core, init_db
+from sql_agent.feasibility import ChangeFeed, FeasibilityView
+
+
+def _lemon_cake_events() -> list[dict]:
+    """The events of consuming one lemon cake from the demo stock."""
+    return [
+        {"recipe_name": "lemon cake", "can_make": False, "max_servings": 0, "limiting_ingredient": "lemon",
+         "before": {"can_make": True, "max_servings": 1, "limiting_ingredient": "lemon"}},
+        {"recipe_name": "scramble eggs", "can_make": True, "max_servings": 1, "limiting_ingredient": "eggs",
+         "before": {"can_make": True, "max_servings": 2, "limiting_ingredient": "eggs"}},
+    ]
+
+
+def _without_ids(events: list[dict]) -> list[dict]:
+    return [{k: v for k, v in e.items() if k not in ("seq", "type", "recipe_uid")} for e in events]
+
+
+# ── Incremental state ─────────────────────────────────────────────────────────
+
+def test_incremental_feasibility_matches_a_full_evaluation(make_db, use_db):
+    path = make_db(init_db.synthetic_catalog(400, 30, (1, 5), seed=5))
+    use_db(path, COMPACT_RESULTS=False, USE_SNAPSHOT=True)
+    unsubscribe = core.subscribe_feasibility(lambda events: None)
+    names = [i["name"] for i in core.get_inventory()]
+    rng = random.Random(5)
+    cache = core._get_snapshot_cache()
+
+    for step in range(20):
+        chosen = rng.sample(names, rng.randint(1, 4))
+        if step % 2:
+            result = core.bulk_adjust_supply([{"ingredient_name": n, "supply": rng.randint(0, 12)} for n in chosen])
+            assert "error" not in result, result
+        else:       # another process: noticed by the next call
+            with sqlite3.connect(path) as conn:
+                conn.executemany("UPDATE ingredients SET supply = ? WHERE name = ?",
+                                 [(rng.randint(0, 12), n) for n in chosen])
+            conn.close()
+        view = core._get_snapshot().feasibility()
+        full = FeasibilityView(view.matrix)
+        np.testing.assert_array_equal(view.can_make, full.can_make)
+        np.testing.assert_array_equal(view.max_servings, full.max_servings)
+        np.testing.assert_array_equal(view.limiting, full.limiting)
+        assert view.feasible == full.feasible
+
+    assert (cache.rebuilds, cache.updates) == (1, 20)
+    unsubscribe()
+
+
+def test_apply_reports_only_the_recipes_that_changed(demo):
+    snapshot = core._get_snapshot()
+    view = snapshot.feasibility()
+    supply = {uid: s for uid, (_, s) in snapshot.ingredients.items()}
+    tomato = next(uid for uid, (name, _) in snapshot.ingredients.items() if name == "tomato")
+    updated, events = snapshot.with_supply({**supply, tomato: 0}, snapshot.version)
+    assert events == []             # no recipe uses tomato
+    assert updated._feasibility is not None and updated._feasibility.can_make is view.can_make
+
+
+# ── Events ────────────────────────────────────────────────────────────────────
+
+def test_a_write_publishes_before_and_after_values(demo):
+    received: list[list[dict]] = []
+    core.subscribe_feasibility(received.append)
+    core.consume_recipe("lemon cake")
+
+    assert len(received) == 1
+    assert _without_ids(received[0]) == _lemon_cake_events()
+    assert [e["seq"] for e in received[0]] == [1, 2]
+    assert core.feasibility_changes(0) == {"seq": 2, "events": received[0], "truncated": False}
+    assert core.feasibility_changes(2)["events"] == []
+
+
+def test_subscribers_hear_of_writes_by_other_connections(demo):
+    received: list[list[dict]] = []
+    unsubscribe = core.subscribe_feasibility(received.append)
+    with sqlite3.connect(demo) as conn:
+        conn.execute("UPDATE ingredients SET supply = 0 WHERE name = 'apple'")
+    conn.close()
+    assert received == []           # noticed by the next call
+    core.get_inventory()
+    assert [(e["recipe_name"], e["can_make"], e["before"]["can_make"]) for e in received[0]] == [
+        ("apple cake", False, True),
+    ]
+
+    unsubscribe()
+    core.restock("apple", 5)
+    assert len(received) == 1
+    assert core.feasibility_changes(1)["events"][0]["recipe_name"] == "apple cake"
+
+
+def test_a_catalog_change_publishes_a_reload(demo):
+    received: list[list[dict]] = []
+    core.subscribe_feasibility(received.append)
+    init_db.bulk_load(demo, [{"type": "recipe", "name": "omelette", "ingredients": [
+        {"name": "eggs", "quantity": 2}, {"name": "milk", "quantity": 1}]}])
+    core.get_inventory()
+    assert received == [[{"type": "reload", "recipes": 4, "can_make": 4, "seq": 1}]]
+
+
+def test_a_failing_subscriber_does_not_stop_the_others(demo):
+    received: list[list[dict]] = []
+    core.subscribe_feasibility(lambda events: 1 / 0)
+    core.subscribe_feasibility(received.append)
+    core.consume_recipe("lemon cake")
+    assert len(received) == 1
+    assert core._get_snapshot_cache().feed.subscriber_errors == 1
+
+
+# ── History ───────────────────────────────────────────────────────────────────
+
+def test_since_reports_events_dropped_from_the_history():
+    feed = ChangeFeed(history=3)
+    feed.publish([{"type": "recipe", "n": n} for n in range(5)])
+    assert feed.since(0) == {"seq": 5, "events": [{"type": "recipe", "n": n, "seq": n + 1} for n in (2, 3, 4)],
+                             "truncated": True}
+    assert feed.since(1)["truncated"]
+    assert not feed.since(2)["truncated"] and len(feed.since(2)["events"]) == 3
+    assert feed.since(5) == {"seq": 5, "events": [], "truncated": False}
+    assert ChangeFeed().since(0) == {"seq": 0, "events": [], "truncated": False}
@@ -0,0 +1,111 @@
+"""
+test_llm_cache.py
+-----------------
+ResponseStore size tracking and eviction, and CachedLlm's store calls.
+"""
+
+import asyncio
+import threading
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import llm_cache
+
+
+class _EchoLlm(BaseLlm):
+    """Answers every request with the text of its last message."""
+
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        text = llm_request.contents[-1].parts[0].text
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def _request(text: str) -> LlmRequest:
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+
+def _generate(model: BaseLlm, text: str, stream: bool = False) -> list[LlmResponse]:
+    async def run():
+        return [r async for r in model.generate_content_async(_request(text), stream)]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = llm_cache.ResponseStore(str(tmp_path / "cache.db"), max_entries=5, max_bytes=1_000)
+    yield store
+    store.close()
+
+
+# ── Store ─────────────────────────────────────────────────────────────────────
+
+def test_tracked_totals_match_the_table(store):
+    for i in range(20):
+        store.put(f"k{i % 8}", "x" * (50 + i))
+    store.get("k7")
+    assert (store._count, store._bytes) == store._totals()
+    assert store._count <= 5 and store._bytes <= 1_000
+    metrics = store.metrics()
+    assert (metrics["entries"], metrics["bytes"]) == store._totals()
+
+
+def test_least_recently_used_entries_are_evicted_first(store, monkeypatch):
+    clock = iter(range(1_000_000, 2_000_000))
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(clock)))
+    for i in range(5):
+        store.put(f"k{i}", "x" * 10)
+    store.get("k0")
+    store.put("k5", "x" * 10)
+    assert store.get("k0") is not None
+    assert store.get("k1") is None
+    assert store.stats["evicted"] == 1
+
+
+def test_byte_cap_counts_replaced_entries_once(store):
+    for _ in range(10):
+        store.put("same", "x" * 400)
+    store.put("other", "y" * 400)
+    assert store.get("same") is not None and store.get("other") is not None
+    assert (store._count, store._bytes) == (2, 800)
+
+
+def test_expired_entries_are_dropped(store, monkeypatch):
+    store.put("old", "x" * 100)
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + store.ttl_seconds + 1)
+    store.put("new", "y" * 100)
+    assert store.get("old") is None
+    assert (store._count, store._bytes) == (1, 100)
+
+
+# ── CachedLlm ─────────────────────────────────────────────────────────────────
+
+def test_cached_llm_uses_the_store_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "ENABLED", True)
+    path = str(tmp_path / "cache.db")
+    model = llm_cache.CachedLlm.wrap(_EchoLlm(model="echo"), store_path=path)
+    store = llm_cache.get_store(path)
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(store, name)
+        monkeypatch.setattr(store, name, lambda *args, _m=method: threads.append(threading.current_thread()) or _m(*args))
+
+    first = _generate(model, "hello")
+    second = _generate(model, "hello")
+    assert first[0].content == second[0].content
+    assert second[0].custom_metadata == {"llm_cache": "hit"}
+    assert model.inner.calls == 1
+    assert len(threads) == 3 and threading.main_thread() not in threads
+
+    _generate(model, "hello", stream=True)
+    assert store.metrics()["bypassed"] == 1
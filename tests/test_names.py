@@ -0,0 +1,147 @@
+"""
+test_names.py
+-------------
+Ranking, ambiguity, incremental updates and bounded work of the name
+indexes in sql_agent.names (NameIndex and its array-backed FrozenNameIndex).
+"""
+
+import pytest
+
+from sql_agent import init_db, names
+from sql_agent.names import FrozenNameIndex, NameIndex
+
+RECIPES = {
+    "r1": "lemon cake",
+    "r2": "lemon tart",
+    "r3": "cake",
+    "r4": "apple cake",
+    "r5": "pancakes",
+    "r6": "Crème Brûlée",
+    "r7": "lemonade",
+}
+
+
+def _frozen(entries: dict[str, str]) -> FrozenNameIndex:
+    return FrozenNameIndex(**names.freeze(entries))
+
+
+@pytest.fixture(params=[NameIndex, _frozen], ids=["dict", "frozen"])
+def make_index(request):
+    return request.param
+
+
+def _keys(matches: list[names.Match]) -> list[str]:
+    return [m.key for m in matches]
+
+
+# ── Ranking ───────────────────────────────────────────────────────────────────
+
+def test_matches_rank_exact_prefix_word_substring_fuzzy(make_index):
+    index = make_index(RECIPES)
+    matches = index.search("cake", limit=10)
+    assert [(m.key, m.match) for m in matches] == [
+        ("r3", "exact"), ("r1", "word"), ("r4", "word"), ("r5", "substring"),
+    ]
+    assert [m.match for m in index.search("lemon", limit=10)] == ["prefix"] * 3
+    fuzzy = index.search("lemno cake")
+    assert fuzzy[0].key == "r1" and {m.match for m in fuzzy} == {"fuzzy"}
+
+
+def test_prefix_matches_prefer_the_shorter_name(make_index):
+    index = make_index(RECIPES)
+    assert _keys(index.search("lemon", limit=10)) == ["r7", "r1", "r2"]
+    assert _keys(index.search("lemon", limit=1)) == ["r7"]
+
+
+def test_ties_go_to_the_shorter_name_then_insertion_order(make_index):
+    index = make_index({"a": "green tea", "b": "black tea", "c": "tea"})
+    assert _keys(index.search("tea")) == ["c", "a", "b"]
+
+
+def test_accents_and_case_are_ignored(make_index):
+    index = make_index(RECIPES)
+    assert index.search("creme brulee")[0] == names.Match("r6", "Crème Brûlée", 1.0, "exact")
+    assert _keys(index.search("BRÛLÉE")) == ["r6"]
+    assert names.normalize("  Crème   Brûlée ") == "creme brulee"
+
+
+def test_unknown_names_and_fuzzy_off_find_nothing(make_index):
+    index = make_index(RECIPES)
+    assert index.search("zzz") == []
+    assert index.search("lemno cake", fuzzy=False) == []
+    assert index.search("   ") == []
+
+
+# ── Ambiguity ─────────────────────────────────────────────────────────────────
+
+def test_close_prefix_matches_are_ambiguous(make_index):
+    matches = make_index(RECIPES).search("lemon")
+    assert [round(m.score, 3) for m in matches] == [0.931, 0.925, 0.925]
+    assert names.is_ambiguous(matches)
+
+
+def test_an_exact_or_clearly_better_match_is_not_ambiguous(make_index):
+    index = make_index(RECIPES)
+    assert not names.is_ambiguous(index.search("cake"))
+    assert not names.is_ambiguous(index.search("apple"))
+    assert not names.is_ambiguous(index.search("lemno cake"))
+
+
+# ── Updates ───────────────────────────────────────────────────────────────────
+
+def test_updated_renames_adds_and_removes_without_touching_the_original():
+    index = NameIndex(RECIPES)
+    entries = {**RECIPES, "r2": "orange tart", "r8": "lemon curd"}
+    del entries["r7"]
+    updated = index.updated(entries)
+
+    assert _keys(updated.search("lemon", limit=10)) == ["r1", "r8"]
+    assert _keys(updated.search("orange")) == ["r2"]
+    assert "r7" not in _keys(updated.search("lemonade"))
+    assert len(updated) == len(entries)
+
+    assert _keys(index.search("lemon", limit=10)) == ["r7", "r1", "r2"]
+    assert index.search("orange") == []
+    assert len(index) == len(RECIPES)
+
+
+def test_updated_matches_a_fresh_index():
+    entries = {k: n for k, n in RECIPES.items() if k != "r3"} | {"r9": "lemon cake deluxe"}
+    updated = NameIndex(RECIPES).updated(entries)
+    fresh = NameIndex(entries)
+    for query in ("lemon", "cake", "le", "c", "tart", "creme", "lemon cake"):
+        assert _keys(updated.search(query, limit=10)) == _keys(fresh.search(query, limit=10)), query
+
+
+def test_updated_without_changes_returns_the_same_index():
+    index = NameIndex(RECIPES)
+    assert index.updated(dict(RECIPES)) is index
+
+
+def test_frozen_index_is_read_only():
+    index = _frozen(RECIPES)
+    for change in (lambda: index.add("x", "y"), lambda: index.remove("r1"), lambda: index.updated({})):
+        with pytest.raises(TypeError):
+            change()
+
+
+# ── Bounded work ──────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("query", ["c", "le", "cake", "baked"])
+def test_short_and_common_queries_score_a_bounded_number_of_names(make_index, monkeypatch, query):
+    entries = {
+        r["uid"]: r["name"]
+        for r in init_db.synthetic_catalog(5_000, 100, (1, 2), seed=4)
+        if r["type"] == "recipe"
+    }
+    index = make_index(entries)
+    expected = names.rank(query, entries.items())
+    scored = []
+    score = names.score
+    monkeypatch.setattr(names, "score", lambda q, n: scored.append(n) or score(q, n))
+    matches = index.search(query)
+    assert len(scored) <= 50, len(scored)
+    if len(query) >= 3:
+        assert _keys(matches) == _keys(expected)
+    else:
+        assert all(m.match in ("exact", "prefix", "word") for m in matches)
@@ -0,0 +1,138 @@
+"""
+test_replica.py
+---------------
+sql_agent.replica: the in-memory replica read path of core (USE_REPLICA),
+its refresh on data_version changes, generation swaps and close().
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from sql_agent import core
+from sql_agent.replica import Replica
+
+
+def _supplies() -> dict[str, int]:
+    return {row["name"]: row["supply"] for row in core.get_inventory()}
+
+
+def _set_supply(path: str, name: str, supply: int) -> None:
+    """Commit a stock change through a connection of its own (another process)."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE ingredients SET supply = ? WHERE name = ?", (supply, name))
+    conn.close()
+
+
+def _supply(conn: sqlite3.Connection, name: str) -> int:
+    return conn.execute("SELECT supply FROM ingredients WHERE name = ?", (name,)).fetchone()[0]
+
+
+@pytest.fixture
+def replica_db(demo, use_db) -> str:
+    """core reading the demo catalog through its replica (no snapshot)."""
+    use_db(demo, USE_SNAPSHOT=False, USE_REPLICA=True, COMPACT_RESULTS=False)
+    return demo
+
+
+@pytest.fixture
+def replica(demo):
+    replica = Replica(demo, max_size=4)
+    yield replica
+    replica.close()
+
+
+# ── Through core ──────────────────────────────────────────────────────────────
+
+def test_reads_see_this_process_s_writes_right_away(replica_db):
+    assert core.get_max_servings("lemon cake")["max_servings"] == 1
+    assert "error" not in core.consume_recipe("lemon cake")
+    assert core.get_max_servings("lemon cake")["max_servings"] == 0
+    assert _supplies()["lemon"] == 0
+    assert core._replicas[replica_db].stats()["generation"] == 2
+
+
+def test_an_external_update_is_picked_up_by_the_next_read(replica_db):
+    assert _supplies()["eggs"] == 10
+    stats = core._replicas[replica_db].stats
+    assert stats()["refreshes"] == 1
+    _supplies()
+    assert stats()["refreshes"] == 1        # unchanged file: no copy
+
+    _set_supply(replica_db, "eggs", 4)
+    assert _supplies()["eggs"] == 4
+    assert core.get_missing_ingredients("scramble eggs")["missing_ingredients"][0]["shortage"] == 1
+    assert stats()["refreshes"] == 2 and stats()["generation"] == 2
+
+
+def test_close_pools_closes_the_replica(replica_db):
+    _supplies()
+    replica = core._replicas[replica_db]
+    core.close_pools()
+    assert core._replicas == {}
+    with pytest.raises(RuntimeError):
+        replica.refresh()
+    assert _supplies()["eggs"] == 10        # a new replica is made on demand
+
+
+# ── Generations ───────────────────────────────────────────────────────────────
+
+def test_a_connection_keeps_its_generation_across_a_swap(replica, demo):
+    with replica.connection() as old:
+        _set_supply(demo, "milk", 7)
+        assert replica.refresh(force=False)
+        assert _supply(old, "milk") == 2            # still the copy it was handed
+        with replica.connection() as new:
+            assert _supply(new, "milk") == 7
+    with pytest.raises(sqlite3.ProgrammingError):   # the replaced generation closed it on release
+        old.execute("SELECT 1")
+    assert replica.stats()["generation"] == 2
+    assert not replica.refresh(force=False)         # nothing changed since
+
+
+def test_readers_keep_reading_during_refreshes(replica, demo):
+    totals = {2 + 10 + 3 + 2 + 1}           # the demo stock
+    errors: list[BaseException] = []
+    seen: set[int] = set()
+    done = threading.Event()
+
+    def read() -> None:
+        try:
+            while not done.is_set():
+                with replica.connection() as conn:
+                    seen.add(conn.execute("SELECT SUM(supply) FROM ingredients").fetchone()[0])
+        except BaseException as exc:
+            errors.append(exc)
+
+    with replica.connection():
+        pass
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        for supply in range(20, 30):
+            _set_supply(demo, "eggs", supply)
+            totals.add(2 + supply + 3 + 2 + 1)
+            replica.refresh(force=False)   # or a reader got there first: one copy either way
+    finally:
+        done.set()
+        for thread in readers:
+            thread.join()
+
+    assert errors == []
+    assert seen <= totals and len(seen) > 1         # every read saw one whole committed state
+    assert replica.stats()["generation"] == 11
+    assert replica.stats()["pool"]["in_use"] == 0
+
+
+def test_closed_replica_refuses_connections(replica):
+    with replica.connection() as conn:
+        replica.close()
+        assert _supply(conn, "eggs") == 10          # checked out: usable until released
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        with replica.connection():
+            pass
+    assert replica.stats()["generation"] == 0